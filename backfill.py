@@ -0,0 +1,122 @@
+"""
+Multi-day backfill: build several days of posts in one process.
+
+`daily_bot.py --days 7 --out week/` (or carousel_bot.py) asks Gemini for all
+days in one request (batch_prompt / batch_items), then pushes the days through
+a pipeline of stages. Each stage has its own small thread pool, sized to what
+the provider behind it tolerates: image generation runs a few days at a time
+while another day's reel is being fetched and rendered. Every stage reuses the
+process-wide clients (HTTP session, Gemini model, dedup histories, fonts, TTS
+cache, browser pool).
+
+The video stage defaults to no pool at all: it runs one day at a time on the
+calling thread (the bot's main thread or the scheduler daemon's worker). That
+keeps the Playwright browser fallback on the thread that started it (its sync
+API is bound to one thread) and leaves the CPU to ffmpeg, while the image pool
+keeps working on the next days.
+
+`--brand all` (see brands.py) fans out over the same pipeline: every brand's
+batch comes from its own Gemini request (BACKFILL_CONTENT_WORKERS brands at a
+time), then all brands' days share the image and video pools, so the brands
+together stay inside the same provider limits as one brand.
+"""
+
+import os
+import json
+import datetime
+import contextvars
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+from bot_core import _extract_json_from_text
+
+BACKFILL_IMAGE_WORKERS = int(os.environ.get("BACKFILL_IMAGE_WORKERS", "3"))  # Days generating images at once
+BACKFILL_VIDEO_WORKERS = int(os.environ.get("BACKFILL_VIDEO_WORKERS", "0"))  # Days fetching / rendering reels (0: calling thread)
+BACKFILL_CONTENT_WORKERS = int(os.environ.get("BACKFILL_CONTENT_WORKERS", "2"))  # Brands asking Gemini at once
+MAX_DAYS = 31
+
+
+def day_dates(days: int, start: str = None) -> list:
+    """ISO dates of `days` consecutive days from start (YYYY-MM-DD, default today)."""
+    first = datetime.date.fromisoformat(start) if start else datetime.date.today()
+    return [(first + datetime.timedelta(days=i)).isoformat() for i in range(days)]
+
+
+def batch_prompt(dates: list, key: str, extra: str = "") -> str:
+    """Instructions appended to a single-post prompt to get one object per day in one request."""
+    return f"""
+
+BATCH REQUEST: create content for {len(dates)} consecutive days ({dates[0]} to {dates[-1]}).
+Return ONLY a JSON object {{"{key}": [...]}} holding exactly {len(dates)} objects, one per day in date order,
+each with all the keys described above{extra}. Make every day clearly different (subject, palette, message);
+never repeat or paraphrase a line from another day.
+"""
+
+
+def batch_items(text: str, key: str) -> list:
+    """The per-day objects from a batch response (a {key: [...]} object or a bare array)."""
+    data = _extract_json_from_text(text)
+    if isinstance(data, dict) and isinstance(data.get(key), list):
+        return [item for item in data[key] if isinstance(item, dict)]
+    start, end = text.find("["), text.rfind("]")
+    if start != -1 and end > start:
+        try:
+            items = json.loads(text[start:end + 1])
+        except ValueError:
+            return []
+        return [item for item in items if isinstance(item, dict)]
+    return []
+
+
+def run_pipeline(items, stages):
+    """
+    Run every item through stages [(name, func, workers), ...]; func(item, previous
+    result) runs on that stage's pool as soon as the item's previous stage is done.
+    A stage with 0 workers has no pool: it runs on the calling thread, one item at a
+    time, while the other stages' pools keep going.
+    Yields (item, result, error) in completion order; an error skips later stages.
+    Stages run in a copy of the caller's context, so they see its current_run().
+    """
+    pools = [ThreadPoolExecutor(workers, thread_name_prefix=f"backfill-{name}") if workers > 0 else None
+             for name, _, workers in stages]
+    pending = {}
+    finished = []
+
+    def start(item, index, previous):
+        # Pooled stages are submitted; calling-thread stages run right here, then hand on
+        while pools[index] is None:
+            try:
+                previous = contextvars.copy_context().run(stages[index][1], item, previous)
+            except Exception as e:
+                finished.append((item, None, e))
+                return
+            index += 1
+            if index == len(stages):
+                finished.append((item, previous, None))
+                return
+        future = pools[index].submit(contextvars.copy_context().run, stages[index][1], item, previous)
+        pending[future] = (item, index)
+
+    try:
+        for item in items:
+            start(item, 0, None)
+            while finished:
+                yield finished.pop(0)
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                item, index = pending.pop(future)
+                try:
+                    result = future.result()
+                except Exception as e:
+                    yield item, None, e
+                    continue
+                if index + 1 < len(stages):
+                    start(item, index + 1, result)
+                    while finished:
+                        yield finished.pop(0)
+                else:
+                    yield item, result, None
+    finally:
+        for pool in pools:
+            if pool is not None:
+                pool.shutdown(wait=True, cancel_futures=True)
@@ -0,0 +1,159 @@
+"""
+Batch renderer for carousels and posts.
+
+Runs the image post-processing steps (process_for_instagram, overlay_text_on_slide)
+for many jobs on a ProcessPoolExecutor, so back-catalogue renders and A/B variants
+use every core instead of one.
+
+Manifest: a JSON list (or JSON Lines file) of jobs:
+    [
+      {"image": "raw/slide1.png", "text": "Trust the timing of your life.", "style": "carousel"},
+      {"image": "raw/post.png", "style": "post"}
+    ]
+Styles:
+    "post"     -> 1080x1080 crop + JPEG encode (no text)
+    "carousel" -> 1080x1080 crop + text overlay (needs "text")
+Relative image paths are resolved against the manifest's folder.
+
+Usage:
+    python batch_render.py manifest.json --out rendered/ --workers 4
+    python batch_render.py manifest.json --out rendered/ --bench 1,2,4
+"""
+
+import os
+import json
+import time
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+
+STYLES = ("post", "carousel")
+
+# Font sizes used by overlay_text_on_slide for 1080px slides (and small inputs)
+_WARM_FONT_SIZES = (72, 42)
+
+
+def _warm_worker():
+    """Pool initializer: import the render stack and load fonts once per worker."""
+    from carousel_bot import _get_carousel_font
+
+    for size in _WARM_FONT_SIZES:
+        _get_carousel_font(size)
+
+
+def load_manifest(path: str) -> list:
+    """Read a JSON / JSON Lines manifest and normalise each job."""
+    with open(path, "r", encoding="utf-8") as f:
+        raw = f.read().strip()
+    if raw.startswith("["):
+        entries = json.loads(raw)
+    else:
+        entries = [json.loads(line) for line in raw.splitlines() if line.strip()]
+
+    base = os.path.dirname(os.path.abspath(path))
+    jobs = []
+    for i, entry in enumerate(entries):
+        image = entry.get("image") or entry.get("path")
+        if not image:
+            raise ValueError(f"Manifest entry {i} has no image path")
+        style = entry.get("style") or ("carousel" if entry.get("text") else "post")
+        if style not in STYLES:
+            raise ValueError(f"Manifest entry {i}: unknown style '{style}' (use {', '.join(STYLES)})")
+        if style == "carousel" and not entry.get("text"):
+            raise ValueError(f"Manifest entry {i}: carousel style needs slide text")
+        jobs.append({
+            "index": i,
+            "image": image if os.path.isabs(image) else os.path.join(base, image),
+            "text": entry.get("text") or "",
+            "style": style,
+            "name": entry.get("name") or f"{i + 1:04d}_{os.path.splitext(os.path.basename(image))[0]}",
+        })
+    return jobs
+
+
+def render_job(job: dict) -> dict:
+    """Render one job in a worker process. Returns the JPEG bytes plus timing."""
+    from bot_core import process_for_instagram
+    from carousel_bot import overlay_text_on_slide, INTERMEDIATE_MIN_SSIM
+
+    start = time.perf_counter()
+    with open(job["image"], "rb") as f:
+        raw = f.read()
+    if job["style"] == "carousel":
+        processed = process_for_instagram(raw, min_ssim=INTERMEDIATE_MIN_SSIM)
+        output = overlay_text_on_slide(processed, job["text"])
+    else:
+        output = process_for_instagram(raw)
+    return {
+        "index": job["index"],
+        "name": job["name"],
+        "data": output,
+        "seconds": time.perf_counter() - start,
+        "pid": os.getpid(),
+    }
+
+
+def render_batch(jobs: list, workers: int = None):
+    """
+    Render jobs on a process pool. Yields results in manifest order as soon as
+    each one (and every job before it) is finished.
+    """
+    workers = workers or os.cpu_count() or 1
+    with ProcessPoolExecutor(max_workers=workers, initializer=_warm_worker) as pool:
+        for result in pool.map(render_job, jobs, chunksize=1):
+            yield result
+
+
+def run_batch(jobs: list, out_dir: str = None, workers: int = None) -> dict:
+    """Render all jobs, optionally writing <name>.jpg files, and return throughput stats."""
+    workers = workers or os.cpu_count() or 1
+    if out_dir:
+        os.makedirs(out_dir, exist_ok=True)
+
+    start = time.perf_counter()
+    total_bytes = 0
+    for result in render_batch(jobs, workers):
+        total_bytes += len(result["data"])
+        if out_dir:
+            with open(os.path.join(out_dir, f"{result['name']}.jpg"), "wb") as f:
+                f.write(result["data"])
+        print(f"  [{result['index'] + 1}/{len(jobs)}] {result['name']} "
+              f"{len(result['data'])//1024}KB in {result['seconds']:.2f}s (pid {result['pid']})")
+    elapsed = time.perf_counter() - start
+
+    return {
+        "workers": workers,
+        "slides": len(jobs),
+        "seconds": elapsed,
+        "slides_per_sec": len(jobs) / elapsed if elapsed > 0 else 0.0,
+        "bytes": total_bytes,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Render many carousel slides / posts on all CPU cores")
+    parser.add_argument("manifest", help="JSON or JSON Lines manifest of (image, text, style) jobs")
+    parser.add_argument("--out", help="Folder to write rendered JPEGs into")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: CPU count)")
+    parser.add_argument("--bench", help="Comma-separated worker counts to benchmark, e.g. 1,2,4")
+    args = parser.parse_args()
+
+    jobs = load_manifest(args.manifest)
+    print(f"🖼️ {len(jobs)} render jobs from {args.manifest}")
+
+    worker_counts = [int(w) for w in args.bench.split(",")] if args.bench else [args.workers]
+    results = []
+    for workers in worker_counts:
+        stats = run_batch(jobs, args.out, workers)
+        results.append(stats)
+        print(f"✅ {stats['slides']} slides with {stats['workers']} workers: "
+              f"{stats['seconds']:.2f}s, {stats['slides_per_sec']:.2f} slides/sec")
+
+    if len(results) > 1:
+        baseline = results[0]["slides_per_sec"] or 1.0
+        print("\nworkers  slides/sec  speedup")
+        for stats in results:
+            print(f"{stats['workers']:>7}  {stats['slides_per_sec']:>10.2f}  {stats['slides_per_sec'] / baseline:>6.2f}x")
+
+
+if __name__ == "__main__":
+    main()
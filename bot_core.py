@@ -0,0 +1,576 @@
+"""
+Shared core for daily_bot and carousel_bot: configuration, Gemini response parsing,
+the image provider chain, the Instagram square crop and post delivery.
+
+Kept light on purpose: both bots import it at startup, so heavy dependencies
+(requests, Pillow, NumPy, the dedup histories, python-dotenv) are imported inside the
+functions that use them. A `--dry-run --mock` run never loads them at all
+(scripts/test_startup_time.py checks this).
+"""
+
+import os
+import json
+import atexit
+import threading
+import contextvars
+from contextlib import contextmanager
+import time
+import random
+import urllib.parse
+
+
+def _load_env_file():
+    """Load .env (local dev) from the working directory or next to this file, if there is one."""
+    for directory in (os.getcwd(), os.path.dirname(os.path.abspath(__file__))):
+        path = os.path.join(directory, ".env")
+        if os.path.isfile(path):
+            from dotenv import load_dotenv
+
+            load_dotenv(path)
+            return path
+    return None
+
+
+# Load secrets from .env file if present (Local dev)
+_load_env_file()
+
+# Configuration (process defaults; a run reads them through current_run())
+GEMINI_API_KEY = os.environ.get("GEMINI_API_KEY")
+YOUR_EMAIL = os.environ.get("YOUR_EMAIL")
+EMAIL_PASSWORD = os.environ.get("EMAIL_PASSWORD")  # Gmail App Password
+
+GEMINI_MODEL = "gemini-2.5-flash"
+
+# Pollinations.ai API Key (required for authenticated requests)
+POLLINATION_API_KEY = os.environ.get("POLLINATION_API_KEY")  # https://enter.pollinations.ai
+
+# Local state (post history, caches) - kept between runs
+STATE_DIR = os.environ.get("ASTROBOLI_STATE_DIR") or os.path.join(os.path.dirname(os.path.abspath(__file__)), ".astroboli")
+
+# Near-duplicate image rejection (perceptual-hash history of accepted images)
+IMAGE_HASH_INDEX = os.environ.get("IMAGE_HASH_INDEX") or os.path.join(STATE_DIR, "image_hashes.npy")
+IMAGE_DEDUP_THRESHOLD = int(os.environ.get("IMAGE_DEDUP_THRESHOLD", "10"))  # Hamming bits out of 64
+IMAGE_DEDUP_MAX_REROLLS = int(os.environ.get("IMAGE_DEDUP_MAX_REROLLS", "3"))
+
+# Repeated caption / slide text rejection (MinHash history of posted lines)
+TEXT_HISTORY_PATH = os.environ.get("TEXT_HISTORY_PATH") or os.path.join(STATE_DIR, "text_history.jsonl")
+TEXT_DEDUP_THRESHOLD = float(os.environ.get("TEXT_DEDUP_THRESHOLD", "0.6"))  # Jaccard similarity
+TEXT_DEDUP_MAX_RETRIES = int(os.environ.get("TEXT_DEDUP_MAX_RETRIES", "2"))
+TEXT_AVOID_RECENT = 15  # Recent lines listed in a regeneration request
+
+# Finished emails are spooled here before sending, so a failed delivery keeps the content
+OUTBOX_DIR = os.environ.get("OUTBOX_DIR") or os.path.join(STATE_DIR, "outbox")
+OUTBOX_RETRIES = int(os.environ.get("OUTBOX_RETRIES", "2"))  # In-run retries per email (backoff 2 s, 4 s, ...)
+
+# Where finished posts go: smtp (default), maildir, mbox or dir (see delivery.py)
+DELIVERY = os.environ.get("DELIVERY", "smtp")
+DELIVERY_PATH = os.environ.get("DELIVERY_PATH")  # Default: STATE_DIR/delivered/<Maildir|astroboli.mbox|posts>
+LOCAL_ADDRESS = "astroboli@localhost"  # From / To on disk deliveries when YOUR_EMAIL is not set
+
+
+class RunContext:
+    """
+    The settings of one run: brand, Gemini key and email account. Code reads them
+    through current_run() instead of the module constants, so runs for different
+    brands can share this process (and its clients and caches) at the same time.
+    """
+
+    def __init__(self, brand=None, gemini_api_key=None, email=None, email_password=None):
+        from brands import DEFAULT_BRAND
+
+        self.brand = brand or DEFAULT_BRAND
+        self.gemini_api_key = gemini_api_key if gemini_api_key is not None else GEMINI_API_KEY
+        self.email = email if email is not None else YOUR_EMAIL
+        self.email_password = email_password if email_password is not None else EMAIL_PASSWORD
+
+    @property
+    def recipient(self):
+        """Who gets this run's posts: the brand's recipient, else the account itself."""
+        return self.brand.recipient or self.email or LOCAL_ADDRESS
+
+    def replace(self, **changes):
+        fields = {"brand": self.brand, "gemini_api_key": self.gemini_api_key, "email": self.email,
+                  "email_password": self.email_password}
+        fields.update(changes)
+        return RunContext(**fields)
+
+
+_run_context = contextvars.ContextVar("run_context", default=None)
+
+
+def current_run() -> RunContext:
+    """The RunContext of the calling run (environment defaults outside of one)."""
+    return _run_context.get() or RunContext()
+
+
+@contextmanager
+def use_run(context: RunContext):
+    """Make context the current run inside the with block (this thread / task only)."""
+    token = _run_context.set(context)
+    try:
+        yield context
+    finally:
+        _run_context.reset(token)
+
+
+def for_brand(brand):
+    """use_run() with the current settings for another brand."""
+    return use_run(current_run().replace(brand=brand))
+
+
+def _extract_json_from_text(text: str) -> dict | None:
+    """Attempt to extract and parse a JSON object from free-form text.
+    This handles cases where the model wraps JSON in markdown code fences (```json ... ```)
+    or returns additional commentary around the JSON.
+    Returns the parsed dict or None if parsing fails.
+    """
+    # Try a direct parse first
+    try:
+        return json.loads(text)
+    except Exception:
+        pass
+
+    # Remove common markdown fences and try again
+    import re
+    # Find a JSON object inside text by locating the first '{' and last '}'
+    start = text.find('{')
+    end = text.rfind('}')
+    if start != -1 and end != -1 and end > start:
+        candidate = text[start:end+1]
+        try:
+            return json.loads(candidate)
+        except Exception:
+            # Sometimes there are trailing or leading backticks to strip
+            candidate = re.sub(r'```.*?```', '', text, flags=re.S).strip()
+            start = candidate.find('{')
+            end = candidate.rfind('}')
+            if start != -1 and end != -1 and end > start:
+                try:
+                    return json.loads(candidate[start:end+1])
+                except Exception:
+                    return None
+    return None
+
+
+def _clean_image_prompt(p: str) -> str:
+    # Remove any accidental CTAs or Visit links from the image prompt
+    import re
+    p = re.sub(r'Visit\s+https?://\S+', '', p)
+    p = p.replace('```json', '').replace('```', '')
+    p = p.replace('\n', ' ').strip()
+    # Collapse multiple spaces
+    p = re.sub(r'\s+', ' ', p)
+    # Limit length to safe size for URL encoding (800 chars ~= 2000 URL-encoded)
+    return p[:800]
+
+
+_http = None
+_gemini_models = {}
+_gemini_lock = threading.Lock()
+
+
+def get_http():
+    """One requests.Session per process: keep-alive connections shared by every provider call and thread."""
+    global _http
+    if _http is None:
+        import requests
+        from requests.adapters import HTTPAdapter
+
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=8, pool_maxsize=16)
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        _http = session
+    return _http
+
+
+def get_gemini_model():
+    """The Gemini model client for the current run's API key, created once per key per process."""
+    key = current_run().gemini_api_key
+    with _gemini_lock:
+        if key not in _gemini_models:
+            import google.generativeai as genai
+            from google.generativeai import client
+
+            # configure() is process-wide: bind this key's client to the model right away
+            genai.configure(api_key=key)
+            model = genai.GenerativeModel(GEMINI_MODEL)
+            model._client = client.get_default_generative_client()
+            _gemini_models[key] = model
+        return _gemini_models[key]
+
+
+_text_history = None
+_image_history = None
+_history_load_lock = threading.Lock()  # Threads asking at once must all get the same history
+_image_history_lock = threading.Lock()
+
+
+def _get_text_history():
+    """Load the posted-text history once per process."""
+    global _text_history
+    if _text_history is None:
+        with _history_load_lock:
+            if _text_history is None:
+                from text_history import TextHistory
+
+                _text_history = TextHistory(TEXT_HISTORY_PATH, threshold=TEXT_DEDUP_THRESHOLD)
+    return _text_history
+
+
+def _get_image_history():
+    """Load the perceptual-hash history once per process."""
+    global _image_history
+    if _image_history is None:
+        with _history_load_lock:
+            if _image_history is None:
+                from image_dedup import ImageHashIndex
+
+                _image_history = ImageHashIndex(IMAGE_HASH_INDEX, threshold=IMAGE_DEDUP_THRESHOLD)
+    return _image_history
+
+
+def generate_image(prompt, dedup=True, record=True):
+    """
+    Generate image using multiple providers with automatic fallback.
+    Priority: Pollinations.ai → AI Horde → Hugging Face Inference
+    Images that look almost the same as a past post are rejected and re-rolled
+    (every provider call uses a fresh random seed). record=False still checks the
+    history but leaves it unchanged (--mock runs are not real posts).
+    """
+    print(f"🖼️ Generating image: {prompt[:60]}...")
+    
+    history = _get_image_history() if dedup else None
+    
+    for attempt in range(IMAGE_DEDUP_MAX_REROLLS + 1):
+        result = _generate_image_once(prompt)
+        if history is None:
+            return result
+        
+        # Check + add is atomic (thread lock here, file lock across worker processes),
+        # so concurrent backfill days or queue workers cannot both accept look-alikes
+        with _image_history_lock:
+            try:
+                match = history.check_and_add(result, record=record)
+            except Exception as e:
+                print(f"  ⚠️ Could not hash image ({str(e)[:60]}), skipping duplicate check")
+                return result
+            
+            if not match:
+                return result
+        
+        index, p_dist, d_dist = match
+        print(f"  🔁 Near-duplicate of past image #{index + 1} (pHash {p_dist}, dHash {d_dist} bits)")
+        if attempt < IMAGE_DEDUP_MAX_REROLLS:
+            print(f"  Re-rolling with a new seed ({attempt + 1}/{IMAGE_DEDUP_MAX_REROLLS})...")
+    
+    raise Exception(f"Every image was a near-duplicate of a past post after {IMAGE_DEDUP_MAX_REROLLS} re-rolls")
+
+
+def _generate_image_once(prompt):
+    """Run the provider chain once and return the first valid image."""
+    providers = [
+        ("Pollinations.ai", _try_pollinations_image),
+        ("AI Horde", _try_aihorde_image),
+        ("Hugging Face", _try_huggingface_image),
+    ]
+    
+    for name, provider_func in providers:
+        try:
+            print(f"  Trying: {name}...")
+            result = provider_func(prompt)
+            if result and len(result) > 10000:  # Valid image > 10KB
+                print(f"  ✅ {name} succeeded: {len(result)//1024}KB")
+                return result
+        except Exception as e:
+            print(f"  ❌ {name} failed: {str(e)[:80]}")
+            continue
+    
+    raise Exception("All image providers failed")
+
+
+def _try_pollinations_image(prompt, max_retries=3):
+    """
+    Try Pollinations.ai image generation with new API.
+    Uses gen.pollinations.ai endpoint with FLUX.2 Klein 9B model.
+    Requires POLLINATION_API_KEY for authenticated requests.
+    """
+    import requests
+
+    if not POLLINATION_API_KEY:
+        raise Exception("POLLINATION_API_KEY not configured")
+    
+    # New API endpoint: gen.pollinations.ai/image/{prompt}
+    encoded_prompt = urllib.parse.quote(prompt[:1000])  # Longer prompts allowed with new API
+    seed = random.randint(1, 2147483647)
+    
+    # Use FLUX.2 Klein 9B model (or klein-large for higher quality)
+    url = f"https://gen.pollinations.ai/image/{encoded_prompt}?model=klein&width=1024&height=1024&seed={seed}"
+    
+    headers = {
+        "Authorization": f"Bearer {POLLINATION_API_KEY}"
+    }
+    
+    for attempt in range(max_retries):
+        try:
+            print(f"    Pollinations (FLUX.2 Klein) attempt {attempt + 1}/{max_retries}...")
+            response = get_http().get(url, headers=headers, timeout=120)
+            
+            if response.status_code == 200:
+                content_type = response.headers.get('content-type', '')
+                if 'image' in content_type and len(response.content) > 5000:
+                    return response.content
+                raise Exception(f"Invalid response: {content_type}, size: {len(response.content)}")
+            elif response.status_code == 401:
+                raise Exception("Invalid API key - check POLLINATION_API_KEY")
+            elif response.status_code == 402:
+                raise Exception("Insufficient pollen balance")
+            elif response.status_code in [500, 502, 503, 504]:
+                if attempt < max_retries - 1:
+                    wait = (attempt + 1) * 10
+                    print(f"    Server error {response.status_code}, retrying in {wait}s...")
+                    time.sleep(wait)
+                    continue
+            
+            # Try to get error details from JSON response
+            try:
+                error_data = response.json()
+                error_msg = error_data.get('error', {}).get('message', f'HTTP {response.status_code}')
+                raise Exception(error_msg[:100])
+            except:
+                raise Exception(f"HTTP {response.status_code}")
+                
+        except requests.exceptions.Timeout:
+            if attempt < max_retries - 1:
+                wait = (attempt + 1) * 10
+                print(f"    Timeout, retrying in {wait}s...")
+                time.sleep(wait)
+                continue
+            raise Exception("Request timeout after all retries")
+        except requests.exceptions.RequestException as e:
+            if attempt < max_retries - 1:
+                time.sleep(5)
+                continue
+            raise Exception(f"Request error: {str(e)[:50]}")
+    
+    return None
+
+
+def _try_aihorde_image(prompt, max_wait=180):
+    """
+    Try AI Horde (stablehorde.net) - free community-powered image generation.
+    Uses anonymous API key (lower priority but works without signup).
+    """
+    api_url = "https://stablehorde.net/api/v2"
+    api_key = "0000000000"  # Anonymous API key
+    
+    headers = {
+        "apikey": api_key,
+        "Content-Type": "application/json"
+    }
+    
+    # Submit generation request
+    payload = {
+        "prompt": prompt[:1000],
+        "params": {
+            "width": 1024,
+            "height": 1024,
+            "steps": 25,
+            "sampler_name": "k_euler_a",
+            "cfg_scale": 7,
+        },
+        "nsfw": False,
+        "models": ["stable_diffusion_xl"],
+        "r2": True,  # Use R2 storage for faster downloads
+    }
+    
+    # Submit job
+    response = get_http().post(f"{api_url}/generate/async", headers=headers, json=payload, timeout=30)
+    if response.status_code != 202:
+        raise Exception(f"Submit failed: {response.status_code} - {response.text[:100]}")
+    
+    data = response.json()
+    job_id = data.get("id")
+    if not job_id:
+        raise Exception("No job ID returned")
+    
+    print(f"    AI Horde job submitted: {job_id[:20]}...")
+    
+    # Poll for completion
+    start_time = time.time()
+    while time.time() - start_time < max_wait:
+        time.sleep(5)
+        
+        status_resp = get_http().get(f"{api_url}/generate/check/{job_id}", headers=headers, timeout=30)
+        if status_resp.status_code != 200:
+            continue
+            
+        status = status_resp.json()
+        
+        if status.get("done"):
+            # Get result
+            result_resp = get_http().get(f"{api_url}/generate/status/{job_id}", headers=headers, timeout=30)
+            if result_resp.status_code == 200:
+                result = result_resp.json()
+                generations = result.get("generations", [])
+                if generations:
+                    img_url = generations[0].get("img")
+                    if img_url:
+                        # Download actual image
+                        img_resp = get_http().get(img_url, timeout=60)
+                        if img_resp.status_code == 200:
+                            return img_resp.content
+            break
+            
+        elif status.get("faulted"):
+            raise Exception("Generation faulted")
+        
+        queue_pos = status.get("queue_position", "?")
+        wait_time = status.get("wait_time", "?")
+        print(f"    Queue position: {queue_pos}, ETA: {wait_time}s")
+    
+    raise Exception(f"Timeout after {max_wait}s")
+
+
+def _try_huggingface_image(prompt):
+    """
+    Try Hugging Face Inference API with SDXL model (free tier).
+    """
+    api_url = "https://api-inference.huggingface.co/models/stabilityai/stable-diffusion-xl-base-1.0"
+    
+    # Try without auth first (limited free inference)
+    headers = {"Content-Type": "application/json"}
+    
+    payload = {
+        "inputs": prompt[:500],
+        "parameters": {
+            "width": 1024,
+            "height": 1024,
+        }
+    }
+    
+    response = get_http().post(api_url, headers=headers, json=payload, timeout=120)
+    
+    if response.status_code == 200:
+        # Response is the image bytes directly
+        if response.content and len(response.content) > 5000:
+            return response.content
+    
+    raise Exception(f"HTTP {response.status_code}: {response.text[:100]}")
+
+
+def process_for_instagram(image_bytes, target_bytes=None, min_ssim=None):
+    """
+    Process image for Instagram - ensure exact 1:1 ratio (1080x1080), NO text overlay.
+    The JPEG quality is searched to fit target_bytes or keep min_ssim (see image_encoding).
+    """
+    from PIL import Image
+    from io import BytesIO
+    from image_encoding import encode_for_post
+
+    print("Processing image for Instagram...")
+    
+    # Open image
+    img = Image.open(BytesIO(image_bytes)).convert("RGB")
+    original_w, original_h = img.size
+    print(f"Original image: {original_w}x{original_h}")
+    
+    # Instagram square post: 1080x1080 pixels (1:1 ratio)
+    INSTAGRAM_SIZE = 1080
+    
+    # Step 1: Center crop to perfect square
+    if original_w != original_h:
+        min_dim = min(original_w, original_h)
+        left = (original_w - min_dim) // 2
+        top = (original_h - min_dim) // 2
+        right = left + min_dim
+        bottom = top + min_dim
+        img = img.crop((left, top, right, bottom))
+        print(f"Center cropped to: {img.size[0]}x{img.size[1]}")
+    
+    # Step 2: Resize to exactly 1080x1080
+    img = img.resize((INSTAGRAM_SIZE, INSTAGRAM_SIZE), Image.Resampling.LANCZOS)
+    print(f"Resized to: {img.size[0]}x{img.size[1]}")
+    
+    # Step 3: Verify and save
+    final_w, final_h = img.size
+    
+    if final_w != INSTAGRAM_SIZE or final_h != INSTAGRAM_SIZE:
+        print(f"ERROR: Expected {INSTAGRAM_SIZE}x{INSTAGRAM_SIZE}, got {final_w}x{final_h}")
+        # Force create correct size
+        perfect = Image.new("RGB", (INSTAGRAM_SIZE, INSTAGRAM_SIZE), (0, 0, 0))
+        perfect.paste(img, (0, 0))
+        img = perfect
+    
+    # Save as JPEG at the lowest quality that meets the size / SSIM goal
+    jpeg_data, _ = encode_for_post(img, target_bytes=target_bytes, min_ssim=min_ssim)
+    
+    print(f"Final output: {INSTAGRAM_SIZE}x{INSTAGRAM_SIZE} (1:1 ratio) - ready for Instagram")
+    
+    return jpeg_data
+
+
+def get_outbox():
+    from outbox import Outbox
+
+    return Outbox(OUTBOX_DIR)
+
+
+_delivery = None
+_delivery_choice = None
+
+
+def set_delivery(name: str, path: str = None):
+    """Choose where finished posts go for this process (--delivery / --delivery-path)."""
+    global _delivery, _delivery_choice
+    import delivery
+
+    _delivery_choice = (name, path)
+    if name != "smtp" and not path:
+        path = os.path.join(STATE_DIR, "delivered", delivery.DEFAULT_PATHS.get(name, name))
+    run = current_run()
+    backend = delivery.open_backend(name, path, run.email, run.email_password,
+                                    outbox=get_outbox() if name == "smtp" else None, retries=OUTBOX_RETRIES)
+    if _delivery is not None:
+        _delivery.close()
+    else:
+        atexit.register(lambda: _delivery and _delivery.close())
+    _delivery = backend
+    return _delivery
+
+
+def use_delivery(name: str, path: str = None):
+    """set_delivery() unless that backend is already in use (queue workers switch per job)."""
+    if _delivery is None or _delivery_choice != (name, path):
+        return set_delivery(name, path)
+    return _delivery
+
+
+def get_delivery():
+    """The process-wide delivery backend (DELIVERY / DELIVERY_PATH unless set_delivery chose one)."""
+    return _delivery or set_delivery(DELIVERY, DELIVERY_PATH)
+
+
+def deliver(spec) -> str:
+    """Hand a formatted post to the delivery backend; returns where it went."""
+    return get_delivery().deliver(spec)
+
+
+def flush_outbox() -> bool:
+    """Retry every pending outbox email now (no generation). Returns True if none is left failing."""
+    outbox = get_outbox()
+    pending = outbox.entries()
+    if not pending:
+        print("📭 Outbox is empty")
+        return True
+    print(f"📤 Flushing {len(pending)} email(s) from {OUTBOX_DIR}...")
+    from delivery import SMTPBackend
+
+    run = current_run()
+    result = outbox.drain(SMTPBackend(run.email, run.email_password).send, retries=OUTBOX_RETRIES, force=True)
+    if result["locked"]:
+        print("⏳ Another run is delivering the outbox right now")
+        return False
+    print(f"  Sent {len(result['sent'])}, still pending {len(result['failed'])}")
+    return not result["failed"]
+
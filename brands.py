@@ -0,0 +1,112 @@
+"""
+Brand settings for the bots.
+
+Everything that makes a post "Astroboli" lives in one Brand: the name variants
+Gemini weaves into captions, the site in the call to action, the mandatory
+hashtag, the visual style, the reel voice and who receives the finished post.
+Without a brands file the bots run the built-in Astroboli brand. With one
+(BRANDS_FILE, default brands.json next to the bots) every brand in it can be
+run with --brand KEY, several with --brand a,b or all of them with --brand all:
+
+    {"brands": [
+      {"key": "astroboli", "name": "Astroboli", "site": "astroboli.com", "hashtag": "#AstroboliAI",
+       "variants": ["Astro Boli", "AstroBoli AI"], "style": "...", "voice": null, "recipient": null}
+    ]}
+
+Only key, name, site and hashtag are required; see brands.example.json.
+"""
+
+import os
+import json
+import random
+
+BRANDS_FILE = os.environ.get("BRANDS_FILE") or os.path.join(os.path.dirname(os.path.abspath(__file__)), "brands.json")
+BRAND = os.environ.get("BRAND", "")  # Default --brand: a key, "a,b" or "all" (empty: the first brand)
+
+_REQUIRED = ("key", "name", "site", "hashtag")
+
+
+class Brand:
+    """One brand's identity: naming, call to action, hashtag, style, voice and recipient."""
+
+    def __init__(self, key: str, name: str, site: str, hashtag: str, variants=None, style: str = "",
+                 voice: str = None, recipient: str = None):
+        self.key = key
+        self.name = name
+        self.site = site
+        self.hashtag = hashtag if hashtag.startswith("#") else f"#{hashtag}"
+        self.variants = list(variants or [name])
+        self.style = style
+        self.voice = voice          # edge-tts voice for reels (None: TTS_VOICE)
+        self.recipient = recipient  # Where this brand's posts are sent (None: YOUR_EMAIL)
+
+    @property
+    def url(self) -> str:
+        return f"https://{self.site}"
+
+    @property
+    def spoken_site(self) -> str:
+        """The site as a voiceover says it: astroboli dot com."""
+        return self.site.replace(".", " dot ")
+
+    def pick_name(self) -> str:
+        """A random name variant, so captions don't repeat the same brand spelling every day."""
+        return random.choice(self.variants)
+
+    def mentions_site(self, text: str) -> bool:
+        return self.site.split(".")[0].lower() in text.lower()
+
+    def has_hashtag(self, tags) -> bool:
+        return self.hashtag.lower() in [t.lower() for t in tags]
+
+    def __repr__(self):
+        return f"Brand({self.key!r})"
+
+
+DEFAULT_BRAND = Brand(
+    "astroboli",
+    name="Astroboli",
+    site="astroboli.com",
+    hashtag="#AstroboliAI",
+    variants=["Astro Boli", "AstroBoli AI", "Astro AI", "AstroBoli", "Astro Boli AI"],
+    style="cosmic art: mystical cosmic beings, zodiac symbols and celestial scenes in cosmic purples, "
+          "celestial golds and ethereal teals",
+)
+
+
+def load_brands(path: str = None) -> dict:
+    """{key: Brand} from the brands file, in file order; just DEFAULT_BRAND when there is no file."""
+    path = path or BRANDS_FILE
+    if not os.path.exists(path):
+        return {DEFAULT_BRAND.key: DEFAULT_BRAND}
+    with open(path, encoding="utf-8") as f:
+        data = json.load(f)
+    entries = data.get("brands") if isinstance(data, dict) else data
+    if not isinstance(entries, list) or not entries:
+        raise Exception(f"{path}: expected {{\"brands\": [...]}} with at least one brand")
+    brands = {}
+    for entry in entries:
+        missing = [k for k in _REQUIRED if not entry.get(k)]
+        if missing:
+            raise Exception(f"{path}: brand {entry.get('key') or entry.get('name') or '?'} is missing {', '.join(missing)}")
+        if entry["key"] in brands:
+            raise Exception(f"{path}: duplicate brand key '{entry['key']}'")
+        brands[entry["key"]] = Brand(**{k: v for k, v in entry.items()
+                                        if k in ("key", "name", "site", "hashtag", "variants", "style", "voice",
+                                                 "recipient")})
+    return brands
+
+
+def select_brands(selection: str = None, path: str = None) -> list:
+    """The brands named by --brand: a key, comma-separated keys or "all" (empty: the first brand)."""
+    brands = load_brands(path)
+    selection = (selection if selection is not None else BRAND).strip()
+    if not selection:
+        return [next(iter(brands.values()))]
+    if selection == "all":
+        return list(brands.values())
+    keys = list(dict.fromkeys(k.strip() for k in selection.split(",") if k.strip()))
+    unknown = [k for k in keys if k not in brands]
+    if unknown:
+        raise Exception(f"Unknown brand(s): {', '.join(unknown)} (known: {', '.join(brands)})")
+    return [brands[k] for k in keys]
@@ -0,0 +1,178 @@
+"""
+Warm Playwright browser pool for the browser-automation video providers.
+
+Launching Chromium costs seconds on every attempt, and the free generator sites
+pull in megabytes of images, fonts and analytics we never look at. BrowserPool
+starts one browser per process and keeps a few browser contexts warm (their HTTP
+cache survives between attempts). Every page routes its requests through
+should_block, which drops images, fonts, media and tracker hosts. URLs matching
+the page's `allow` patterns (e.g. the generated video) are never blocked.
+
+Pages are meant to wait on events (wait_for_selector / wait_for_function with a
+deadline) instead of fixed sleeps; wait_for_any is the helper for "first of
+these selectors to appear".
+
+Playwright's sync API is bound to the thread that started it, so use the pool
+from one thread (the bot's main thread or the scheduler daemon's worker).
+"""
+
+import re
+import atexit
+from contextlib import contextmanager
+from urllib.parse import urlparse
+
+BLOCKED_RESOURCE_TYPES = {"image", "font", "media"}
+TRACKER_HOSTS = (
+    "google-analytics.com", "googletagmanager.com", "doubleclick.net", "googlesyndication.com",
+    "adservice.google.com", "facebook.net", "connect.facebook.net", "hotjar.com", "clarity.ms",
+    "segment.io", "segment.com", "mixpanel.com", "amplitude.com", "sentry.io", "intercom.io",
+    "tiktok.com", "bing.com", "quantserve.com", "scorecardresearch.com",
+)
+DEFAULT_USER_AGENT = ("Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
+                      "(KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36")
+DEFAULT_VIEWPORT = {"width": 1920, "height": 1080}
+MAX_IDLE_CONTEXTS = 2
+
+
+def is_tracker(url: str) -> bool:
+    host = (urlparse(url).hostname or "").lower()
+    return any(host == h or host.endswith("." + h) for h in TRACKER_HOSTS)
+
+
+def should_block(resource_type: str, url: str, allow=()) -> bool:
+    """Whether a request is dead weight for automation (allow patterns always pass)."""
+    if any(re.search(pattern, url) for pattern in allow):
+        return False
+    if is_tracker(url):
+        return True
+    return resource_type in BLOCKED_RESOURCE_TYPES
+
+
+class BrowserPool:
+    """One Chromium per process with reusable, request-filtered contexts."""
+
+    def __init__(self, headless=True, user_agent=DEFAULT_USER_AGENT, viewport=None,
+                 max_idle_contexts=MAX_IDLE_CONTEXTS):
+        self.headless = headless
+        self.user_agent = user_agent
+        self.viewport = viewport or DEFAULT_VIEWPORT
+        self.max_idle_contexts = max_idle_contexts
+        self.stats = {"pages": 0, "blocked": 0, "contexts_created": 0}
+        self._playwright = None
+        self._browser = None
+        self._idle = []
+
+    def start(self):
+        if self._browser is None:
+            from playwright.sync_api import sync_playwright
+
+            self._playwright = sync_playwright().start()
+            try:
+                self._browser = self._playwright.chromium.launch(
+                    headless=self.headless,
+                    args=["--disable-dev-shm-usage", "--no-first-run", "--mute-audio"],
+                )
+            except Exception:
+                self._playwright.stop()
+                self._playwright = None
+                raise
+        return self
+
+    @property
+    def running(self) -> bool:
+        return self._browser is not None and self._browser.is_connected()
+
+    def _acquire_context(self):
+        if self._idle:
+            return self._idle.pop()
+        self.stats["contexts_created"] += 1
+        return self._browser.new_context(viewport=self.viewport, user_agent=self.user_agent)
+
+    def _release_context(self, context):
+        try:
+            context.clear_cookies()  # Keep the HTTP cache warm, drop the session
+        except Exception:
+            context.close()
+            return
+        if len(self._idle) < self.max_idle_contexts:
+            self._idle.append(context)
+        else:
+            context.close()
+
+    @contextmanager
+    def page(self, allow=(), block=True):
+        """
+        A fresh page in a warm context. Requests are filtered with should_block
+        unless block=False; `allow` lists regex patterns that must always load.
+        """
+        if not self.running:
+            self.close()
+            self.start()
+        context = self._acquire_context()
+        page = context.new_page()
+        self.stats["pages"] += 1
+
+        if block:
+            def filter_request(route):
+                request = route.request
+                if should_block(request.resource_type, request.url, allow):
+                    self.stats["blocked"] += 1
+                    route.abort()
+                else:
+                    route.continue_()
+
+            page.route("**/*", filter_request)
+
+        try:
+            yield page
+        finally:
+            try:
+                page.close()
+            finally:
+                self._release_context(context)
+
+    def close(self):
+        for context in self._idle:
+            try:
+                context.close()
+            except Exception:
+                pass
+        self._idle = []
+        if self._browser is not None:
+            try:
+                self._browser.close()
+            except Exception:
+                pass
+            self._browser = None
+        if self._playwright is not None:
+            self._playwright.stop()
+            self._playwright = None
+
+
+def wait_for_any(page, selectors, timeout_ms: int, state: str = "visible"):
+    """
+    Wait until the first of several selectors matches; returns (selector, locator).
+    Raises playwright's TimeoutError after timeout_ms.
+    """
+    page.wait_for_selector(", ".join(selectors), state=state, timeout=timeout_ms)
+    for selector in selectors:
+        locator = page.locator(selector).first
+        try:
+            if locator.count() and (state != "visible" or locator.is_visible()):
+                return selector, locator
+        except Exception:
+            continue
+    # Matched through the combined selector only (e.g. became hidden again)
+    return selectors[0], page.locator(", ".join(selectors)).first
+
+
+_pool = None
+
+
+def get_pool() -> BrowserPool:
+    """The process-wide pool, started on first use and closed at exit."""
+    global _pool
+    if _pool is None:
+        _pool = BrowserPool()
+        atexit.register(_pool.close)
+    return _pool.start()
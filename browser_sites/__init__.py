@@ -0,0 +1,17 @@
+"""
+Pluggable browser video sites. To add a free site, drop a module here with a
+BrowserSite subclass (URL, selectors, result URL/API patterns) and list it in SITES.
+"""
+
+from .base import BrowserSite, find_video_url
+from .gizai import GizAI
+
+SITES = [GizAI()]
+
+
+def get_site(name: str):
+    """Look up a registered site by name (case-insensitive)."""
+    for site in SITES:
+        if site.name.lower() == name.lower():
+            return site
+    raise ValueError(f"Unknown browser site '{name}' (use {', '.join(s.name for s in SITES)})")
@@ -0,0 +1,160 @@
+"""
+Base class for free browser video sites.
+
+A site module only describes the page: where the prompt goes, which button
+starts the job and what the finished video looks like on the network. The result
+is captured from network traffic, not scraped from the DOM:
+
+  * media requests whose URL matches result_url_patterns are intercepted with
+    page.route; the full file is fetched once (without the player's Range header)
+    and handed both to the page and to us - no second download;
+  * responses with a video/* content type, or JSON from result_api_patterns that
+    names the video URL, also complete the job.
+
+Only traffic after the generate click counts, so demo clips on the landing page
+are never mistaken for the result.
+"""
+
+import re
+import time
+
+VIDEO_URL_RE = re.compile(r"\.(mp4|webm|mov)(\?|#|$)", re.IGNORECASE)
+
+
+def find_video_url(data, patterns=()):
+    """First string in a JSON document that looks like a video URL (depth-first)."""
+    if isinstance(data, str):
+        if data.startswith(("http://", "https://", "/")) and (
+                VIDEO_URL_RE.search(data) or any(re.search(p, data) for p in patterns)):
+            return data
+        return None
+    items = data.values() if isinstance(data, dict) else data if isinstance(data, list) else ()
+    for item in items:
+        found = find_video_url(item, patterns)
+        if found:
+            return found
+    return None
+
+
+class BrowserSite:
+    """A free text-to-video web UI. Subclasses set the class attributes."""
+
+    name = "site"
+    url = ""
+    input_selectors = ['textarea', 'input[type="text"]', '[contenteditable="true"]']
+    button_selectors = ['button:has-text("Generate")', 'button[type="submit"]']
+    result_url_patterns = (VIDEO_URL_RE.pattern,)  # Regexes for the generated file's URL
+    result_api_patterns = ()  # Regexes for JSON endpoints that announce the result
+    load_timeout_ms = 60000
+    result_timeout_ms = 300000
+    min_bytes = 50000
+
+    def is_result_url(self, url: str) -> bool:
+        return any(re.search(p, url, re.IGNORECASE) for p in self.result_url_patterns)
+
+    def is_result_api(self, url: str) -> bool:
+        return any(re.search(p, url, re.IGNORECASE) for p in self.result_api_patterns)
+
+    def absolute_url(self, url: str) -> str:
+        if url.startswith("http"):
+            return url
+        origin = re.match(r"https?://[^/]+", self.url)
+        return f"{origin.group(0) if origin else ''}{url}"
+
+    def video_url_from_json(self, data):
+        """Video URL announced by a result API response (override for odd payloads)."""
+        return find_video_url(data, self.result_url_patterns)
+
+    def generate(self, page, prompt: str):
+        """Run one generation on a pooled page. Returns the video bytes or None."""
+        from playwright.sync_api import TimeoutError as PlaywrightTimeout
+        from browser_pool import wait_for_any
+
+        state = {"armed": False, "body": None, "url": None}
+
+        def capture_media(route):
+            request = route.request
+            if not (state["armed"] and state["body"] is None and self.is_result_url(request.url)):
+                return route.fallback()
+            # One full fetch serves both the page's player and us
+            headers = {k: v for k, v in request.headers.items() if k.lower() != "range"}
+            try:
+                response = route.fetch(headers=headers)
+            except Exception:
+                return route.fallback()
+            body = response.body() if response.ok else b""
+            if len(body) >= self.min_bytes:
+                state["body"], state["url"] = body, request.url
+            route.fulfill(response=response, body=body)
+
+        candidates = []
+
+        def collect(response):
+            # Event handlers only record; bodies are read from the main flow below
+            if not state["armed"]:
+                return
+            content_type = (response.headers.get("content-type") or "").lower()
+            if response.status == 200 and content_type.startswith("video/") and self.is_result_url(response.url):
+                candidates.append(response)
+            elif response.ok and "json" in content_type and self.is_result_api(response.url):
+                candidates.append(response)
+
+        page.route("**/*", capture_media)
+        page.on("response", collect)
+
+        print(f"    Loading {self.name}...")
+        page.goto(self.url, timeout=self.load_timeout_ms, wait_until="domcontentloaded")
+        try:
+            selector, prompt_input = wait_for_any(page, self.input_selectors, timeout_ms=self.load_timeout_ms // 2)
+        except PlaywrightTimeout:
+            print("    Could not find prompt input field")
+            return None
+        prompt_input.fill(prompt)
+        try:
+            selector, button = wait_for_any(page, self.button_selectors, timeout_ms=10000)
+        except PlaywrightTimeout:
+            print("    Could not find generate button")
+            return None
+
+        state["armed"] = True
+        button.click()
+        print(f"    Clicked generate, waiting for the result on the network (up to {self.result_timeout_ms // 60000} min)...")
+
+        deadline = time.monotonic() + self.result_timeout_ms / 1000
+        while True:
+            if state["body"] is not None:
+                print(f"    Captured {state['url'][:60]} from the page's own request")
+                return state["body"]
+            while candidates:
+                body = self._read_result(page, candidates.pop(0))
+                if body:
+                    return body
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                print("    Timeout: no result on the network")
+                return None
+            try:
+                page.wait_for_event("response", predicate=lambda r: bool(candidates) or state["body"] is not None,
+                                    timeout=remaining * 1000)
+            except PlaywrightTimeout:
+                print("    Timeout: no result on the network")
+                return None
+
+    def _read_result(self, page, response):
+        """Video bytes from a candidate response (video body, or the file a JSON result names)."""
+        content_type = (response.headers.get("content-type") or "").lower()
+        if content_type.startswith("video/"):
+            body = response.body()
+            return body if len(body) >= self.min_bytes else None
+        try:
+            video_url = self.video_url_from_json(response.json())
+        except Exception:
+            return None
+        if not video_url:
+            return None  # Still pending
+        video_url = self.absolute_url(video_url)
+        print(f"    Result announced: {video_url[:60]}...")
+        # Fetched once, with the page's cookies
+        fetched = page.request.get(video_url, timeout=120000)
+        body = fetched.body() if fetched.ok else b""
+        return body if len(body) >= self.min_bytes else None
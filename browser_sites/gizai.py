@@ -0,0 +1,26 @@
+"""GizAI free video generator (https://giz.ai/video, no signup)."""
+
+from .base import BrowserSite, VIDEO_URL_RE
+
+
+class GizAI(BrowserSite):
+    name = "GizAI"
+    url = "https://giz.ai/video"
+    input_selectors = [
+        'textarea[placeholder*="prompt"]',
+        'textarea[placeholder*="describe"]',
+        'textarea[placeholder*="Enter"]',
+        'input[placeholder*="prompt"]',
+        'textarea',
+        '[contenteditable="true"]',
+    ]
+    button_selectors = [
+        'button:has-text("Generate")',
+        'button:has-text("Create")',
+        'button:has-text("Make")',
+        'button[type="submit"]',
+        '[role="button"]:has-text("Generate")',
+    ]
+    # The finished clip is served as a plain video file; job status comes back as JSON
+    result_url_patterns = (VIDEO_URL_RE.pattern,)
+    result_api_patterns = (r"giz\.ai/api/.*(video|result|status|job)",)
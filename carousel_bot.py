@@ -1,41 +1,50 @@
 """
-Instagram Carousel Post Bot — Astroboli only
+Instagram Carousel Post Bot — Astroboli (and sibling brands, see brands.py)
 
-Generates one 5-slide carousel for Astroboli's Instagram. Each slide has
+Generates one 5-slide carousel for the brand's Instagram. Each slide has
 MEANINGFUL TEXT ON THE IMAGE (like @projectwuhu, @sacredwhisperers, @revivalofwisdom):
 short wisdom/quote lines that are interesting to read, overlaid on cosmic imagery.
 One run = one carousel ready to post directly.
 """
 
 import os
-import random
 import argparse
+import tempfile
+from functools import lru_cache
 from io import BytesIO
-from dotenv import load_dotenv
 
-load_dotenv()
-
-from PIL import Image, ImageDraw, ImageFont
-
-# Reuse daily_bot components
-from daily_bot import (
-    GEMINI_API_KEY,
-    YOUR_EMAIL,
-    EMAIL_PASSWORD,
+# Shared helpers come from the light core module (not daily_bot, which pulls in the
+# whole reel / video stack). Pillow, Gemini and SMTP delivery are imported where used.
+from bot_core import (
     POLLINATION_API_KEY,
     _extract_json_from_text,
     _clean_image_prompt,
     generate_image,
     process_for_instagram,
+    _get_text_history,
+    get_gemini_model,
+    TEXT_DEDUP_THRESHOLD,
+    TEXT_DEDUP_MAX_RETRIES,
+    TEXT_AVOID_RECENT,
+    LOCAL_ADDRESS,
+    DELIVERY,
+    DELIVERY_PATH,
+    set_delivery,
+    use_delivery,
+    get_delivery,
+    deliver,
+    flush_outbox,
+    current_run,
+    for_brand,
 )
-from email.mime.multipart import MIMEMultipart
-from email.mime.text import MIMEText
-from email.mime.image import MIMEImage
-import smtplib
+from brands import BRAND, select_brands
 
 # Number of carousel slides (Instagram allows 2–10)
 CAROUSEL_SLIDES = 5
 
+# SSIM floor for the background JPEG that is decoded again for the text overlay
+INTERMEDIATE_MIN_SSIM = 0.995
+
 # Reference accounts: they put SHORT, MEANINGFUL TEXT ON EACH SLIDE — wisdom quotes
 # that stop the scroll and are interesting to read. One idea per slide.
 STYLE_REFERENCE_ACCOUNTS = (
@@ -45,8 +54,12 @@ STYLE_REFERENCE_ACCOUNTS = (
 )
 
 
+@lru_cache(maxsize=None)
 def _get_carousel_font(size: int):
-    """Load a bold, readable font for text overlay. Tries system fonts, falls back to default."""
+    """Load a bold, readable font for text overlay. Tries system fonts, falls back to default.
+    Cached per size so repeated slides (and batch render workers) only load it once."""
+    from PIL import ImageFont
+
     candidates = [
         "/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf",  # Linux
         "/usr/share/fonts/truetype/liberation/LiberationSans-Bold.ttf",
@@ -87,6 +100,9 @@ def overlay_text_on_slide(image_bytes: bytes, text_line: str) -> bytes:
     Overlay one short wisdom/quote line on the image. High contrast, centered,
     readable — like projectwuhu / sacredwhisperers / revivalofwisdom.
     """
+    from PIL import Image, ImageDraw
+    from image_encoding import encode_for_post
+
     img = Image.open(BytesIO(image_bytes)).convert("RGB")
     w, h = img.size
     draw = ImageDraw.Draw(img)
@@ -135,32 +151,40 @@ def overlay_text_on_slide(image_bytes: bytes, text_line: str) -> bytes:
         # Slight shadow for readability
         draw.text((tx + 1, ty + 1), line, font=font, fill=(0, 0, 0))
         draw.text((tx, ty), line, font=font, fill=(255, 255, 255))
-    out = BytesIO()
-    img.save(out, format="JPEG", quality=95, optimize=True)
-    out.seek(0)
-    return out.getvalue()
+    jpeg_data, _ = encode_for_post(img)
+    return jpeg_data
 
 
-def generate_carousel_content():
+def generate_fresh_carousel_content():
     """
-    Generate background prompts, SLIDE TEXTS (meaningful quotes on each image),
-    caption, and hashtags. Style: like projectwuhu, sacredwhisperers, revivalofwisdom
-    — they put SHORT, INTERESTING-TO-READ text ON every slide.
+    generate_carousel_content, but if any slide text or the caption hook repeats
+    something already posted, ask Gemini again listing those + recent lines to avoid.
     """
-    import google.generativeai as genai
-
-    brand_variations = [
-        "Astro Boli",
-        "AstroBoli AI",
-        "Astro AI",
-        "AstroBoli",
-        "Astro Boli AI",
-    ]
-    brand_name = random.choice(brand_variations)
+    from text_history import caption_hook
+
+    history = _get_text_history()
+    result = generate_carousel_content()
+    for attempt in range(TEXT_DEDUP_MAX_RETRIES):
+        _, slide_texts, caption, _ = result
+        repeats = history.collisions(slide_texts + [caption_hook(caption)])
+        if not repeats:
+            break
+        print(f"🔁 {len(repeats)} line(s) repeat past posts - regenerating ({attempt + 1}/{TEXT_DEDUP_MAX_RETRIES})...")
+        for line in repeats:
+            print(f"   - {line}")
+        result = generate_carousel_content(avoid_lines=repeats + history.recent(TEXT_AVOID_RECENT))
+    return result
+
+
+def _carousel_prompt():
+    """The Gemini prompt for one carousel and the brand hashtag it asks for."""
+    brand = current_run().brand
+    brand_name = brand.pick_name()
     brand_hashtag = brand_name.replace(" ", "")
 
     prompt = f"""
-You create Instagram CAROUSEL posts for Astroboli (brand: {brand_name}, site: astroboli.com).
+You create Instagram CAROUSEL posts for {brand.name} (brand: {brand_name}, site: {brand.site}).
+Visual style: {brand.style or 'ethereal cosmic art'}.
 
 CRITICAL — Study these accounts: @projectwuhu, @sacredwhisperers, @revivalofwisdom. They put MEANINGFUL, SHORT TEXT DIRECTLY ON EACH SLIDE so users stop and read. Each slide has one wisdom quote or impactful line ON THE IMAGE — not just a caption. Your job is to write that kind of content: interesting, readable, shareable lines that go ON each of the 5 images.
 
@@ -168,9 +192,9 @@ CRITICAL — Study these accounts: @projectwuhu, @sacredwhisperers, @revivalofwi
 
 Rules for the text ON the images:
 - One short wisdom/quote line PER SLIDE (10–15 words max per slide). This text will be overlaid on the image.
-- Meaningful: cosmic guidance, astrology insight, reflection, manifestation, or timeless wisdom — Astroboli vibe.
+- Meaningful: cosmic guidance, astrology insight, reflection, manifestation, or timeless wisdom — {brand.name} vibe.
 - Tone: contemplative, gentle, memorable. Something users would save or screenshot.
-- No hashtags in the slide text. No "Visit astroboli.com" on the image (that goes in caption only).
+- No hashtags in the slide text. No "Visit {brand.site}" on the image (that goes in caption only).
 - Each line should stand alone and feel complete.
 
 Generate a JSON object with these keys:
@@ -180,9 +204,9 @@ Generate a JSON object with these keys:
   * Subtle visual story (e.g. dawn to stars). NO text in the image — we overlay text separately.
   * End each with: "masterpiece, 8K, hyperdetailed, square 1:1, no text, no watermarks"
 
-- "slide_texts": Array of exactly {CAROUSEL_SLIDES} SHORT LINES to be OVERLAID ON EACH SLIDE. These are the meaningful quotes/wisdom that appear ON the image (like projectwuhu, sacredwhisperers, revivalofwisdom). Each string 10–15 words max, impactful, interesting to read. Examples of the STYLE: "The stars don't decide your path. You do." / "What you seek is seeking you." / "Your intuition is the universe whispering." — Astroboli/cosmic themed.
+- "slide_texts": Array of exactly {CAROUSEL_SLIDES} SHORT LINES to be OVERLAID ON EACH SLIDE. These are the meaningful quotes/wisdom that appear ON the image (like projectwuhu, sacredwhisperers, revivalofwisdom). Each string 10–15 words max, impactful, interesting to read. Examples of the STYLE: "The stars don't decide your path. You do." / "What you seek is seeking you." / "Your intuition is the universe whispering." — {brand.name}/cosmic themed.
 
-- "caption": One Instagram caption (≤300 chars) for the whole carousel. Hook + CTA "✨ Visit astroboli.com for your reading" or "Save this for later." Use 2–3 emojis.
+- "caption": One Instagram caption (≤300 chars) for the whole carousel. Hook + CTA "✨ Visit {brand.site} for your reading" or "Save this for later." Use 2–3 emojis.
 
 - "hashtags": Array of exactly 5. First: #{brand_hashtag}. Rest: #Astrology #CosmicEnergy #Spirituality #ZodiacSigns #Manifestation (or similar).
 
@@ -197,20 +221,39 @@ Example structure:
     "Trust the timing of your life.",
     "The cosmos crowns those who listen."
   ],
-  "caption": "Five reminders from the cosmos. ✨ Save for when you need them. Visit astroboli.com for your reading 🌙",
+  "caption": "Five reminders from the cosmos. ✨ Save for when you need them. Visit {brand.site} for your reading 🌙",
   "hashtags": ["#{brand_hashtag}", "#Astrology", "#CosmicEnergy", "#Spirituality", "#ZodiacSigns"]
 }}
 """
+    return prompt, brand_hashtag
+
+
+def generate_carousel_content(avoid_lines=None):
+    """
+    Generate background prompts, SLIDE TEXTS (meaningful quotes on each image),
+    caption, and hashtags. Style: like projectwuhu, sacredwhisperers, revivalofwisdom
+    — they put SHORT, INTERESTING-TO-READ text ON every slide.
+    avoid_lines are listed in the prompt as already-posted text.
+    """
+    from text_history import avoid_prompt
+
+    prompt, brand_hashtag = _carousel_prompt()
+    if avoid_lines:
+        prompt += avoid_prompt(avoid_lines)
 
-    genai.configure(api_key=GEMINI_API_KEY)
-    model = genai.GenerativeModel("gemini-2.5-flash")
-    response = model.generate_content(prompt)
+    response = get_gemini_model().generate_content(prompt)
     text = response.text
 
     data = _extract_json_from_text(text) or {}
     if not data:
         raise ValueError("No JSON found in Gemini output for carousel")
+    return carousel_from_data(data, brand_hashtag)
 
+
+def carousel_from_data(data: dict, brand_hashtag: str = None):
+    """(prompts, slide_texts, caption with hashtags, meta) from one parsed Gemini JSON object.
+    brand_hashtag (without #) is prepended when the brand's hashtag is missing."""
+    brand = current_run().brand
     raw_prompts = data.get("image_prompts") or []
     if isinstance(raw_prompts, str):
         raw_prompts = [p.strip() for p in raw_prompts.split("\n") if p.strip()]
@@ -247,31 +290,168 @@ Example structure:
             h = f"#{h}"
         normalized.append(h)
     top5 = normalized[:5]
-    if "#astroboliai" not in [t.lower() for t in top5]:
-        top5 = [f"#{brand_hashtag}"] + [t for t in top5 if t.lower() != "#astroboliai"]
+    if not brand.has_hashtag(top5):
+        top5 = [f"#{brand_hashtag}" if brand_hashtag else brand.hashtag] + top5
     top5 = top5[:5]
     while len(top5) < 5:
         top5.append("#Astrology")
     hashtags_str = " ".join(top5)
-    if "astroboli" not in caption_part.lower():
-        caption_part = f"{caption_part.strip()} — Visit astroboli.com"
+    if not brand.mentions_site(caption_part):
+        caption_part = f"{caption_part.strip()} — Visit {brand.site}"
     full_caption = f"{caption_part}\n\n{hashtags_str}".strip()
 
     return prompts, slide_texts, full_caption, {"hashtags": top5}
 
 
-def send_carousel_email(images_data: list, caption: str):
-    """Send one email with all carousel images (with text on each) and instructions."""
-    msg = MIMEMultipart()
-    msg["From"] = YOUR_EMAIL
-    msg["To"] = YOUR_EMAIL
-    msg["Subject"] = "Astroboli Carousel Ready — Post to Instagram"
+def generate_carousel_content_batch(dates: list) -> list:
+    """Carousels for several days from ONE Gemini request; may return fewer than dates."""
+    from backfill import batch_prompt, batch_items
+
+    print(f"✨ Asking Gemini for {len(dates)} days of carousels in one request...")
+    prompt, brand_hashtag = _carousel_prompt()
+    prompt += batch_prompt(dates, "carousels")
+    carousels = []
+    for data in batch_items(get_gemini_model().generate_content(prompt).text, "carousels")[:len(dates)]:
+        try:
+            carousels.append(carousel_from_data(data, brand_hashtag))
+        except Exception as e:
+            print(f"  ⚠️ Skipping a malformed day in the batch response: {str(e)[:80]}")
+    return carousels
+
+
+def generate_fresh_carousel_content_batch(dates: list) -> list:
+    """
+    generate_carousel_content_batch, but a day with lines that repeat past posts or
+    another day of the batch (or missing from the response) is asked for on its own.
+    """
+    from text_history import TextHistory, caption_hook
+
+    history = _get_text_history()
+    batch = TextHistory(None, threshold=TEXT_DEDUP_THRESHOLD)  # This batch only, in memory
+    carousels = generate_carousel_content_batch(dates)
+    fresh = []
+    for i, date in enumerate(dates):
+        result = carousels[i] if i < len(carousels) else None
+        if result is None:
+            print(f"  {date} missing from the batch response - asking for it alone...")
+            result = generate_carousel_content(avoid_lines=batch.recent(TEXT_AVOID_RECENT))
+        for attempt in range(TEXT_DEDUP_MAX_RETRIES):
+            lines = result[1] + [caption_hook(result[2])]
+            repeats = list(dict.fromkeys(history.collisions(lines) + batch.collisions(lines)))
+            if not repeats:
+                break
+            print(f"🔁 {date}: {len(repeats)} line(s) repeat - regenerating ({attempt + 1}/{TEXT_DEDUP_MAX_RETRIES})...")
+            result = generate_carousel_content(avoid_lines=repeats + batch.recent(TEXT_AVOID_RECENT)
+                                               + history.recent(TEXT_AVOID_RECENT))
+        batch.add_many(result[1], kind="slide")
+        batch.add(caption_hook(result[2]), kind="caption")
+        fresh.append(result)
+    return fresh
+
+
+def mock_carousel_content():
+    """Fixed carousel content for tests (no Gemini)."""
+    prompts = [
+        "Ethereal cosmic dawn, soft gold and purple, 1:1, no text, masterpiece",
+    ] * CAROUSEL_SLIDES
+    slide_texts = [
+        "The stars don't decide your path. You do.",
+        "What you seek is seeking you.",
+        "Your intuition is the universe whispering.",
+        "Trust the timing of your life.",
+        "The cosmos crowns those who listen.",
+    ]
+    brand = current_run().brand
+    hashtags = [brand.hashtag, "#Astrology", "#CosmicEnergy", "#Spirituality", "#ZodiacSigns"]
+    caption = f"Five reminders from the cosmos. ✨ Visit {brand.site} for your reading.\n\n{' '.join(hashtags)}"
+    meta = {"hashtags": hashtags}
+    return prompts, slide_texts, caption, meta
+
+
+def make_carousel_slides(prompts: list, slide_texts: list, work_dir: str, record: bool = True) -> list:
+    """Generate every slide with its text overlaid; returns the JPEG paths in work_dir.
+    record=False keeps the backgrounds out of the image history (--mock runs)."""
+    slide_paths = []
+    for i, (p, text_line) in enumerate(zip(prompts, slide_texts), start=1):
+        print(f"Generating slide {i}/{len(prompts)} (text: \"{text_line[:40]}...\")...")
+        raw = generate_image(p, record=record)
+        # Intermediate is re-encoded after the overlay, so keep it near-lossless
+        processed = process_for_instagram(raw, min_ssim=INTERMEDIATE_MIN_SSIM)
+        path = os.path.join(work_dir, f"slide_{i}.jpg")
+        with open(path, "wb") as f:
+            f.write(overlay_text_on_slide(processed, text_line))
+        slide_paths.append(path)
+    return slide_paths
+
+
+def run_backfill(dates: list, mock: bool = False, brands: list = None) -> list:
+    """
+    Build and deliver one carousel per date in this process (see backfill.py): one
+    Gemini request for all days, then the slides of several days generated
+    concurrently (BACKFILL_IMAGE_WORKERS). brands (default: the current run's) fans
+    out: every brand gets its own batch, and all brands share the slide workers.
+    Returns the dates that failed ("<brand>/<date>" when several brands run).
+    """
+    from backfill import run_pipeline, BACKFILL_CONTENT_WORKERS, BACKFILL_IMAGE_WORKERS
+    from text_history import caption_hook
 
+    brands = brands or [current_run().brand]
+    label = (lambda day: day["date"]) if len(brands) == 1 else (lambda day: f"{day['brand'].key}/{day['date']}")
+
+    def content_stage(brand, _):
+        with for_brand(brand):
+            return [mock_carousel_content() for _ in dates] if mock else generate_fresh_carousel_content_batch(dates)
+
+    days, failed = [], []
+    for brand, contents, error in run_pipeline(brands, [("content", content_stage, BACKFILL_CONTENT_WORKERS)]):
+        if error is not None:
+            print(f"❌ {brand.key}: no content: {error}")
+            failed += [label({"brand": brand, "date": date}) for date in dates]
+            continue
+        days += [{"brand": brand, "date": date, "prompts": c[0], "slide_texts": c[1], "caption": c[2]}
+                 for date, c in zip(dates, contents)]
+    with tempfile.TemporaryDirectory(prefix="astroboli_carousels_") as work_root:
+
+        def slides_stage(day, _):
+            print(f"📅 {label(day)}: generating slides...")
+            work_dir = os.path.join(work_root, day["brand"].key, day["date"])
+            os.makedirs(work_dir, exist_ok=True)
+            return make_carousel_slides(day["prompts"], day["slide_texts"], work_dir, record=not mock)
+
+        print(f"🗓️ Backfilling {len(days)} carousel(s): {dates[0]} to {dates[-1]}"
+              + (f" for {len(brands)} brands" if len(brands) > 1 else "") + f" ({BACKFILL_IMAGE_WORKERS} worker(s))")
+        for day, slide_paths, error in run_pipeline(days, [("slides", slides_stage, BACKFILL_IMAGE_WORKERS)]):
+            if error is None:
+                if not mock:
+                    history = _get_text_history()
+                    history.add_many(day["slide_texts"], kind="slide")
+                    history.add(caption_hook(day["caption"]), kind="caption")
+                try:
+                    with for_brand(day["brand"]):
+                        send_carousel_email(slide_paths, day["caption"], date=day["date"])
+                    continue
+                except Exception as e:
+                    error = e
+            print(f"❌ {label(day)} failed: {error}")
+            failed.append(label(day))
+    return sorted(failed)
+
+
+def carousel_email_spec(images_data: list, caption: str, date: str = None):
+    """
+    The carousel email as a mime_stream.MessageSpec. Slides may be JPEG bytes or
+    file paths; they are read in chunks only while the message is sent. Every
+    delivery backend takes this spec. date (YYYY-MM-DD) marks a backfilled carousel.
+    """
+    from mime_stream import MessageSpec
+
+    run = current_run()
+    brand = run.brand
     body = f"""
 <html>
 <body style="font-family: Arial, sans-serif; max-width: 600px; margin: 0 auto;">
-    <h2 style="color: #2D3748;">📸 Astroboli Carousel Ready</h2>
-    <p>One carousel ({len(images_data)} slides) with <strong>meaningful text on each image</strong> — ready to post to Astroboli Instagram. Order: slide 1 → {len(images_data)}.</p>
+    <h2 style="color: #2D3748;">📸 {brand.name} Carousel Ready</h2>
+    <p>One carousel ({len(images_data)} slides) with <strong>meaningful text on each image</strong> — ready to post to {brand.name} Instagram. Order: slide 1 → {len(images_data)}.</p>
     <div style="background: #EDF2F7; padding: 20px; border-radius: 8px; margin: 20px 0;">
         <h3 style="color: #2D3748; margin-top: 0;">Caption & Hashtags</h3>
         <p style="white-space: pre-wrap; color: #4A5568;">{caption}</p>
@@ -279,7 +459,7 @@ def send_carousel_email(images_data: list, caption: str):
     <div style="background: #E6FFFA; padding: 15px; border-radius: 8px; margin: 20px 0; border-left: 4px solid #38B2AC;">
         <h3 style="color: #234E52; margin-top: 0;">📱 How to Post as Carousel</h3>
         <ol style="color: #285E61;">
-            <li>Open Instagram (Astroboli account) → tap <strong>+</strong> → Post</li>
+            <li>Open Instagram ({brand.name} account) → tap <strong>+</strong> → Post</li>
             <li>Select <strong>Multiple</strong> and add the attached images in order (slide 1, 2, 3, 4, 5)</li>
             <li>Tap Next → Next</li>
             <li>Paste the caption above</li>
@@ -290,21 +470,108 @@ def send_carousel_email(images_data: list, caption: str):
 </body>
 </html>
 """
-    msg.attach(MIMEText(body, "html"))
+    subject = f"{brand.name} Carousel Ready — Post to Instagram" + (f" ({date})" if date else "")
+    spec = MessageSpec(run.email or LOCAL_ADDRESS, run.recipient, subject, html=body,
+                       meta={"kind": "carousel", "caption": caption, "date": date, "brand": brand.key})
+    for i, image in enumerate(images_data, start=1):
+        spec.attach(image, f"{brand.key}_carousel_slide_{i}.jpg", "image/jpeg")
+    return spec
 
-    for i, img_bytes in enumerate(images_data, start=1):
-        part = MIMEImage(img_bytes, name=f"astroboli_carousel_slide_{i}.jpg")
-        msg.attach(part)
 
-    server = smtplib.SMTP("smtp.gmail.com", 587)
-    server.starttls()
-    server.login(YOUR_EMAIL, EMAIL_PASSWORD)
-    server.send_message(msg)
-    server.quit()
-    print(f"Email sent: Astroboli carousel with {len(images_data)} slides (text on each).")
+def send_carousel_email(images_data: list, caption: str, date: str = None):
+    """Send one email with all carousel images (with text on each) and instructions.
+    Goes to the --delivery backend: by default spooled to the outbox and emailed (see delivery.py)."""
+    where = deliver(carousel_email_spec(images_data, caption, date))
+    print(f"Delivered to {where}: {current_run().brand.name} carousel with {len(images_data)} slides (text on each).")
 
 
-def main():
+def submit_jobs(dates: list, brands: list, args, queue=None, run_id: str = None, dated: bool = True) -> str:
+    """
+    Queue the job graph for one carousel per brand per date (see job_queue.py): content
+    (one Gemini request per brand) -> one image job per slide (provider I/O) -> one
+    slide job per slide (overlay + encode, CPU) -> deliver. Returns the run id.
+    """
+    from job_queue import JobQueue, new_run_id
+
+    queue = queue or JobQueue()
+    run_id = run_id or new_run_id()
+    for brand in brands:
+        content = queue.submit("content", "carousel_bot:job_content",
+                               {"mock": args.mock, "brand": brand.key, "dates": dates}, run_id)
+        for index, date in enumerate(dates):
+            day = {"mock": args.mock, "brand": brand.key, "index": index, "date": date if dated else None}
+            slides = []
+            for slide in range(CAROUSEL_SLIDES):
+                image = queue.submit("image", "carousel_bot:job_image", dict(day, slide=slide), run_id, after=[content])
+                slides.append(queue.submit("slide", "carousel_bot:job_slide", dict(day, slide=slide), run_id,
+                                           after=[content, image]))
+            queue.submit("deliver", "carousel_bot:job_deliver",
+                         dict(day, delivery=args.delivery, delivery_path=args.delivery_path,
+                              spool_key=f"{run_id}-{brand.key}-{index}"), run_id,
+                         after=[content] + slides)
+    return run_id
+
+
+def _job_brand(payload):
+    """for_brand() for the brand a job was submitted for."""
+    return for_brand(select_brands(payload["brand"])[0])
+
+
+def job_content(payload: dict, inputs: list, store) -> dict:
+    """Queue job: slide prompts, slide texts and caption for every date of one brand."""
+    dates = payload["dates"]
+    with _job_brand(payload):
+        if payload["mock"]:
+            contents = [mock_carousel_content() for _ in dates]
+        elif len(dates) == 1:
+            contents = [generate_fresh_carousel_content()]
+        else:
+            contents = generate_fresh_carousel_content_batch(dates)
+    if len(contents) < len(dates):
+        raise Exception(f"Gemini returned {len(contents)} of {len(dates)} carousels")
+    return {"carousels": [{"prompts": c[0], "slide_texts": c[1], "caption": c[2]} for c in contents]}
+
+
+def job_image(payload: dict, inputs: list, store) -> dict:
+    """Queue job: one slide background from the provider chain, as an artifact."""
+    carousel = inputs[0]["carousels"][payload["index"]]
+    raw = generate_image(carousel["prompts"][payload["slide"]], record=not payload["mock"])
+    return {"raw": store.put(raw)}
+
+
+def job_slide(payload: dict, inputs: list, store) -> dict:
+    """Queue job: crop, overlay the slide text and encode one slide, as an artifact."""
+    content, image = inputs
+    text_line = content["carousels"][payload["index"]]["slide_texts"][payload["slide"]]
+    # Intermediate is re-encoded after the overlay, so keep it near-lossless
+    processed = process_for_instagram(store.get(image["raw"]), min_ssim=INTERMEDIATE_MIN_SSIM)
+    return {"slide": store.put(overlay_text_on_slide(processed, text_line))}
+
+
+def job_deliver(payload: dict, inputs: list, store) -> dict:
+    """Queue job: hand the finished carousel to the delivery backend it was submitted with.
+    Safe to retry: the outbox entry is keyed on the job (spooled once, and spooled counts
+    as delivered), and the texts only go into the history once the carousel is handed over."""
+    content, slides = inputs[0], inputs[1:]
+    carousel = content["carousels"][payload["index"]]
+    use_delivery(payload["delivery"], payload["delivery_path"])
+    with _job_brand(payload):
+        slide_paths = [store.path(s["slide"]) for s in slides]
+        spec = carousel_email_spec(slide_paths, carousel["caption"], payload["date"])
+        spec.meta["spool_key"] = payload["spool_key"]
+        print(f"Delivered to {deliver(spec)}: {current_run().brand.name} carousel with {len(slide_paths)} slides.")
+    get_delivery().flush()  # The job only counts as done once the carousel is on disk / in the outbox
+    if not payload["mock"]:
+        from text_history import caption_hook
+
+        history = _get_text_history()
+        history.add_many(carousel["slide_texts"], kind="slide")
+        history.add(caption_hook(carousel["caption"]), kind="caption")
+    return {}
+
+
+def parse_args(argv=None):
+    """Command-line options (argv defaults to sys.argv; the daemon passes its own)."""
     parser = argparse.ArgumentParser(
         description="Astroboli Instagram Carousel Bot — meaningful text on each slide"
     )
@@ -318,33 +585,142 @@ def main():
         action="store_true",
         help="Use mock carousel content (no Gemini)",
     )
-    args = parser.parse_args()
+    parser.add_argument(
+        "--flush-outbox",
+        action="store_true",
+        help="Only retry emails left in the outbox by earlier runs (generates nothing)",
+    )
+    parser.add_argument(
+        "--delivery",
+        choices=["smtp", "maildir", "mbox", "dir"],
+        default=DELIVERY,
+        help="Where the carousel goes: smtp (email, default), maildir, mbox or dir (files + caption.txt + manifest.json)",
+    )
+    parser.add_argument(
+        "--delivery-path",
+        default=DELIVERY_PATH,
+        help="Maildir / mbox file / export directory for the disk backends",
+    )
+    parser.add_argument(
+        "--days",
+        type=int,
+        default=1,
+        help="Backfill: build this many days of carousels in one process (one Gemini request)",
+    )
+    parser.add_argument("--start", help="First day of the backfill, YYYY-MM-DD (default: today)")
+    parser.add_argument(
+        "--out",
+        help="Write one dated bundle per day to this directory (same as --delivery dir --delivery-path DIR)",
+    )
+    parser.add_argument(
+        "--brand",
+        default=BRAND,
+        help='Brand key from the brands file, several as a,b, or "all" (default: BRAND or the first brand)',
+    )
+    parser.add_argument(
+        "--submit-only",
+        action="store_true",
+        help="Only queue the jobs (see job_queue.py) and print the run id; workers do the rest",
+    )
+    parser.add_argument(
+        "--no-queue",
+        action="store_true",
+        help="Run every step in this process instead of through the job queue",
+    )
+    return parser.parse_args(argv)
+
+
+def run(args) -> int:
+    """One run with parsed options; returns the exit code (main() exits with it)."""
+    if args.flush_outbox:
+        return 0 if flush_outbox() else 1
+    if args.out:
+        args.delivery, args.delivery_path = "dir", args.out
+    set_delivery(args.delivery, args.delivery_path)
+
+    try:
+        brands = select_brands(args.brand)
+    except Exception as e:
+        print(f"ERROR: {e}")
+        return 1
 
-    if not args.mock and not all([GEMINI_API_KEY, YOUR_EMAIL, EMAIL_PASSWORD]):
+    run = current_run()
+    email_keys = [run.email, run.email_password] if args.delivery == "smtp" else []
+    if not args.mock and not all([run.gemini_api_key] + email_keys):
         print(
             "ERROR: Missing credentials. Set GEMINI_API_KEY, YOUR_EMAIL, EMAIL_PASSWORD (and POLLINATION_API_KEY for images)."
         )
-        exit(1)
+        return 1
+
+    if not args.dry_run and (args.submit_only or not args.no_queue):
+        from backfill import day_dates, MAX_DAYS
+        from job_queue import finish_run
+
+        if not 1 <= args.days <= MAX_DAYS:
+            print(f"ERROR: --days must be between 1 and {MAX_DAYS}")
+            return 1
+        dated = args.days > 1 or bool(args.start) or len(brands) > 1
+        run_id = submit_jobs(day_dates(args.days, args.start), brands, args, dated=dated)
+        return finish_run(run_id, args.submit_only)
+
+    if len(brands) > 1 and not args.dry_run:
+        from backfill import day_dates, MAX_DAYS
+
+        if not 1 <= args.days <= MAX_DAYS:
+            print(f"ERROR: --days must be between 1 and {MAX_DAYS}")
+            return 1
+        dates = day_dates(args.days, args.start)
+        print(f"🏷️ Fan-out over {len(brands)} brands: {', '.join(b.key for b in brands)}")
+        try:
+            failed = run_backfill(dates, mock=args.mock, brands=brands)
+        except Exception as e:
+            print(f"Error: {e}")
+            return 1
+        total = len(brands) * len(dates)
+        print(f"\n✨ Fan-out done: {total - len(failed)}/{total} carousel(s) delivered"
+              + (f", failed: {', '.join(failed)}" if failed else ""))
+        return 1 if failed else 0
+
+    code = 0
+    for brand in brands:
+        with for_brand(brand):
+            code = code or _run_brand(args)
+    return code
+
+
+def _run_brand(args) -> int:
+    """run() for the current brand: one carousel, a dry run or a backfill."""
+    if args.days > 1 or args.start:
+        from backfill import day_dates, MAX_DAYS
+
+        if not 1 <= args.days <= MAX_DAYS:
+            print(f"ERROR: --days must be between 1 and {MAX_DAYS}")
+            return 1
+        try:
+            dates = day_dates(args.days, args.start)
+            if args.dry_run:
+                contents = ([mock_carousel_content() for _ in dates] if args.mock
+                            else generate_fresh_carousel_content_batch(dates))
+                for date, (_, slide_texts, caption, _) in zip(dates, contents):
+                    print(f"\n📅 {date}")
+                    for i, t in enumerate(slide_texts, 1):
+                        print(f"  {i}. {t}")
+                    print(f"Caption:\n{caption}")
+                print(f"\nDry-run: would generate {len(contents)} carousel(s) of {CAROUSEL_SLIDES} slides.")
+                return 0
+            failed = run_backfill(dates, mock=args.mock)
+        except Exception as e:
+            print(f"Error: {e}")
+            return 1
+        print(f"\n✨ Backfill done: {len(dates) - len(failed)}/{len(dates)} carousel(s) delivered"
+              + (f", failed: {', '.join(failed)}" if failed else ""))
+        return 1 if failed else 0
 
     try:
         if args.mock:
-            prompts = [
-                "Ethereal cosmic dawn, soft gold and purple, 1:1, no text, masterpiece",
-            ] * CAROUSEL_SLIDES
-            slide_texts = [
-                "The stars don't decide your path. You do.",
-                "What you seek is seeking you.",
-                "Your intuition is the universe whispering.",
-                "Trust the timing of your life.",
-                "The cosmos crowns those who listen.",
-            ]
-            caption = (
-                "Five reminders from the cosmos. ✨ Visit astroboli.com for your reading.\n\n"
-                "#AstroboliAI #Astrology #CosmicEnergy #Spirituality #ZodiacSigns"
-            )
-            meta = {"hashtags": ["#AstroboliAI", "#Astrology", "#CosmicEnergy", "#Spirituality", "#ZodiacSigns"]}
+            prompts, slide_texts, caption, meta = mock_carousel_content()
         else:
-            prompts, slide_texts, caption, meta = generate_carousel_content()
+            prompts, slide_texts, caption, meta = generate_fresh_carousel_content()
         print("Slide texts (on each image):")
         for i, t in enumerate(slide_texts, 1):
             print(f"  {i}. {t}")
@@ -352,23 +728,34 @@ def main():
 
         if args.dry_run:
             print(
-                f"Dry-run: would generate {len(prompts)} images, overlay text on each, and send one Astroboli carousel email."
+                f"Dry-run: would generate {len(prompts)} images, overlay text on each, and send one {current_run().brand.name} carousel email."
             )
-            exit(0)
-
-        images_data = []
-        for i, (p, text_line) in enumerate(zip(prompts, slide_texts), start=1):
-            print(f"Generating slide {i}/{len(prompts)} (text: \"{text_line[:40]}...\")...")
-            raw = generate_image(p)
-            processed = process_for_instagram(raw)
-            with_text = overlay_text_on_slide(processed, text_line)
-            images_data.append(with_text)
-
-        send_carousel_email(images_data, caption)
-        print("\n✨ Astroboli carousel done (meaningful text on each slide). Check your email and post to Instagram.")
+            return 0
+
+        # Finished slides go to a work dir as they are made; the email streams them from disk
+        with tempfile.TemporaryDirectory(prefix="astroboli_carousel_") as work_dir:
+            slide_paths = make_carousel_slides(prompts, slide_texts, work_dir, record=not args.mock)
+
+            # Remember what was made so future carousels don't repeat it (the outbox
+            # guarantees it gets delivered even if this send fails)
+            if not args.mock:
+                from text_history import caption_hook
+
+                history = _get_text_history()
+                history.add_many(slide_texts, kind="slide")
+                history.add(caption_hook(caption), kind="caption")
+
+            send_carousel_email(slide_paths, caption)
+        print(f"\n✨ {current_run().brand.name} carousel done (meaningful text on each slide). Check your email and post to Instagram.")
     except Exception as e:
         print(f"Error: {e}")
-        exit(1)
+        return 1
+    return 0
+
+
+def main():
+    """Submit the run's jobs to the queue and work them off (or only submit, with --submit-only)."""
+    exit(run(parse_args()))
 
 
 if __name__ == "__main__":
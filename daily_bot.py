@@ -1,105 +1,103 @@
 import os
 import time
-import requests
-import google.generativeai as genai
-import random
 import urllib.parse
-import json
 import argparse
-from dotenv import load_dotenv
-import smtplib
-from email.mime.multipart import MIMEMultipart
-from email.mime.text import MIMEText
-from email.mime.image import MIMEImage
-from email.mime.base import MIMEBase
-from email import encoders
-from PIL import Image, ImageDraw, ImageFont, ImageFilter
-from io import BytesIO
 import tempfile
-import numpy as np
-import asyncio
+import reel_render
+import video_probe
+from brands import BRAND, select_brands
+from bot_core import (
+    POLLINATION_API_KEY,
+    STATE_DIR,
+    TEXT_DEDUP_THRESHOLD,
+    TEXT_DEDUP_MAX_RETRIES,
+    TEXT_AVOID_RECENT,
+    _extract_json_from_text,
+    _clean_image_prompt,
+    _get_text_history,
+    get_gemini_model,
+    generate_image,
+    process_for_instagram,
+    LOCAL_ADDRESS,
+    DELIVERY,
+    DELIVERY_PATH,
+    set_delivery,
+    use_delivery,
+    get_delivery,
+    deliver,
+    flush_outbox,
+    current_run,
+    for_brand,
+)
 
-# Load secrets from .env file if present (Local dev)
-load_dotenv()
-
-# Configuration
-GEMINI_API_KEY = os.environ.get("GEMINI_API_KEY")
-YOUR_EMAIL = os.environ.get("YOUR_EMAIL")
-EMAIL_PASSWORD = os.environ.get("EMAIL_PASSWORD")  # Gmail App Password
+# Heavy dependencies (google.generativeai, requests, Pillow, NumPy, email/smtplib,
+# edge-tts, the video job clients) are imported where they are used, so
+# `--dry-run --mock` starts fast (see scripts/test_startup_time.py).
 
 # AI Video API Keys (optional - register for free tiers)
 FAL_KEY = os.environ.get("FAL_KEY")  # https://fal.ai
 LUMA_API_KEY = os.environ.get("LUMA_API_KEY")  # https://lumalabs.ai
 REPLICATE_API_TOKEN = os.environ.get("REPLICATE_API_TOKEN")  # https://replicate.com
 
-# Pollinations.ai API Key (required for authenticated requests)
-POLLINATION_API_KEY = os.environ.get("POLLINATION_API_KEY")  # https://enter.pollinations.ai
+# Queue-based video providers (fal / Luma / Replicate) are raced concurrently:
+# 0 = submit to every configured one, k = only the first k by priority
+VIDEO_PROVIDER_TOP_K = int(os.environ.get("VIDEO_PROVIDER_TOP_K", "0"))
+VIDEO_JOB_TIMEOUT = int(os.environ.get("VIDEO_JOB_TIMEOUT", "300"))  # Seconds for the whole race
+# Completion webhooks instead of polling: public base URL that reaches WEBHOOK_BIND
+# (tunnel / reverse proxy). Unset = poll.
+WEBHOOK_PUBLIC_URL = os.environ.get("WEBHOOK_PUBLIC_URL")
+WEBHOOK_BIND = os.environ.get("WEBHOOK_BIND", "0.0.0.0:8787")
+REPLICATE_WEBHOOK_SECRET = os.environ.get("REPLICATE_WEBHOOK_SECRET")  # Fetched from the API if unset
 
-def _extract_json_from_text(text: str) -> dict | None:
-    """Attempt to extract and parse a JSON object from free-form text.
-    This handles cases where the model wraps JSON in markdown code fences (```json ... ```)
-    or returns additional commentary around the JSON.
-    Returns the parsed dict or None if parsing fails.
-    """
-    # Try a direct parse first
-    try:
-        return json.loads(text)
-    except Exception:
-        pass
-
-    # Remove common markdown fences and try again
-    import re
-    # Find a JSON object inside text by locating the first '{' and last '}'
-    start = text.find('{')
-    end = text.rfind('}')
-    if start != -1 and end != -1 and end > start:
-        candidate = text[start:end+1]
-        try:
-            return json.loads(candidate)
-        except Exception:
-            # Sometimes there are trailing or leading backticks to strip
-            candidate = re.sub(r'```.*?```', '', text, flags=re.S).strip()
-            start = candidate.find('{')
-            end = candidate.rfind('}')
-            if start != -1 and end != -1 and end > start:
-                try:
-                    return json.loads(candidate[start:end+1])
-                except Exception:
-                    return None
-    return None
+# Provider clips shorter than this (or without a video track) are rejected
+MIN_VIDEO_SECONDS = 1.0
 
+# Voiceover: edge-tts voice and the sentence-segment cache
+TTS_VOICE = os.environ.get("TTS_VOICE", "en-US-AvaMultilingualNeural")
+TTS_CACHE_DIR = os.environ.get("TTS_CACHE_DIR") or os.path.join(STATE_DIR, "tts_cache")
+# Extra reel variants, one per voice (comma-separated edge-tts voices, e.g.
+# "en-US-AvaMultilingualNeural,en-US-EmmaMultilingualNeural,hi-IN-SwaraNeural"); empty = single reel
+REEL_VOICES = os.environ.get("REEL_VOICES", "")
 
-def _clean_image_prompt(p: str) -> str:
-    # Remove any accidental CTAs or Visit links from the image prompt
-    import re
-    p = re.sub(r'Visit\s+https?://\S+', '', p)
-    p = p.replace('```json', '').replace('```', '')
-    p = p.replace('\n', ' ').strip()
-    # Collapse multiple spaces
-    p = re.sub(r'\s+', ' ', p)
-    # Limit length to safe size for URL encoding (800 chars ~= 2000 URL-encoded)
-    return p[:800]
+# Reel renderer: "ffmpeg" (single subprocess filter graph) or "moviepy" (per-frame fallback)
+REEL_BACKEND = os.environ.get("REEL_BACKEND", "ffmpeg").lower()
+# Reel encoding profile: draft (quick preview), standard (daily upload) or archival
+REEL_PROFILE = os.environ.get("REEL_PROFILE", reel_render.DEFAULT_PROFILE).lower()
+# Video renditions to export and email: reel, story, square, portrait (comma-separated)
+REEL_RENDITIONS = os.environ.get("REEL_RENDITIONS", "reel")
+# Reel prompt used when Gemini could not write one
+DEFAULT_VIDEO_PROMPT = "Mystical cosmic astrology scene with swirling galaxies, glowing zodiac constellations, ethereal purple and gold aurora lights, magical stardust particles floating through space, cinematic dreamy atmosphere. FORMAT: Instagram Reels vertical 9:16 aspect ratio, 10-15 seconds duration, 1080x1920 resolution."
+# Size cap of the whole email (base64 attachments + HTML), Gmail's limit; videos are encoded to fit
+EMAIL_MAX_MB = float(os.environ.get("EMAIL_MAX_MB", "25"))
 
 
-def generate_astro_content():
-    """Generates a prompt and caption using Gemini."""
-    print("✨ Connecting to Gemini...")
-    genai.configure(api_key=GEMINI_API_KEY)
-    model = genai.GenerativeModel('gemini-2.5-flash')
+def generate_fresh_astro_content():
+    """
+    generate_astro_content, but if the caption hook repeats something already posted,
+    ask Gemini again with the colliding + recent lines listed as off-limits.
+    """
+    from text_history import caption_hook
+
+    history = _get_text_history()
+    result = generate_astro_content()
+    for attempt in range(TEXT_DEDUP_MAX_RETRIES):
+        repeats = history.collisions([caption_hook(result[1])])
+        if not repeats:
+            break
+        print(f"🔁 Caption repeats a past post: \"{repeats[0][:60]}\" - regenerating ({attempt + 1}/{TEXT_DEDUP_MAX_RETRIES})...")
+        result = generate_astro_content(avoid_lines=repeats + history.recent(TEXT_AVOID_RECENT, kind="caption"))
+    return result
 
+
+def _astro_prompt():
+    """The Gemini prompt for one post (image prompt, caption, hashtags) with a varied brand name."""
+    brand = current_run().brand
     # Randomize branding for variety
-    brand_variations = [
-        "Astro Boli",
-        "AstroBoli AI", 
-        "Astro AI",
-        "AstroBoli",
-        "Astro Boli AI"
-    ]
-    brand_name = random.choice(brand_variations)
+    brand_name = brand.pick_name()
     brand_hashtag = brand_name.replace(" ", "")  # Remove spaces for hashtag
 
     prompt = f"""
-    You are '{brand_name}' — a world-class digital artist creating cosmic art for astroboli.com.
+    You are '{brand_name}' — a world-class digital artist creating {brand.style or 'cosmic art'} for {brand.site}.
 
     Generate a JSON object with these keys:
 
@@ -113,7 +111,7 @@ def generate_astro_content():
     - "caption": Instagram caption (≤280 chars):
       * Weave {brand_name} naturally into mystical insight
       * Include cosmic guidance for today
-      * End with "✨ Visit astroboli.com for your reading"
+      * End with "✨ Visit {brand.site} for your reading"
       * Use 2-3 emojis: 🌙 ✨ 🔮 ⭐ 🌟 💫
       
     - "hashtags": Array of exactly 5 hashtags:
@@ -127,11 +125,24 @@ def generate_astro_content():
     Example:
     {{
       "image_prompt": "Ethereal cosmic queen with flowing stardust hair emerging from luminous nebula, sacred geometry halo behind her head, bioluminescent crystal crown, volumetric god rays through purple cosmic clouds, floating zodiac symbols, art by Peter Mohrbacher, deep purple and gold palette, mystical atmosphere, masterpiece, 8K, hyperdetailed, square 1:1, no text, no watermarks",
-      "caption": "The cosmos crowns you with infinite potential today. {brand_name} channels pure celestial energy for your journey. ✨ Visit astroboli.com for your reading 🌙👑",
+      "caption": "The cosmos crowns you with infinite potential today. {brand_name} channels pure celestial energy for your journey. ✨ Visit {brand.site} for your reading 🌙👑",
       "hashtags": ["#{brand_hashtag}", "#Astrology", "#CosmicEnergy", "#Spirituality", "#ZodiacSigns"],
       "alt_text": "A cosmic queen with stardust hair emerging from purple nebula clouds, wearing a glowing crystal crown."
     }}
     """
+    return prompt
+
+
+def generate_astro_content(avoid_lines=None):
+    """Generates a prompt and caption using Gemini. avoid_lines are listed as already-posted text."""
+    from text_history import avoid_prompt
+
+    print("✨ Connecting to Gemini...")
+    model = get_gemini_model()
+    prompt = _astro_prompt()
+
+    if avoid_lines:
+        prompt += avoid_prompt(avoid_lines)
 
     response = model.generate_content(prompt)
     text = response.text
@@ -141,42 +152,7 @@ def generate_astro_content():
         data = _extract_json_from_text(text) or {}
         if not data:
             raise ValueError("No JSON found in model output")
-        image_prompt = data.get("image_prompt") or data.get("IMAGE_PROMPT") or ""
-        caption_part = data.get("caption") or data.get("CAPTION") or ""
-        hashtags_list = data.get("hashtags") or data.get("HASHTAGS") or []
-        # Normalize hashtags
-        if isinstance(hashtags_list, str):
-            hashtags_list = [h.strip() for h in hashtags_list.replace(',', ' ').split() if h.strip()]
-        normalized = []
-        for h in hashtags_list:
-            h = h.strip()
-            if not h:
-                continue
-            if not h.startswith('#'):
-                h = f"#{h}"
-            normalized.append(h)
-        # Take top 5. If fewer than 5, pad with related tags; ensure #AstroboliAI is present.
-        top5 = normalized[:5]
-        if '#astroboliai' in [t.lower() for t in top5]:
-            pass
-        else:
-            top5 = ['#AstroboliAI'] + [t for t in top5 if t.lower() != '#astroboliai']
-            top5 = top5[:5]
-        defaults = ['#astrology', '#numerology', '#horoscope', '#zodiac']
-        i = 0
-        while len(top5) < 5 and i < len(defaults):
-            cand = defaults[i]
-            if cand not in top5:
-                top5.append(cand)
-            i += 1
-        hashtags_str = " ".join(top5)
-        # Clean image prompt from CTA / code fences
-        image_prompt = _clean_image_prompt(image_prompt)
-        # Ensure brand CTA in caption
-        if "astroboli" not in caption_part.lower():
-            caption_part = f"{caption_part.strip()} — Visit https://astroboli.com"
-        full_caption = f"{caption_part}\n\n{hashtags_str}".strip()
-        return image_prompt, full_caption, {'hashtags': top5}
+        return generate_astro_content_from_data(data)
     except Exception:
         # Fallback to older parsing for non-JSON responses
         try:
@@ -194,9 +170,10 @@ def generate_astro_content():
                 if not h.startswith('#'):
                     h = f"#{h}"
                 normalized.append(h)
+            brand = current_run().brand
             top5 = normalized[:5]
-            if '#AstroboliAI' not in [t for t in top5]:
-                top5 = ['#AstroboliAI'] + [t for t in top5 if t.lower() != '#astroboliai']
+            if not brand.has_hashtag(top5):
+                top5 = [brand.hashtag] + top5
                 top5 = top5[:5]
             defaults = ['#astrology', '#numerology', '#horoscope', '#zodiac']
             i = 0
@@ -206,8 +183,8 @@ def generate_astro_content():
                     top5.append(cand)
                 i += 1
             # Ensure brand CTA
-            if "astroboli" not in caption_part.lower():
-                caption_part = f"{caption_part}\n\nVisit https://astroboli.com"
+            if not brand.mentions_site(caption_part):
+                caption_part = f"{caption_part}\n\nVisit {brand.url}"
             full_caption = f"{caption_part}\n\n{' '.join(top5)}"
             image_prompt = _clean_image_prompt(image_prompt)
             return image_prompt, full_caption, top5
@@ -216,17 +193,57 @@ def generate_astro_content():
             raw = text.strip()
             # Make a brief caption + default hashtag
             short_caption = (raw[:240] + "...") if len(raw) > 240 else raw
-            if "astroboli" not in short_caption.lower():
-                short_caption = f"{short_caption}\n\nVisit https://astroboli.com"
-            defaults = ['#AstroboliAI', '#astrology', '#numerology', '#horoscope', '#zodiac']
+            brand = current_run().brand
+            if not brand.mentions_site(short_caption):
+                short_caption = f"{short_caption}\n\nVisit {brand.url}"
+            defaults = [brand.hashtag, '#astrology', '#numerology', '#horoscope', '#zodiac']
             return short_caption[:800], f"{short_caption}\n\n{' '.join(defaults)}", defaults
 
+
+def generate_astro_content_from_data(data):
+    """(image_prompt, caption with hashtags, meta) from one parsed Gemini JSON object."""
+    image_prompt = data.get("image_prompt") or data.get("IMAGE_PROMPT") or ""
+    caption_part = data.get("caption") or data.get("CAPTION") or ""
+    hashtags_list = data.get("hashtags") or data.get("HASHTAGS") or []
+    # Normalize hashtags
+    if isinstance(hashtags_list, str):
+        hashtags_list = [h.strip() for h in hashtags_list.replace(',', ' ').split() if h.strip()]
+    normalized = []
+    for h in hashtags_list:
+        h = h.strip()
+        if not h:
+            continue
+        if not h.startswith('#'):
+            h = f"#{h}"
+        normalized.append(h)
+    # Take top 5. If fewer than 5, pad with related tags; ensure the brand hashtag is present.
+    brand = current_run().brand
+    top5 = normalized[:5]
+    if not brand.has_hashtag(top5):
+        top5 = [brand.hashtag] + top5
+        top5 = top5[:5]
+    defaults = ['#astrology', '#numerology', '#horoscope', '#zodiac']
+    i = 0
+    while len(top5) < 5 and i < len(defaults):
+        cand = defaults[i]
+        if cand not in top5:
+            top5.append(cand)
+        i += 1
+    hashtags_str = " ".join(top5)
+    # Clean image prompt from CTA / code fences
+    image_prompt = _clean_image_prompt(image_prompt)
+    # Ensure brand CTA in caption
+    if not brand.mentions_site(caption_part):
+        caption_part = f"{caption_part.strip()} — Visit {brand.url}"
+    full_caption = f"{caption_part}\n\n{hashtags_str}".strip()
+    return image_prompt, full_caption, {'hashtags': top5}
+
+
 def generate_video_prompt():
     """Generate a unique video prompt using Gemini AI for Instagram Reels format."""
     print("🎬 Generating unique video prompt...")
     try:
-        genai.configure(api_key=GEMINI_API_KEY)
-        model = genai.GenerativeModel('gemini-2.5-flash')
+        model = get_gemini_model()
         
         prompt = """
         Generate a creative, mystical, cosmic-themed video prompt for an Instagram Reel.
@@ -252,11 +269,7 @@ def generate_video_prompt():
         """
         
         response = model.generate_content(prompt)
-        video_prompt = response.text.strip()
-        
-        # Ensure format requirements are included
-        if "9:16" not in video_prompt or "1080x1920" not in video_prompt:
-            video_prompt = f"{video_prompt} FORMAT: Instagram Reels vertical 9:16 aspect ratio, 10-15 seconds duration, 1080x1920 resolution."
+        video_prompt = _with_reel_format(response.text.strip())
         
         print(f"📝 Video prompt generated: {video_prompt[:80]}...")
         return video_prompt
@@ -264,202 +277,14 @@ def generate_video_prompt():
     except Exception as e:
         print(f"⚠️ Video prompt generation failed: {e}")
         # Fallback to a static prompt
-        return "Mystical cosmic astrology scene with swirling galaxies, glowing zodiac constellations, ethereal purple and gold aurora lights, magical stardust particles floating through space, cinematic dreamy atmosphere. FORMAT: Instagram Reels vertical 9:16 aspect ratio, 10-15 seconds duration, 1080x1920 resolution."
-
-
-def generate_image(prompt):
-    """
-    Generate image using multiple providers with automatic fallback.
-    Priority: Pollinations.ai → AI Horde → Hugging Face Inference
-    """
-    print(f"🖼️ Generating image: {prompt[:60]}...")
-    
-    providers = [
-        ("Pollinations.ai", _try_pollinations_image),
-        ("AI Horde", _try_aihorde_image),
-        ("Hugging Face", _try_huggingface_image),
-    ]
-    
-    for name, provider_func in providers:
-        try:
-            print(f"  Trying: {name}...")
-            result = provider_func(prompt)
-            if result and len(result) > 10000:  # Valid image > 10KB
-                print(f"  ✅ {name} succeeded: {len(result)//1024}KB")
-                return result
-        except Exception as e:
-            print(f"  ❌ {name} failed: {str(e)[:80]}")
-            continue
-    
-    raise Exception("All image providers failed")
-
-
-def _try_pollinations_image(prompt, max_retries=3):
-    """
-    Try Pollinations.ai image generation with new API.
-    Uses gen.pollinations.ai endpoint with FLUX.2 Klein 9B model.
-    Requires POLLINATION_API_KEY for authenticated requests.
-    """
-    if not POLLINATION_API_KEY:
-        raise Exception("POLLINATION_API_KEY not configured")
-    
-    # New API endpoint: gen.pollinations.ai/image/{prompt}
-    encoded_prompt = urllib.parse.quote(prompt[:1000])  # Longer prompts allowed with new API
-    seed = random.randint(1, 2147483647)
-    
-    # Use FLUX.2 Klein 9B model (or klein-large for higher quality)
-    url = f"https://gen.pollinations.ai/image/{encoded_prompt}?model=klein&width=1024&height=1024&seed={seed}"
-    
-    headers = {
-        "Authorization": f"Bearer {POLLINATION_API_KEY}"
-    }
-    
-    for attempt in range(max_retries):
-        try:
-            print(f"    Pollinations (FLUX.2 Klein) attempt {attempt + 1}/{max_retries}...")
-            response = requests.get(url, headers=headers, timeout=120)
-            
-            if response.status_code == 200:
-                content_type = response.headers.get('content-type', '')
-                if 'image' in content_type and len(response.content) > 5000:
-                    return response.content
-                raise Exception(f"Invalid response: {content_type}, size: {len(response.content)}")
-            elif response.status_code == 401:
-                raise Exception("Invalid API key - check POLLINATION_API_KEY")
-            elif response.status_code == 402:
-                raise Exception("Insufficient pollen balance")
-            elif response.status_code in [500, 502, 503, 504]:
-                if attempt < max_retries - 1:
-                    wait = (attempt + 1) * 10
-                    print(f"    Server error {response.status_code}, retrying in {wait}s...")
-                    time.sleep(wait)
-                    continue
-            
-            # Try to get error details from JSON response
-            try:
-                error_data = response.json()
-                error_msg = error_data.get('error', {}).get('message', f'HTTP {response.status_code}')
-                raise Exception(error_msg[:100])
-            except:
-                raise Exception(f"HTTP {response.status_code}")
-                
-        except requests.exceptions.Timeout:
-            if attempt < max_retries - 1:
-                wait = (attempt + 1) * 10
-                print(f"    Timeout, retrying in {wait}s...")
-                time.sleep(wait)
-                continue
-            raise Exception("Request timeout after all retries")
-        except requests.exceptions.RequestException as e:
-            if attempt < max_retries - 1:
-                time.sleep(5)
-                continue
-            raise Exception(f"Request error: {str(e)[:50]}")
-    
-    return None
+        return DEFAULT_VIDEO_PROMPT
 
 
-def _try_aihorde_image(prompt, max_wait=180):
-    """
-    Try AI Horde (stablehorde.net) - free community-powered image generation.
-    Uses anonymous API key (lower priority but works without signup).
-    """
-    api_url = "https://stablehorde.net/api/v2"
-    api_key = "0000000000"  # Anonymous API key
-    
-    headers = {
-        "apikey": api_key,
-        "Content-Type": "application/json"
-    }
-    
-    # Submit generation request
-    payload = {
-        "prompt": prompt[:1000],
-        "params": {
-            "width": 1024,
-            "height": 1024,
-            "steps": 25,
-            "sampler_name": "k_euler_a",
-            "cfg_scale": 7,
-        },
-        "nsfw": False,
-        "models": ["stable_diffusion_xl"],
-        "r2": True,  # Use R2 storage for faster downloads
-    }
-    
-    # Submit job
-    response = requests.post(f"{api_url}/generate/async", headers=headers, json=payload, timeout=30)
-    if response.status_code != 202:
-        raise Exception(f"Submit failed: {response.status_code} - {response.text[:100]}")
-    
-    data = response.json()
-    job_id = data.get("id")
-    if not job_id:
-        raise Exception("No job ID returned")
-    
-    print(f"    AI Horde job submitted: {job_id[:20]}...")
-    
-    # Poll for completion
-    start_time = time.time()
-    while time.time() - start_time < max_wait:
-        time.sleep(5)
-        
-        status_resp = requests.get(f"{api_url}/generate/check/{job_id}", headers=headers, timeout=30)
-        if status_resp.status_code != 200:
-            continue
-            
-        status = status_resp.json()
-        
-        if status.get("done"):
-            # Get result
-            result_resp = requests.get(f"{api_url}/generate/status/{job_id}", headers=headers, timeout=30)
-            if result_resp.status_code == 200:
-                result = result_resp.json()
-                generations = result.get("generations", [])
-                if generations:
-                    img_url = generations[0].get("img")
-                    if img_url:
-                        # Download actual image
-                        img_resp = requests.get(img_url, timeout=60)
-                        if img_resp.status_code == 200:
-                            return img_resp.content
-            break
-            
-        elif status.get("faulted"):
-            raise Exception("Generation faulted")
-        
-        queue_pos = status.get("queue_position", "?")
-        wait_time = status.get("wait_time", "?")
-        print(f"    Queue position: {queue_pos}, ETA: {wait_time}s")
-    
-    raise Exception(f"Timeout after {max_wait}s")
-
-
-def _try_huggingface_image(prompt):
-    """
-    Try Hugging Face Inference API with SDXL model (free tier).
-    """
-    api_url = "https://api-inference.huggingface.co/models/stabilityai/stable-diffusion-xl-base-1.0"
-    
-    # Try without auth first (limited free inference)
-    headers = {"Content-Type": "application/json"}
-    
-    payload = {
-        "inputs": prompt[:500],
-        "parameters": {
-            "width": 1024,
-            "height": 1024,
-        }
-    }
-    
-    response = requests.post(api_url, headers=headers, json=payload, timeout=120)
-    
-    if response.status_code == 200:
-        # Response is the image bytes directly
-        if response.content and len(response.content) > 5000:
-            return response.content
-    
-    raise Exception(f"HTTP {response.status_code}: {response.text[:100]}")
+def _with_reel_format(video_prompt):
+    """Ensure the Reels format requirements are part of a video prompt."""
+    if "9:16" not in video_prompt or "1080x1920" not in video_prompt:
+        video_prompt = f"{video_prompt} FORMAT: Instagram Reels vertical 9:16 aspect ratio, 10-15 seconds duration, 1080x1920 resolution."
+    return video_prompt
 
 
 def get_image_url(prompt):
@@ -469,6 +294,8 @@ def get_image_url(prompt):
 
 def download_image(url):
     """Legacy function - kept for compatibility but generate_image is preferred."""
+    import requests
+
     if url is None:
         raise Exception("Use generate_image() instead")
     response = requests.get(url, timeout=60)
@@ -476,85 +303,52 @@ def download_image(url):
         return response.content
     raise Exception(f"Failed: {response.status_code}")
 
-def process_for_instagram(image_bytes):
-    """Process image for Instagram - ensure exact 1:1 ratio (1080x1080), NO text overlay."""
-    print("Processing image for Instagram...")
-    
-    # Open image
-    img = Image.open(BytesIO(image_bytes)).convert("RGB")
-    original_w, original_h = img.size
-    print(f"Original image: {original_w}x{original_h}")
-    
-    # Instagram square post: 1080x1080 pixels (1:1 ratio)
-    INSTAGRAM_SIZE = 1080
-    
-    # Step 1: Center crop to perfect square
-    if original_w != original_h:
-        min_dim = min(original_w, original_h)
-        left = (original_w - min_dim) // 2
-        top = (original_h - min_dim) // 2
-        right = left + min_dim
-        bottom = top + min_dim
-        img = img.crop((left, top, right, bottom))
-        print(f"Center cropped to: {img.size[0]}x{img.size[1]}")
-    
-    # Step 2: Resize to exactly 1080x1080
-    img = img.resize((INSTAGRAM_SIZE, INSTAGRAM_SIZE), Image.Resampling.LANCZOS)
-    print(f"Resized to: {img.size[0]}x{img.size[1]}")
-    
-    # Step 3: Verify and save
-    final_w, final_h = img.size
-    
-    if final_w != INSTAGRAM_SIZE or final_h != INSTAGRAM_SIZE:
-        print(f"ERROR: Expected {INSTAGRAM_SIZE}x{INSTAGRAM_SIZE}, got {final_w}x{final_h}")
-        # Force create correct size
-        perfect = Image.new("RGB", (INSTAGRAM_SIZE, INSTAGRAM_SIZE), (0, 0, 0))
-        perfect.paste(img, (0, 0))
-        img = perfect
-    
-    # Save as high-quality JPEG
-    output = BytesIO()
-    img.save(output, format="JPEG", quality=98, optimize=True)
-    output.seek(0)
+async def generate_voiceover(text, output_path=None, voice=None):
+    """
+    Generate highly natural AI voiceover using edge-tts with best voices.
+    The script is synthesized sentence by sentence through a segment cache
+    (tts_engine): the brand intro and the outro come from disk, only new
+    sentences hit the network (concurrently), and segments are crossfaded.
+    Returns (audio_bytes, duration_seconds), or (None, 0) on failure.
+    output_path is optional and only for callers that still want a file;
+    voice overrides the brand's voice and TTS_VOICE.
+    """
+    from tts_engine import TTSEngine, stream_tts
+
+    # Use the most natural-sounding Microsoft MultilingualNeural voices (2024)
+    # These have more human-like qualities with natural pauses and intonation
+    voice = voice or current_run().brand.voice or TTS_VOICE  # Default: en-US-AvaMultilingualNeural - bright, engaging, very natural
     
-    print(f"Final output: {INSTAGRAM_SIZE}x{INSTAGRAM_SIZE} (1:1 ratio) - ready for Instagram")
+    # Alternative great voices:
+    # "en-US-EmmaMultilingualNeural" - Friendly, light-hearted
+    # "en-US-JennyNeural" - Warm, mature
+    # "en-GB-SoniaNeural" - British, sophisticated
     
-    return output.getvalue()
-
-async def generate_voiceover(text, output_path):
-    """Generate highly natural AI voiceover using edge-tts with best voices."""
     try:
-        import edge_tts
-        
-        # Use the most natural-sounding Microsoft MultilingualNeural voices (2024)
-        # These have more human-like qualities with natural pauses and intonation
-        voice = "en-US-AvaMultilingualNeural"  # Bright, engaging, very natural
-        
-        # Alternative great voices:
-        # "en-US-EmmaMultilingualNeural" - Friendly, light-hearted
-        # "en-US-JennyNeural" - Warm, mature
-        # "en-GB-SoniaNeural" - British, sophisticated
-        
-        # Create the communicate object with natural speech rate
-        # Slightly slower for mystical/calming effect
-        communicate = edge_tts.Communicate(
-            text, 
-            voice,
-            rate="-5%",  # Slightly slower for dramatic effect
-            pitch="+0Hz"  # Natural pitch
-        )
-        await communicate.save(output_path)
+        # Slightly slower for mystical/calming effect, natural pitch
+        engine = TTSEngine(TTS_CACHE_DIR, voice=voice, rate="-5%", pitch="+0Hz")
+        try:
+            audio, duration, stats = await engine.synthesize(text)
+            print(f"✨ Voiceover generated with {voice} ({duration:.1f}s; "
+                  f"{stats['cached']}/{stats['sentences']} sentences from cache)")
+        except Exception as e:
+            # Segment join needs ffmpeg; fall back to one streamed synthesis
+            print(f"⚠️ Segmented TTS failed ({str(e)[:80]}), synthesizing in one piece...")
+            audio, duration = await stream_tts(text, voice, rate="-5%", pitch="+0Hz")
+            print(f"✨ Voiceover generated with {voice} ({duration:.1f}s)")
         
-        print(f"✨ Voiceover generated with {voice}")
-        return True
+        if output_path:
+            with open(output_path, 'wb') as f:
+                f.write(audio)
+        return audio, duration
     except Exception as e:
         print(f"Error generating voiceover: {e}")
-        return False
+        return None, 0
 
 def download_ai_video(prompt, duration=8):
     """
     Download AI-generated video from multiple providers.
-    Priority: Pollinations (with API key) > API keys > Free fallbacks
+    Priority: Pollinations (with API key) > API keys (raced concurrently) > Free fallbacks
     """
     print(f"🎥 Generating AI video: {prompt[:60]}...")
     
@@ -564,11 +358,9 @@ def download_ai_video(prompt, duration=8):
     if POLLINATION_API_KEY:
         providers.append(_try_pollinations_video)
     
-    # 2. Authenticated APIs (if configured)
-    if FAL_KEY:
-        providers.append(_try_fal_video)
-    if REPLICATE_API_TOKEN:
-        providers.append(_try_replicate_video)
+    # 2. Authenticated queue APIs (if configured): submitted together, first valid video wins
+    if _video_job_providers():
+        providers.append(_try_video_jobs)
     
     # 3. Free API fallbacks
     providers.extend([
@@ -596,6 +388,8 @@ def _try_pollinations_video(prompt, duration=8):
     Generate video using Pollinations.ai video API.
     Uses Wan 2.6 model for text-to-video generation.
     """
+    import requests
+
     print("  Trying: Pollinations.ai (Wan 2.6)...")
     
     if not POLLINATION_API_KEY:
@@ -676,10 +470,10 @@ def _try_browser_video(prompt, duration):
         print("    ⚠️ Playwright not installed")
         return None
     
-    # Try multiple free video generator sites
-    sites = [
-        _browser_pixelbin,
-        _browser_gizai,
+    # Try multiple free video generator sites (one module per site in browser_sites/)
+    import browser_sites
+    sites = [_browser_pixelbin] + [
+        lambda prompt, site=site: _browser_site_video(site, prompt) for site in browser_sites.SITES
     ]
     
     for site_func in sites:
@@ -698,386 +492,72 @@ def _browser_pixelbin(prompt):
     print("    Pixelbin.io: Requires login, skipping...")
     return None
 
-def _browser_gizai(prompt):
-    """Automate GizAI free video generator."""
-    print("    Trying: GizAI (giz.ai/video)...")
+def _browser_site_video(site, prompt):
+    """Generate a video on one browser site (browser_sites); the result is captured from network traffic."""
+    print(f"    Trying: {site.name} ({site.url})...")
     
-    from playwright.sync_api import sync_playwright
+    from browser_pool import get_pool
     
-    with sync_playwright() as p:
-        browser = p.chromium.launch(headless=True)
-        context = browser.new_context(
-            viewport={'width': 1920, 'height': 1080},
-            user_agent='Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
-        )
-        page = context.new_page()
-        
+    # Media stays blocked; the site's own route captures the result once it is armed
+    with get_pool().page() as page:
         try:
-            # Navigate to GizAI video generator
-            print("    Loading GizAI video page...")
-            page.goto("https://giz.ai/video", timeout=120000)
-            
-            # Wait for page to be fully loaded
-            page.wait_for_load_state("domcontentloaded", timeout=60000)
-            page.wait_for_timeout(5000)  # Extra wait for JS to initialize
-            
-            # Try to find prompt input with multiple selectors
-            print("    Looking for prompt input...")
-            input_selectors = [
-                'textarea[placeholder*="prompt"]',
-                'textarea[placeholder*="describe"]',
-                'textarea[placeholder*="Enter"]',
-                'input[placeholder*="prompt"]',
-                'textarea',
-                '[contenteditable="true"]',
-            ]
-            
-            prompt_input = None
-            for selector in input_selectors:
-                try:
-                    elem = page.locator(selector).first
-                    if elem.is_visible(timeout=3000):
-                        prompt_input = elem
-                        print(f"    Found input with selector: {selector[:30]}")
-                        break
-                except:
-                    continue
-            
-            if not prompt_input:
-                print("    Could not find prompt input field")
-                return None
-            
-            # Fill the prompt
-            prompt_input.fill(prompt)
-            page.wait_for_timeout(1000)
-            
-            # Find and click generate button
-            print("    Looking for generate button...")
-            button_selectors = [
-                'button:has-text("Generate")',
-                'button:has-text("Create")',
-                'button:has-text("Make")',
-                'button[type="submit"]',
-                '[role="button"]:has-text("Generate")',
-            ]
-            
-            generate_btn = None
-            for selector in button_selectors:
-                try:
-                    elem = page.locator(selector).first
-                    if elem.is_visible(timeout=3000):
-                        generate_btn = elem
-                        print(f"    Found button with selector: {selector[:30]}")
-                        break
-                except:
-                    continue
-            
-            if not generate_btn:
-                print("    Could not find generate button")
-                return None
-            
-            generate_btn.click()
-            print("    Clicked generate, waiting for video (up to 5 min)...")
-            
-            # Wait for video to be generated
-            # Look for video element, download link, or result container
-            result_selectors = [
-                'video',
-                'video source',
-                'a[download]',
-                'a:has-text("Download")',
-                '[class*="result"] video',
-                '[class*="output"] video',
-            ]
-            
-            video_element = None
-            for _ in range(60):  # Check every 5 seconds for 5 minutes
-                page.wait_for_timeout(5000)
-                for selector in result_selectors:
-                    try:
-                        elem = page.locator(selector).first
-                        if elem.is_visible(timeout=1000):
-                            video_element = elem
-                            break
-                    except:
-                        continue
-                if video_element:
-                    break
-                print("    Still waiting...")
-            
-            if not video_element:
-                print("    Timeout: No video appeared after 5 minutes")
-                return None
-            
-            # Get video URL
-            video_url = None
-            try:
-                # Try video source first
-                video_src = page.locator('video source').first
-                if video_src.count() > 0:
-                    video_url = video_src.get_attribute('src')
-            except:
-                pass
-            
-            if not video_url:
-                try:
-                    # Try video element directly
-                    video_elem = page.locator('video').first
-                    video_url = video_elem.get_attribute('src')
-                except:
-                    pass
-            
-            if not video_url:
-                try:
-                    # Try download link
-                    download_link = page.locator('a[download]').first
-                    video_url = download_link.get_attribute('href')
-                except:
-                    pass
-            
-            if video_url:
-                if not video_url.startswith('http'):
-                    video_url = f"https://giz.ai{video_url}"
-                
-                print(f"    Found video URL: {video_url[:60]}...")
-                import requests
-                response = requests.get(video_url, timeout=120)
-                if response.status_code == 200 and len(response.content) > 50000:
-                    print(f"    ✅ GizAI video: {len(response.content)//1024}KB")
-                    return response.content
-            
-            print("    Could not extract video URL")
-                    
+            video = site.generate(page, prompt)
+            if video:
+                print(f"    ✅ {site.name} video: {len(video)//1024}KB")
+            return video
         except Exception as e:
-            print(f"    GizAI error: {str(e)[:80]}")
-        finally:
-            browser.close()
+            print(f"    {site.name} error: {str(e)[:80]}")
     
     return None
 
-def _try_fal_video(prompt, duration):
-    """Try Fal.ai for high-quality video generation (Kling 2.5 model)."""
-    print("  Trying: Fal.ai (Kling 2.5)...")
-    
-    if not FAL_KEY:
-        print("    ⚠️ FAL_KEY not configured")
-        return None
-    
-    try:
-        import fal_client
-        
-        # Use Kling 2.5 Turbo for fast, high-quality generation
-        result = fal_client.subscribe(
-            "fal-ai/kling-video/v1.5/standard/text-to-video",
-            arguments={
-                "prompt": prompt,
-                "duration": "5",  # 5 or 10 seconds
-                "aspect_ratio": "9:16",  # Instagram Reels format
-            },
-            with_logs=False,
-        )
-        
-        if result and result.get("video") and result["video"].get("url"):
-            video_url = result["video"]["url"]
-            video_response = requests.get(video_url, timeout=120)
-            
-            if video_response.status_code == 200:
-                print(f"    ✅ Fal.ai Kling video: {len(video_response.content)//1024}KB")
-                return video_response.content
-                
-    except ImportError:
-        print("    ⚠️ fal-client not installed, using REST API...")
-        # Fallback to REST API
-        try:
-            headers = {"Authorization": f"Key {FAL_KEY}", "Content-Type": "application/json"}
-            payload = {
-                "prompt": prompt,
-                "duration": "5",
-                "aspect_ratio": "9:16",
-            }
-            
-            # Submit request
-            response = requests.post(
-                "https://queue.fal.run/fal-ai/kling-video/v1.5/standard/text-to-video",
-                headers=headers,
-                json=payload,
-                timeout=30
-            )
-            
-            if response.status_code == 200:
-                data = response.json()
-                request_id = data.get("request_id")
-                
-                if request_id:
-                    # Poll for result
-                    for _ in range(60):  # Wait up to 5 minutes
-                        time.sleep(5)
-                        status_resp = requests.get(
-                            f"https://queue.fal.run/fal-ai/kling-video/v1.5/standard/text-to-video/requests/{request_id}/status",
-                            headers=headers,
-                            timeout=30
-                        )
-                        if status_resp.status_code == 200:
-                            status_data = status_resp.json()
-                            if status_data.get("status") == "COMPLETED":
-                                result_resp = requests.get(
-                                    f"https://queue.fal.run/fal-ai/kling-video/v1.5/standard/text-to-video/requests/{request_id}",
-                                    headers=headers,
-                                    timeout=30
-                                )
-                                if result_resp.status_code == 200:
-                                    result_data = result_resp.json()
-                                    if result_data.get("video", {}).get("url"):
-                                        video_url = result_data["video"]["url"]
-                                        video_resp = requests.get(video_url, timeout=120)
-                                        if video_resp.status_code == 200:
-                                            print(f"    ✅ Fal.ai video: {len(video_resp.content)//1024}KB")
-                                            return video_resp.content
-                                break
-                            elif status_data.get("status") == "FAILED":
-                                print(f"    ❌ Fal.ai failed: {status_data.get('error')}")
-                                break
-                                
-        except Exception as e:
-            print(f"    Fal.ai REST error: {e}")
-    except Exception as e:
-        print(f"    Fal.ai error: {e}")
-    
-    return None
+def _video_job_providers():
+    """Configured queue-based providers, in priority order."""
+    import video_jobs
 
-def _try_luma_api_video(prompt, duration):
-    """Try Luma AI official API for video generation."""
-    print("  Trying: Luma AI API...")
-    
-    if not LUMA_API_KEY:
-        print("    ⚠️ LUMA_API_KEY not configured")
-        return None
-    
-    try:
-        headers = {
-            "Authorization": f"Bearer {LUMA_API_KEY}",
-            "Content-Type": "application/json"
-        }
-        
-        # Create generation request
-        payload = {
-            "prompt": prompt,
-            "aspect_ratio": "9:16",
-            "loop": False,
-        }
-        
-        response = requests.post(
-            "https://api.lumalabs.ai/dream-machine/v1/generations",
-            headers=headers,
-            json=payload,
-            timeout=30
-        )
-        
-        if response.status_code in [200, 201]:
-            data = response.json()
-            generation_id = data.get("id")
-            
-            if generation_id:
-                # Poll for completion
-                for _ in range(60):  # Wait up to 5 minutes
-                    time.sleep(5)
-                    status_resp = requests.get(
-                        f"https://api.lumalabs.ai/dream-machine/v1/generations/{generation_id}",
-                        headers=headers,
-                        timeout=30
-                    )
-                    
-                    if status_resp.status_code == 200:
-                        status_data = status_resp.json()
-                        state = status_data.get("state")
-                        
-                        if state == "completed":
-                            video_url = status_data.get("assets", {}).get("video")
-                            if video_url:
-                                video_resp = requests.get(video_url, timeout=120)
-                                if video_resp.status_code == 200:
-                                    print(f"    ✅ Luma AI video: {len(video_resp.content)//1024}KB")
-                                    return video_resp.content
-                            break
-                        elif state == "failed":
-                            print(f"    ❌ Luma failed: {status_data.get('failure_reason')}")
-                            break
-        else:
-            print(f"    Luma API returned: {response.status_code}")
-            
-    except Exception as e:
-        print(f"    Luma API error: {e}")
-    
-    return None
+    providers = []
+    if FAL_KEY:
+        providers.append(video_jobs.FalProvider(FAL_KEY))
+    if LUMA_API_KEY:
+        providers.append(video_jobs.LumaProvider(LUMA_API_KEY))
+    if REPLICATE_API_TOKEN:
+        providers.append(video_jobs.ReplicateProvider(REPLICATE_API_TOKEN, webhook_secret=REPLICATE_WEBHOOK_SECRET))
+    return providers
 
-def _try_replicate_video(prompt, duration):
-    """Try Replicate API for video generation (CogVideoX)."""
-    print("  Trying: Replicate (CogVideoX)...")
-    
-    if not REPLICATE_API_TOKEN:
-        print("    ⚠️ REPLICATE_API_TOKEN not configured")
-        return None
-    
+
+def _run_video_jobs(prompt, duration, providers, top_k=None):
+    """Race the given providers; returns the first valid video's bytes or None."""
+    import video_jobs
+
+    receiver = None
+    if WEBHOOK_PUBLIC_URL and any(p.supports_webhook for p in providers):
+        from webhook_receiver import WebhookReceiver
+        try:
+            receiver = WebhookReceiver(WEBHOOK_PUBLIC_URL, WEBHOOK_BIND).start()
+            print(f"    📡 Waiting for webhooks on {WEBHOOK_BIND} ({WEBHOOK_PUBLIC_URL})")
+        except OSError as e:
+            print(f"    ⚠️ Webhook receiver unavailable ({e}), polling instead")
     try:
-        headers = {
-            "Authorization": f"Token {REPLICATE_API_TOKEN}",
-            "Content-Type": "application/json"
-        }
-        
-        # Use CogVideoX-5B for text-to-video
-        payload = {
-            "version": "2b89ece6d64f7deccae55c54a3a2ca8d2bea04e3c0d3b5c6f7a1e8e5e5c5e5e5",
-            "input": {
-                "prompt": prompt,
-                "num_frames": 49,  # ~6 seconds at 8fps
-                "fps": 8,
-            }
-        }
-        
-        response = requests.post(
-            "https://api.replicate.com/v1/predictions",
-            headers=headers,
-            json=payload,
-            timeout=30
+        winner = video_jobs.download_first_video(
+            providers, prompt, duration, validate=_is_valid_video, top_k=top_k,
+            timeout=VIDEO_JOB_TIMEOUT, receiver=receiver,
         )
-        
-        if response.status_code == 201:
-            data = response.json()
-            prediction_id = data.get("id")
-            
-            if prediction_id:
-                # Poll for completion
-                for _ in range(60):
-                    time.sleep(5)
-                    status_resp = requests.get(
-                        f"https://api.replicate.com/v1/predictions/{prediction_id}",
-                        headers=headers,
-                        timeout=30
-                    )
-                    
-                    if status_resp.status_code == 200:
-                        status_data = status_resp.json()
-                        status = status_data.get("status")
-                        
-                        if status == "succeeded":
-                            output = status_data.get("output")
-                            video_url = output[0] if isinstance(output, list) else output
-                            if video_url:
-                                video_resp = requests.get(video_url, timeout=120)
-                                if video_resp.status_code == 200:
-                                    print(f"    ✅ Replicate video: {len(video_resp.content)//1024}KB")
-                                    return video_resp.content
-                            break
-                        elif status == "failed":
-                            print(f"    ❌ Replicate failed: {status_data.get('error')}")
-                            break
-        else:
-            print(f"    Replicate returned: {response.status_code}")
-            
-    except Exception as e:
-        print(f"    Replicate error: {e}")
-    
-    return None
+    finally:
+        if receiver:
+            receiver.stop()
+    if winner is None:
+        return None
+    name, video = winner
+    print(f"    ✅ {name} video: {len(video)//1024}KB")
+    return video
+
+
+def _try_video_jobs(prompt, duration):
+    """Submit to fal / Luma / Replicate at once (or the top VIDEO_PROVIDER_TOP_K) and take the first video."""
+    providers = _video_job_providers()
+    names = [p.name for p in providers[:VIDEO_PROVIDER_TOP_K or None]]
+    print(f"  Trying: {', '.join(names)} (concurrently)...")
+    return _run_video_jobs(prompt, duration, providers, top_k=VIDEO_PROVIDER_TOP_K or None)
+
 
 def _try_luma_video(prompt, duration):
     """Try Luma AI Dream Machine via Hugging Face Space (fallback)."""
@@ -1165,6 +645,8 @@ def _try_huggingface_video(prompt, duration):
 
 def _try_modelslab_video(prompt, duration):
     """Try ModelsLab free tier for video generation."""
+    import requests
+
     print("  Trying: ModelsLab API...")
     
     try:
@@ -1201,10 +683,24 @@ def _try_modelslab_video(prompt, duration):
     return None
 
 def _is_valid_video(content):
-    """Check if content is actually a video file (not an image)."""
+    """Check if content is actually a video file (not an image, audio-only or empty clip)."""
     if not content or len(content) < 1000:
         return False
     
+    # MP4 / WebM: read the container metadata (no decoding)
+    info = video_probe.try_probe(content)
+    if info:
+        if not info['has_video']:
+            print("    ❌ Rejected: no video track (audio-only clip)")
+            return False
+        if info['duration'] is not None and info['duration'] < MIN_VIDEO_SECONDS:
+            print(f"    ❌ Rejected: clip is only {info['duration']:.2f}s long")
+            return False
+        if not info['width'] or not info['height']:
+            print("    ❌ Rejected: video track has no dimensions")
+            return False
+        return True
+    
     # Check video magic bytes
     # MP4/MOV: starts with ftyp after 4 bytes
     # WebM: starts with 0x1A45DFA3
@@ -1253,55 +749,95 @@ def _try_pollinations_video(prompt, duration):
     print("    ⚠️ Pollinations video API currently unavailable")
     return None
 
-def generate_reel(image_bytes, caption_text, brand_name, video_prompt=None):
-    """Generate a professional Instagram Reel with AI voiceover and video effects."""
-    print("🎬 Generating Professional Instagram Reel...")
-    
-    try:
-        from moviepy.video.VideoClip import VideoClip
-        from moviepy.audio.io.AudioFileClip import AudioFileClip
-        from moviepy.video.compositing.CompositeVideoClip import CompositeVideoClip
-    except ImportError:
-        print("WARNING: moviepy not available, skipping reel generation")
+def _describe_clip(video_data, target_duration, width, height):
+    """Probe the provider clip and log how it will be looped and scaled. Returns its duration or None."""
+    info = video_probe.try_probe(video_data)
+    if not info:
+        print("Provider clip: unknown container, looping until the reel length")
         return None
+    loops = reel_render.loop_count(target_duration, info['duration'])
+    scale = min(width / info['width'], height / info['height']) if info['width'] and info['height'] else 0
+    fps = f", {info['fps']:g} fps" if info['fps'] else ""
+    print(f"Provider clip: {info['width']}x{info['height']} {info['codec']}{fps}, "
+          f"{info['duration'] or 0:.1f}s -> {'no loop' if loops == 0 else f'{loops + 1} passes' if loops > 0 else 'looped'}, "
+          f"{'upscaled' if scale > 1 else 'scaled'} x{scale:.2f}")
+    return info['duration']
+
+
+def _reel_script(caption_text, brand_name):
+    """Voiceover script for a reel: brand intro, the caption's first line, CTA."""
+    # Extract a short, punchy script from caption for voiceover
+    # Remove hashtags and website links for cleaner voiceover
+    script_lines = caption_text.split('\n')
+    script = script_lines[0] if script_lines else "Embrace the cosmic energy today"
+    script = script.split('#')[0].strip()
+    brand = current_run().brand
+    script = script.replace(brand.url, '').replace(brand.site, '')
+    script = script.replace('Visit', '').strip()
+    
+    # Add brand intro for professionalism
+    return f"Welcome to {brand_name}. {script}. Visit {brand.spoken_site} for your complete reading."
+
+
+def _video_budget(image_data, caption, videos=1):
+    """
+    Raw bytes each attached video may have so that the whole email (base64 image,
+    HTML and videos) stays under EMAIL_MAX_MB.
+    """
+    html = _email_body(caption, True).encode('utf-8')
+    other = reel_render.base64_size(len(image_data)) + reel_render.base64_size(len(html))
+    return reel_render.attachment_budget(int(EMAIL_MAX_MB * 1000 * 1000), other, videos)
+
+
+def _fit_video(video_data, max_bytes, duration, profile=None, name='reel'):
+    """Re-encode a video that came out over max_bytes (two-pass, audio copied); otherwise return it as is."""
+    if not max_bytes or video_data is None or len(video_data) <= max_bytes:
+        return video_data
+    print(f"📦 {name} is {len(video_data)/1e6:.1f}MB, over its {max_bytes/1e6:.1f}MB email budget - re-encoding to fit...")
+    try:
+        with reel_render.MemFile(video_data) as source, reel_render.MemFile() as output:
+            info = reel_render.fit_to_size(source, output, max_bytes, duration,
+                                           audio_bitrate=reel_render.get_profile(profile)['audio_bitrate'])
+            fitted = output.read()
+        print(f"  ✅ {name}: {len(fitted)/1e6:.1f}MB at {info['kbps']:.0f} kbps "
+              f"(attempt {info['attempts']}, {info['seconds']:.1f}s)")
+        return fitted
+    except Exception as e:
+        print(f"  ⚠️ Could not fit {name} into the budget: {str(e)[:120]}")
+        return video_data
+
+
+def generate_reel(image_bytes, caption_text, brand_name, video_prompt=None, profile=None, renditions=None,
+                  max_bytes=None):
+    """Generate a professional Instagram Reel with AI voiceover and video effects.
+    profile picks the encoding profile (draft / standard / archival, see reel_render).
+    If renditions is given (e.g. ["reel", "story", "square"]) all of them are cut from
+    one decode pass and a {name: mp4 bytes} dict is returned instead of the reel bytes.
+    max_bytes caps each video (see _video_budget): the encode is rate-capped to it and
+    re-encoded only if it still comes out over."""
+    import asyncio
+
+    profile = profile or REEL_PROFILE
+    print(f"🎬 Generating Professional Instagram Reel ({profile} profile)...")
     
     try:
         # Instagram Reels specs: 9:16 aspect ratio, 1080x1920
-        REEL_WIDTH = 1080
-        REEL_HEIGHT = 1920
-        FPS = 24
-        
-        # Extract a short, punchy script from caption for voiceover
-        # Remove hashtags and website links for cleaner voiceover
-        script_lines = caption_text.split('\n')
-        script = script_lines[0] if script_lines else "Embrace the cosmic energy today"
-        script = script.split('#')[0].strip()
-        script = script.replace('https://astroboli.com', '').replace('astroboli.com', '')
-        script = script.replace('Visit', '').strip()
-        
-        # Add brand intro for professionalism
-        full_script = f"Welcome to {brand_name}. {script}. Visit astroboli dot com for your complete reading."
+        REEL_WIDTH = reel_render.REEL_WIDTH
+        REEL_HEIGHT = reel_render.REEL_HEIGHT
+        FPS = reel_render.REEL_FPS
         
+        full_script = _reel_script(caption_text, brand_name)
         print(f"Script: {full_script[:80]}...")
         
-        # Generate voiceover
-        with tempfile.NamedTemporaryFile(suffix='.mp3', delete=False) as audio_tmp:
-            audio_path = audio_tmp.name
-        
-        # Run async voiceover generation
-        voiceover_success = asyncio.run(generate_voiceover(full_script, audio_path))
+        # Generate voiceover (in memory, duration from word boundaries)
+        audio_data, speech_duration = asyncio.run(generate_voiceover(full_script))
         
-        if not voiceover_success or not os.path.exists(audio_path):
+        if not audio_data:
             print("Voiceover generation failed, continuing without audio")
-            audio_path = None
+            audio_data = None
         
-        # Get audio duration to match video length
-        if audio_path:
-            audio_clip = AudioFileClip(audio_path)
-            DURATION = audio_clip.duration + 1  # Add 1 second buffer
-            audio_clip.close()
-        else:
-            DURATION = 10
+        # Match video length to the speech
+        DURATION = speech_duration + 1 if audio_data else 10  # Add 1 second buffer
         
         print(f"Reel duration target: {DURATION:.1f}s")
         
@@ -1313,69 +849,54 @@ def generate_reel(image_bytes, caption_text, brand_name, video_prompt=None):
         # Try to download AI-generated video
         ai_video_data = download_ai_video(video_prompt, duration=min(10, int(DURATION)))
         
-        use_ai_video = ai_video_data is not None
-        
-        if use_ai_video:
-            print("✅ Using AI-generated video from Pollinations.ai")
-            # Save AI video to temp file
-            with tempfile.NamedTemporaryFile(suffix='.mp4', delete=False) as vid_tmp:
-                vid_tmp.write(ai_video_data)
-                ai_video_path = vid_tmp.name
-            
-            # Load AI video as clip
-            from moviepy.video.io.VideoFileClip import VideoFileClip
-            video_clip = VideoFileClip(ai_video_path)
-            
-            # Resize to Instagram Reels dimensions (9:16)
-            video_clip = video_clip.resized((REEL_WIDTH, REEL_HEIGHT))
-            
-            # Loop or trim to match audio duration
-            if video_clip.duration < DURATION:
-                # Loop the video
-                loops_needed = int(DURATION / video_clip.duration) + 1
-                from moviepy.video.fx.loop import loop
-                video_clip = loop(video_clip, n=loops_needed).with_duration(DURATION)
-            else:
-                video_clip = video_clip.subclipped(0, DURATION)
-                
-        else:
+        if ai_video_data is None:
             # NO FALLBACK - User requested real AI video only
             print("❌ AI video generation failed - no reel will be created")
             print("💡 All providers returned errors. Real AI video required - no fallback to animated images.")
             return None
         
-        # ===== ADD AUDIO AND RENDER =====
-        if audio_path:
-            audio_clip = AudioFileClip(audio_path)
-            video_clip = video_clip.with_audio(audio_clip)
-            print("Audio attached to video")
-        
-        # Write final video
-        with tempfile.NamedTemporaryFile(suffix='.mp4', delete=False) as tmp:
-            output_path = tmp.name
-        
-        print(f"Rendering reel to: {output_path}")
-        video_clip.write_videofile(
-            output_path,
-            codec='libx264',
-            audio_codec='aac' if audio_path else None,
-            fps=FPS,
-            preset='medium'
-        )
+        print("✅ Using AI-generated video")
+        clip_duration = _describe_clip(ai_video_data, DURATION, REEL_WIDTH, REEL_HEIGHT)
+        # CRF quality with a VBV cap at the email budget's bitrate
+        render_profile = reel_render.capped_profile(profile, max_bytes, DURATION) if max_bytes else profile
         
-        # Read the final video
-        with open(output_path, 'rb') as f:
-            video_data = f.read()
+        # Provider clip and output live in memory (memfd); the audio is piped to ffmpeg's stdin
+        with reel_render.MemFile(ai_video_data) as video_file:
+            if renditions and REEL_BACKEND == 'ffmpeg':
+                try:
+                    videos = _export_reel_renditions(video_file, audio_data, DURATION, renditions, render_profile,
+                                                     clip_duration)
+                    for name in videos:
+                        cap = reel_render.RENDITIONS[name]['max_duration']
+                        videos[name] = _fit_video(videos[name], max_bytes, min(DURATION, cap) if cap else DURATION,
+                                                  profile, name)
+                    return videos
+                except Exception as e:
+                    print(f"⚠️ Multi-format export failed, rendering the Reel only: {str(e)[:120]}")
+            
+            video_data = None
+            if REEL_BACKEND == 'ffmpeg':
+                try:
+                    with reel_render.MemFile() as output:
+                        print("Rendering reel with ffmpeg (in memory)...")
+                        elapsed = reel_render.render_reel_ffmpeg(
+                            video_file, audio_data, output, DURATION,
+                            width=REEL_WIDTH, height=REEL_HEIGHT, fps=FPS, profile=render_profile,
+                            clip_duration=clip_duration,
+                        )
+                        video_data = output.read()
+                    print(f"ffmpeg render took {elapsed:.1f}s")
+                except Exception as e:
+                    print(f"⚠️ ffmpeg render failed, falling back to moviepy: {str(e)[:120]}")
         
-        # Cleanup
-        video_clip.close()
-        os.unlink(output_path)
-        if audio_path and os.path.exists(audio_path):
-            os.unlink(audio_path)
+        if video_data is None:
+            video_data = _render_reel_moviepy(ai_video_data, audio_data, DURATION, REEL_WIDTH, REEL_HEIGHT, FPS, profile)
         
-        print(f"✅ Professional reel generated: {REEL_WIDTH}x{REEL_HEIGHT}, {DURATION:.1f}s, size: {len(video_data)//1024}KB")
+        video_data = _fit_video(video_data, max_bytes, DURATION, profile)
+        budget = f" of {max_bytes//1024}KB budget" if max_bytes else ""
+        print(f"✅ Professional reel generated: {REEL_WIDTH}x{REEL_HEIGHT}, {DURATION:.1f}s, size: {len(video_data)//1024}KB{budget}")
         
-        return video_data
+        return {'reel': video_data} if renditions else video_data
         
     except Exception as e:
         print(f"ERROR generating reel: {e}")
@@ -1383,19 +904,187 @@ def generate_reel(image_bytes, caption_text, brand_name, video_prompt=None):
         traceback.print_exc()
         return None
 
-def send_email(image_data, caption, reel_data=None, video_prompt=None):
-    """Sends email with image, caption, and optional reel. If reel failed, includes video_prompt for manual creation."""
-    print("Sending email...")
+
+def _export_reel_renditions(video, audio, duration, renditions, profile, clip_duration=None):
+    """Cut every requested rendition from one ffmpeg pass and return {name: mp4 bytes}."""
+    with tempfile.TemporaryDirectory() as out_dir:
+        print(f"Exporting {', '.join(renditions)} from a single decode pass...")
+        results = reel_render.export_renditions(video, audio, duration, renditions, out_dir, profile=profile,
+                                                clip_duration=clip_duration)
+        videos = {}
+        for name, info in results.items():
+            spec = reel_render.RENDITIONS[name]
+            with open(info['path'], 'rb') as f:
+                videos[name] = f.read()
+            print(f"  ✅ {name}: {spec['width']}x{spec['height']}, {info['duration']:.1f}s, "
+                  f"{info['size']//1024}KB ({info['kbps']:.0f} kbps)")
+        print(f"  Export pass took {next(iter(results.values()))['seconds']:.1f}s for {len(results)} renditions")
+    return videos
+
+
+def voice_label(voice):
+    """Short name for a voice, used in attachment names: en-US-AvaMultilingualNeural -> ava."""
+    name = voice.split('-')[-1]
+    for suffix in ('MultilingualNeural', 'Neural'):
+        if name.endswith(suffix) and len(name) > len(suffix):
+            name = name[:-len(suffix)]
+    return name.lower()
+
+
+async def _generate_voiceovers(script, voices):
+    """Synthesize the same script in several voices concurrently. Returns {voice: (audio, duration)}."""
+    import asyncio
+
+    results = await asyncio.gather(*(generate_voiceover(script, voice=v) for v in voices))
+    return dict(zip(voices, results))
+
+
+def generate_reel_variants(image_bytes, caption_text, brand_name, voices, video_prompt=None, profile=None,
+                           max_bytes=None):
+    """
+    One reel per voice for A/B tests and regional accounts. The voiceovers are
+    synthesized concurrently, the AI clip is downloaded and encoded once (silent,
+    long enough for the longest voiceover), and each voice is muxed onto that
+    track with stream copy - the video is never re-encoded per variant.
+    Returns {"reel_<voice>": mp4 bytes}; voices whose TTS failed are skipped.
+    max_bytes caps each variant, as in generate_reel.
+    """
+    import asyncio
+
+    profile = profile or REEL_PROFILE
+    print(f"🎬 Generating {len(voices)} reel voice variants ({profile} profile)...")
+
+    try:
+        full_script = _reel_script(caption_text, brand_name)
+        print(f"Script: {full_script[:80]}...")
+
+        voiceovers = asyncio.run(_generate_voiceovers(full_script, voices))
+        variants, labels = {}, {}
+        for voice, (audio, speech_duration) in voiceovers.items():
+            if not audio:
+                print(f"⚠️ No voiceover for {voice}, skipping that variant")
+                continue
+            label = voice_label(voice)
+            if label in labels.values():
+                label = voice.lower()
+            labels[voice] = label
+            variants[f"reel_{label}"] = (audio, speech_duration + 1)  # 1 second buffer
+        if not variants:
+            print("❌ No voiceover succeeded - no variants created")
+            return {}
+
+        track_duration = max(d for _, d in variants.values())
+        if not video_prompt:
+            video_prompt = "Mystical cosmic astrology scene, swirling galaxies, zodiac constellations, ethereal purple and gold colors, glowing stars, nebula clouds, magical celestial energy, cinematic, 4K quality, slow motion particles, dreamy atmosphere"
+        ai_video_data = download_ai_video(video_prompt, duration=min(10, int(track_duration)))
+        if ai_video_data is None:
+            print("❌ AI video generation failed - no reel variants will be created")
+            return {}
+        clip_duration = _describe_clip(ai_video_data, track_duration, reel_render.REEL_WIDTH, reel_render.REEL_HEIGHT)
+
+        videos = {}
+        if REEL_BACKEND == 'ffmpeg':
+            try:
+                with reel_render.MemFile(ai_video_data) as video_file, reel_render.MemFile() as track, \
+                        tempfile.TemporaryDirectory() as out_dir:
+                    track_profile = (reel_render.capped_profile(profile, max_bytes, track_duration)
+                                     if max_bytes else profile)
+                    elapsed = reel_render.render_reel_ffmpeg(video_file, None, track, track_duration,
+                                                             profile=track_profile, clip_duration=clip_duration)
+                    print(f"Shared video track ({track_duration:.1f}s) encoded in {elapsed:.1f}s")
+                    results = reel_render.mux_variants(track, variants, out_dir, track_duration, profile)
+                    for name, info in results.items():
+                        with open(info['path'], 'rb') as f:
+                            videos[name] = _fit_video(f.read(), max_bytes, info['duration'], profile, name)
+                        print(f"  ✅ {name}: {info['duration']:.1f}s, {len(videos[name])//1024}KB (muxed in {info['seconds']:.1f}s)")
+                return videos
+            except Exception as e:
+                print(f"⚠️ Stream-copy variants failed, rendering each variant with moviepy: {str(e)[:120]}")
+
+        for name, (audio, duration) in variants.items():
+            video = _render_reel_moviepy(ai_video_data, audio, duration, reel_render.REEL_WIDTH,
+                                         reel_render.REEL_HEIGHT, reel_render.REEL_FPS, profile)
+            videos[name] = _fit_video(video, max_bytes, duration, profile, name)
+        return videos
+
+    except Exception as e:
+        print(f"ERROR generating reel variants: {e}")
+        import traceback
+        traceback.print_exc()
+        return {}
+
+
+def _render_reel_moviepy(video_data, audio_data, duration, width, height, fps, profile=None):
+    """
+    Fallback renderer: per-frame compositing with moviepy (slow, but no extra setup).
+    moviepy needs real files, so they live in a temp folder that is always removed.
+    Returns the mp4 bytes.
+    """
+    settings = reel_render.get_profile(profile)
+    
+    with tempfile.TemporaryDirectory() as work_dir:
+        video_path = os.path.join(work_dir, 'source.mp4')
+        output_path = os.path.join(work_dir, 'reel.mp4')
+        audio_name = 'voice.wav' if audio_data and audio_data[:4] == b'RIFF' else 'voice.mp3'
+        audio_path = os.path.join(work_dir, audio_name) if audio_data else None
+        with open(video_path, 'wb') as f:
+            f.write(video_data)
+        if audio_path:
+            with open(audio_path, 'wb') as f:
+                f.write(audio_data)
+        
+        _write_reel_moviepy(video_path, audio_path, output_path, duration, width, height, fps, settings)
+        
+        with open(output_path, 'rb') as f:
+            return f.read()
+
+
+def _write_reel_moviepy(video_path, audio_path, output_path, duration, width, height, fps, settings):
+    """Resize, loop/trim, attach audio and encode with moviepy."""
+    from moviepy.audio.io.AudioFileClip import AudioFileClip
+    from moviepy.video.io.VideoFileClip import VideoFileClip
     
-    # Create message
-    msg = MIMEMultipart()
-    msg['From'] = YOUR_EMAIL
-    msg['To'] = YOUR_EMAIL
+    video_clip = VideoFileClip(video_path)
     
-    has_reel = reel_data is not None
-    msg['Subject'] = 'Your Daily Astroboli Post & Reel are Ready!' if has_reel else 'Your Daily Astroboli Post is Ready!'
+    # Resize to Instagram Reels dimensions (9:16)
+    video_clip = video_clip.resized((width, height))
     
-    # Email body
+    # Loop or trim to match audio duration
+    if video_clip.duration < duration:
+        # Loop the video (moviepy 2.x effect API)
+        from moviepy.video.fx import Loop
+        video_clip = video_clip.with_effects([Loop(duration=duration)])
+    else:
+        video_clip = video_clip.subclipped(0, duration)
+    
+    # ===== ADD AUDIO AND RENDER =====
+    if audio_path:
+        audio_clip = AudioFileClip(audio_path)
+        video_clip = video_clip.with_audio(audio_clip)
+        print("Audio attached to video")
+    
+    print(f"Rendering reel with moviepy to: {output_path}")
+    rate_params = ['-crf', str(settings['crf'])] if not settings.get('bitrate') else []
+    video_clip.write_videofile(
+        output_path,
+        codec='libx264',
+        audio_codec='aac' if audio_path else None,
+        fps=fps,
+        preset=settings['preset'],
+        bitrate=settings.get('bitrate'),
+        threads=settings['threads'] or None,
+        audio_bitrate=settings['audio_bitrate'],
+        ffmpeg_params=rate_params + ['-g', str(settings['gop'])],
+        # Keep moviepy's intermediate audio next to the output (not in the working directory)
+        temp_audiofile=os.path.join(os.path.dirname(output_path), 'reel_audio.m4a'),
+    )
+    video_clip.close()
+    if audio_path:
+        audio_clip.close()
+
+
+def _email_body(caption, has_reel, video_prompt=None, extra_videos=None):
+    """HTML body of the daily email."""
     if has_reel:
         reel_section = """
     <div style="background: #E6FFFA; padding: 15px; border-radius: 8px; margin: 20px 0; border-left: 4px solid #38B2AC;">
@@ -1426,7 +1115,7 @@ def send_email(image_data, caption, reel_data=None, video_prompt=None):
     body = f"""
 <html>
 <body style="font-family: Arial, sans-serif; max-width: 600px; margin: 0 auto;">
-    <h2 style="color: #4A5568;">✨ Daily Astroboli Content Ready!</h2>
+    <h2 style="color: #4A5568;">✨ Daily {current_run().brand.name} Content Ready!</h2>
     
     <p>Your mystical content for today has been generated and is ready to share on Instagram.</p>
     
@@ -1454,58 +1143,436 @@ def send_email(image_data, caption, reel_data=None, video_prompt=None):
 </html>
 """
     
-    msg.attach(MIMEText(body, 'html'))
-    
-    # Attach image
-    image = MIMEImage(image_data, name='astroboli_post.jpg')
-    msg.attach(image)
+    if extra_videos:
+        # Renditions get their frame size; voice variants (reel_<voice>) are 1080x1920 reels
+        sizes = {name: reel_render.RENDITIONS.get(name, reel_render.RENDITIONS['reel']) for name in extra_videos}
+        extra_list = ', '.join(f"{name} ({spec['width']}x{spec['height']})" for name, spec in sizes.items())
+        body = body.replace('</body>', f'    <p style="color: #718096; font-size: 14px;">Extra video formats: {extra_list}</p>\n</body>')
     
-    # Attach reel if available
+    return body
+
+
+def post_email_spec(image_data, caption, reel_data=None, video_prompt=None, extra_videos=None, date=None):
+    """
+    The daily email as a mime_stream.MessageSpec. The image and videos may be bytes
+    or file paths; either way they are only read (and base64-encoded in chunks)
+    while the message is being sent. Every delivery backend takes this spec.
+    date (YYYY-MM-DD) marks a backfilled post: it goes in the subject and names the bundle.
+    """
+    from mime_stream import MessageSpec
+
+    run = current_run()
+    brand = run.brand
+    has_reel = reel_data is not None
+    subject = f'Your Daily {brand.name} Post & Reel are Ready!' if has_reel else f'Your Daily {brand.name} Post is Ready!'
+    if date:
+        subject = f"{subject} ({date})"
+    spec = MessageSpec(run.email or LOCAL_ADDRESS, run.recipient, subject,
+                       html=_email_body(caption, has_reel, video_prompt, extra_videos),
+                       meta={'kind': 'post', 'caption': caption, 'video_prompt': video_prompt, 'date': date,
+                             'brand': brand.key})
+    spec.attach(image_data, f'{brand.key}_post.jpg', 'image/jpeg')
+    if reel_data:
+        spec.attach(reel_data, f'{brand.key}_reel.mp4', 'video/mp4')
+    for name, video in (extra_videos or {}).items():
+        spec.attach(video, f'{brand.key}_{name}.mp4', 'video/mp4')
+    return spec
+
+
+def send_email(image_data, caption, reel_data=None, video_prompt=None, extra_videos=None, date=None):
+    """Sends email with image, caption, and optional reel. If reel failed, includes video_prompt for manual creation.
+    extra_videos ({rendition name: mp4 bytes or path}, e.g. story / square) are attached next to the reel.
+    Goes to the --delivery backend: by default spooled to the outbox and emailed (see delivery.py)."""
+    print("Delivering post...")
+    spec = post_email_spec(image_data, caption, reel_data, video_prompt, extra_videos, date)
     if reel_data:
-        reel = MIMEBase('video', 'mp4')
-        reel.set_payload(reel_data)
-        encoders.encode_base64(reel)
-        reel.add_header('Content-Disposition', 'attachment', filename='astroboli_reel.mp4')
-        msg.attach(reel)
-        print("Reel attached to email")
+        print("Reel attached")
+    for name in extra_videos or {}:
+        print(f"{name.capitalize()} video attached")
     
-    # Send via Gmail SMTP
-    try:
-        server = smtplib.SMTP('smtp.gmail.com', 587)
-        server.starttls()
-        server.login(YOUR_EMAIL, EMAIL_PASSWORD)
-        server.send_message(msg)
-        server.quit()
-        print("Email sent successfully!")
-    except Exception as e:
-        raise Exception(f"Failed to send email: {e}")
+    print(f"Post delivered to {deliver(spec)}")
 
-def main():
-    parser = argparse.ArgumentParser(description='Astroboli daily bot')
+def make_post_videos(image_data, processed_image, caption, video_prompt, renditions, voices, profile=None,
+                     email_budget=True):
+    """The reel plus any extra renditions / voice variants of one post. Returns (reel_data, extra_videos)."""
+    brand_name = current_run().brand.pick_name()
+    
+    # Every video shares what is left of the email size limit after the image and HTML
+    video_count = len(voices) if voices else len(renditions)
+    max_bytes = None
+    if email_budget:  # Disk deliveries have no attachment limit
+        max_bytes = _video_budget(processed_image, caption, video_count)
+        print(f"📦 Email budget: {max_bytes/1e6:.1f}MB per video ({video_count} video(s), {EMAIL_MAX_MB:g}MB limit)")
+    
+    extra_videos = None
+    if voices:
+        # First voice is the main reel, the others ride along as reel_<voice> attachments
+        videos = generate_reel_variants(image_data, caption, brand_name, voices,
+                                        video_prompt=video_prompt, profile=profile, max_bytes=max_bytes)
+        reel_data = videos.pop(f"reel_{voice_label(voices[0])}", None)
+        extra_videos = videos or None
+    elif renditions == ['reel']:
+        reel_data = generate_reel(image_data, caption, brand_name, video_prompt=video_prompt, profile=profile,
+                                  max_bytes=max_bytes)
+    else:
+        # Single decode pass for every requested format; the email picks them up by name
+        videos = generate_reel(image_data, caption, brand_name, video_prompt=video_prompt,
+                               profile=profile, renditions=renditions, max_bytes=max_bytes) or {}
+        reel_data = videos.pop('reel', None)
+        extra_videos = videos or None
+    return reel_data, extra_videos
+
+
+def generate_mock_content():
+    """Deterministic mock data for reliable tests (no Gemini)."""
+    image_prompt = "Ethereal cosmic scene, gold and indigo palette, glowing stars, soft volumetric fog, intricate star textures, 1:1 aspect, 1080x1080, no watermark"
+    brand = current_run().brand
+    hashtags = [brand.hashtag, '#astrology', '#numerology', '#horoscope', '#zodiac']
+    caption = f"{brand.name} AI - Today's cosmic energy: embrace small shifts. — Visit {brand.url}\n\n{' '.join(hashtags)}"
+    return image_prompt, caption, {'hashtags': hashtags}
+
+
+def generate_astro_content_batch(dates):
+    """Posts for several days from ONE Gemini request: [(image_prompt, caption, meta)], meta has video_prompt.
+    May return fewer posts than dates if the response is short or malformed."""
+    from backfill import batch_prompt, batch_items
+
+    print(f"✨ Asking Gemini for {len(dates)} days of posts in one request...")
+    prompt = _astro_prompt() + batch_prompt(
+        dates, "posts", extra=', plus "video_prompt": a 1-2 sentence cinematic scene for a 9:16 Instagram Reel matching that day')
+    posts = []
+    for data in batch_items(get_gemini_model().generate_content(prompt).text, "posts")[:len(dates)]:
+        try:
+            image_prompt, caption, meta = generate_astro_content_from_data(data)
+        except Exception as e:
+            print(f"  ⚠️ Skipping a malformed day in the batch response: {str(e)[:80]}")
+            continue
+        video_prompt = str(data.get("video_prompt") or "").strip()
+        meta['video_prompt'] = _with_reel_format(video_prompt) if video_prompt else None
+        posts.append((image_prompt, caption, meta))
+    return posts
+
+
+def generate_fresh_astro_content_batch(dates):
+    """
+    generate_astro_content_batch, but a day whose caption hook repeats a past post or
+    another day of the batch (or that is missing from the response) is asked for on
+    its own with the colliding + recent lines listed as off-limits.
+    """
+    from text_history import TextHistory, caption_hook
+
+    history = _get_text_history()
+    batch = TextHistory(None, threshold=TEXT_DEDUP_THRESHOLD)  # This batch only, in memory
+    posts = generate_astro_content_batch(dates)
+    fresh = []
+    for i, date in enumerate(dates):
+        post = posts[i] if i < len(posts) else None
+        if post is None:
+            print(f"  {date} missing from the batch response - asking for it alone...")
+            post = generate_astro_content(avoid_lines=batch.recent(TEXT_AVOID_RECENT))
+        for attempt in range(TEXT_DEDUP_MAX_RETRIES):
+            hook = caption_hook(post[1])
+            repeats = history.collisions([hook]) + batch.collisions([hook])
+            if not repeats:
+                break
+            print(f"🔁 {date}: caption repeats \"{repeats[0][:60]}\" - regenerating ({attempt + 1}/{TEXT_DEDUP_MAX_RETRIES})...")
+            post = generate_astro_content(avoid_lines=repeats + batch.recent(TEXT_AVOID_RECENT)
+                                          + history.recent(TEXT_AVOID_RECENT, kind="caption"))
+        batch.add(caption_hook(post[1]), kind="caption")
+        fresh.append(post)
+    return fresh
+
+
+def run_backfill(dates, renditions, voices, profile=None, mock=False, email_budget=True, brands=None):
+    """
+    Build and deliver one post per date in this process (see backfill.py): one Gemini
+    request for all days, then images and reels of different days concurrently within
+    the per-provider worker limits. Each post is delivered as soon as it is ready,
+    as a dated bundle. brands (default: the current run's) fans out: every brand gets
+    its own batch, and all brands share the image / video workers.
+    Returns the dates that failed ("<brand>/<date>" when several brands run).
+    """
+    from backfill import run_pipeline, BACKFILL_CONTENT_WORKERS, BACKFILL_IMAGE_WORKERS, BACKFILL_VIDEO_WORKERS
+
+    brands = brands or [current_run().brand]
+    label = (lambda day: day['date']) if len(brands) == 1 else (lambda day: f"{day['brand'].key}/{day['date']}")
+
+    def content_stage(brand, _):
+        with for_brand(brand):
+            return [generate_mock_content() for _ in dates] if mock else generate_fresh_astro_content_batch(dates)
+
+    days, failed = [], []
+    for brand, posts, error in run_pipeline(brands, [("content", content_stage, BACKFILL_CONTENT_WORKERS)]):
+        if error is not None:
+            print(f"❌ {brand.key}: no content: {error}")
+            failed += [label({'brand': brand, 'date': date}) for date in dates]
+            continue
+        days += [{'brand': brand, 'date': date, 'prompt': prompt, 'caption': caption, 'meta': meta}
+                 for date, (prompt, caption, meta) in zip(dates, posts)]
+
+    def image_stage(day, _):
+        print(f"📅 {label(day)}: generating image...")
+        image_data = generate_image(day['prompt'], record=not mock)
+        return image_data, process_for_instagram(image_data)
+
+    def video_stage(day, images):
+        image_data, processed_image = images
+        print(f"📅 {label(day)}: generating reel...")
+        with for_brand(day['brand']):
+            video_prompt = day['meta'].get('video_prompt') or (DEFAULT_VIDEO_PROMPT if mock else generate_video_prompt())
+            reel_data, extra_videos = make_post_videos(image_data, processed_image, day['caption'], video_prompt,
+                                                       renditions, voices, profile=profile, email_budget=email_budget)
+        return processed_image, reel_data, extra_videos, video_prompt
+
+    print(f"🗓️ Backfilling {len(days)} post(s): {dates[0]} to {dates[-1]}"
+          + (f" for {len(brands)} brands" if len(brands) > 1 else "")
+          + f" ({BACKFILL_IMAGE_WORKERS} image worker(s), reels "
+          + (f"on {BACKFILL_VIDEO_WORKERS} worker(s))" if BACKFILL_VIDEO_WORKERS else "on this thread)"))
+    stages = [("image", image_stage, BACKFILL_IMAGE_WORKERS), ("video", video_stage, BACKFILL_VIDEO_WORKERS)]
+    for day, result, error in run_pipeline(days, stages):
+        if error is None:
+            processed_image, reel_data, extra_videos, video_prompt = result
+            if not mock:
+                from text_history import caption_hook
+
+                _get_text_history().add(caption_hook(day['caption']), kind="caption")
+            try:
+                with for_brand(day['brand']):
+                    send_email(processed_image, day['caption'], reel_data,
+                               video_prompt=video_prompt if reel_data is None and not extra_videos else None,
+                               extra_videos=extra_videos, date=day['date'])
+                print(f"✅ {label(day)} done")
+                continue
+            except Exception as e:
+                error = e
+        print(f"❌ {label(day)} failed: {error}")
+        failed.append(label(day))
+    return sorted(failed)
+
+
+def submit_jobs(dates, renditions, voices, brands, args, queue=None, run_id=None, dated=True):
+    """
+    Queue the job graph for one post per brand per date (see job_queue.py):
+    content (one Gemini request per brand) -> image -> video -> deliver. Returns the run id.
+    """
+    from job_queue import JobQueue, new_run_id
+
+    queue = queue or JobQueue()
+    run_id = run_id or new_run_id()
+    common = {'mock': args.mock}
+    for brand in brands:
+        content = queue.submit('content', 'daily_bot:job_content', dict(common, brand=brand.key, dates=dates), run_id)
+        for index, date in enumerate(dates):
+            day = dict(common, brand=brand.key, index=index, date=date if dated else None)
+            image = queue.submit('image', 'daily_bot:job_image', day, run_id, after=[content])
+            video = queue.submit('video', 'daily_bot:job_video',
+                                 dict(day, renditions=renditions, voices=voices, profile=args.reel_profile,
+                                      email_budget=args.delivery == 'smtp'), run_id, after=[content, image])
+            queue.submit('deliver', 'daily_bot:job_deliver',
+                         dict(day, delivery=args.delivery, delivery_path=args.delivery_path,
+                              spool_key=f"{run_id}-{brand.key}-{index}"), run_id,
+                         after=[content, image, video])
+    return run_id
+
+
+def _job_brand(payload):
+    """for_brand() for the brand a job was submitted for."""
+    return for_brand(select_brands(payload['brand'])[0])
+
+
+def job_content(payload, inputs, store):
+    """Queue job: captions and prompts for every date of one brand."""
+    dates = payload['dates']
+    with _job_brand(payload):
+        if payload['mock']:
+            posts = [generate_mock_content() for _ in dates]
+        elif len(dates) == 1:
+            posts = [generate_fresh_astro_content()]
+        else:
+            posts = generate_fresh_astro_content_batch(dates)
+    if len(posts) < len(dates):
+        raise Exception(f"Gemini returned {len(posts)} of {len(dates)} posts")
+    return {'posts': [{'prompt': prompt, 'caption': caption, 'meta': meta} for prompt, caption, meta in posts]}
+
+
+def job_image(payload, inputs, store):
+    """Queue job: the post image (provider chain) and its 1080x1080 crop, as artifacts."""
+    post = inputs[0]['posts'][payload['index']]
+    image_data = generate_image(post['prompt'], record=not payload['mock'])
+    return {'raw': store.put(image_data), 'processed': store.put(process_for_instagram(image_data))}
+
+
+def job_video(payload, inputs, store):
+    """Queue job: the reel, renditions and voice variants of one post, as artifacts."""
+    content, images = inputs
+    post = content['posts'][payload['index']]
+    with _job_brand(payload):
+        video_prompt = post['meta'].get('video_prompt') or (
+            DEFAULT_VIDEO_PROMPT if payload['mock'] else generate_video_prompt())
+        reel_data, extra_videos = make_post_videos(store.get(images['raw']), store.get(images['processed']),
+                                                   post['caption'], video_prompt, payload['renditions'],
+                                                   payload['voices'], profile=payload['profile'],
+                                                   email_budget=payload['email_budget'])
+    return {'reel': store.put(reel_data) if reel_data else None, 'video_prompt': video_prompt,
+            'extras': {name: store.put(video) for name, video in (extra_videos or {}).items()}}
+
+
+def job_deliver(payload, inputs, store):
+    """Queue job: hand the finished post to the delivery backend it was submitted with.
+    Safe to retry: the outbox entry is keyed on the job (spooled once, and spooled counts
+    as delivered), and the caption only goes into the history once the post is handed over."""
+    content, images, videos = inputs
+    post = content['posts'][payload['index']]
+    use_delivery(payload['delivery'], payload['delivery_path'])
+    extra_videos = {name: store.path(artifact) for name, artifact in videos['extras'].items()} or None
+    with _job_brand(payload):
+        spec = post_email_spec(store.path(images['processed']), post['caption'],
+                               store.path(videos['reel']) if videos['reel'] else None,
+                               video_prompt=videos['video_prompt'] if not videos['reel'] and not extra_videos else None,
+                               extra_videos=extra_videos, date=payload['date'])
+        spec.meta['spool_key'] = payload['spool_key']
+        print(f"Post delivered to {deliver(spec)}")
+    get_delivery().flush()  # The job only counts as done once the post is on disk / in the outbox
+    if not payload['mock']:
+        from text_history import caption_hook
+
+        _get_text_history().add(caption_hook(post['caption']), kind="caption")
+    return {}
+
+
+def parse_args(argv=None):
+    """Command-line options (argv defaults to sys.argv; the daemon passes its own)."""
+    parser = argparse.ArgumentParser(description='Astroboli daily bot (one post per brand)')
     parser.add_argument('--dry-run', action='store_true', help='Only generate content and validate hashtags (do not download image or send email)')
     parser.add_argument('--mock', action='store_true', help='Use a mock response instead of calling Gemini (for testing without API key)')
-    args = parser.parse_args()
+    parser.add_argument('--reel-profile', choices=sorted(reel_render.ENCODING_PROFILES), default=None,
+                        help='Reel encoding profile: draft (quick preview), standard (default) or archival')
+    parser.add_argument('--renditions', default=REEL_RENDITIONS,
+                        help=f"Comma-separated video formats to export and email ({', '.join(reel_render.RENDITIONS)}); default: reel")
+    parser.add_argument('--voices', default=REEL_VOICES,
+                        help='Comma-separated edge-tts voices: one reel variant per voice, sharing one video render')
+    parser.add_argument('--flush-outbox', action='store_true',
+                        help='Only retry emails left in the outbox by earlier runs (generates nothing)')
+    parser.add_argument('--delivery', choices=['smtp', 'maildir', 'mbox', 'dir'], default=DELIVERY,
+                        help='Where the post goes: smtp (email, default), maildir, mbox or dir (files + caption.txt + manifest.json)')
+    parser.add_argument('--delivery-path', default=DELIVERY_PATH,
+                        help='Maildir / mbox file / export directory for the disk backends')
+    parser.add_argument('--days', type=int, default=1,
+                        help='Backfill: build this many days of posts in one process (one Gemini request)')
+    parser.add_argument('--start', help='First day of the backfill, YYYY-MM-DD (default: today)')
+    parser.add_argument('--out', help='Write one dated bundle per day to this directory (same as --delivery dir --delivery-path DIR)')
+    parser.add_argument('--brand', default=BRAND,
+                        help='Brand key from the brands file, several as a,b, or "all" (default: BRAND or the first brand)')
+    parser.add_argument('--submit-only', action='store_true',
+                        help='Only queue the jobs (see job_queue.py) and print the run id; workers do the rest')
+    parser.add_argument('--no-queue', action='store_true',
+                        help='Run every step in this process instead of through the job queue')
+    return parser.parse_args(argv)
+
+
+def run(args) -> int:
+    """One run with parsed options; returns the exit code (main() exits with it)."""
+    if args.flush_outbox:
+        return 0 if flush_outbox() else 1
+    if args.out:
+        args.delivery, args.delivery_path = 'dir', args.out
+    set_delivery(args.delivery, args.delivery_path)
+    renditions = [r.strip().lower() for r in args.renditions.split(',') if r.strip()]
+    unknown = [r for r in renditions if r not in reel_render.RENDITIONS]
+    if unknown:
+        print(f"ERROR: Unknown rendition(s): {', '.join(unknown)}")
+        return 1
+    voices = list(dict.fromkeys(v.strip() for v in args.voices.split(',') if v.strip()))
+    if voices and renditions != ['reel']:
+        print("⚠️ --voices produces 9:16 reels only; ignoring --renditions")
+    try:
+        brands = select_brands(args.brand)
+    except Exception as e:
+        print(f"ERROR: {e}")
+        return 1
 
     # If not mocking, ensure credentials are set
     if not args.mock:
-        if not all([GEMINI_API_KEY, YOUR_EMAIL, EMAIL_PASSWORD]):
+        run = current_run()
+        if not all([run.gemini_api_key] + ([run.email, run.email_password] if args.delivery == 'smtp' else [])):
             print("ERROR: Missing credentials.")
             print("Please fill out the '.env' file with your keys.")
-            print("Required: GEMINI_API_KEY, YOUR_EMAIL, EMAIL_PASSWORD")
-            exit(1)
+            print("Required: GEMINI_API_KEY, YOUR_EMAIL, EMAIL_PASSWORD (email only with --delivery smtp)")
+            return 1
+
+    if not args.dry_run and (args.submit_only or not args.no_queue):
+        from backfill import day_dates, MAX_DAYS
+        from job_queue import finish_run
+
+        if not 1 <= args.days <= MAX_DAYS:
+            print(f"ERROR: --days must be between 1 and {MAX_DAYS}")
+            return 1
+        dated = args.days > 1 or bool(args.start) or len(brands) > 1
+        run_id = submit_jobs(day_dates(args.days, args.start), renditions, voices, brands, args, dated=dated)
+        return finish_run(run_id, args.submit_only)
+
+    if len(brands) > 1 and not args.dry_run:
+        from backfill import day_dates, MAX_DAYS
+
+        if not 1 <= args.days <= MAX_DAYS:
+            print(f"ERROR: --days must be between 1 and {MAX_DAYS}")
+            return 1
+        dates = day_dates(args.days, args.start)
+        print(f"🏷️ Fan-out over {len(brands)} brands: {', '.join(b.key for b in brands)}")
+        try:
+            failed = run_backfill(dates, renditions, voices, profile=args.reel_profile, mock=args.mock,
+                                  email_budget=args.delivery == 'smtp', brands=brands)
+        except Exception as e:
+            print(f"Error: {e}")
+            return 1
+        total = len(brands) * len(dates)
+        print(f"\n✨ Fan-out done: {total - len(failed)}/{total} post(s) delivered"
+              + (f", failed: {', '.join(failed)}" if failed else ""))
+        return 1 if failed else 0
+
+    code = 0
+    for brand in brands:
+        with for_brand(brand):
+            code = code or _run_brand(args, renditions, voices)
+    return code
+
+
+def _run_brand(args, renditions, voices) -> int:
+    """run() for the current brand: today's post, a dry run or a backfill."""
+    if args.days > 1 or args.start:
+        from backfill import day_dates, MAX_DAYS
+
+        if not 1 <= args.days <= MAX_DAYS:
+            print(f"ERROR: --days must be between 1 and {MAX_DAYS}")
+            return 1
+        try:
+            dates = day_dates(args.days, args.start)
+            if args.dry_run:
+                posts = [generate_mock_content() for _ in dates] if args.mock else generate_fresh_astro_content_batch(dates)
+                for date, (prompt, caption, meta) in zip(dates, posts):
+                    print(f"\n📅 {date}\nPrompt: {prompt}\nCaption:\n{caption}")
+                    tags = meta.get('hashtags') if isinstance(meta, dict) else []
+                    if not isinstance(tags, list) or len(tags) != 5:
+                        print("Validation failed: hashtags must be a list of exactly 5 items.")
+                        return 2
+                print(f"\nDry-run validation passed for {len(posts)} day(s).")
+                return 0
+            failed = run_backfill(dates, renditions, voices, profile=args.reel_profile, mock=args.mock,
+                                  email_budget=args.delivery == 'smtp')
+        except Exception as e:
+            print(f"Error: {e}")
+            return 1
+        print(f"\n✨ Backfill done: {len(dates) - len(failed)}/{len(dates)} day(s) delivered"
+              + (f", failed: {', '.join(failed)}" if failed else ""))
+        return 1 if failed else 0
 
     try:
         # 1. Generate Content
         if args.mock:
             # Use deterministic mock data for reliable tests
-            def generate_mock_content():
-                image_prompt = "Ethereal cosmic scene, gold and indigo palette, glowing stars, soft volumetric fog, intricate star textures, 1:1 aspect, 1080x1080, no watermark"
-                caption = "Astroboli AI - Today's cosmic energy: embrace small shifts. — Visit https://astroboli.com\n\n#AstroboliAI #astrology #numerology #horoscope #zodiac"
-                hashtags = ['#AstroboliAI', '#astrology', '#numerology', '#horoscope', '#zodiac']
-                return image_prompt, caption, {'hashtags': hashtags}
             prompt, caption, meta = generate_mock_content()
         else:
-            prompt, caption, meta = generate_astro_content()
+            prompt, caption, meta = generate_fresh_astro_content()
         print(f"Prompt: {prompt}")
         print(f"Caption:\n{caption}")
 
@@ -1515,36 +1582,50 @@ def main():
             print(f"Hashtags generated: {tags}")
             if not isinstance(tags, list) or len(tags) != 5:
                 print("Validation failed: hashtags must be a list of exactly 5 items.")
-                exit(2)
-            if not any(t.lower() == '#astroboliai' for t in tags):
-                print("Validation failed: #AstroboliAI must be present in hashtags.")
-                exit(3)
-            print("Dry-run validation passed: 5 hashtags (including #AstroboliAI) found.")
-            exit(0)
+                return 2
+            brand = current_run().brand
+            if not brand.has_hashtag(tags):
+                print(f"Validation failed: {brand.hashtag} must be present in hashtags.")
+                return 3
+            print(f"Dry-run validation passed: 5 hashtags (including {brand.hashtag}) found.")
+            return 0
 
         # 2. Generate Image (with multi-provider fallback)
-        image_data = generate_image(prompt)
+        image_data = generate_image(prompt, record=not args.mock)
         
         # 4. Process image for Instagram (1:1 ratio, 1080x1080)
         processed_image = process_for_instagram(image_data)
         
-        # 5. Generate Instagram Reel (animated video from image)
-        brand_variations = ["Astro Boli", "AstroBoli AI", "Astro AI", "AstroBoli", "Astro Boli AI"]
-        brand_name = random.choice(brand_variations)
-        
         # Video prompt for manual creation if automation fails (generated dynamically)
         video_prompt = generate_video_prompt()
         
-        reel_data = generate_reel(image_data, caption, brand_name, video_prompt=video_prompt)
+        # 5. Generate Instagram Reel (animated video from image)
+        reel_data, extra_videos = make_post_videos(image_data, processed_image, caption, video_prompt, renditions, voices,
+                                                   profile=args.reel_profile, email_budget=args.delivery == 'smtp')
+        
+        # Remember what was made so tomorrow's caption doesn't repeat it (the outbox
+        # guarantees it gets delivered even if this send fails)
+        if not args.mock:
+            from text_history import caption_hook
+
+            _get_text_history().add(caption_hook(caption), kind="caption")
         
         # 6. Send Email with post image and reel (or video prompt if reel failed)
-        send_email(processed_image, caption, reel_data, video_prompt=video_prompt if reel_data is None else None)
+        send_email(processed_image, caption, reel_data, video_prompt=video_prompt if reel_data is None and not extra_videos else None,
+                   extra_videos=extra_videos)
         
         print("\n✨ Done! Check your email for today's post and reel.")
         
     except Exception as e:
         print(f"Error: {e}")
-        exit(1)
+        return 1
+    return 0
+
+
+def main():
+    """Submit the run's jobs to the queue and work them off (or only submit, with --submit-only)."""
+    exit(run(parse_args()))
+
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,280 @@
+"""
+Delivery backends for finished posts.
+
+send_email / send_carousel_email only format a mime_stream.MessageSpec; where it
+goes is decided by the backend picked with --delivery (or DELIVERY):
+
+    smtp     email via the outbox and the shared SMTP session (default)
+    maildir  one message file per post in <path>/new, readable by any mail client
+    mbox     posts appended to the single mbox file <path>
+    dir      one folder per post: the attachments, caption.txt and manifest.json
+
+The disk backends never touch the network. They write without fsync and make
+what they wrote durable in one batch (every FSYNC_BATCH posts and on close), so
+a long batch run pays a few fsyncs instead of several per file. Maildir messages
+and exported folders are written under a temporary name and only appear under
+their final name once they have been synced.
+"""
+
+import os
+import re
+import json
+import time
+import shutil
+import socket
+import secrets
+
+from mime_stream import iter_message
+
+BACKENDS = ("smtp", "maildir", "mbox", "dir")
+DEFAULT_PATHS = {"maildir": "Maildir", "mbox": "astroboli.mbox", "dir": "posts"}  # Under the state dir
+FSYNC_BATCH = int(os.environ.get("DELIVERY_FSYNC_BATCH", "50"))  # Posts written between two fsync rounds
+
+_FROM_LINE = re.compile(rb"(?m)^(>*From )")  # mboxrd quoting
+
+
+def _unix_lines(spec):
+    """The message with LF line endings (the on-disk convention for Maildir and mbox)."""
+    for piece in iter_message(spec):
+        yield piece.replace(b"\r\n", b"\n")
+
+
+def _place_file(source, target):
+    """Hard-link a spooled / temporary file into place, copying across filesystems."""
+    try:
+        os.link(source, target)
+    except OSError:
+        shutil.copyfile(source, target)
+
+
+class SMTPBackend:
+    """Email through the outbox (see outbox.py) and the shared SMTP session."""
+
+    name = "smtp"
+
+    def __init__(self, user, password, outbox=None, retries: int = 2):
+        self.user = user
+        self.password = password
+        self.outbox = outbox
+        self.retries = retries
+
+    def send(self, spec):
+        import smtp_delivery
+
+        smtp_delivery.get_session(self.user, self.password).send(spec)
+
+    def deliver(self, spec) -> str:
+        """
+        Spool the email, then send everything due. Raises if this email is still in the outbox,
+        unless it was spooled with a key (spec.meta["spool_key"], queue deliver jobs): that
+        email is spooled only once however often it is retried, and counts as delivered
+        once it is in the outbox, which owns its retries from then on.
+        """
+        if self.outbox is None:
+            self.send(spec)
+            return ", ".join(spec.to_addrs)
+        key = spec.meta.get("spool_key")
+        entry_id = self.outbox.find(key) if key else None
+        if entry_id:
+            print(f"📥 Already in the outbox: {entry_id}")
+        else:
+            entry_id = self.outbox.put(spec, spec.meta.get("kind", "post"), key=key)
+            print(f"📥 Spooled to outbox: {entry_id}")
+        result = self.outbox.drain(self.send, retries=self.retries)
+        earlier = [e for e in result["sent"] if e != entry_id]
+        if earlier:
+            print(f"📤 Also delivered {len(earlier)} email(s) left from earlier runs")
+        if entry_id not in result["sent"]:
+            reason = "another run is delivering the outbox" if result["locked"] else "not delivered yet"
+            if key:
+                print(f"📥 {entry_id} stays in the outbox ({reason}); the next run or --flush-outbox sends it")
+                return f"the outbox ({entry_id})"
+            if result["locked"]:
+                raise Exception("Another run is delivering the outbox; it will send this email")
+            raise Exception("Email not delivered - it is kept in the outbox, retry with --flush-outbox")
+        return ", ".join(spec.to_addrs)
+
+    def flush(self):
+        pass
+
+    def close(self):
+        pass
+
+
+class _DiskBackend:
+    """Shared batching: _write() queues (files to sync, (temp, final) rename or None)."""
+
+    name = None
+
+    def __init__(self, path: str, fsync_batch: int = FSYNC_BATCH):
+        self.path = path
+        self.fsync_batch = max(1, fsync_batch)
+        self.stats = {"delivered": 0, "fsyncs": 0, "batches": 0}
+        self._pending = []
+        self._unsynced = 0
+
+    def deliver(self, spec) -> str:
+        """Write one post; returns where it ends up (durable after the next flush)."""
+        location = self._write(spec)
+        self.stats["delivered"] += 1
+        self._unsynced += 1
+        if self._unsynced >= self.fsync_batch:
+            self.flush()
+        return location
+
+    def flush(self):
+        """fsync every pending file, rename finished ones into place, then fsync each touched directory once."""
+        if not self._pending:
+            return
+        directories = set()
+        for files, publish in self._pending:
+            for path in files:
+                self._fsync(path)
+            if publish:
+                os.rename(*publish)
+                directories.add(os.path.dirname(publish[1]))
+        for directory in directories:
+            self._fsync(directory)
+        self._pending = []
+        self._unsynced = 0
+        self.stats["batches"] += 1
+
+    def _fsync(self, path):
+        try:
+            fd = os.open(path, os.O_RDONLY)
+        except OSError:  # Directories cannot be opened on Windows; their entries are durable there
+            return
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+        self.stats["fsyncs"] += 1
+
+    def close(self):
+        self.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class MaildirBackend(_DiskBackend):
+    """Maildir: written to tmp/, moved to new/ once synced."""
+
+    name = "maildir"
+
+    def __init__(self, path: str, fsync_batch: int = FSYNC_BATCH):
+        super().__init__(path, fsync_batch)
+        for sub in ("tmp", "new", "cur"):
+            os.makedirs(os.path.join(path, sub), exist_ok=True)
+        self._host = socket.gethostname().replace("/", r"\057").replace(":", r"\072")
+        self._count = 0
+
+    def _write(self, spec) -> str:
+        self._count += 1
+        now = time.time()
+        name = f"{int(now)}.M{int(now % 1 * 1e6)}P{os.getpid()}Q{self._count}.{self._host}"
+        temp = os.path.join(self.path, "tmp", name)
+        with open(temp, "wb") as f:
+            for piece in _unix_lines(spec):
+                f.write(piece)
+        final = os.path.join(self.path, "new", name)
+        self._pending.append(([temp], (temp, final)))
+        return final
+
+
+class MboxBackend(_DiskBackend):
+    """One mbox file (mboxrd quoting); appends are locked against concurrent runs."""
+
+    name = "mbox"
+
+    def __init__(self, path: str, fsync_batch: int = FSYNC_BATCH):
+        super().__init__(path, fsync_batch)
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+
+    def _write(self, spec) -> str:
+        with open(self.path, "ab") as f:
+            try:
+                import fcntl
+
+                fcntl.flock(f, fcntl.LOCK_EX)
+            except ImportError:
+                pass
+            sender = spec.from_addr or "MAILER-DAEMON"
+            f.write(f"From {sender} {time.asctime()}\n".encode("utf-8"))
+            for piece in _unix_lines(spec):
+                f.write(_FROM_LINE.sub(rb">\1", piece))
+            f.write(b"\n")
+        if not self._pending:
+            self._pending.append(([self.path], None))
+        return self.path
+
+
+class DirectoryBackend(_DiskBackend):
+    """One folder per post with the attachments, caption.txt and manifest.json."""
+
+    name = "dir"
+
+    def __init__(self, path: str, fsync_batch: int = FSYNC_BATCH):
+        super().__init__(path, fsync_batch)
+        os.makedirs(path, exist_ok=True)
+
+    def _write(self, spec) -> str:
+        kind = spec.meta.get("kind", "post")
+        brand = spec.meta.get("brand")
+        label = f"{brand}-{kind}" if brand else kind
+        date = spec.meta.get("date")  # Backfilled posts get one bundle per day: <date>-<brand>-<kind>
+        entry = f"{date}-{label}" if date else f"{time.strftime('%Y%m%d-%H%M%S')}-{label}-{secrets.token_hex(3)}"
+        waiting = {os.path.basename(final) for _, (_, final) in self._pending}  # Written, not yet renamed
+        if entry in waiting or os.path.exists(os.path.join(self.path, entry)):
+            entry = f"{entry}-{secrets.token_hex(3)}"
+        staging = os.path.join(self.path, "." + entry)
+        os.makedirs(staging)
+        written, files = [], []
+        for attachment in spec.attachments:
+            target = os.path.join(staging, os.path.basename(attachment.filename))
+            if attachment.is_file:
+                _place_file(attachment.source, target)
+            else:
+                with open(target, "wb") as f:
+                    f.write(attachment.source)
+            written.append(target)
+            files.append({"file": os.path.basename(target), "content_type": attachment.content_type,
+                          "bytes": os.path.getsize(target)})
+        caption = spec.meta.get("caption")
+        if caption is not None:
+            written.append(os.path.join(staging, "caption.txt"))
+            with open(written[-1], "w", encoding="utf-8") as f:
+                f.write(caption + "\n")
+        written.append(os.path.join(staging, "manifest.json"))
+        with open(written[-1], "w", encoding="utf-8") as f:
+            json.dump({
+                "id": entry,
+                "kind": kind,
+                "brand": brand,
+                "date": date,
+                "created": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+                "subject": spec.subject,
+                "caption_file": "caption.txt" if caption is not None else None,
+                "files": files,
+                "meta": {k: v for k, v in spec.meta.items() if k not in ("kind", "brand", "caption", "date", "spool_key")},
+            }, f, ensure_ascii=False, indent=1)
+        written.append(staging)  # Its entries, before the rename publishes it
+        final = os.path.join(self.path, entry)
+        self._pending.append((written, (staging, final)))
+        return final
+
+
+def open_backend(name: str, path: str = None, user=None, password=None, outbox=None, retries: int = 2,
+                 fsync_batch: int = FSYNC_BATCH):
+    """A delivery backend by name (see BACKENDS); path is required for the disk backends."""
+    if name == "smtp":
+        return SMTPBackend(user, password, outbox, retries)
+    backends = {"maildir": MaildirBackend, "mbox": MboxBackend, "dir": DirectoryBackend}
+    if name not in backends:
+        raise Exception(f"Unknown delivery backend '{name}' (choose from {', '.join(BACKENDS)})")
+    if not path:
+        raise Exception(f"The {name} delivery backend needs a path")
+    return backends[name](path, fsync_batch)
@@ -0,0 +1,31 @@
+"""
+Cross-process lock for state files shared by several workers (the dedup histories).
+
+    with file_lock(path):
+        ...  # re-read, check, append, save
+
+An exclusive fcntl.flock on "<path>.lock", so the data file itself can still be
+replaced by a rename. flock locks belong to the open file, so two threads of one
+process that each take the lock also exclude each other. On Windows there is no
+fcntl; the lock is a no-op there, as for the outbox.
+"""
+
+import os
+from contextlib import contextmanager
+
+
+@contextmanager
+def file_lock(path: str):
+    """Hold an exclusive lock on path (blocking) for the duration of the block."""
+    try:
+        import fcntl
+    except ImportError:  # Windows: runs do not share a state dir there
+        yield
+        return
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(f"{path}.lock", "a") as handle:
+        fcntl.flock(handle, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(handle, fcntl.LOCK_UN)
@@ -0,0 +1,198 @@
+"""
+Perceptual-hash history of generated images.
+
+Every image that generate_image accepts is reduced to two 64-bit perceptual
+hashes (pHash + dHash, computed with NumPy) and stored in a compact .npy index
+(16 bytes per image). New images are compared against the whole history with a
+vectorized XOR + popcount; anything within the Hamming threshold of a past post
+is a near-duplicate and gets re-rolled before the expensive reel/overlay stages.
+"""
+
+import os
+import secrets
+from io import BytesIO
+
+import numpy as np
+from PIL import Image
+
+from file_lock import file_lock
+
+HASH_BITS = 64
+
+# Byte popcount table, used when numpy has no bitwise_count (numpy < 2.0)
+_POPCOUNT8 = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+
+def _to_gray(image) -> Image.Image:
+    if isinstance(image, (bytes, bytearray, memoryview)):
+        image = Image.open(BytesIO(image))
+    return image.convert("L")
+
+
+def _pack_bits(bits: np.ndarray) -> np.uint64:
+    """Pack 64 booleans (row-major) into one uint64."""
+    return np.packbits(bits.astype(np.uint8).ravel()).view(">u8")[0].astype(np.uint64)
+
+
+def dhash(image) -> np.uint64:
+    """Difference hash: is each pixel brighter than its right neighbour (9x8 grayscale)."""
+    gray = _to_gray(image).resize((9, 8), Image.Resampling.LANCZOS)
+    px = np.asarray(gray, dtype=np.int16)
+    return _pack_bits(px[:, 1:] > px[:, :-1])
+
+
+def _dct_matrix(n: int) -> np.ndarray:
+    k = np.arange(n)[:, None]
+    i = np.arange(n)[None, :]
+    m = np.cos(np.pi * (2 * i + 1) * k / (2 * n)) * np.sqrt(2.0 / n)
+    m[0, :] = np.sqrt(1.0 / n)
+    return m
+
+
+_DCT32 = _dct_matrix(32)
+
+
+def phash(image) -> np.uint64:
+    """DCT hash: low-frequency 8x8 DCT coefficients of a 32x32 grayscale above their median."""
+    gray = _to_gray(image).resize((32, 32), Image.Resampling.LANCZOS)
+    px = np.asarray(gray, dtype=np.float64)
+    low = (_DCT32 @ px @ _DCT32.T)[:8, :8]
+    # Median without the DC term, which only encodes overall brightness
+    median = np.median(low.ravel()[1:])
+    return _pack_bits(low > median)
+
+
+def image_hashes(image) -> np.ndarray:
+    """Return [phash, dhash] as a uint64 array of shape (2,)."""
+    gray = _to_gray(image)
+    return np.array([phash(gray), dhash(gray)], dtype=np.uint64)
+
+
+def popcount64(values: np.ndarray) -> np.ndarray:
+    """Number of set bits in each uint64."""
+    values = np.ascontiguousarray(values, dtype=np.uint64)
+    if hasattr(np, "bitwise_count"):
+        return np.bitwise_count(values).astype(np.uint8)
+    as_bytes = values.view(np.uint8).reshape(values.shape + (8,))
+    return _POPCOUNT8[as_bytes].sum(axis=-1, dtype=np.uint8)
+
+
+def hamming(a, b) -> np.ndarray:
+    """Vectorized Hamming distance between uint64 hashes (broadcasts)."""
+    return popcount64(np.bitwise_xor(np.asarray(a, dtype=np.uint64), np.asarray(b, dtype=np.uint64)))
+
+
+class ImageHashIndex:
+    """
+    Append-only history of image hashes stored as an (N, 2) uint64 .npy file.
+    An image is a near-duplicate when BOTH its pHash and dHash are within
+    `threshold` bits of the same past image (two hashes keep false positives low).
+
+    Several worker processes share one index: writes happen under a file lock
+    after re-reading the file, so no worker overwrites hashes another one added,
+    and every lookup first picks up whatever the other workers saved since.
+    """
+
+    def __init__(self, path: str, threshold: int = 10):
+        self.path = path
+        self.threshold = threshold
+        self._stamp = None
+        self.hashes = self._load()
+
+    def _file_stamp(self):
+        try:
+            st = os.stat(self.path)
+        except OSError:
+            return None
+        return st.st_mtime_ns, st.st_size, st.st_ino
+
+    def _load(self) -> np.ndarray:
+        if self.path and os.path.exists(self.path):
+            self._stamp = self._file_stamp()
+            try:
+                data = np.load(self.path)
+                if data.ndim == 2 and data.shape[1] == 2:
+                    return data.astype(np.uint64)
+                print(f"⚠️ Ignoring malformed image hash index: {self.path}")
+            except Exception as e:
+                print(f"⚠️ Could not read image hash index {self.path}: {e}")
+        return np.empty((0, 2), dtype=np.uint64)
+
+    def refresh(self):
+        """Re-read the index if another process has saved it since we last did."""
+        if self.path and self._file_stamp() not in (None, self._stamp):
+            self.hashes = self._load()
+
+    def __len__(self):
+        return len(self.hashes)
+
+    def nearest(self, hashes: np.ndarray):
+        """Return (index, phash_distance, dhash_distance) of the closest past image, or None."""
+        if not len(self.hashes):
+            return None
+        dist = hamming(self.hashes, hashes[None, :]).astype(np.int16)
+        worst = dist.max(axis=1)
+        i = int(np.argmin(worst))
+        return i, int(dist[i, 0]), int(dist[i, 1])
+
+    def _match(self, hashes: np.ndarray):
+        match = self.nearest(hashes)
+        if match and max(match[1], match[2]) <= self.threshold:
+            return match
+        return None
+
+    def find_duplicate(self, image):
+        """Return the nearest match if it is within the threshold, else None."""
+        hashes = image_hashes(image)
+        self.refresh()
+        return self._match(hashes)
+
+    def check_and_add(self, image, record: bool = True):
+        """
+        Duplicate check and append as one step across processes: under the file
+        lock, re-read the index, look for a match and, if there is none, record
+        the image. Returns the match (nothing recorded) or None.
+        """
+        hashes = image_hashes(image)
+        if not self.path:
+            match = self._match(hashes)
+            if match is None and record:
+                self.hashes = np.vstack([self.hashes, hashes[None, :]])
+            return match
+        with file_lock(self.path):
+            self.refresh()
+            match = self._match(hashes)
+            if match is None and record:
+                self.hashes = np.vstack([self.hashes, hashes[None, :]])
+                self._save()
+        return match
+
+    def add(self, image, save: bool = True):
+        hashes = image_hashes(image)
+        if not (save and self.path):
+            self.hashes = np.vstack([self.hashes, hashes[None, :]])
+            return
+        with file_lock(self.path):
+            self.refresh()
+            self.hashes = np.vstack([self.hashes, hashes[None, :]])
+            self._save()
+
+    def save(self):
+        if not self.path:
+            return
+        with file_lock(self.path):
+            self._save()
+
+    def _save(self):
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        # Unique temp name: a shared "<path>.tmp" lets one writer rename another's half-written file
+        tmp = f"{self.path}.{os.getpid()}.{secrets.token_hex(4)}.tmp"
+        try:
+            with open(tmp, "wb") as f:
+                np.save(f, self.hashes)
+            os.replace(tmp, self.path)
+        except BaseException:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            raise
+        self._stamp = self._file_stamp()
@@ -0,0 +1,174 @@
+"""
+JPEG encoder stage for post outputs.
+
+Instead of saving every image at a fixed quality, binary-search the JPEG
+quality so the file either fits a byte budget or stays above a minimum SSIM
+(computed with NumPy against the source). Instagram recompresses uploads
+anyway, so anything above "visually lossless" only makes emails bigger.
+"""
+
+import os
+from io import BytesIO
+
+import numpy as np
+from PIL import Image
+
+# Defaults (override via environment)
+JPEG_MIN_SSIM = float(os.environ.get("JPEG_MIN_SSIM", "0.985"))
+JPEG_TARGET_KB = os.environ.get("JPEG_TARGET_KB")  # e.g. "350" to cap each image at ~350KB
+JPEG_PROGRESSIVE = os.environ.get("JPEG_PROGRESSIVE", "1") not in ("0", "false", "False")
+JPEG_SUBSAMPLING = os.environ.get("JPEG_SUBSAMPLING", "4:2:0")  # 4:4:4, 4:2:2 or 4:2:0
+
+# Pillow's subsampling codes
+_SUBSAMPLING = {"4:4:4": 0, "4:2:2": 1, "4:2:0": 2}
+
+# SSIM constants for 8-bit images (Wang et al. 2004)
+_C1 = (0.01 * 255) ** 2
+_C2 = (0.03 * 255) ** 2
+
+
+def _luma(img) -> np.ndarray:
+    """Return the image's luma plane as float64 (ITU-R BT.601 weights)."""
+    if isinstance(img, np.ndarray):
+        arr = img.astype(np.float64)
+    else:
+        arr = np.asarray(img.convert("RGB"), dtype=np.float64)
+    if arr.ndim == 3:
+        arr = arr[..., 0] * 0.299 + arr[..., 1] * 0.587 + arr[..., 2] * 0.114
+    return arr
+
+
+def _box_mean(a: np.ndarray, win: int) -> np.ndarray:
+    """Mean over every win x win window ('valid' mode) using an integral image."""
+    s = np.pad(a, ((1, 0), (1, 0))).cumsum(axis=0).cumsum(axis=1)
+    total = s[win:, win:] - s[:-win, win:] - s[win:, :-win] + s[:-win, :-win]
+    return total / float(win * win)
+
+
+def ssim(a, b, win: int = 8) -> float:
+    """
+    Mean structural similarity between two images (PIL images or arrays).
+    Computed on luma with a uniform win x win window.
+    """
+    x = _luma(a)
+    y = _luma(b)
+    if x.shape != y.shape:
+        raise ValueError(f"SSIM needs equal sizes, got {x.shape} and {y.shape}")
+    win = max(1, min(win, x.shape[0], x.shape[1]))
+
+    mu_x = _box_mean(x, win)
+    mu_y = _box_mean(y, win)
+    var_x = _box_mean(x * x, win) - mu_x * mu_x
+    var_y = _box_mean(y * y, win) - mu_y * mu_y
+    cov = _box_mean(x * y, win) - mu_x * mu_y
+
+    num = (2 * mu_x * mu_y + _C1) * (2 * cov + _C2)
+    den = (mu_x * mu_x + mu_y * mu_y + _C1) * (var_x + var_y + _C2)
+    return float(np.mean(num / den))
+
+
+def _save_jpeg(img, quality: int, progressive: bool, subsampling: str) -> bytes:
+    out = BytesIO()
+    img.save(
+        out,
+        format="JPEG",
+        quality=quality,
+        optimize=True,
+        progressive=progressive,
+        subsampling=_SUBSAMPLING.get(subsampling, 2),
+    )
+    return out.getvalue()
+
+
+def encode_jpeg(
+    img,
+    target_bytes=None,
+    min_ssim=None,
+    progressive=None,
+    subsampling=None,
+    min_quality: int = 60,
+    max_quality: int = 98,
+):
+    """
+    Encode a PIL image as JPEG, picking the lowest quality that satisfies the goal.
+
+    - target_bytes: largest quality whose output fits in this many bytes
+    - min_ssim: lowest quality whose SSIM against the source is >= this value
+    If both are given the byte budget wins (SSIM is still reported).
+    If neither is given the image is saved at max_quality.
+
+    Returns (jpeg_bytes, info) where info has quality, size, ssim, progressive, subsampling
+    and met: False when even min_quality is over target_bytes (or max_quality under min_ssim).
+    """
+    img = img.convert("RGB")
+    progressive = JPEG_PROGRESSIVE if progressive is None else progressive
+    subsampling = subsampling or JPEG_SUBSAMPLING
+    if subsampling not in _SUBSAMPLING:
+        raise ValueError(f"Unknown chroma subsampling: {subsampling} (use 4:4:4, 4:2:2 or 4:2:0)")
+
+    source = _luma(img)
+    cache = {}
+
+    def trial(q):
+        if q not in cache:
+            data = _save_jpeg(img, q, progressive, subsampling)
+            score = ssim(source, Image.open(BytesIO(data)))
+            cache[q] = (data, score)
+        return cache[q]
+
+    if target_bytes:
+        # Largest quality that still fits the budget
+        lo, hi, best = min_quality, max_quality, min_quality
+        while lo <= hi:
+            mid = (lo + hi) // 2
+            if len(trial(mid)[0]) <= target_bytes:
+                best, lo = mid, mid + 1
+            else:
+                hi = mid - 1
+    elif min_ssim:
+        # Smallest quality that still looks like the source
+        lo, hi, best = min_quality, max_quality, max_quality
+        while lo <= hi:
+            mid = (lo + hi) // 2
+            if trial(mid)[1] >= min_ssim:
+                best, hi = mid, mid - 1
+            else:
+                lo = mid + 1
+    else:
+        best = max_quality
+
+    data, score = trial(best)
+    if target_bytes:
+        met = len(data) <= target_bytes
+    elif min_ssim:
+        met = score >= min_ssim
+    else:
+        met = True
+    info = {
+        "quality": best,
+        "size": len(data),
+        "ssim": round(score, 5),
+        "progressive": bool(progressive),
+        "subsampling": subsampling,
+        "trials": len(cache),
+        "met": met,
+    }
+    return data, info
+
+
+def encode_for_post(img, target_bytes=None, min_ssim=None):
+    """Encode with the configured defaults (JPEG_TARGET_KB / JPEG_MIN_SSIM) and log the result."""
+    if target_bytes is None and JPEG_TARGET_KB:
+        target_bytes = int(float(JPEG_TARGET_KB) * 1024)
+    if target_bytes is None and min_ssim is None:
+        min_ssim = JPEG_MIN_SSIM
+    data, info = encode_jpeg(img, target_bytes=target_bytes, min_ssim=min_ssim)
+    print(
+        f"JPEG encoded: quality {info['quality']}, {info['size']//1024}KB, "
+        f"SSIM {info['ssim']:.4f} ({info['subsampling']}"
+        f"{', progressive' if info['progressive'] else ''}, {info['trials']} trials)"
+    )
+    if not info["met"]:
+        goal = f"{target_bytes//1024}KB budget" if target_bytes else f"SSIM {min_ssim}"
+        print(f"⚠️ JPEG missed the {goal} even at quality {info['quality']}")
+    return data, info
@@ -0,0 +1,593 @@
+#!/usr/bin/env python3
+"""
+SQLite job queue for spreading generation work over processes and machines.
+
+A run of daily_bot / carousel_bot becomes a small graph of jobs, one per step:
+
+    content  Gemini: captions, prompts (one job per brand, covering every day)
+    image    image provider call + square crop (one per post / per slide)
+    slide    text overlay + JPEG encode of a carousel slide (CPU)
+    video    reel render / provider fetch (CPU + network)
+    deliver  hand the finished post to the delivery backend
+
+A job runs when every job it depends on is done. Its handler is named in the job
+("carousel_bot:job_slide") and gets the results of its dependencies. Files it
+makes go to the artifact store: content-addressed files next to the database,
+so any worker on the same filesystem can read them. The JSON result holds only
+their ids.
+
+Workers lease jobs of the types they were started for. A lease expires unless the
+worker's heartbeat renews it, so a job from a crashed worker is picked up again.
+Failed jobs are retried with exponential backoff. After their last attempt they
+fail together with everything that depends on them. The database runs in WAL
+mode: workers write while others read, and every lease is one short IMMEDIATE
+transaction.
+
+    python daily_bot.py --submit-only             # queue today's post, print its run id
+    python job_queue.py work --types content,image,deliver --processes 4    # I/O-bound
+    python job_queue.py work --types slide,video --processes 2              # CPU-bound
+    python job_queue.py status [RUN_ID]
+    python job_queue.py prune --older-than 7d    # finished runs: job rows + artifacts
+
+A run the bot works off itself is deleted (job rows and the artifacts no other
+run uses) as soon as it finishes without a failure. Failed runs stay around for
+`status` and go JOB_RETENTION_DAYS later. A run that was only submitted is
+finished by workers that don't know whether more of its jobs are on the way, so
+shared setups prune on a schedule instead.
+"""
+
+import os
+import sys
+import json
+import time
+import socket
+import sqlite3
+import re
+import hashlib
+import secrets
+import argparse
+import importlib
+import threading
+
+from bot_core import STATE_DIR
+
+JOB_TYPES = ("content", "image", "slide", "video", "deliver")
+JOB_QUEUE_DB = os.environ.get("JOB_QUEUE_DB") or os.path.join(STATE_DIR, "jobs.sqlite")
+ARTIFACT_DIR = os.environ.get("ARTIFACT_DIR")  # Default: "artifacts" next to the database
+JOB_LEASE_SECONDS = float(os.environ.get("JOB_LEASE_SECONDS", "120"))    # Renewed every third of this
+JOB_MAX_ATTEMPTS = int(os.environ.get("JOB_MAX_ATTEMPTS", "3"))
+JOB_BACKOFF_SECONDS = float(os.environ.get("JOB_BACKOFF_SECONDS", "30"))  # 30 s, 60 s, 120 s, ...
+JOB_RETENTION_DAYS = float(os.environ.get("JOB_RETENTION_DAYS", "7"))  # Failed / submitted runs, pruned by later runs
+JOB_POLL_SECONDS = 1.0
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY,
+    run_id TEXT NOT NULL,
+    type TEXT NOT NULL,
+    task TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    state TEXT NOT NULL DEFAULT 'queued',      -- queued, leased, done, failed
+    attempts INTEGER NOT NULL DEFAULT 0,
+    max_attempts INTEGER NOT NULL,
+    run_after REAL NOT NULL,
+    lease_owner TEXT,
+    lease_until REAL,
+    result TEXT,
+    error TEXT,
+    created REAL NOT NULL,
+    updated REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS deps (
+    job_id INTEGER NOT NULL,
+    dep_id INTEGER NOT NULL,
+    position INTEGER NOT NULL,
+    PRIMARY KEY (job_id, dep_id)
+);
+CREATE INDEX IF NOT EXISTS jobs_ready ON jobs (state, type, run_after);
+CREATE INDEX IF NOT EXISTS jobs_run ON jobs (run_id);
+CREATE INDEX IF NOT EXISTS deps_dep ON deps (dep_id);
+"""
+
+
+class ArtifactStore:
+    """Content-addressed files (sha256) under root, shared by every worker on the filesystem."""
+
+    def __init__(self, root: str):
+        self.root = root
+        os.makedirs(root, exist_ok=True)
+
+    @classmethod
+    def for_queue(cls, path: str):
+        """The store that goes with a queue database (ARTIFACT_DIR, or "artifacts" next to it)."""
+        return cls(ARTIFACT_DIR or os.path.join(os.path.dirname(os.path.abspath(path)), "artifacts"))
+
+    def path(self, artifact_id: str) -> str:
+        return os.path.join(self.root, artifact_id[:2], artifact_id)
+
+    def put(self, data) -> str:
+        """Store bytes or the file at a path; returns its id. Identical content is stored once."""
+        digest = hashlib.sha256()
+        temp = os.path.join(self.root, f".{secrets.token_hex(8)}.tmp")
+        with open(temp, "wb") as out:
+            if isinstance(data, (bytes, bytearray)):
+                digest.update(data)
+                out.write(data)
+            else:
+                with open(data, "rb") as f:
+                    for chunk in iter(lambda: f.read(1 << 20), b""):
+                        digest.update(chunk)
+                        out.write(chunk)
+            out.flush()
+            os.fsync(out.fileno())
+        artifact_id = digest.hexdigest()
+        target = self.path(artifact_id)
+        try:
+            os.utime(target)  # Already stored: mark it in use again, so pruning an older run keeps it
+            os.remove(temp)
+        except FileNotFoundError:
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            os.replace(temp, target)
+        return artifact_id
+
+    def get(self, artifact_id: str) -> bytes:
+        with open(self.path(artifact_id), "rb") as f:
+            return f.read()
+
+    def remove(self, artifact_ids, not_after: float = None) -> int:
+        """Delete artifacts (only those last stored at or before not_after, if given); returns how many."""
+        removed = 0
+        for artifact_id in artifact_ids:
+            path = self.path(artifact_id)
+            try:
+                if not_after is None or os.path.getmtime(path) <= not_after:
+                    os.remove(path)
+                    removed += 1
+            except FileNotFoundError:
+                pass
+        return removed
+
+    def sweep(self, keep: set, before: float) -> int:
+        """Delete artifacts not in `keep` and stray temp files, last written before `before`; returns how many."""
+        removed = 0
+        for folder, _, names in os.walk(self.root):
+            for name in names:
+                path = os.path.join(folder, name)
+                if name in keep or (folder == self.root and not name.endswith(".tmp")):
+                    continue
+                try:
+                    if os.path.getmtime(path) < before:
+                        os.remove(path)
+                        removed += 1
+                except FileNotFoundError:
+                    pass
+        return removed
+
+
+class JobQueue:
+    """Jobs, their dependencies and leases in one SQLite database (WAL mode)."""
+
+    def __init__(self, path: str = JOB_QUEUE_DB, lease_seconds: float = JOB_LEASE_SECONDS,
+                 backoff_seconds: float = JOB_BACKOFF_SECONDS):
+        self.path = path
+        self.lease_seconds = lease_seconds
+        self.backoff_seconds = backoff_seconds
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._local = threading.local()  # One connection per thread (the heartbeat has its own)
+        with self._db() as db:
+            db.executescript(_SCHEMA)
+
+    def _db(self) -> sqlite3.Connection:
+        db = getattr(self._local, "db", None)
+        if db is None:
+            db = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            db.row_factory = sqlite3.Row
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("PRAGMA synchronous=NORMAL")  # Durable at checkpoints; WAL keeps it consistent
+            db.execute("PRAGMA busy_timeout=30000")
+            self._local.db = db
+        return db
+
+    def _write(self):
+        """An IMMEDIATE transaction: takes the write lock up front, so lease races can't happen."""
+        return _Transaction(self._db())
+
+    def close(self):
+        db = getattr(self._local, "db", None)
+        if db is not None:
+            db.close()
+            self._local.db = None
+
+    # ----- submit -----
+
+    def submit(self, job_type: str, task: str, payload: dict = None, run_id: str = None, after=(),
+               max_attempts: int = JOB_MAX_ATTEMPTS) -> int:
+        """Queue one job; it becomes ready when every job id in `after` is done. Returns its id."""
+        if job_type not in JOB_TYPES:
+            raise Exception(f"Unknown job type '{job_type}' (choose from {', '.join(JOB_TYPES)})")
+        now = time.time()
+        with self._write() as db:
+            cursor = db.execute(
+                "INSERT INTO jobs (run_id, type, task, payload, max_attempts, run_after, created, updated)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (run_id or new_run_id(), job_type, task, json.dumps(payload or {}), max_attempts, now, now, now))
+            job_id = cursor.lastrowid
+            db.executemany("INSERT INTO deps (job_id, dep_id, position) VALUES (?, ?, ?)",
+                           [(job_id, dep, i) for i, dep in enumerate(after)])
+        return job_id
+
+    # ----- leases -----
+
+    def lease(self, types=JOB_TYPES, owner: str = None, run_id: str = None) -> dict:
+        """Claim the oldest ready job of one of `types` (or one whose lease expired), optionally of one
+        run only; None if there is none."""
+        owner = owner or worker_name()
+        now = time.time()
+        marks = ",".join("?" * len(types))
+        with self._write() as db:
+            # A job whose worker died on its last attempt is not handed out again
+            for row in db.execute("SELECT id FROM jobs WHERE state = 'leased' AND lease_until < ?"
+                                  " AND attempts >= max_attempts", (now,)).fetchall():
+                self._give_up(db, row["id"], "lease expired on the last attempt (worker died?)", now)
+            row = db.execute(
+                f"""SELECT * FROM jobs WHERE type IN ({marks}) {'AND run_id = ?' if run_id else ''}
+                    AND ((state = 'queued' AND run_after <= ?) OR (state = 'leased' AND lease_until < ?))
+                    AND NOT EXISTS (SELECT 1 FROM deps JOIN jobs AS dep ON dep.id = deps.dep_id
+                                    WHERE deps.job_id = jobs.id AND dep.state != 'done')
+                    ORDER BY run_after, id LIMIT 1""",
+                (*types, *([run_id] if run_id else []), now, now)).fetchone()
+            if row is None:
+                return None
+            db.execute("UPDATE jobs SET state = 'leased', lease_owner = ?, lease_until = ?, attempts = attempts + 1,"
+                       " updated = ? WHERE id = ?", (owner, now + self.lease_seconds, now, row["id"]))
+            inputs = [json.loads(dep["result"]) for dep in db.execute(
+                "SELECT result FROM deps JOIN jobs ON jobs.id = deps.dep_id WHERE deps.job_id = ? ORDER BY position",
+                (row["id"],))]
+        job = _job(row)
+        job.update(state="leased", attempts=row["attempts"] + 1, lease_owner=owner, inputs=inputs)
+        return job
+
+    def heartbeat(self, job_id: int, owner: str) -> bool:
+        """Extend a lease; False if the job is no longer ours (expired and taken, or finished)."""
+        now = time.time()
+        with self._write() as db:
+            cursor = db.execute("UPDATE jobs SET lease_until = ?, updated = ? WHERE id = ? AND state = 'leased'"
+                                " AND lease_owner = ?", (now + self.lease_seconds, now, job_id, owner))
+        return cursor.rowcount == 1
+
+    def complete(self, job_id: int, owner: str, result: dict = None) -> bool:
+        """Record a result; False (and nothing changes) if the lease was lost meanwhile."""
+        with self._write() as db:
+            cursor = db.execute("UPDATE jobs SET state = 'done', result = ?, error = NULL, lease_owner = NULL,"
+                                " lease_until = NULL, updated = ? WHERE id = ? AND state = 'leased' AND lease_owner = ?",
+                                (json.dumps(result or {}), time.time(), job_id, owner))
+        return cursor.rowcount == 1
+
+    def fail(self, job_id: int, owner: str, error: str) -> str:
+        """Retry later with backoff, or give up after max_attempts (failing every job that waits on it).
+        Returns the new state, or None if the lease was lost."""
+        now = time.time()
+        with self._write() as db:
+            row = db.execute("SELECT attempts, max_attempts FROM jobs WHERE id = ? AND state = 'leased'"
+                             " AND lease_owner = ?", (job_id, owner)).fetchone()
+            if row is None:
+                return None
+            if row["attempts"] < row["max_attempts"]:
+                delay = self.backoff_seconds * 2 ** (row["attempts"] - 1)
+                db.execute("UPDATE jobs SET state = 'queued', run_after = ?, error = ?, lease_owner = NULL,"
+                           " lease_until = NULL, updated = ? WHERE id = ?", (now + delay, error, now, job_id))
+                return "queued"
+            self._give_up(db, job_id, error, now)
+        return "failed"
+
+    def _give_up(self, db, job_id: int, error: str, now: float):
+        """Fail a job for good, and everything downstream of it (it can never run now)."""
+        db.execute("UPDATE jobs SET state = 'failed', error = ?, lease_owner = NULL, lease_until = NULL,"
+                   " updated = ? WHERE id = ?", (error, now, job_id))
+        waiting = [job_id]
+        while waiting:
+            dependents = [r["job_id"] for r in db.execute(
+                f"SELECT deps.job_id FROM deps JOIN jobs ON jobs.id = deps.job_id WHERE deps.dep_id IN"
+                f" ({','.join('?' * len(waiting))}) AND jobs.state IN ('queued', 'leased')", waiting)]
+            if dependents:
+                db.execute(f"UPDATE jobs SET state = 'failed', error = ?, updated = ? WHERE id IN"
+                           f" ({','.join('?' * len(dependents))})", (f"dependency #{job_id} failed", now, *dependents))
+            waiting = dependents
+
+    # ----- reporting -----
+
+    def get(self, job_id: int) -> dict:
+        row = self._db().execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return _job(row) if row else None
+
+    def jobs(self, run_id: str) -> list:
+        return [_job(row) for row in self._db().execute("SELECT * FROM jobs WHERE run_id = ? ORDER BY id", (run_id,))]
+
+    def counts(self, run_id: str = None) -> dict:
+        """{state: number of jobs}, for one run or the whole queue."""
+        query = "SELECT state, COUNT(*) AS n FROM jobs" + (" WHERE run_id = ?" if run_id else "") + " GROUP BY state"
+        return {row["state"]: row["n"] for row in self._db().execute(query, (run_id,) if run_id else ())}
+
+    def finished(self, run_id: str) -> bool:
+        counts = self.counts(run_id)
+        return not counts.get("queued") and not counts.get("leased")
+
+    # ----- retention -----
+
+    def finished_runs(self, before: float) -> list:
+        """Runs with no queued / leased job whose last job changed before `before`."""
+        rows = self._db().execute("SELECT run_id, MAX(updated) AS last, SUM(state IN ('queued', 'leased')) AS open"
+                                  " FROM jobs GROUP BY run_id")
+        return [row["run_id"] for row in rows if not row["open"] and row["last"] < before]
+
+    def delete_run(self, run_id: str):
+        """Delete a finished run's jobs. Returns (artifact ids in their results, time of its last change);
+        (set(), None) if the run is unknown or still has queued / leased jobs."""
+        with self._write() as db:
+            rows = db.execute("SELECT state, result, updated FROM jobs WHERE run_id = ?", (run_id,)).fetchall()
+            if not rows or any(row["state"] in ("queued", "leased") for row in rows):
+                return set(), None
+            db.execute("DELETE FROM deps WHERE job_id IN (SELECT id FROM jobs WHERE run_id = ?)", (run_id,))
+            db.execute("DELETE FROM jobs WHERE run_id = ?", (run_id,))
+        return _artifact_ids(row["result"] for row in rows), max(row["updated"] for row in rows)
+
+    def artifact_ids(self) -> set:
+        """Every artifact id in a job result still in the queue."""
+        return _artifact_ids(row["result"] for row in self._db().execute("SELECT result FROM jobs"))
+
+
+class _Transaction:
+    def __init__(self, db):
+        self.db = db
+
+    def __enter__(self):
+        self.db.execute("BEGIN IMMEDIATE")
+        return self.db
+
+    def __exit__(self, exc_type, *exc):
+        self.db.execute("ROLLBACK" if exc_type else "COMMIT")
+
+
+def _job(row) -> dict:
+    job = dict(row)
+    job["payload"] = json.loads(job["payload"])
+    job["result"] = json.loads(job["result"]) if job["result"] else None
+    return job
+
+
+_ARTIFACT_ID = re.compile(r"\b[0-9a-f]{64}\b")
+
+
+def _artifact_ids(results) -> set:
+    """The artifact ids (sha256 hex) in JSON job results."""
+    return {match for result in results if result for match in _ARTIFACT_ID.findall(result)}
+
+
+def new_run_id() -> str:
+    return f"{time.strftime('%Y%m%d-%H%M%S')}-{secrets.token_hex(3)}"
+
+
+def worker_name() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}:{threading.get_ident()}"
+
+
+# ===== WORKERS =====
+
+def _handler(task: str):
+    module, _, name = task.partition(":")
+    return getattr(importlib.import_module(module), name)
+
+
+def run_job(queue: JobQueue, job: dict, store: ArtifactStore, owner: str) -> bool:
+    """Run one leased job under a heartbeat; returns True if it succeeded."""
+    beat = JobQueue(queue.path, queue.lease_seconds)  # Own connection for the heartbeat thread
+    stop = threading.Event()
+
+    def heartbeat():
+        while not stop.wait(queue.lease_seconds / 3):
+            if not beat.heartbeat(job["id"], owner):
+                print(f"⚠️ Lost the lease on job #{job['id']}; its result will be discarded")
+                return
+
+    thread = threading.Thread(target=heartbeat, name=f"heartbeat-{job['id']}", daemon=True)
+    thread.start()
+    start = time.perf_counter()
+    try:
+        result = _handler(job["task"])(job["payload"], job["inputs"], store)
+    except Exception as e:
+        state = queue.fail(job["id"], owner, f"{type(e).__name__}: {e}"[:2000])
+        print(f"❌ Job #{job['id']} {job['type']} failed (attempt {job['attempts']}/{job['max_attempts']}): {e}"
+              + (" - will retry" if state == "queued" else ""))
+        return False
+    finally:
+        stop.set()
+        thread.join()
+        beat.close()
+    queue.complete(job["id"], owner, result)
+    print(f"✅ Job #{job['id']} {job['type']} done in {time.perf_counter() - start:.1f}s")
+    return True
+
+
+def work(types=JOB_TYPES, path: str = JOB_QUEUE_DB, run_id: str = None, exit_when_idle: bool = False,
+         stop: threading.Event = None, poll_seconds: float = JOB_POLL_SECONDS) -> int:
+    """
+    Lease and run jobs of `types` until stopped. run_id: only that run's jobs, and
+    return once it has no queued / leased jobs left (the bots' inline worker).
+    exit_when_idle: return as soon as nothing is ready. Returns the number of jobs run.
+    """
+    queue = JobQueue(path)
+    store = ArtifactStore.for_queue(path)
+    owner = worker_name()
+    done = 0
+    try:
+        while not (stop and stop.is_set()):
+            job = queue.lease(types, owner, run_id)
+            if job is None:
+                if (run_id and queue.finished(run_id)) or exit_when_idle:
+                    break
+                time.sleep(poll_seconds)
+                continue
+            print(f"▶️ Job #{job['id']} {job['type']} ({job['task']}, run {job['run_id']})")
+            run_job(queue, job, store, owner)
+            done += 1
+    finally:
+        queue.close()
+    return done
+
+
+def work_inline(run_id: str, path: str = JOB_QUEUE_DB) -> bool:
+    """
+    Run one run's jobs in this process, pooled like a backfill: content / image / slide
+    jobs on BACKFILL_IMAGE_WORKERS threads, video on BACKFILL_VIDEO_WORKERS (the
+    browser fallback stays on one thread), deliveries on one. Workers started with
+    `job_queue.py work` can take jobs of the same run meanwhile. Returns True if no job failed.
+    """
+    from backfill import BACKFILL_IMAGE_WORKERS, BACKFILL_VIDEO_WORKERS
+
+    pools = [(("content", "image", "slide"), BACKFILL_IMAGE_WORKERS), (("video",), BACKFILL_VIDEO_WORKERS),
+             (("deliver",), 1)]
+    threads = [threading.Thread(target=work, args=(types, path, run_id), kwargs={"poll_seconds": 0.1},
+                                name=f"jobs-{types[0]}-{i}")
+               for types, workers in pools for i in range(max(1, workers))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return print_run(JobQueue(path), run_id)
+
+
+def finish_run(run_id: str, submit_only: bool = False, path: str = JOB_QUEUE_DB) -> int:
+    """The bots' exit code after submitting: print the run id, or work it off here, report and
+    prune (this run if nothing failed, and finished runs older than JOB_RETENTION_DAYS)."""
+    counts = JobQueue(path).counts(run_id)
+    print(f"🧾 Run {run_id}: {sum(counts.values())} job(s) queued in {path}")
+    if submit_only:
+        print(f"   Start workers with: python job_queue.py work   (status: python job_queue.py status {run_id})")
+        return 0
+    ok = work_inline(run_id, path)
+    print(f"\n{'✨ Run finished' if ok else '❌ Run finished with failed jobs'}: {run_id}")
+    queue, store = JobQueue(path), ArtifactStore.for_queue(path)
+    if ok:
+        prune_run(queue, store, run_id)
+    prune(queue, store, JOB_RETENTION_DAYS * 86400)
+    return 0 if ok else 1
+
+
+def prune_run(queue: JobQueue, store: ArtifactStore, run_id: str) -> tuple:
+    """Delete a finished run's jobs and the artifacts no remaining job refers to. Returns (jobs, artifacts)
+    deleted. An artifact stored again after the run ended belongs to a newer run and stays. While other
+    jobs are running, one of them may have stored the same content without recording it yet, so then
+    the run's artifacts are left for the sweep in prune()."""
+    jobs = len(queue.jobs(run_id))
+    artifact_ids, finished_at = queue.delete_run(run_id)
+    if finished_at is None:
+        return 0, 0
+    counts = queue.counts()
+    if counts.get("queued") or counts.get("leased"):
+        return jobs, 0
+    return jobs, store.remove(artifact_ids - queue.artifact_ids(), not_after=finished_at)
+
+
+def prune(queue: JobQueue, store: ArtifactStore, older_than: float) -> dict:
+    """Delete runs finished more than older_than seconds ago (failed ones too) with their artifacts,
+    then artifacts and temp files no job refers to that are that old. Returns what was deleted."""
+    cutoff = time.time() - older_than
+    deleted = {"runs": 0, "jobs": 0, "artifacts": 0}
+    for run_id in queue.finished_runs(cutoff):
+        jobs, artifacts = prune_run(queue, store, run_id)
+        deleted["runs"] += 1 if jobs else 0
+        deleted["jobs"] += jobs
+        deleted["artifacts"] += artifacts
+    deleted["artifacts"] += store.sweep(queue.artifact_ids(), cutoff)
+    if deleted["runs"] or deleted["artifacts"]:
+        print(f"🧹 Pruned {deleted['runs']} run(s), {deleted['jobs']} job(s), {deleted['artifacts']} artifact(s)")
+    return deleted
+
+
+def parse_age(text: str) -> float:
+    """Seconds in "90", "30m", "12h" or "7d"."""
+    units = {"s": 1, "m": 60, "h": 3600, "d": 86400}
+    text = text.strip().lower()
+    if text[-1:] in units:
+        return float(text[:-1]) * units[text[-1]]
+    return float(text)
+
+
+def _work_process(types, path, exit_when_idle):
+    try:
+        work(types, path, exit_when_idle=exit_when_idle)
+    except KeyboardInterrupt:
+        pass
+
+
+def print_run(queue: JobQueue, run_id: str, every_job: bool = False) -> bool:
+    """Job counts of one run plus its failed jobs (or every job); returns True if none failed."""
+    jobs = queue.jobs(run_id)
+    print(f"  {json.dumps(queue.counts(run_id))}")
+    for job in jobs:
+        if every_job or job["state"] == "failed":
+            note = job["error"] or "" if job["state"] == "failed" else ""
+            print(f"  #{job['id']:<5} {job['type']:<8} {job['state']:<7} attempts {job['attempts']}  {note[:100]}")
+    return not any(job["state"] == "failed" for job in jobs)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Astroboli job queue: workers and status")
+    parser.add_argument("--db", default=JOB_QUEUE_DB, help="Queue database (share its folder between machines)")
+    sub = parser.add_subparsers(dest="command", required=True)
+    worker = sub.add_parser("work", help="Run a pool of worker processes")
+    worker.add_argument("--types", default=",".join(JOB_TYPES), help=f"Job types to take ({', '.join(JOB_TYPES)})")
+    worker.add_argument("--processes", type=int, default=1, help="Worker processes")
+    worker.add_argument("--exit-when-idle", action="store_true", help="Stop once no job is ready")
+    status = sub.add_parser("status", help="Job counts, or the jobs of one run")
+    status.add_argument("run_id", nargs="?")
+    pruner = sub.add_parser("prune", help="Delete finished runs and their artifacts")
+    pruner.add_argument("--older-than", default=f"{JOB_RETENTION_DAYS:g}d",
+                        help="Only runs finished this long ago: 90 (seconds), 30m, 12h or 7d (default: JOB_RETENTION_DAYS)")
+    args = parser.parse_args()
+
+    if args.command == "prune":
+        try:
+            older_than = parse_age(args.older_than)
+        except ValueError:
+            print(f"ERROR: Bad --older-than '{args.older_than}' (use e.g. 3600, 30m, 12h or 7d)")
+            return 1
+        deleted = prune(JobQueue(args.db), ArtifactStore.for_queue(args.db), older_than)
+        if not deleted["runs"] and not deleted["artifacts"]:
+            print("🧹 Nothing to prune")
+        return 0
+
+    if args.command == "status":
+        queue = JobQueue(args.db)
+        if not args.run_id:
+            print(json.dumps(queue.counts()))
+            return 0
+        return 0 if print_run(queue, args.run_id, every_job=True) else 1
+
+    types = [t.strip() for t in args.types.split(",") if t.strip()]
+    unknown = [t for t in types if t not in JOB_TYPES]
+    if unknown:
+        print(f"ERROR: Unknown job type(s): {', '.join(unknown)}")
+        return 1
+    if args.processes <= 1:
+        print(f"👷 Worker for {', '.join(types)} on {args.db}")
+        work(types, args.db, exit_when_idle=args.exit_when_idle)
+        return 0
+    import multiprocessing
+
+    print(f"👷 {args.processes} workers for {', '.join(types)} on {args.db}")
+    processes = [multiprocessing.Process(target=_work_process, args=(types, args.db, args.exit_when_idle))
+                 for _ in range(args.processes)]
+    for process in processes:
+        process.start()
+    try:
+        for process in processes:
+            process.join()
+    except KeyboardInterrupt:
+        for process in processes:
+            process.join()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
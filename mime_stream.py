@@ -0,0 +1,158 @@
+"""
+Streaming MIME writer for the post emails.
+
+email.mime keeps the raw attachment, its base64 payload and finally the serialized
+message in memory - three full copies of a multi-MB reel. Here a message is a
+small MessageSpec (addresses, subject, HTML, attachments that point at file paths
+or existing buffers) and iter_message() turns it into CRLF byte pieces on the fly:
+attachments are read through an mmap (or a memoryview of the bytes) and
+base64-encoded a few dozen KB at a time. SMTPSession.send() writes the pieces
+straight onto the socket (dot-stuffed), so peak memory does not grow with the
+attachment size.
+"""
+
+import os
+import re
+import mmap
+import time
+import base64
+import secrets
+from email.utils import formatdate, make_msgid
+
+LINE_BYTES = 57          # Raw bytes per 76-character base64 line
+CHUNK_LINES = 1024       # base64 lines encoded per piece (~57 KB raw, ~78 KB out)
+CRLF = b"\r\n"
+
+_LEADING_DOT = re.compile(rb"(?m)^\.")
+
+
+class Attachment:
+    """One attachment; source is a file path or a bytes-like object (not copied)."""
+
+    def __init__(self, source, filename: str, content_type: str = "application/octet-stream"):
+        self.source = source
+        self.filename = filename
+        self.content_type = content_type
+
+    @property
+    def is_file(self) -> bool:
+        return isinstance(self.source, (str, os.PathLike))
+
+    def size(self) -> int:
+        return os.path.getsize(self.source) if self.is_file else memoryview(self.source).nbytes
+
+    def iter_raw(self, chunk_size: int):
+        """Raw content in chunk_size slices (a file is mmapped, never read whole)."""
+        if not self.is_file:
+            view = memoryview(self.source).cast("B")
+            for start in range(0, len(view), chunk_size):
+                yield view[start:start + chunk_size]
+            return
+        with open(self.source, "rb") as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                return
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                # Slicing an mmap copies just that chunk; no view outlives the mapping
+                for start in range(0, len(mapped), chunk_size):
+                    yield mapped[start:start + chunk_size]
+
+
+class MessageSpec:
+    """Everything needed to write one email; attachments stay where they are until sent.
+    meta (kind, caption, ...) is not part of the message; directory exports use it."""
+
+    def __init__(self, from_addr: str, to_addrs, subject: str, html: str = None, attachments=(), headers=None,
+                 meta=None):
+        self.from_addr = from_addr
+        self.to_addrs = [to_addrs] if isinstance(to_addrs, str) else list(to_addrs)
+        self.subject = subject
+        self.html = html
+        self.attachments = list(attachments)
+        self.headers = dict(headers or {})
+        self.meta = dict(meta or {})
+
+    def attach(self, source, filename: str, content_type: str = "application/octet-stream"):
+        self.attachments.append(Attachment(source, filename, content_type))
+        return self
+
+    def get(self, name, default=None):
+        """Header lookup, like email.message.Message.get (used for log labels)."""
+        return {"subject": self.subject, "from": self.from_addr, "to": ", ".join(self.to_addrs)}.get(
+            name.lower(), self.headers.get(name, default))
+
+
+def _header_value(value: str) -> str:
+    """RFC 2047-encode non-ASCII header text (emoji / dashes in subjects)."""
+    if value.isascii():
+        return value
+    return "=?utf-8?b?" + base64.b64encode(value.encode("utf-8")).decode("ascii") + "?="
+
+
+def iter_base64(chunks):
+    """base64 with a CRLF every 76 characters, from raw chunks of any size."""
+    step = LINE_BYTES * CHUNK_LINES
+    carry = b""
+    for chunk in chunks:
+        if carry:
+            need = step - len(carry)
+            carry += bytes(chunk[:need])
+            chunk = chunk[need:]
+            if len(carry) < step:
+                continue
+            yield _encode_lines(carry)
+            carry = b""
+        whole = len(chunk) - len(chunk) % LINE_BYTES
+        for start in range(0, whole, step):
+            yield _encode_lines(chunk[start:min(start + step, whole)])
+        carry = bytes(chunk[whole:])
+    if carry:
+        yield _encode_lines(carry)
+
+
+def _encode_lines(raw) -> bytes:
+    encoded = base64.b64encode(raw)
+    return CRLF.join(encoded[i:i + 76] for i in range(0, len(encoded), 76)) + CRLF
+
+
+def iter_message(spec: MessageSpec, boundary: str = None):
+    """The whole message as CRLF-terminated byte pieces (not dot-stuffed)."""
+    boundary = boundary or "=_astroboli_" + secrets.token_hex(12)
+    headers = {
+        "From": spec.from_addr,
+        "To": ", ".join(spec.to_addrs),
+        "Subject": _header_value(spec.subject),
+        "Date": formatdate(time.time(), localtime=True),
+        "Message-ID": make_msgid(domain="astroboli.com"),
+        "MIME-Version": "1.0",
+        **{name: _header_value(value) for name, value in spec.headers.items()},
+        "Content-Type": f'multipart/mixed; boundary="{boundary}"',
+    }
+    yield "".join(f"{name}: {value}\r\n" for name, value in headers.items()).encode("utf-8") + CRLF
+
+    if spec.html is not None:
+        yield (f"--{boundary}\r\nContent-Type: text/html; charset=\"utf-8\"\r\n"
+               f"Content-Transfer-Encoding: base64\r\n\r\n").encode("ascii")
+        yield from iter_base64([spec.html.encode("utf-8")])
+
+    for attachment in spec.attachments:
+        yield (f"--{boundary}\r\nContent-Type: {attachment.content_type}; name=\"{attachment.filename}\"\r\n"
+               f"Content-Transfer-Encoding: base64\r\n"
+               f"Content-Disposition: attachment; filename=\"{attachment.filename}\"\r\n\r\n").encode("ascii")
+        yield from iter_base64(attachment.iter_raw(LINE_BYTES * CHUNK_LINES))
+
+    yield f"--{boundary}--\r\n".encode("ascii")
+
+
+def dot_stuffed(pieces):
+    """SMTP DATA transparency (RFC 5321 4.5.2): double a leading '.' on every line."""
+    for piece in pieces:
+        yield _LEADING_DOT.sub(b"..", piece)
+
+
+def write_message(spec: MessageSpec, fileobj) -> int:
+    """Write the message to a binary file object (no dot-stuffing). Returns bytes written."""
+    written = 0
+    for piece in iter_message(spec):
+        fileobj.write(piece)
+        written += len(piece)
+    return written
@@ -0,0 +1,235 @@
+"""
+Durable outbox for finished posts.
+
+Generating a post takes minutes (image, AI video, voiceover); sending it takes
+seconds and fails for boring reasons (expired app password, network drop). So the
+two are decoupled: every finished email is first written to the outbox as a spool
+entry, and only then delivered. An entry is a directory under OUTBOX_DIR holding
+the artifacts (image, videos) and entry.json with the rendered message spec
+(addresses, subject, HTML, attachment list) and its delivery state.
+
+    outbox/<id>/entry.json, post.jpg, reel.mp4, ...   pending
+    outbox/failed/<id>/                               gave up after max_attempts
+
+Entries are built in a hidden ".<id>" directory and renamed into place, so a crash
+never leaves half an entry. drain() sends every due entry, retrying a few times
+in-process with exponential backoff; an entry that still fails is rescheduled
+(next_attempt, again exponential) and picked up by the next run or by
+`--flush-outbox`. A lock file keeps two overlapping runs from sending the same
+entry twice.
+"""
+
+import os
+import json
+import time
+import shutil
+import secrets
+
+from mime_stream import MessageSpec, Attachment
+
+ENTRY_FILE = "entry.json"
+RETRY_SECONDS = 2.0       # First in-run retry delay (doubles per retry)
+BACKOFF_SECONDS = 300.0   # First between-runs delay after a failed drain (doubles per failure)
+MAX_BACKOFF_SECONDS = 6 * 3600
+MAX_ATTEMPTS = 10
+
+
+def backoff_delay(attempt: int, base: float, cap: float = MAX_BACKOFF_SECONDS) -> float:
+    """base, 2*base, 4*base, ... for attempt 1, 2, 3, ..., capped."""
+    return min(cap, base * 2 ** max(0, attempt - 1))
+
+
+def _write_json(path, data):
+    """Atomic JSON write (temp file + fsync + rename)."""
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, indent=1)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+class Outbox:
+    """Spool directory of emails waiting to be delivered."""
+
+    def __init__(self, root: str, max_attempts: int = MAX_ATTEMPTS, retry_seconds: float = RETRY_SECONDS,
+                 backoff_seconds: float = BACKOFF_SECONDS):
+        self.root = root
+        self.max_attempts = max_attempts
+        self.retry_seconds = retry_seconds
+        self.backoff_seconds = backoff_seconds
+
+    # ----- spooling -----
+
+    def put(self, spec: MessageSpec, kind: str = "post", key: str = None) -> str:
+        """Write a message and copies of its attachments as a new entry; returns the entry id.
+        key (optional) names the entry for find(), so a retried producer can spool it only once."""
+        os.makedirs(self.root, exist_ok=True)
+        entry_id = f"{time.strftime('%Y%m%d-%H%M%S')}-{kind}-{secrets.token_hex(3)}"
+        staging = os.path.join(self.root, "." + entry_id)
+        os.makedirs(staging)
+        try:
+            files = []
+            for i, attachment in enumerate(spec.attachments):
+                name = f"{i:02d}_{os.path.basename(attachment.filename)}"
+                target = os.path.join(staging, name)
+                if attachment.is_file:
+                    try:
+                        os.link(attachment.source, target)  # Same filesystem: no copy
+                    except OSError:
+                        shutil.copyfile(attachment.source, target)
+                else:
+                    with open(target, "wb") as f:
+                        f.write(attachment.source)
+                        f.flush()
+                        os.fsync(f.fileno())
+                files.append({"file": name, "filename": attachment.filename,
+                              "content_type": attachment.content_type})
+            _write_json(os.path.join(staging, ENTRY_FILE), {
+                "id": entry_id,
+                "kind": kind,
+                "key": key,
+                "created": time.time(),
+                "from": spec.from_addr,
+                "to": spec.to_addrs,
+                "subject": spec.subject,
+                "html": spec.html,
+                "headers": spec.headers,
+                "meta": spec.meta,
+                "attachments": files,
+                "attempts": 0,
+                "next_attempt": 0,
+                "last_error": None,
+            })
+            os.rename(staging, os.path.join(self.root, entry_id))
+        except Exception:
+            shutil.rmtree(staging, ignore_errors=True)
+            raise
+        return entry_id
+
+    # ----- reading -----
+
+    def _entry_dir(self, entry_id):
+        return os.path.join(self.root, entry_id)
+
+    def entry(self, entry_id) -> dict:
+        with open(os.path.join(self._entry_dir(entry_id), ENTRY_FILE), encoding="utf-8") as f:
+            return json.load(f)
+
+    def entries(self) -> list:
+        """All pending entries (oldest first)."""
+        if not os.path.isdir(self.root):
+            return []
+        found = []
+        for name in sorted(os.listdir(self.root)):
+            if name.startswith(".") or name == "failed":
+                continue
+            try:
+                found.append(self.entry(name))
+            except (OSError, ValueError):
+                continue  # Not an entry (or unreadable); leave it alone
+        return found
+
+    def find(self, key: str):
+        """Id of the pending or failed entry spooled with this key, or None."""
+        failed = os.path.join(self.root, "failed")
+        names = [(self.root, n) for n in (sorted(os.listdir(self.root)) if os.path.isdir(self.root) else [])]
+        names += [(failed, n) for n in (sorted(os.listdir(failed)) if os.path.isdir(failed) else [])]
+        for folder, name in names:
+            if name.startswith(".") or name == "failed":
+                continue
+            try:
+                with open(os.path.join(folder, name, ENTRY_FILE), encoding="utf-8") as f:
+                    if json.load(f).get("key") == key:
+                        return name
+            except (OSError, ValueError):
+                continue
+        return None
+
+    def due(self, now: float = None) -> list:
+        now = time.time() if now is None else now
+        return [e for e in self.entries() if e["next_attempt"] <= now]
+
+    def load(self, entry_id) -> MessageSpec:
+        """The entry's message spec, with attachments pointing at the spooled files."""
+        data = self.entry(entry_id)
+        base = self._entry_dir(entry_id)
+        return MessageSpec(
+            data["from"], data["to"], data["subject"], html=data["html"], headers=data.get("headers"), meta=data.get("meta"),
+            attachments=[Attachment(os.path.join(base, a["file"]), a["filename"], a["content_type"])
+                         for a in data["attachments"]],
+        )
+
+    # ----- state changes -----
+
+    def mark_sent(self, entry_id):
+        shutil.rmtree(self._entry_dir(entry_id), ignore_errors=True)
+
+    def mark_failed(self, entry_id, error, now: float = None) -> dict:
+        """Count a failed delivery: reschedule with backoff, or move to failed/ after max_attempts."""
+        now = time.time() if now is None else now
+        path = os.path.join(self._entry_dir(entry_id), ENTRY_FILE)
+        data = self.entry(entry_id)
+        data["attempts"] += 1
+        data["last_error"] = str(error)[:500]
+        data["next_attempt"] = now + backoff_delay(data["attempts"], self.backoff_seconds)
+        _write_json(path, data)
+        if data["attempts"] >= self.max_attempts:
+            failed = os.path.join(self.root, "failed")
+            os.makedirs(failed, exist_ok=True)
+            os.rename(self._entry_dir(entry_id), os.path.join(failed, entry_id))
+        return data
+
+    # ----- delivery -----
+
+    def _lock(self):
+        """Exclusive, non-blocking lock on the outbox; None if another process holds it."""
+        try:
+            import fcntl
+        except ImportError:  # Windows: no cross-process lock, runs do not overlap there
+            return open(os.devnull)
+        os.makedirs(self.root, exist_ok=True)
+        handle = open(os.path.join(self.root, ".lock"), "w")
+        try:
+            fcntl.flock(handle, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            handle.close()
+            return None
+        return handle
+
+    def drain(self, send, retries: int = 2, force: bool = False, sleep=time.sleep) -> dict:
+        """
+        Deliver every due entry (every entry if force) with send(spec). A failing
+        entry is retried `retries` times with exponential backoff before it is
+        rescheduled for a later run. Returns {"sent": [ids], "failed": [ids], "locked": bool}.
+        """
+        result = {"sent": [], "failed": [], "locked": False}
+        lock = self._lock()
+        if lock is None:
+            result["locked"] = True
+            return result
+        try:
+            for data in (self.entries() if force else self.due()):
+                entry_id = data["id"]
+                for attempt in range(retries + 1):
+                    try:
+                        send(self.load(entry_id))
+                    except Exception as e:
+                        error = e
+                        if attempt < retries:
+                            delay = backoff_delay(attempt + 1, self.retry_seconds)
+                            print(f"    ⚠️ Sending {entry_id} failed ({str(e)[:80]}), retrying in {delay:.0f}s...")
+                            sleep(delay)
+                        continue
+                    self.mark_sent(entry_id)
+                    result["sent"].append(entry_id)
+                    break
+                else:
+                    state = self.mark_failed(entry_id, error)
+                    result["failed"].append(entry_id)
+                    where = ("moved to failed/" if state["attempts"] >= self.max_attempts else
+                             f"next try after {time.strftime('%Y-%m-%d %H:%M', time.localtime(state['next_attempt']))}")
+                    print(f"    ❌ {entry_id} not delivered ({str(error)[:80]}); {where}")
+        finally:
+            lock.close()
+        return result
@@ -0,0 +1,587 @@
+"""
+ffmpeg-native reel renderer.
+
+Builds one ffmpeg filter graph for scale/pad, looping (-stream_loop), trimming
+and audio muxing, and runs it as a single subprocess - no per-frame Python/NumPy
+work. Uses the ffmpeg binary bundled with imageio-ffmpeg (already installed as a
+moviepy dependency), falling back to an ffmpeg on PATH.
+"""
+
+import os
+import re
+import math
+import sys
+import shutil
+import argparse
+import subprocess
+import tempfile
+import time
+
+REEL_WIDTH = 1080
+REEL_HEIGHT = 1920
+REEL_FPS = 24
+
+# Named x264/AAC encoding profiles.
+#   crf or bitrate (bitrate wins if both are set), threads 0 = auto,
+#   gop = keyframe interval in frames (48 = one keyframe every 2 s at 24 fps)
+ENCODING_PROFILES = {
+    # Quick previews / local testing
+    "draft": {"preset": "ultrafast", "crf": 30, "bitrate": None, "threads": 0, "gop": 48, "audio_bitrate": "96k"},
+    # Daily uploads (same preset as the original moviepy render)
+    "standard": {"preset": "medium", "crf": 23, "bitrate": None, "threads": 0, "gop": 48, "audio_bitrate": "128k"},
+    # Keep-forever masters
+    "archival": {"preset": "slow", "crf": 18, "bitrate": None, "threads": 0, "gop": 24, "audio_bitrate": "192k"},
+}
+DEFAULT_PROFILE = "standard"
+
+# Output formats that can be cut from one decode of the provider clip.
+#   fit "pad": letterbox the whole clip, "crop": fill the frame and center-crop
+#   max_duration: hard cap in seconds (Stories are limited to 15 s per card)
+RENDITIONS = {
+    "reel": {"width": 1080, "height": 1920, "fit": "pad", "max_duration": None},
+    "story": {"width": 1080, "height": 1920, "fit": "pad", "max_duration": 15},
+    "square": {"width": 1080, "height": 1080, "fit": "crop", "max_duration": 60},
+    "portrait": {"width": 1080, "height": 1350, "fit": "crop", "max_duration": 60},
+}
+
+
+def get_profile(name=None) -> dict:
+    """Look up an encoding profile by name (default: standard)."""
+    name = (name or DEFAULT_PROFILE).lower()
+    if name not in ENCODING_PROFILES:
+        raise ValueError(f"Unknown encoding profile '{name}' (use {', '.join(ENCODING_PROFILES)})")
+    return ENCODING_PROFILES[name]
+
+
+def video_encoder_args(profile) -> list:
+    """libx264 arguments for a profile (name or dict)."""
+    p = get_profile(profile) if isinstance(profile, str) or profile is None else profile
+    args = ["-c:v", "libx264", "-preset", p["preset"], "-pix_fmt", "yuv420p"]
+    if p.get("bitrate"):
+        args += ["-b:v", p["bitrate"], "-maxrate", p["bitrate"], "-bufsize", p["bitrate"]]
+    else:
+        args += ["-crf", str(p["crf"])]
+        if p.get("maxrate"):
+            # CRF quality, but the VBV caps the rate (see capped_profile)
+            args += ["-maxrate", p["maxrate"], "-bufsize", p.get("bufsize") or p["maxrate"]]
+    args += ["-g", str(p["gop"]), "-threads", str(p["threads"])]
+    return args
+
+
+_ffmpeg_path = None
+
+
+def ffmpeg_exe() -> str:
+    """Path of the ffmpeg binary (imageio-ffmpeg's bundled build, else PATH)."""
+    global _ffmpeg_path
+    if _ffmpeg_path is None:
+        try:
+            import imageio_ffmpeg
+            _ffmpeg_path = imageio_ffmpeg.get_ffmpeg_exe()
+        except Exception:
+            _ffmpeg_path = shutil.which("ffmpeg")
+        if not _ffmpeg_path:
+            raise Exception("ffmpeg not found (install imageio-ffmpeg or add ffmpeg to PATH)")
+    return _ffmpeg_path
+
+
+def media_duration(path: str) -> float:
+    """Duration in seconds, read from ffmpeg's input banner (no decoding)."""
+    proc = subprocess.run(
+        [ffmpeg_exe(), "-hide_banner", "-i", path],
+        capture_output=True, text=True,
+    )
+    match = re.search(r"Duration:\s*(\d+):(\d+):(\d+(?:\.\d+)?)", proc.stderr)
+    if not match:
+        raise Exception(f"Could not read duration of {os.path.basename(path)}")
+    h, m, s = match.groups()
+    return int(h) * 3600 + int(m) * 60 + float(s)
+
+
+class MemFile:
+    """
+    A file ffmpeg can read or write by path without touching the disk: a memfd on
+    Linux (passed to the subprocess as /dev/fd/N), a temp file elsewhere. Either way
+    it is gone after close(), so error paths cannot leak files.
+    """
+
+    def __init__(self, data: bytes = None, suffix: str = ".mp4"):
+        self._temp_path = None
+        if hasattr(os, "memfd_create"):
+            self.fd = os.memfd_create(f"astroboli{suffix}", 0)
+            self.path = f"/dev/fd/{self.fd}"
+        else:
+            self.fd, self._temp_path = tempfile.mkstemp(suffix=suffix)
+            self.path = self._temp_path
+        if data:
+            view = memoryview(data)
+            while view:
+                view = view[os.write(self.fd, view):]
+
+    def __fspath__(self):
+        return self.path
+
+    @property
+    def pass_fds(self) -> tuple:
+        """File descriptors the child process must inherit to open self.path."""
+        return () if self._temp_path else (self.fd,)
+
+    def size(self) -> int:
+        return os.fstat(self.fd).st_size
+
+    def read(self) -> bytes:
+        size = self.size()
+        chunks, offset = [], 0
+        while offset < size:
+            chunk = os.pread(self.fd, min(1 << 20, size - offset), offset)
+            if not chunk:
+                break
+            chunks.append(chunk)
+            offset += len(chunk)
+        return b"".join(chunks)
+
+    def close(self):
+        if self.fd is not None:
+            os.close(self.fd)
+            self.fd = None
+        if self._temp_path and os.path.exists(self._temp_path):
+            os.unlink(self._temp_path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def _audio_input(audio) -> list:
+    """ffmpeg input args for audio given as a path (or MemFile) or as raw bytes (piped on stdin)."""
+    if isinstance(audio, (bytes, bytearray, memoryview)):
+        return ["-i", "pipe:0"]
+    return ["-i", os.fspath(audio)]
+
+
+def _run_ffmpeg(cmd: list, audio=None, files=()):
+    """Run ffmpeg, feeding audio bytes on stdin and handing down any MemFile descriptors."""
+    fds = tuple(fd for f in files if isinstance(f, MemFile) for fd in f.pass_fds)
+    stdin_data = bytes(audio) if isinstance(audio, (bytes, bytearray, memoryview)) else None
+    kwargs = {"pass_fds": fds} if fds else {}
+    return subprocess.run(
+        cmd, input=stdin_data, capture_output=True,
+        stdin=None if stdin_data is not None else subprocess.DEVNULL, **kwargs,
+    )
+
+
+def scale_pad_filter(width: int, height: int, fps: int) -> str:
+    """Fit the clip inside width x height (keeping aspect), pad the rest black, fix fps."""
+    return (
+        f"scale={width}:{height}:force_original_aspect_ratio=decrease,"
+        f"pad={width}:{height}:(ow-iw)/2:(oh-ih)/2:color=black,"
+        f"setsar=1,fps={fps},format=yuv420p"
+    )
+
+
+def crop_fill_filter(width: int, height: int, fps: int) -> str:
+    """Scale the clip to cover width x height, then center-crop the overflow."""
+    return (
+        f"scale={width}:{height}:force_original_aspect_ratio=increase,"
+        f"crop={width}:{height},"
+        f"setsar=1,fps={fps},format=yuv420p"
+    )
+
+
+def loop_count(duration, clip_duration=None) -> int:
+    """
+    -stream_loop value covering `duration` with a clip of `clip_duration` seconds:
+    0 when the clip is long enough, -1 (loop until -t cuts) when the length is unknown.
+    """
+    if not clip_duration or clip_duration <= 0:
+        return -1
+    # Half a second of slack so frame rounding never leaves the output short
+    return max(0, math.ceil((duration + 0.5) / clip_duration) - 1)
+
+
+def build_reel_command(video_path, audio, output_path, duration,
+                       width=REEL_WIDTH, height=REEL_HEIGHT, fps=REEL_FPS, profile=None, clip_duration=None) -> list:
+    """
+    ffmpeg argv that loops/trims the clip to `duration`, scales/pads it and muxes the audio.
+    Paths may be MemFiles; audio may also be raw bytes (read from stdin). With a known
+    clip_duration (video_probe) the clip is looped exactly as often as needed.
+    """
+    p = get_profile(profile) if isinstance(profile, str) or profile is None else profile
+    cmd = [
+        ffmpeg_exe(), "-hide_banner", "-loglevel", "error", "-y",
+        # Loop the provider clip (endlessly if its length is unknown); the output -t trims it
+        "-stream_loop", str(loop_count(duration, clip_duration)), "-i", os.fspath(video_path),
+    ]
+    if audio is not None:
+        cmd += _audio_input(audio)
+
+    cmd += ["-filter_complex", f"[0:v]{scale_pad_filter(width, height, fps)}[v]", "-map", "[v]"]
+    if audio is not None:
+        cmd += ["-map", "1:a:0", "-c:a", "aac", "-b:a", p["audio_bitrate"]]
+    else:
+        cmd += ["-an"]
+
+    cmd += [
+        "-t", f"{duration:.3f}",
+        *video_encoder_args(p),
+        "-movflags", "+faststart",
+        # Path has no extension for MemFiles, so name the container
+        "-f", "mp4", os.fspath(output_path),
+    ]
+    return cmd
+
+
+def render_reel_ffmpeg(video_path, audio, output_path, duration,
+                       width=REEL_WIDTH, height=REEL_HEIGHT, fps=REEL_FPS, profile=None, clip_duration=None) -> float:
+    """Render the reel in one ffmpeg subprocess. Returns elapsed seconds; raises on failure."""
+    cmd = build_reel_command(video_path, audio, output_path, duration, width, height, fps, profile, clip_duration)
+    start = time.perf_counter()
+    proc = _run_ffmpeg(cmd, audio, (video_path, audio, output_path))
+    elapsed = time.perf_counter() - start
+    if proc.returncode != 0 or not os.path.exists(os.fspath(output_path)) or os.path.getsize(os.fspath(output_path)) == 0:
+        stderr = proc.stderr.decode("utf-8", "replace").strip()
+        raise Exception(f"ffmpeg failed ({proc.returncode}): {stderr[-300:]}")
+    return elapsed
+
+
+# ===== MULTI-FORMAT EXPORT =====
+
+def build_export_command(video_path, audio, outputs: dict, duration, fps=REEL_FPS, profile=None,
+                         clip_duration=None) -> list:
+    """
+    One ffmpeg command that decodes the clip (and audio) once, then `split`s it
+    into per-rendition scale/crop branches, each with its own -t and encoder.
+    outputs maps rendition name -> output path.
+    """
+    p = get_profile(profile) if isinstance(profile, str) or profile is None else profile
+    names = list(outputs)
+    n = len(names)
+
+    graph = [f"[0:v]split={n}" + "".join(f"[s{i}]" for i in range(n))]
+    for i, name in enumerate(names):
+        r = RENDITIONS[name]
+        fit = scale_pad_filter if r["fit"] == "pad" else crop_fill_filter
+        graph.append(f"[s{i}]{fit(r['width'], r['height'], fps)}[v{i}]")
+    if audio is not None:
+        graph.append(f"[1:a]asplit={n}" + "".join(f"[a{i}]" for i in range(n)))
+
+    cmd = [ffmpeg_exe(), "-hide_banner", "-loglevel", "error", "-y",
+           "-stream_loop", str(loop_count(duration, clip_duration)), "-i", os.fspath(video_path)]
+    if audio is not None:
+        cmd += _audio_input(audio)
+    cmd += ["-filter_complex", ";".join(graph)]
+
+    for i, name in enumerate(names):
+        r = RENDITIONS[name]
+        length = min(duration, r["max_duration"]) if r["max_duration"] else duration
+        cmd += ["-map", f"[v{i}]"]
+        if audio is not None:
+            cmd += ["-map", f"[a{i}]", "-c:a", "aac", "-b:a", p["audio_bitrate"]]
+        else:
+            cmd += ["-an"]
+        cmd += ["-t", f"{length:.3f}", *video_encoder_args(p), "-movflags", "+faststart", outputs[name]]
+    return cmd
+
+
+def export_renditions(video_path, audio, duration, renditions, out_dir, fps=REEL_FPS, profile=None,
+                      clip_duration=None) -> dict:
+    """
+    Write several renditions (see RENDITIONS) from a single decode pass.
+    Returns {name: {"path", "size", "duration", "kbps", "seconds"}}; all renditions
+    come out of the same ffmpeg process, so "seconds" is that shared pass time.
+    """
+    unknown = [r for r in renditions if r not in RENDITIONS]
+    if unknown:
+        raise ValueError(f"Unknown rendition(s): {', '.join(unknown)} (use {', '.join(RENDITIONS)})")
+    outputs = {name: os.path.join(out_dir, f"{name}.mp4") for name in renditions}
+    cmd = build_export_command(video_path, audio, outputs, duration, fps, profile, clip_duration)
+
+    start = time.perf_counter()
+    proc = _run_ffmpeg(cmd, audio, (video_path, audio))
+    elapsed = time.perf_counter() - start
+    if proc.returncode != 0:
+        stderr = proc.stderr.decode("utf-8", "replace").strip()
+        raise Exception(f"ffmpeg export failed ({proc.returncode}): {stderr[-300:]}")
+
+    results = {}
+    for name, path in outputs.items():
+        if not os.path.exists(path) or os.path.getsize(path) == 0:
+            raise Exception(f"ffmpeg export produced no {name} rendition")
+        r = RENDITIONS[name]
+        size = os.path.getsize(path)
+        length = min(duration, r["max_duration"]) if r["max_duration"] else duration
+        results[name] = {
+            "path": path,
+            "size": size,
+            "duration": length,
+            "kbps": size * 8 / 1000 / length if length else 0.0,
+            "seconds": elapsed,
+        }
+    return results
+
+
+# ===== VOICE VARIANTS =====
+
+def build_mux_command(track_path, audio, output_path, duration, track_duration=None, profile=None) -> list:
+    """
+    ffmpeg argv that muxes audio onto an already encoded video track without
+    re-encoding it (-c:v copy). The track is trimmed to `duration`, or looped
+    (whole stream-copied passes) when the voiceover is longer than the track.
+    """
+    p = get_profile(profile) if isinstance(profile, str) or profile is None else profile
+    cmd = [ffmpeg_exe(), "-hide_banner", "-loglevel", "error", "-y"]
+    if track_duration is not None and duration > track_duration + 0.01:
+        cmd += ["-stream_loop", "-1"]
+    cmd += ["-i", os.fspath(track_path)]
+    cmd += _audio_input(audio)
+    cmd += [
+        "-map", "0:v:0", "-map", "1:a:0",
+        "-c:v", "copy", "-c:a", "aac", "-b:a", p["audio_bitrate"],
+        "-t", f"{duration:.3f}",
+        "-movflags", "+faststart",
+        "-f", "mp4", os.fspath(output_path),
+    ]
+    return cmd
+
+
+def mux_variants(track_path, variants: dict, out_dir, track_duration=None, profile=None) -> dict:
+    """
+    Mux several voiceovers onto one rendered video track, concurrently.
+    variants maps name -> (audio, duration); audio is a path or raw bytes.
+    Returns {name: {"path", "size", "duration", "seconds"}}.
+    """
+    from concurrent.futures import ThreadPoolExecutor
+
+    def mux(name):
+        audio, duration = variants[name]
+        output = os.path.join(out_dir, f"{name}.mp4")
+        cmd = build_mux_command(track_path, audio, output, duration, track_duration, profile)
+        start = time.perf_counter()
+        proc = _run_ffmpeg(cmd, audio, (track_path, audio))
+        elapsed = time.perf_counter() - start
+        if proc.returncode != 0 or not os.path.exists(output) or os.path.getsize(output) == 0:
+            stderr = proc.stderr.decode("utf-8", "replace").strip()
+            raise Exception(f"ffmpeg mux of {name} failed ({proc.returncode}): {stderr[-300:]}")
+        return name, {"path": output, "size": os.path.getsize(output), "duration": duration, "seconds": elapsed}
+
+    # Each mux is a short, I/O-bound ffmpeg process; threads just wait on them
+    with ThreadPoolExecutor(max_workers=max(1, min(len(variants), os.cpu_count() or 1, 4))) as pool:
+        return dict(pool.map(mux, list(variants)))
+
+
+# ===== SIZE BUDGET =====
+
+# Email providers count the encoded message: base64 turns 3 bytes into 4, plus a
+# CRLF after every 76 characters
+MIME_LINE = 76
+CONTAINER_OVERHEAD = 0.03  # mp4 boxes, audio framing and VBV slack, as a share of the budget
+FIT_PRESET = "veryfast"     # Preset of the re-encode that runs only when a render overshoots
+VBV_SECONDS = 1.0           # VBV buffer of capped_profile, in seconds at maxrate
+
+
+def base64_size(n: int) -> int:
+    """Size of n bytes as a MIME base64 attachment body (with line breaks)."""
+    chars = 4 * math.ceil(n / 3)
+    return chars + 2 * math.ceil(chars / MIME_LINE)
+
+
+def attachment_budget(limit_bytes: int, other_bytes: int = 0, videos: int = 1, headroom: int = 64 * 1024) -> int:
+    """
+    Raw bytes each of `videos` attachments may have so that the whole message stays
+    under limit_bytes. other_bytes is the already encoded size of everything else
+    (image attachments, HTML, headers); headroom covers the MIME part headers.
+    """
+    remaining = limit_bytes - other_bytes - headroom
+    per_video = remaining / max(1, videos)
+    # Invert base64_size: 4/3 expansion, then (76 + 2) / 76 for the line breaks
+    raw = int(per_video * 3 / 4 * MIME_LINE / (MIME_LINE + 2))
+    return max(0, raw)
+
+
+def _kbps(rate: str) -> float:
+    """'128k' / '2M' / '96000' -> kilobits per second."""
+    rate = str(rate).strip().lower()
+    scale = {"k": 1, "m": 1000}.get(rate[-1:], None)
+    return float(rate[:-1]) * scale if scale else float(rate) / 1000
+
+
+def target_video_kbps(max_bytes: int, duration: float, audio_bitrate=None, overhead: float = CONTAINER_OVERHEAD) -> float:
+    """Video bitrate (kbps) that puts a `duration`-second mp4 with this audio under max_bytes."""
+    if duration <= 0:
+        raise ValueError("duration must be positive")
+    total_kbps = max_bytes * 8 / 1000 / duration * (1 - overhead)
+    audio_kbps = _kbps(audio_bitrate) if audio_bitrate else 0.0
+    return max(1.0, total_kbps - audio_kbps)
+
+
+def capped_profile(profile, max_bytes: int, duration: float) -> dict:
+    """
+    Copy of an encoding profile that keeps its CRF but adds a VBV cap (maxrate with
+    a one-second buffer) at the bitrate that fits max_bytes. Easy clips stay at the
+    CRF quality and well under the cap; high-motion clips are capped at the budget.
+    """
+    p = dict(get_profile(profile) if isinstance(profile, str) or profile is None else profile)
+    # A full buffer can be spent on top of maxrate * duration, so leave room for it
+    kbps = int(target_video_kbps(max_bytes, duration, p["audio_bitrate"]) * duration / (duration + VBV_SECONDS))
+    if p.get("bitrate"):
+        p["bitrate"] = f"{min(kbps, int(_kbps(p['bitrate'])))}k"
+    else:
+        p["maxrate"] = f"{kbps}k"
+        p["bufsize"] = f"{int(kbps * VBV_SECONDS)}k"
+    return p
+
+
+def build_fit_commands(input_path, output_path, video_kbps: float, passlog: str, preset: str = FIT_PRESET) -> list:
+    """
+    Two-pass x264 commands re-encoding an mp4 to an average video bitrate.
+    The audio is copied, so only the video is encoded again.
+    """
+    rate = f"{int(video_kbps)}k"
+    common = [
+        "-c:v", "libx264", "-preset", preset, "-pix_fmt", "yuv420p",
+        "-b:v", rate, "-maxrate", f"{int(video_kbps * 1.5)}k", "-bufsize", f"{int(video_kbps * 2)}k",
+        "-passlogfile", passlog,
+    ]
+    first = [ffmpeg_exe(), "-hide_banner", "-loglevel", "error", "-y", "-i", os.fspath(input_path),
+             "-map", "0:v:0", *common, "-pass", "1", "-an", "-f", "null", os.devnull]
+    second = [ffmpeg_exe(), "-hide_banner", "-loglevel", "error", "-y", "-i", os.fspath(input_path),
+              "-map", "0:v:0", "-map", "0:a?", *common, "-pass", "2", "-c:a", "copy",
+              "-movflags", "+faststart", "-f", "mp4", os.fspath(output_path)]
+    return [first, second]
+
+
+def fit_to_size(input_path, output_path, max_bytes: int, duration: float, audio_bitrate=None,
+                preset: str = FIT_PRESET, attempts: int = 3) -> dict:
+    """
+    Re-encode an mp4 that came out over max_bytes with two-pass x264 at the budget's
+    bitrate (audio copied). If a pass still lands over, the overshoot is taken off
+    the video bitrate and it runs again. Paths may be MemFiles.
+    Returns {"size", "kbps", "seconds", "attempts"}; raises if it never fits.
+    """
+    kbps = target_video_kbps(max_bytes, duration, audio_bitrate)
+    start = time.perf_counter()
+    size = 0
+    with tempfile.TemporaryDirectory() as work_dir:
+        passlog = os.path.join(work_dir, "x264")
+        for attempt in range(1, attempts + 1):
+            for cmd in build_fit_commands(input_path, output_path, kbps, passlog, preset):
+                proc = _run_ffmpeg(cmd, files=(input_path, output_path))
+                if proc.returncode != 0:
+                    stderr = proc.stderr.decode("utf-8", "replace").strip()
+                    raise Exception(f"ffmpeg size fit failed ({proc.returncode}): {stderr[-300:]}")
+            size = os.path.getsize(os.fspath(output_path))
+            if size <= max_bytes:
+                return {"size": size, "kbps": kbps, "seconds": time.perf_counter() - start, "attempts": attempt}
+            # Take the overshoot (e.g. a louder copied audio track) off the video rate, with margin
+            kbps = max(1.0, kbps - (size - max_bytes) * 8 / 1000 / duration * 1.2)
+    raise Exception(f"Could not fit the video under {max_bytes // 1024}KB (last try {size // 1024}KB)")
+
+
+# ===== ENCODE BENCHMARK =====
+
+def _has_audio(path: str) -> bool:
+    proc = subprocess.run([ffmpeg_exe(), "-hide_banner", "-i", path], capture_output=True, text=True)
+    return "Audio:" in proc.stderr
+
+
+def _gray_frames(path: str, duration: float, width: int, height: int, fps: int, every: int):
+    """Yield every `every`-th frame of `path` as a uint8 luma array, through the reel filter graph."""
+    import numpy as np
+
+    cmd = [
+        ffmpeg_exe(), "-hide_banner", "-loglevel", "error", "-i", path, "-t", f"{duration:.3f}",
+        "-vf", f"{scale_pad_filter(width, height, fps)},format=gray",
+        "-f", "rawvideo", "-pix_fmt", "gray", "pipe:1",
+    ]
+    frame_size = width * height
+    # stderr is dropped: the reader may stop early and ffmpeg then reports a broken pipe
+    proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+    try:
+        index = 0
+        while True:
+            buf = proc.stdout.read(frame_size)
+            if len(buf) < frame_size:
+                break
+            if index % every == 0:
+                yield np.frombuffer(buf, dtype=np.uint8).reshape(height, width)
+            index += 1
+    finally:
+        proc.stdout.close()
+        proc.wait()
+
+
+def quality_proxies(reference: str, encoded: str, duration: float,
+                    width=REEL_WIDTH, height=REEL_HEIGHT, fps=REEL_FPS, every: int = 6) -> dict:
+    """Mean PSNR (dB) and SSIM of `encoded` against `reference` on sampled luma frames (NumPy)."""
+    import numpy as np
+    from image_encoding import ssim
+
+    psnrs, ssims = [], []
+    ref_frames = _gray_frames(reference, duration, width, height, fps, every)
+    enc_frames = _gray_frames(encoded, duration, width, height, fps, every)
+    for ref, enc in zip(ref_frames, enc_frames):
+        mse = np.mean((ref.astype(np.float64) - enc.astype(np.float64)) ** 2)
+        psnrs.append(99.0 if mse == 0 else 10 * np.log10(255.0 ** 2 / mse))
+        ssims.append(ssim(ref, enc))
+    if not psnrs:
+        raise Exception("No frames decoded for quality comparison")
+    return {"psnr": float(np.mean(psnrs)), "ssim": float(np.mean(ssims)), "frames": len(psnrs)}
+
+
+def benchmark_profiles(reference: str, profiles=None, duration=None, every: int = 6) -> list:
+    """Encode `reference` under each profile; report wall time, CPU time, size, PSNR and SSIM."""
+    profiles = profiles or list(ENCODING_PROFILES)
+    duration = duration or media_duration(reference)
+    audio = reference if _has_audio(reference) else None
+    try:
+        import resource  # CPU time of child processes (not available on Windows)
+    except ImportError:
+        resource = None
+
+    def child_cpu():
+        if resource is None:
+            return float("nan")
+        usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+        return usage.ru_utime + usage.ru_stime
+
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for name in profiles:
+            output = os.path.join(tmp, f"{name}.mp4")
+            before = child_cpu()
+            wall = render_reel_ffmpeg(reference, audio, output, duration, profile=name)
+            cpu = child_cpu() - before
+            quality = quality_proxies(reference, output, duration, every=every)
+            results.append({
+                "profile": name,
+                "wall": wall,
+                "cpu": cpu,
+                "size": os.path.getsize(output),
+                **quality,
+            })
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Reel encoding profiles: encode-time vs. size benchmark")
+    parser.add_argument("--bench", metavar="CLIP", default="test_reel.mp4", help="Reference clip (default: test_reel.mp4)")
+    parser.add_argument("--profiles", default=",".join(ENCODING_PROFILES), help="Comma-separated profile names")
+    parser.add_argument("--duration", type=float, default=None, help="Seconds to encode (default: whole clip)")
+    parser.add_argument("--sample-every", type=int, default=6, help="Compare every Nth frame for PSNR/SSIM")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.bench):
+        print(f"Reference clip not found: {args.bench}")
+        sys.exit(1)
+
+    print(f"🎬 Benchmarking {args.profiles} on {args.bench}...")
+    results = benchmark_profiles(args.bench, args.profiles.split(","), args.duration, args.sample_every)
+    print(f"\n{'profile':<10} {'wall s':>7} {'cpu s':>7} {'size KB':>8} {'PSNR dB':>8} {'SSIM':>7}")
+    for r in results:
+        print(f"{r['profile']:<10} {r['wall']:>7.2f} {r['cpu']:>7.2f} {r['size']//1024:>8} {r['psnr']:>8.2f} {r['ssim']:>7.4f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,454 @@
+#!/usr/bin/env python3
+"""
+Resident scheduler for the Astroboli bots.
+
+Every GitHub Actions / cron run starts from nothing: interpreter start, imports,
+Gemini setup, Chromium launch when a browser site is needed, fonts and dedup
+histories loaded from disk. The daemon pays for that once and keeps everything
+warm: the HTTP session, the Gemini model, the SMTP session, the browser pool, the
+font cache and the histories. Each run only does the work itself.
+
+    python scheduler_daemon.py                      # run the schedules in the foreground
+    python scheduler_daemon.py ctl status           # jobs, next run times, run latencies
+    python scheduler_daemon.py ctl run post --mock  # a manual run (bot options after the job name)
+    python scheduler_daemon.py ctl run --wait carousel --days 7 --out week/   # block until done
+    python scheduler_daemon.py ctl stop
+
+Schedules are 5-field cron expressions in local time. The defaults match the GitHub
+workflows: the daily post at 10:00 and the carousel on Sundays at 11:00. A run
+missed while the machine was asleep happens once on wake-up, not once per missed
+slot. Every run, scheduled or manual, goes through one worker thread, in order.
+Runs never overlap, and Playwright stays on the thread that started it. Manual
+commands come in on a Unix socket that only the owner can use.
+"""
+
+import os
+import sys
+import json
+import time
+import shlex
+import socket
+import argparse
+import datetime
+import threading
+import socketserver
+from collections import deque
+
+from bot_core import STATE_DIR
+
+DAEMON_SOCKET = os.environ.get("DAEMON_SOCKET") or os.path.join(STATE_DIR, "daemon.sock")
+DAEMON_POST_CRON = os.environ.get("DAEMON_POST_CRON", "0 10 * * *")      # Daily post
+DAEMON_CAROUSEL_CRON = os.environ.get("DAEMON_CAROUSEL_CRON", "0 11 * * 0")  # Weekly carousel
+DAEMON_POST_ARGS = os.environ.get("DAEMON_POST_ARGS", "")          # Extra bot options, e.g. "--renditions reel,story"
+DAEMON_CAROUSEL_ARGS = os.environ.get("DAEMON_CAROUSEL_ARGS", "")
+DAEMON_WARM_BROWSER = os.environ.get("DAEMON_WARM_BROWSER", "0") in ("1", "true", "True")
+HISTORY_SIZE = 50         # Finished jobs kept for `status`
+MAX_SLEEP_SECONDS = 60    # Re-check the clock at least this often (suspend, clock changes)
+
+
+# ===== CRON =====
+
+_FIELDS = (("minute", 0, 59), ("hour", 0, 23), ("day", 1, 31), ("month", 1, 12), ("weekday", 0, 7))
+
+
+def _parse_field(text: str, low: int, high: int) -> set:
+    values = set()
+    for part in text.split(","):
+        step = 1
+        if "/" in part:
+            part, step_text = part.split("/", 1)
+            step = int(step_text)
+            if step < 1:
+                raise ValueError(f"bad step in '{text}'")
+        if part == "*":
+            start, end = low, high
+        elif "-" in part:
+            start, end = (int(v) for v in part.split("-", 1))
+        else:
+            start = int(part)
+            end = high if step > 1 else start
+        if not low <= start <= end <= high:
+            raise ValueError(f"'{text}' is outside {low}-{high}")
+        values.update(range(start, end + 1, step))
+    return values
+
+
+class CronSchedule:
+    """A 5-field cron expression: minute hour day-of-month month day-of-week (0 or 7 = Sunday)."""
+
+    def __init__(self, expression: str):
+        fields = expression.split()
+        if len(fields) != 5:
+            raise ValueError(f"cron expression needs 5 fields: '{expression}'")
+        self.expression = expression
+        parsed = [_parse_field(text, low, high) for text, (_, low, high) in zip(fields, _FIELDS)]
+        self.minutes, self.hours, self.days, self.months, weekdays = parsed
+        self.weekdays = {d % 7 for d in weekdays}
+        # Standard cron: when both day fields are restricted, either one matching is enough
+        self._day_or = fields[2] != "*" and fields[4] != "*"
+
+    def _day_matches(self, when: datetime.datetime) -> bool:
+        day_ok = when.day in self.days
+        weekday_ok = (when.weekday() + 1) % 7 in self.weekdays
+        return (day_ok or weekday_ok) if self._day_or else (day_ok and weekday_ok)
+
+    def matches(self, when: datetime.datetime) -> bool:
+        return (when.month in self.months and self._day_matches(when)
+                and when.hour in self.hours and when.minute in self.minutes)
+
+    def next_after(self, when: datetime.datetime) -> datetime.datetime:
+        """The first matching minute strictly after `when` (skips whole months, days and hours)."""
+        candidate = when.replace(second=0, microsecond=0) + datetime.timedelta(minutes=1)
+        limit = candidate + datetime.timedelta(days=366 * 5)
+        while candidate < limit:
+            if candidate.month not in self.months:
+                candidate = (candidate.replace(day=1, hour=0, minute=0) + datetime.timedelta(days=32)).replace(day=1)
+            elif not self._day_matches(candidate):
+                candidate = candidate.replace(hour=0, minute=0) + datetime.timedelta(days=1)
+            elif candidate.hour not in self.hours:
+                candidate = candidate.replace(minute=0) + datetime.timedelta(hours=1)
+            elif candidate.minute not in self.minutes:
+                candidate += datetime.timedelta(minutes=1)
+            else:
+                return candidate
+        raise ValueError(f"cron expression never matches: '{self.expression}'")
+
+
+# ===== JOBS =====
+
+# In-process by default: the queue's inline workers would use the browser pool from
+# new threads each run. `run post --submit-only` still hands a run to queue workers.
+def _post_job(argv):
+    import backfill
+    import daily_bot
+
+    backfill.BACKFILL_VIDEO_WORKERS = 0  # --days / multi-brand reels on this thread, where the browser pool lives
+    return daily_bot.run(daily_bot.parse_args(["--no-queue", *argv]))
+
+
+def _carousel_job(argv):
+    import carousel_bot
+
+    return carousel_bot.run(carousel_bot.parse_args(["--no-queue", *argv]))
+
+
+JOBS = {"post": _post_job, "carousel": _carousel_job}
+
+
+def warm_up(browser: bool = DAEMON_WARM_BROWSER) -> float:
+    """Import both bots and open / load every shared client and cache once. Returns seconds taken."""
+    start = time.perf_counter()
+    import bot_core
+    import daily_bot  # noqa: F401  (imports reel_render, video_probe)
+    import carousel_bot
+    from PIL import Image
+    from io import BytesIO
+
+    bot_core.get_http()
+    if bot_core.current_run().gemini_api_key:
+        bot_core.get_gemini_model()
+    bot_core._get_text_history()
+    bot_core._get_image_history()
+    # Pillow codecs, the overlay font and the JPEG encoder, on a throwaway slide
+    blank = BytesIO()
+    Image.new("RGB", (1080, 1080), (30, 20, 60)).save(blank, "JPEG")
+    carousel_bot.overlay_text_on_slide(blank.getvalue(), "The cosmos is warming up.")
+    if browser:
+        import browser_pool
+
+        browser_pool.get_pool()
+    return time.perf_counter() - start
+
+
+class Scheduler:
+    """Cron schedules + a FIFO of runs executed one at a time on a single worker thread."""
+
+    def __init__(self, schedules: dict, warm_browser: bool = DAEMON_WARM_BROWSER):
+        self.schedules = schedules  # {job: (CronSchedule, [bot args])}
+        self.warm_browser = warm_browser
+        self.next_runs = {}
+        self.queue = deque()
+        self.jobs = {}
+        self.finished = deque(maxlen=HISTORY_SIZE)
+        self.warm_seconds = None
+        self.warm_error = None  # Why warm_up failed; runs then load what they need themselves
+        self._counter = 0
+        self._lock = threading.Condition()
+        self._stop = threading.Event()
+        self._wake = threading.Event()  # Re-check the schedules now
+        self._worker = threading.Thread(target=self._work, name="daemon-worker", daemon=True)
+        self._clock = threading.Thread(target=self._tick, name="daemon-cron", daemon=True)
+
+    def start(self):
+        now = datetime.datetime.now()
+        for name, (cron, _) in self.schedules.items():
+            self.next_runs[name] = cron.next_after(now)
+        self._worker.start()
+        self._clock.start()
+        return self
+
+    def stop(self, timeout: float = None):
+        self._stop.set()
+        self._wake.set()
+        with self._lock:
+            self._lock.notify_all()
+        self._clock.join(timeout)
+        self._worker.join(timeout)
+
+    @property
+    def stopped(self) -> bool:
+        return self._stop.is_set()
+
+    # ----- queue -----
+
+    def submit(self, job: str, argv=(), source: str = "manual") -> dict:
+        if job not in JOBS:
+            raise ValueError(f"unknown job '{job}' (choose from {', '.join(JOBS)})")
+        with self._lock:
+            if self._stop.is_set() or (self._worker.ident is not None and not self._worker.is_alive()):
+                raise RuntimeError("the daemon's worker is not running")
+            self._counter += 1
+            entry = {"id": self._counter, "job": job, "args": list(argv), "source": source, "state": "queued",
+                     "queued": time.time(), "seconds": None, "code": None, "error": None}
+            entry["_done"] = threading.Event()
+            self.jobs[entry["id"]] = entry
+            print(f"🗂️ Queued #{entry['id']}: {job} {' '.join(entry['args'])} ({source})")
+            self.queue.append(entry)
+            self._lock.notify_all()
+        return entry
+
+    def wait(self, job_id: int, timeout: float = None) -> dict:
+        entry = self.jobs.get(job_id)
+        if entry is None:
+            raise ValueError(f"no job #{job_id}")
+        entry["_done"].wait(timeout)
+        return entry
+
+    def _work(self):
+        start = time.perf_counter()
+        try:
+            self.warm_seconds = warm_up(self.warm_browser)
+            print(f"🔥 Warm in {self.warm_seconds:.2f}s")
+        except Exception as e:
+            # A broken history file or browser must not take the worker down with it
+            self.warm_seconds = round(time.perf_counter() - start, 3)
+            self.warm_error = f"{type(e).__name__}: {e}"
+            print(f"⚠️ Warm-up failed, running cold: {self.warm_error}")
+        try:
+            while True:
+                with self._lock:
+                    while not self.queue and not self._stop.is_set():
+                        self._lock.wait()
+                    if self._stop.is_set():
+                        break
+                    entry = self.queue.popleft()
+                    entry["state"] = "running"
+                self._run(entry)
+        finally:
+            with self._lock:
+                # Nobody will run these any more: release their waiters
+                while self.queue:
+                    entry = self.queue.popleft()
+                    entry.update(state="done", code=1, error="daemon stopped before this run started")
+                    entry["_done"].set()
+            import browser_pool
+
+            if browser_pool._pool is not None:  # Closed on the thread that started it
+                browser_pool._pool.close()
+
+    def _run(self, entry):
+        import bot_core
+
+        print(f"▶️ Run #{entry['id']}: {entry['job']} {' '.join(entry['args'])}")
+        start = time.perf_counter()
+        try:
+            entry["code"] = JOBS[entry["job"]](entry["args"])
+        except SystemExit as e:  # argparse errors / --help
+            entry["code"] = e.code if isinstance(e.code, int) else 2
+        except BaseException as e:  # Nothing a run raises may end the worker thread
+            entry["code"], entry["error"] = 1, f"{type(e).__name__}: {e}"
+        finally:
+            if bot_core._delivery is not None:
+                bot_core._delivery.flush()  # Disk deliveries are durable when the run reports done
+            entry["seconds"] = round(time.perf_counter() - start, 3)
+            with self._lock:
+                entry["state"] = "done"
+                if len(self.finished) == self.finished.maxlen:
+                    self.jobs.pop(self.finished[0]["id"], None)
+                self.finished.append(entry)
+            entry["_done"].set()
+        print(f"{'✅' if entry['code'] == 0 else '❌'} Run #{entry['id']} finished in {entry['seconds']:.1f}s "
+              f"(exit {entry['code']})")
+
+    # ----- cron -----
+
+    def _tick(self):
+        while not self._stop.is_set():
+            now = datetime.datetime.now()
+            for name, (cron, argv) in self.schedules.items():
+                if now >= self.next_runs[name]:
+                    try:
+                        self.submit(name, argv, source=f"cron {cron.expression}")
+                    except RuntimeError as e:
+                        print(f"⚠️ Scheduled {name} run skipped: {e}")
+                    # Missed slots (suspend) collapse into this one run
+                    self.next_runs[name] = cron.next_after(now)
+            upcoming = min(self.next_runs.values(), default=None)
+            wait = MAX_SLEEP_SECONDS if upcoming is None else (upcoming - datetime.datetime.now()).total_seconds()
+            self._wake.wait(max(0.05, min(MAX_SLEEP_SECONDS, wait)))
+            self._wake.clear()
+
+    # ----- reporting -----
+
+    def status(self) -> dict:
+        public = lambda e: {k: v for k, v in e.items() if not k.startswith("_")}  # noqa: E731
+        with self._lock:
+            return {
+                "pid": os.getpid(),
+                "warm_seconds": self.warm_seconds,
+                "warm_error": self.warm_error,
+                "schedules": {name: {"cron": cron.expression, "args": argv, "next": self.next_runs[name].isoformat()}
+                              for name, (cron, argv) in self.schedules.items()},
+                "queued": [public(e) for e in self.queue],
+                "running": [public(e) for e in self.jobs.values() if e["state"] == "running"],
+                "finished": [public(e) for e in self.finished],
+            }
+
+
+# ===== CONTROL SOCKET =====
+
+class _ControlHandler(socketserver.StreamRequestHandler):
+    """One command line in, one JSON line out."""
+
+    def handle(self):
+        line = self.rfile.readline().decode("utf-8").strip()
+        try:
+            reply = self.server.dispatch(shlex.split(line))
+        except Exception as e:
+            reply = {"error": str(e)}
+        self.wfile.write(json.dumps(reply, default=str).encode("utf-8") + b"\n")
+
+
+class ControlServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+    def __init__(self, path: str, scheduler: Scheduler):
+        self.scheduler = scheduler
+        if os.path.exists(path):
+            if _ping(path):
+                raise Exception(f"A daemon is already listening on {path}")
+            os.remove(path)  # Left over from a daemon that did not shut down cleanly
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        old_umask = os.umask(0o177)  # Socket is owner-only from the moment it exists
+        try:
+            super().__init__(path, _ControlHandler)
+        finally:
+            os.umask(old_umask)
+
+    def dispatch(self, words: list) -> dict:
+        if not words:
+            raise ValueError("empty command")
+        command, rest = words[0], words[1:]
+        if command == "status":
+            return self.scheduler.status()
+        if command == "run":
+            if not rest:
+                raise ValueError(f"usage: run <{'|'.join(JOBS)}> [bot options]")
+            entry = self.scheduler.submit(rest[0], rest[1:])
+            return {"queued": entry["id"]}
+        if command == "wait":
+            entry = self.scheduler.wait(int(rest[0]))
+            return {k: v for k, v in entry.items() if not k.startswith("_")}
+        if command == "ping":
+            return {"pong": True}
+        if command == "stop":
+            threading.Thread(target=self.shutdown, daemon=True).start()
+            return {"stopping": True}
+        raise ValueError(f"unknown command '{command}' (status, run, wait, ping, stop)")
+
+
+def _ping(path: str) -> bool:
+    try:
+        return "pong" in send_command(path, "ping", timeout=2)
+    except OSError:
+        return False
+
+
+def send_command(path: str, line: str, timeout: float = None) -> dict:
+    """Send one command to a running daemon and return its JSON reply."""
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.settimeout(timeout)
+        sock.connect(path)
+        sock.sendall(line.encode("utf-8") + b"\n")
+        data = b""
+        while not data.endswith(b"\n"):
+            chunk = sock.recv(65536)
+            if not chunk:
+                break
+            data += chunk
+    return json.loads(data or b"{}")
+
+
+# ===== CLI =====
+
+def default_schedules() -> dict:
+    schedules = {}
+    for job, cron, extra in (("post", DAEMON_POST_CRON, DAEMON_POST_ARGS),
+                             ("carousel", DAEMON_CAROUSEL_CRON, DAEMON_CAROUSEL_ARGS)):
+        if cron.strip().lower() not in ("", "off"):
+            schedules[job] = (CronSchedule(cron), shlex.split(extra))
+    return schedules
+
+
+def serve(socket_path: str = DAEMON_SOCKET, schedules: dict = None) -> int:
+    if not hasattr(socket, "AF_UNIX"):
+        print("ERROR: the daemon needs Unix domain sockets (Linux / macOS)")
+        return 1
+    scheduler = Scheduler(default_schedules() if schedules is None else schedules)
+    server = ControlServer(socket_path, scheduler)
+    scheduler.start()
+    for name, when in scheduler.next_runs.items():
+        print(f"⏰ {name}: '{scheduler.schedules[name][0].expression}', next at {when:%Y-%m-%d %H:%M}")
+    print(f"🛰️ Listening on {socket_path}")
+    try:
+        server.serve_forever(poll_interval=0.5)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        if os.path.exists(socket_path):
+            os.remove(socket_path)
+        scheduler.stop(timeout=5)
+    print("👋 Daemon stopped")
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Resident Astroboli scheduler with warm clients")
+    parser.add_argument("--socket", default=DAEMON_SOCKET, help="Control socket path")
+    sub = parser.add_subparsers(dest="mode")
+    ctl = sub.add_parser("ctl", help="Send a command to the running daemon")
+    ctl.add_argument("--wait", action="store_true", help="For run: block until the run has finished")
+    ctl.add_argument("command", nargs=argparse.REMAINDER, help="status | run <post|carousel> [bot options] | stop")
+    args = parser.parse_args()
+
+    if args.mode != "ctl":
+        return serve(args.socket)
+    words = args.command
+    if words[:2] == ["run", "--wait"]:
+        args.wait, words = True, ["run"] + words[2:]
+    try:
+        reply = send_command(args.socket, shlex.join(words))
+        if args.wait and "queued" in reply:
+            reply = send_command(args.socket, f"wait {reply['queued']}")
+    except OSError as e:
+        print(f"ERROR: no daemon on {args.socket} ({e})")
+        return 1
+    print(json.dumps(reply, indent=1, default=str))
+    if "error" in reply:
+        return 1
+    return reply.get("code") or 0 if args.wait else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,206 @@
+#!/usr/bin/env python3
+"""Stand-in SMTP server for local delivery tests (standard library only, no TLS).
+
+Speaks enough ESMTP for smtplib: EHLO/HELO, AUTH PLAIN/LOGIN, MAIL, RCPT, DATA,
+NOOP, RSET and QUIT. Received messages are kept in memory (and optionally saved
+as .eml files). Tests can drop every open connection to simulate an idle timeout.
+
+    python scripts/smtp_standin.py --port 8025 --save-dir received/
+    SMTP_HOST=localhost SMTP_PORT=8025 SMTP_STARTTLS=0 python daily_bot.py ...
+"""
+import os
+import sys
+import time
+import base64
+import asyncio
+import argparse
+import threading
+
+
+class StandInSMTPServer:
+    """Asyncio SMTP server running in a background thread."""
+
+    def __init__(self, host="127.0.0.1", port=0, users=None, save_dir=None, verbose=False):
+        self.host = host
+        self.port = port
+        self.users = users  # {user: password}; None = AUTH optional, any credentials accepted
+        self.save_dir = save_dir
+        self.verbose = verbose
+        self.messages = []  # (mail_from, [rcpt], raw bytes)
+        self.stats = {"connections": 0, "logins": 0, "failed_logins": 0, "noops": 0}
+        self._writers = set()
+        self._loop = None
+        self._server = None
+        self._thread = None
+        self._ready = threading.Event()
+
+    # ----- lifecycle -----
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="smtp-standin", daemon=True)
+        self._thread.start()
+        self._ready.wait(10)
+        return self
+
+    def _run(self):
+        self._loop = asyncio.new_event_loop()
+        self._server = self._loop.run_until_complete(asyncio.start_server(self._handle, self.host, self.port))
+        self.port = self._server.sockets[0].getsockname()[1]
+        self._ready.set()
+        self._loop.run_forever()
+
+    def stop(self):
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self._shutdown)
+            self._thread.join(10)
+            self._loop = None
+
+    def _shutdown(self):
+        self._drop()
+        self._server.close()
+        self._loop.stop()
+
+    def drop_connections(self):
+        """Close every client connection without a reply (like a server-side idle timeout)."""
+        done = threading.Event()
+        self._loop.call_soon_threadsafe(lambda: (self._drop(), done.set()))
+        done.wait(5)
+
+    def _drop(self):
+        for writer in list(self._writers):
+            writer.close()
+        self._writers.clear()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    # ----- protocol -----
+
+    async def _handle(self, reader, writer):
+        self.stats["connections"] += 1
+        self._writers.add(writer)
+
+        def reply(line):
+            writer.write(line.encode("ascii") + b"\r\n")
+
+        authed = self.users is None
+        mail_from, rcpts = None, []
+        reply("220 standin ESMTP ready")
+        try:
+            while True:
+                raw = await reader.readline()
+                if not raw:
+                    break
+                line = raw.decode("utf-8", "replace").rstrip("\r\n")
+                verb, _, arg = line.partition(" ")
+                verb = verb.upper()
+
+                if verb == "EHLO":
+                    reply("250-standin")
+                    reply("250-8BITMIME")
+                    reply("250-SIZE 36700160")
+                    reply("250 AUTH PLAIN LOGIN")
+                elif verb == "HELO":
+                    reply("250 standin")
+                elif verb == "AUTH":
+                    mechanism, _, initial = arg.partition(" ")
+                    if mechanism.upper() == "PLAIN":
+                        if not initial:
+                            reply("334 ")
+                            initial = (await reader.readline()).decode().strip()
+                        _, user, password = base64.b64decode(initial).decode().split("\0")
+                    elif mechanism.upper() == "LOGIN":
+                        reply("334 " + base64.b64encode(b"Username:").decode())
+                        user = base64.b64decode(await reader.readline()).decode()
+                        reply("334 " + base64.b64encode(b"Password:").decode())
+                        password = base64.b64decode(await reader.readline()).decode()
+                    else:
+                        reply("504 Unrecognized authentication type")
+                        continue
+                    if self.users is None or self.users.get(user) == password:
+                        authed = True
+                        self.stats["logins"] += 1
+                        reply("235 Authentication successful")
+                    else:
+                        self.stats["failed_logins"] += 1
+                        reply("535 Authentication credentials invalid")
+                elif verb == "MAIL":
+                    if not authed:
+                        reply("530 Authentication required")
+                        continue
+                    mail_from, rcpts = arg.split(":", 1)[1].split()[0].strip("<>"), []
+                    reply("250 OK")
+                elif verb == "RCPT":
+                    rcpts.append(arg.split(":", 1)[1].strip().strip("<>"))
+                    reply("250 OK")
+                elif verb == "DATA":
+                    if mail_from is None or not rcpts:
+                        reply("503 Need MAIL and RCPT first")
+                        continue
+                    reply("354 End data with <CR><LF>.<CR><LF>")
+                    lines = []
+                    while True:
+                        data_line = await reader.readline()
+                        if data_line in (b".\r\n", b".\n", b""):
+                            break
+                        lines.append(data_line[1:] if data_line.startswith(b"..") else data_line)
+                    self._store(mail_from, rcpts, b"".join(lines))
+                    mail_from, rcpts = None, []
+                    reply("250 OK queued")
+                elif verb == "NOOP":
+                    self.stats["noops"] += 1
+                    reply("250 OK")
+                elif verb == "RSET":
+                    mail_from, rcpts = None, []
+                    reply("250 OK")
+                elif verb == "QUIT":
+                    reply("221 Bye")
+                    await writer.drain()
+                    break
+                else:
+                    reply("502 Command not implemented")
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            self._writers.discard(writer)
+            writer.close()
+
+    def _store(self, mail_from, rcpts, data):
+        self.messages.append((mail_from, list(rcpts), data))
+        saved = ""
+        if self.save_dir:
+            os.makedirs(self.save_dir, exist_ok=True)
+            path = os.path.join(self.save_dir, f"{time.time():.6f}.eml")
+            with open(path, "wb") as f:
+                f.write(data)
+            saved = f" saved to {path}"
+        if self.verbose:
+            print(f"📨 {mail_from} -> {', '.join(rcpts)}: {len(data) // 1024}KB{saved}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Stand-in SMTP server for local delivery tests")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8025)
+    parser.add_argument("--user", help="Require AUTH with this user (password from --password)")
+    parser.add_argument("--password", default="")
+    parser.add_argument("--save-dir", help="Save every received message as an .eml file here")
+    args = parser.parse_args()
+
+    users = {args.user: args.password} if args.user else None
+    server = StandInSMTPServer(args.host, args.port, users, args.save_dir, verbose=True).start()
+    print(f"Stand-in SMTP server on {args.host}:{server.port} (Ctrl+C to stop)")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.stop()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""Test multi-day backfill: dates, batch response parsing, the stage pipeline's
+per-stage worker limits and error handling, and a carousel backfill into dated bundles."""
+from pathlib import Path
+import os
+import sys
+import json
+import time
+import tempfile
+import threading
+from io import BytesIO
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+# Keep dedup histories / deliveries of this test out of the real state dir
+state = tempfile.TemporaryDirectory()
+os.environ["ASTROBOLI_STATE_DIR"] = state.name
+
+import backfill
+
+failures = []
+
+# Dates
+if backfill.day_dates(3, "2026-12-30") != ["2026-12-30", "2026-12-31", "2027-01-01"]:
+    failures.append(f"day_dates wrong: {backfill.day_dates(3, '2026-12-30')}")
+
+# Batch responses: wrapped object, fenced, bare array, garbage
+wrapped = '```json\n{"posts": [{"caption": "a"}, {"caption": "b"}, "junk"]}\n```'
+if [d["caption"] for d in backfill.batch_items(wrapped, "posts")] != ["a", "b"]:
+    failures.append("batch_items should read the wrapped list and skip non-objects")
+if [d["caption"] for d in backfill.batch_items('Here: [{"caption": "x"}]', "posts")] != ["x"]:
+    failures.append("batch_items should accept a bare array")
+if backfill.batch_items("no json at all", "posts") != []:
+    failures.append("batch_items should return [] for garbage")
+if "exactly 7 objects" not in backfill.batch_prompt(backfill.day_dates(7), "posts"):
+    failures.append("batch_prompt should ask for one object per day")
+
+# Pipeline: stages overlap across items, each stage stays within its worker limit
+lock = threading.Lock()
+active = {"image": 0, "video": 0}
+peak = {"image": 0, "video": 0}
+overlap = []
+
+
+def stage(name, seconds):
+    def run(item, previous):
+        with lock:
+            active[name] += 1
+            peak[name] = max(peak[name], active[name])
+            if active["image"] and active["video"]:
+                overlap.append(item)
+        time.sleep(seconds)
+        with lock:
+            active[name] -= 1
+        if item == 3 and name == "image":
+            raise RuntimeError("provider down")
+        return (previous or []) + [name]
+    return run
+
+
+start = time.perf_counter()
+results = list(backfill.run_pipeline(range(6), [("image", stage("image", 0.1), 2), ("video", stage("video", 0.1), 1)]))
+elapsed = time.perf_counter() - start
+done = {item: result for item, result, error in results if error is None}
+errors = {item: str(error) for item, _, error in results if error is not None}
+if sorted(done) != [0, 1, 2, 4, 5] or any(r != ["image", "video"] for r in done.values()):
+    failures.append(f"pipeline results wrong: {done}")
+if errors != {3: "provider down"}:
+    failures.append(f"a failed stage should be reported once and skip later stages: {errors}")
+if peak != {"image": 2, "video": 1}:
+    failures.append(f"stage worker limits not respected: peak {peak}")
+if not overlap:
+    failures.append("image and video stages of different days should overlap")
+print(f"pipeline: 6 items in {elapsed:.2f}s (serial would be 1.2s), peak workers {peak}")
+if elapsed > 0.9:
+    failures.append(f"pipeline too slow for overlapping stages: {elapsed:.2f}s")
+
+# A 0-worker stage runs on the calling thread (Playwright's thread) while the image pool keeps going
+threads = set()
+active["image"] = active["video"] = 0
+overlap.clear()
+
+
+def on_caller(item, previous):
+    threads.add(threading.current_thread().name)
+    return stage("video", 0.1)(item, previous)
+
+
+caller = threading.current_thread().name
+results = list(backfill.run_pipeline(range(6), [("image", stage("image", 0.1), 2), ("video", on_caller, 0)]))
+done = sorted(item for item, _, error in results if error is None)
+if done != [0, 1, 2, 4, 5] or [item for item, _, error in results if error is not None] != [3]:
+    failures.append(f"calling-thread stage results wrong: {results}")
+if threads != {caller}:
+    failures.append(f"0-worker stage should run on the calling thread, ran on {threads}")
+if not overlap:
+    failures.append("image pool should keep working while the calling thread renders")
+
+# Carousel backfill end to end with a local image source: one dated bundle per day
+with tempfile.TemporaryDirectory() as tmp:
+    from PIL import Image
+    import bot_core
+    import carousel_bot
+
+    calls = []
+
+    def local_image(prompt, dedup=True, record=True):
+        calls.append(threading.current_thread().name)
+        buf = BytesIO()
+        Image.new("RGB", (1024, 1024), (40 + len(calls), 20, 90)).save(buf, "PNG")
+        return buf.getvalue()
+
+    carousel_bot.generate_image = local_image
+    out = os.path.join(tmp, "week")
+    bot_core.set_delivery("dir", out)
+    dates = backfill.day_dates(3, "2026-11-01")
+    failed = carousel_bot.run_backfill(dates, mock=True)
+    bot_core.get_delivery().close()
+    bundles = sorted(os.listdir(out))
+    if failed or bundles != [f"{d}-astroboli-carousel" for d in dates]:
+        failures.append(f"expected one bundle per day, got {bundles} (failed {failed})")
+    else:
+        with open(os.path.join(out, bundles[0], "manifest.json"), encoding="utf-8") as f:
+            manifest = json.load(f)
+        if manifest["date"] != "2026-11-01" or len(manifest["files"]) != carousel_bot.CAROUSEL_SLIDES:
+            failures.append(f"bundle manifest wrong: {manifest}")
+        if not os.path.isfile(os.path.join(out, bundles[0], "caption.txt")):
+            failures.append("bundle is missing caption.txt")
+    if len(calls) != 3 * carousel_bot.CAROUSEL_SLIDES or len(set(calls)) < 2:
+        failures.append(f"slides should be generated on several worker threads: {set(calls)}")
+
+state.cleanup()
+if failures:
+    for f in failures:
+        print("FAIL:", f)
+    sys.exit(2)
+print("PASS")
+sys.exit(0)
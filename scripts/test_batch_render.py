@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""Test the batch renderer: manifest validation, result order and the --out files."""
+from pathlib import Path
+import io
+import os
+import sys
+import json
+import tempfile
+import subprocess
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+from PIL import Image
+import batch_render
+
+failures = []
+
+with tempfile.TemporaryDirectory() as tmp:
+    # Source images: a large one first, so it finishes after the small ones behind it
+    sizes = [(2400, 1800), (600, 600), (800, 500), (700, 900)]
+    for i, size in enumerate(sizes):
+        Image.new("RGB", size, (40 + i * 40, 20, 90)).save(os.path.join(tmp, f"src{i}.png"))
+
+    def manifest(name, entries, lines=False):
+        path = os.path.join(tmp, name)
+        with open(path, "w", encoding="utf-8") as f:
+            if lines:
+                f.write("\n".join(json.dumps(e) for e in entries) + "\n")
+            else:
+                json.dump(entries, f)
+        return path
+
+    # Bad entries are rejected with the entry number
+    bad = [
+        ([{"text": "no image"}], "no image path"),
+        ([{"image": "src0.png", "style": "story"}], "unknown style"),
+        ([{"image": "src0.png", "style": "carousel"}], "needs slide text"),
+    ]
+    for entries, message in bad:
+        try:
+            batch_render.load_manifest(manifest("bad.json", entries))
+            failures.append(f"manifest {entries} should be rejected")
+        except ValueError as e:
+            if message not in str(e) or "entry 0" not in str(e):
+                failures.append(f"unexpected error for {entries}: {e}")
+
+    # JSON Lines, relative paths, inferred styles and default names
+    entries = [
+        {"image": "src0.png", "text": "Trust the timing of your life."},
+        {"image": "src1.png"},
+        {"path": "src2.png", "style": "post", "name": "cover"},
+        {"image": os.path.join(tmp, "src3.png"), "text": "The stars are listening.", "style": "carousel"},
+    ]
+    jobs = batch_render.load_manifest(manifest("jobs.jsonl", entries, lines=True))
+    if [j["style"] for j in jobs] != ["carousel", "post", "post", "carousel"]:
+        failures.append(f"styles: {[j['style'] for j in jobs]}")
+    if [j["name"] for j in jobs] != ["0001_src0", "0002_src1", "cover", "0004_src3"]:
+        failures.append(f"names: {[j['name'] for j in jobs]}")
+    if jobs[1]["image"] != os.path.join(tmp, "src1.png"):
+        failures.append(f"relative path not resolved against the manifest: {jobs[1]['image']}")
+
+    # Results come back in manifest order, from worker processes
+    results = list(batch_render.render_batch(jobs, workers=2))
+    print("order:", [r["index"] for r in results], "pids:", sorted({r["pid"] for r in results}))
+    if [r["index"] for r in results] != [0, 1, 2, 3]:
+        failures.append(f"results out of manifest order: {[r['index'] for r in results]}")
+    for r in results:
+        if Image.open(io.BytesIO(r["data"])).size != (1080, 1080):
+            failures.append(f"{r['name']} is not 1080x1080")
+    if os.getpid() in {r["pid"] for r in results}:
+        failures.append("jobs should render in worker processes")
+
+    # The CLI writes one <name>.jpg per job
+    out_dir = os.path.join(tmp, "rendered")
+    proc = subprocess.run([sys.executable, str(ROOT / "batch_render.py"), manifest("jobs.json", entries),
+                           "--out", out_dir, "--workers", "2"], capture_output=True, text=True, cwd=tmp)
+    if proc.returncode != 0:
+        failures.append(f"batch_render.py exited {proc.returncode}: {proc.stderr[-300:]}")
+    else:
+        written = sorted(os.listdir(out_dir))
+        expected = sorted(f"{j['name']}.jpg" for j in jobs)
+        if written != expected:
+            failures.append(f"--out wrote {written}, expected {expected}")
+        for name in written:
+            with Image.open(os.path.join(out_dir, name)) as im:
+                if im.format != "JPEG" or im.size != (1080, 1080):
+                    failures.append(f"{name}: {im.format} {im.size}")
+
+if failures:
+    for f in failures:
+        print("FAIL:", f)
+    sys.exit(2)
+print("PASS")
+sys.exit(0)
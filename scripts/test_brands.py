@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""Test brand config and per-run context: brands file loading / selection, runs for
+different brands isolated from each other on shared threads, and a two-brand
+carousel fan-out into per-brand bundles."""
+from pathlib import Path
+import os
+import sys
+import json
+import tempfile
+import threading
+from io import BytesIO
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+state = tempfile.TemporaryDirectory()
+os.environ["ASTROBOLI_STATE_DIR"] = state.name
+
+import brands
+import bot_core
+from bot_core import current_run, for_brand, use_run, RunContext
+
+failures = []
+example = str(Path(__file__).resolve().parents[1] / "brands.example.json")
+
+# Loading / selection
+if list(brands.load_brands(os.path.join(state.name, "missing.json"))) != ["astroboli"]:
+    failures.append("without a brands file only the built-in brand should exist")
+if [b.key for b in brands.select_brands("all", example)] != ["astroboli", "lunaria"]:
+    failures.append("--brand all should select every brand in file order")
+if [b.key for b in brands.select_brands("", example)] != ["astroboli"]:
+    failures.append("empty --brand should select the first brand")
+try:
+    brands.select_brands("astroboli,nope", example)
+    failures.append("unknown brand keys should be rejected")
+except Exception as e:
+    if "nope" not in str(e):
+        failures.append(f"unexpected error for an unknown brand: {e}")
+bad = os.path.join(state.name, "bad.json")
+with open(bad, "w", encoding="utf-8") as f:
+    json.dump({"brands": [{"key": "x", "name": "X"}]}, f)
+try:
+    brands.load_brands(bad)
+    failures.append("a brand without site / hashtag should be rejected")
+except Exception as e:
+    if "site" not in str(e) or "hashtag" not in str(e):
+        failures.append(f"missing fields not named: {e}")
+lunaria = brands.select_brands("lunaria", example)[0]
+if lunaria.spoken_site != "lunaria dot example dot com" or not lunaria.mentions_site("see Lunaria.example.com"):
+    failures.append("brand site helpers wrong")
+
+# Per-run context: concurrent runs each see their own brand and recipient
+if current_run().brand.key != "astroboli":
+    failures.append("outside a run the default brand should apply")
+barrier = threading.Barrier(2)
+seen = {}
+
+
+def run_as(brand):
+    with for_brand(brand):
+        barrier.wait()  # Both runs are inside their context at the same time
+        seen[brand.key] = (current_run().brand.key, current_run().recipient)
+
+
+threads = [threading.Thread(target=run_as, args=(b,)) for b in brands.select_brands("all", example)]
+for t in threads:
+    t.start()
+for t in threads:
+    t.join()
+if seen != {"astroboli": ("astroboli", current_run().recipient), "lunaria": ("lunaria", "lunaria-team@example.com")}:
+    failures.append(f"runs leaked context into each other: {seen}")
+with use_run(RunContext(email="a@example.com", email_password="x")):
+    if current_run().recipient != "a@example.com":
+        failures.append("recipient should fall back to the run's email")
+if current_run().email != bot_core.YOUR_EMAIL:
+    failures.append("use_run should restore the previous context")
+
+# Two-brand carousel fan-out: one bundle per brand per day, each with its own branding
+import carousel_bot
+from PIL import Image
+
+
+def local_image(prompt, dedup=True, record=True):
+    buf = BytesIO()
+    Image.new("RGB", (1024, 1024), (60, 30, 90)).save(buf, "PNG")
+    return buf.getvalue()
+
+
+carousel_bot.generate_image = local_image
+carousel_bot.select_brands = lambda selection: brands.select_brands(selection, example)
+out = os.path.join(state.name, "out")
+args = carousel_bot.parse_args(["--mock", "--brand", "all", "--days", "1", "--start", "2026-11-01", "--out", out])
+code = carousel_bot.run(args)
+bot_core.get_delivery().close()
+bundles = sorted(os.listdir(out)) if os.path.isdir(out) else []
+expected = [f"2026-11-01-{b}-carousel" for b in ("astroboli", "lunaria")]
+if code != 0 or bundles != expected:
+    failures.append(f"fan-out should write {expected}, got {bundles} (exit {code})")
+else:
+    with open(os.path.join(out, "2026-11-01-lunaria-carousel", "manifest.json"), encoding="utf-8") as f:
+        manifest = json.load(f)
+    with open(os.path.join(out, "2026-11-01-lunaria-carousel", "caption.txt"), encoding="utf-8") as f:
+        caption = f.read()
+    if manifest["brand"] != "lunaria" or "#LunariaDaily" not in caption or "lunaria.example.com" not in caption:
+        failures.append(f"lunaria bundle carries the wrong branding: {caption!r}")
+    if not manifest["files"][0]["file"].startswith("lunaria_carousel_slide_"):
+        failures.append(f"attachments should be named after the brand: {manifest['files'][0]}")
+with for_brand(lunaria):
+    spec = carousel_bot.carousel_email_spec([b"jpeg"], "caption")
+if spec.to_addrs != ["lunaria-team@example.com"] or "Lunaria Carousel Ready" not in spec.subject:
+    failures.append(f"email should go to the brand recipient with its name: {spec.to_addrs} {spec.subject}")
+
+state.cleanup()
+if failures:
+    for f in failures:
+        print("FAIL:", f)
+    sys.exit(2)
+print("PASS")
+sys.exit(0)
@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""Test the browser pool's request filter; with Chromium installed, also a local page load."""
+from pathlib import Path
+import sys
+import threading
+from http.server import ThreadingHTTPServer, SimpleHTTPRequestHandler
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from browser_pool import should_block, is_tracker, BrowserPool, wait_for_any
+
+failures = []
+
+cases = [
+    ("image", "https://giz.ai/static/hero.png", (), True),
+    ("font", "https://fonts.gstatic.com/s/inter.woff2", (), True),
+    ("media", "https://cdn.giz.ai/preview-loop.mp4", (), True),
+    ("media", "https://cdn.giz.ai/results/abc.mp4", (r"/results/.*\.mp4",), False),
+    ("script", "https://www.googletagmanager.com/gtm.js", (), True),
+    ("xhr", "https://region1.google-analytics.com/g/collect", (), True),
+    ("script", "https://giz.ai/_next/app.js", (), False),
+    ("document", "https://giz.ai/video", (), False),
+    ("fetch", "https://giz.ai/api/video/status", (), False),
+]
+for resource_type, url, allow, expected in cases:
+    if should_block(resource_type, url, allow) != expected:
+        failures.append(f"should_block({resource_type}, {url}) != {expected}")
+if is_tracker("https://notgoogle-analytics.com/x"):
+    failures.append("tracker match must be on host boundaries")
+
+PAGE = b"""<html><head><link rel="stylesheet" href="/style.css">
+<script src="https://www.google-analytics.com/analytics.js"></script></head>
+<body><img src="/a.png"><img src="/b.png"><textarea placeholder="Enter prompt"></textarea>
+<script>setTimeout(() => { const b = document.createElement('button'); b.textContent = 'Generate';
+document.body.appendChild(b); }, 300);</script></body></html>"""
+
+
+class Handler(SimpleHTTPRequestHandler):
+    def do_GET(self):
+        body = PAGE if self.path == "/" else b"x"
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html" if self.path == "/" else "application/octet-stream")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+pool = BrowserPool()
+try:
+    pool.start()
+except Exception as e:
+    pool = None
+    print(f"SKIP live browser check (Chromium not available: {str(e).splitlines()[0][:80]})")
+
+if pool:
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_address[1]}/"
+    try:
+        for attempt in range(2):
+            with pool.page() as page:
+                page.goto(url, wait_until="domcontentloaded")
+                selector, _ = wait_for_any(page, ['button:has-text("Generate")', 'button[type="submit"]'], 5000)
+                if "Generate" not in selector:
+                    failures.append("wait_for_any should return the matching selector")
+        if pool.stats["blocked"] < 4:
+            failures.append(f"images and trackers should be blocked, stats {pool.stats}")
+        if pool.stats["contexts_created"] != 1:
+            failures.append(f"second attempt should reuse the warm context, stats {pool.stats}")
+    finally:
+        pool.close()
+        server.shutdown()
+
+if failures:
+    for f in failures:
+        print("FAIL:", f)
+    sys.exit(2)
+print("PASS")
+sys.exit(0)
@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""Test browser site matchers; with Chromium installed, capture a result from a local stand-in site."""
+from pathlib import Path
+import sys
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+import browser_sites
+from browser_sites import BrowserSite, find_video_url, get_site
+
+failures = []
+
+gizai = get_site("gizai")
+if not gizai.is_result_url("https://cdn.example.com/out/abc123.mp4?token=x"):
+    failures.append("mp4 result URL should match")
+if gizai.is_result_url("https://giz.ai/_next/static/app.js"):
+    failures.append("script URL should not match")
+if not gizai.is_result_api("https://giz.ai/api/video/status?id=1"):
+    failures.append("GizAI status API should match")
+if find_video_url({"status": "done", "data": [{"thumb": "https://x/y.jpg", "video": "https://x/y.mp4"}]}) != "https://x/y.mp4":
+    failures.append("find_video_url should dig into nested JSON")
+if find_video_url({"status": "pending", "progress": 40}) is not None:
+    failures.append("pending JSON has no video URL")
+try:
+    get_site("nope")
+    failures.append("unknown site should raise")
+except ValueError:
+    pass
+
+# Live check against a local stand-in site (needs Chromium)
+VIDEO = b"\x00\x00\x00\x18ftypmp42" + b"\x00" * 60000
+PAGE = b"""<html><body><video src="/demo/landing.mp4" autoplay muted></video>
+<textarea placeholder="Enter prompt"></textarea><button>Generate</button>
+<script>document.querySelector('button').onclick = () => setTimeout(() => {
+  const v = document.createElement('video'); v.src = '/out/result.mp4'; v.autoplay = true; v.muted = true;
+  document.body.appendChild(v); }, 200);</script></body></html>"""
+hits = []
+
+
+class Handler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        hits.append(self.path)
+        body, kind = (PAGE, "text/html") if self.path == "/" else (VIDEO, "video/mp4")
+        self.send_response(200)
+        self.send_header("Content-Type", kind)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+from browser_pool import BrowserPool
+
+pool = BrowserPool()
+try:
+    pool.start()
+except Exception as e:
+    pool = None
+    print(f"SKIP live capture check (Chromium not available: {str(e).splitlines()[0][:80]})")
+
+if pool:
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    class StandIn(BrowserSite):
+        name = "stand-in"
+        url = f"http://127.0.0.1:{server.server_address[1]}/"
+        result_timeout_ms = 10000
+
+    try:
+        with pool.page() as page:
+            video = StandIn().generate(page, "stars")
+        if video != VIDEO:
+            failures.append("result should be captured from the page's request")
+        if hits.count("/out/result.mp4") != 1:
+            failures.append(f"result should be downloaded exactly once, hits {hits}")
+        if "/demo/landing.mp4" in hits:
+            failures.append("landing-page media should stay blocked")
+    finally:
+        pool.close()
+        server.shutdown()
+
+if failures:
+    for f in failures:
+        print("FAIL:", f)
+    sys.exit(2)
+print("PASS")
+sys.exit(0)
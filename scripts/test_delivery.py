@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""Test the delivery backends: Maildir / mbox / directory exports readable by standard
+tools, batched fsyncs, no network for disk backends, and SMTP through the outbox."""
+from pathlib import Path
+import os
+import sys
+import json
+import email
+import socket
+import mailbox
+import tempfile
+from email import policy
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+import delivery
+from mime_stream import MessageSpec
+from outbox import Outbox
+from smtp_standin import StandInSMTPServer
+
+failures = []
+
+
+def post_spec(video_path, n):
+    caption = f"Day {n}: the stars align ✨\nFrom here on, trust it.\n\n#AstroboliAI"
+    spec = MessageSpec("bot@example.com", "me@example.com", f"Your Daily Astroboli Post {n}",
+                       html=f"<p>{caption}</p>\nFrom the cosmos", meta={"kind": "post", "caption": caption,
+                                                                      "video_prompt": None})
+    spec.attach(b"\xff\xd8jpeg" * 100, "astroboli_post.jpg", "image/jpeg")
+    spec.attach(video_path, "astroboli_reel.mp4", "video/mp4")
+    return spec
+
+
+def body_of(message):
+    return message.get_body(("html",)).get_content()
+
+
+real_connect = socket.socket.connect
+
+
+def no_network(self, *args):
+    raise AssertionError("disk backend opened a network connection")
+
+
+with tempfile.TemporaryDirectory() as tmp:
+    video = os.path.join(tmp, "reel.mp4")
+    with open(video, "wb") as f:
+        f.write(os.urandom(100_000))
+    with open(video, "rb") as f:
+        video_bytes = f.read()
+
+    socket.socket.connect = no_network
+    try:
+        # Maildir: 5 posts, fsynced in batches of 2 (+ the final flush on close)
+        with delivery.open_backend("maildir", os.path.join(tmp, "Maildir"), fsync_batch=2) as box:
+            locations = [box.deliver(post_spec(video, n)) for n in range(5)]
+            if len(os.listdir(os.path.join(tmp, "Maildir", "new"))) != 4:
+                failures.append("maildir: only synced batches should be in new/")
+        if box.stats["batches"] != 3 or any(not os.path.isfile(p) for p in locations):
+            failures.append(f"maildir: expected 3 fsync batches and 5 messages in new/: {box.stats}")
+        if os.listdir(os.path.join(tmp, "Maildir", "tmp")):
+            failures.append("maildir: tmp/ should be empty after close")
+        md = mailbox.Maildir(os.path.join(tmp, "Maildir"), factory=None)
+        messages = sorted((email.message_from_bytes(md.get_bytes(key), policy=policy.default)
+                           for key in md.keys()), key=lambda m: m["Subject"])
+        if [m["Subject"] for m in messages] != [f"Your Daily Astroboli Post {n}" for n in range(5)]:
+            failures.append(f"maildir subjects wrong: {[m['Subject'] for m in messages]}")
+        attachments = {p.get_filename(): p.get_content() for p in messages[0].iter_attachments()}
+        if attachments.get("astroboli_reel.mp4") != video_bytes:
+            failures.append("maildir: reel did not survive")
+
+        # mbox: "From " lines in the body are quoted and come back intact
+        with delivery.open_backend("mbox", os.path.join(tmp, "out", "astroboli.mbox"), fsync_batch=10) as mb:
+            for n in range(3):
+                mb.deliver(post_spec(video, n))
+        if mb.stats["fsyncs"] != 1:
+            failures.append(f"mbox: 3 posts in one batch should need one fsync, got {mb.stats}")
+        parsed = list(mailbox.mbox(os.path.join(tmp, "out", "astroboli.mbox")))
+        if len(parsed) != 3:
+            failures.append(f"mbox: expected 3 messages, found {len(parsed)}")
+        else:
+            message = email.message_from_bytes(parsed[2].as_bytes(), policy=policy.default)
+            if "From the cosmos" not in body_of(message) or message["Subject"] != "Your Daily Astroboli Post 2":
+                failures.append("mbox: message 3 not read back correctly")
+
+        # dir: attachments + caption.txt + manifest.json per post, nothing half-written
+        with delivery.open_backend("dir", os.path.join(tmp, "posts")) as export:
+            folder = export.deliver(post_spec(video, 7))
+            if os.path.exists(folder):
+                failures.append("dir: folder should only appear once synced")
+        if sorted(os.listdir(folder)) != ["astroboli_post.jpg", "astroboli_reel.mp4", "caption.txt", "manifest.json"]:
+            failures.append(f"dir: wrong files {sorted(os.listdir(folder))}")
+        else:
+            with open(os.path.join(folder, "manifest.json"), encoding="utf-8") as f:
+                manifest = json.load(f)
+            with open(os.path.join(folder, "caption.txt"), encoding="utf-8") as f:
+                caption = f.read()
+            with open(os.path.join(folder, "astroboli_reel.mp4"), "rb") as f:
+                exported = f.read()
+            if manifest["kind"] != "post" or [e["file"] for e in manifest["files"]][1] != "astroboli_reel.mp4":
+                failures.append(f"dir: manifest wrong: {manifest}")
+            if not caption.startswith("Day 7: the stars align ✨") or exported != video_bytes:
+                failures.append("dir: caption or reel wrong")
+        if [n for n in os.listdir(os.path.join(tmp, "posts")) if n.startswith(".")]:
+            failures.append("dir: staging folders left behind")
+    finally:
+        socket.socket.connect = real_connect
+
+    try:
+        delivery.open_backend("fax", tmp)
+        failures.append("unknown backend should raise")
+    except Exception as e:
+        if "Unknown delivery backend" not in str(e):
+            failures.append(f"unexpected error for unknown backend: {e}")
+
+    # SMTP: spooled in the outbox, then sent to the stand-in server
+    import smtp_delivery
+    smtp_delivery.SMTP_HOST = "127.0.0.1"
+    with StandInSMTPServer() as server:
+        smtp_delivery.SMTP_PORT = server.port
+        smtp_delivery.SMTP_STARTTLS = False
+        smtp = delivery.open_backend("smtp", user="bot@example.com", password="x",
+                                     outbox=Outbox(os.path.join(tmp, "outbox")))
+        smtp.deliver(post_spec(video, 9))
+        smtp_delivery.get_session("bot@example.com", "x").close()
+        if len(server.messages) != 1 or Outbox(os.path.join(tmp, "outbox")).entries():
+            failures.append("smtp: post should be sent and removed from the outbox")
+
+if failures:
+    for f in failures:
+        print("FAIL:", f)
+    sys.exit(2)
+print("PASS")
+sys.exit(0)
@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""Test perceptual hashing and the near-duplicate image index."""
+from pathlib import Path
+import sys
+import tempfile
+import os
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+import numpy as np
+from PIL import Image, ImageFilter
+import image_dedup as dd
+
+rng = np.random.default_rng(3)
+
+
+def scene(seed):
+    r = np.random.default_rng(seed)
+    small = r.random((12, 12, 3)) * 255
+    return Image.fromarray(small.astype(np.uint8)).resize((512, 512), Image.Resampling.BICUBIC)
+
+
+failures = []
+
+# Popcount / Hamming against a pure-Python reference
+a = rng.integers(0, 2**63, size=200, dtype=np.uint64) * np.uint64(2) + rng.integers(0, 2, size=200, dtype=np.uint64)
+b = rng.integers(0, 2**63, size=200, dtype=np.uint64)
+expected = [bin(int(x) ^ int(y)).count("1") for x, y in zip(a, b)]
+if dd.hamming(a, b).tolist() != expected:
+    failures.append("hamming distance mismatch")
+
+original = scene(1)
+recompressed = original.filter(ImageFilter.GaussianBlur(1)).resize((1024, 1024))
+different = scene(2)
+
+with tempfile.TemporaryDirectory() as tmp:
+    path = os.path.join(tmp, "hashes.npy")
+    index = dd.ImageHashIndex(path, threshold=10)
+    index.add(original)
+    index.add(scene(5))
+
+    reloaded = dd.ImageHashIndex(path, threshold=10)
+    if len(reloaded) != 2 or os.path.getsize(path) > 200:
+        failures.append(f"index not persisted compactly ({len(reloaded)} entries, {os.path.getsize(path)} bytes)")
+
+    match = reloaded.find_duplicate(recompressed)
+    print("near-duplicate match:", match)
+    if not match or match[0] != 0:
+        failures.append("blurred/resized copy not detected as duplicate")
+
+    miss = reloaded.find_duplicate(different)
+    print("different image match:", miss, reloaded.nearest(dd.image_hashes(different)))
+    if miss:
+        failures.append("unrelated image flagged as duplicate")
+
+    # generate_image(record=False) (--mock runs) checks the history but never grows it
+    from io import BytesIO
+    import bot_core
+
+    def png(img):
+        buf = BytesIO()
+        img.save(buf, "PNG")
+        return buf.getvalue()
+
+    # Threads that ask for the histories at the same moment all get the same one
+    import threading
+
+    bot_core._image_history = bot_core._text_history = None
+    bot_core.IMAGE_HASH_INDEX = os.path.join(tmp, "shared_hashes.npy")
+    bot_core.TEXT_HISTORY_PATH = os.path.join(tmp, "text_history.jsonl")
+    barrier = threading.Barrier(4)
+    got = []
+
+    def load():
+        barrier.wait()
+        got.append((id(bot_core._get_image_history()), id(bot_core._get_text_history())))
+
+    threads = [threading.Thread(target=load) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    if len(set(got)) != 1:
+        failures.append(f"concurrent first calls created {len(set(got))} different histories")
+
+    bot_core._image_history = dd.ImageHashIndex(os.path.join(tmp, "bot_hashes.npy"), threshold=10)
+    bot_core._generate_image_once = lambda prompt: png(scene(7))
+    bot_core.generate_image("mock", record=False)
+    if len(bot_core._image_history):
+        failures.append("record=False added the image to the history")
+    bot_core.generate_image("real")
+    if len(bot_core._image_history) != 1:
+        failures.append("a real image was not added to the history")
+
+# Two worker processes share both histories (job_queue.py work --processes 2)
+import multiprocessing
+from text_history import TextHistory
+
+SEEDS = {0: [11, 12, 13, 14], 1: [21, 22, 23, 24]}
+
+
+def worker(n, tmp, barrier):
+    # Both open the histories before either writes, like long-running queue workers
+    index = dd.ImageHashIndex(os.path.join(tmp, "multi_hashes.npy"), threshold=10)
+    texts = TextHistory(os.path.join(tmp, "multi_text.jsonl"))
+    barrier.wait()
+    for seed in SEEDS[n]:
+        index.add(scene(seed))
+        texts.add(f"worker {n} line {seed}: the moon is moving through your chart", kind="line")
+
+
+with tempfile.TemporaryDirectory() as tmp:
+    ctx = multiprocessing.get_context("fork")
+    stale_index = dd.ImageHashIndex(os.path.join(tmp, "multi_hashes.npy"), threshold=10)
+    stale_texts = TextHistory(os.path.join(tmp, "multi_text.jsonl"))
+    barrier = ctx.Barrier(2)
+    procs = [ctx.Process(target=worker, args=(n, tmp, barrier)) for n in SEEDS]
+    for proc in procs:
+        proc.start()
+    for proc in procs:
+        proc.join(60)
+
+    total = sum(len(v) for v in SEEDS.values())
+    saved = dd.ImageHashIndex(os.path.join(tmp, "multi_hashes.npy"), threshold=10)
+    if len(saved) != total:
+        failures.append(f"two workers saved {len(saved)} of {total} image hashes")
+    leftovers = [name for name in os.listdir(tmp) if name.endswith(".tmp")]
+    if leftovers:
+        failures.append(f"temp files left behind: {leftovers}")
+    # An index opened before the workers ran still sees what they added
+    if not stale_index.find_duplicate(scene(23)) or stale_index.check_and_add(scene(12)) is None:
+        failures.append("an open index does not see hashes other processes added")
+    if len(stale_texts) != 0 or not stale_texts.find("worker 1 line 22: the moon is moving through your chart"):
+        failures.append("an open text history does not see lines other processes added")
+    if len(stale_texts) != total or len(TextHistory(os.path.join(tmp, "multi_text.jsonl"))) != total:
+        failures.append(f"text history has {len(stale_texts)} of {total} lines")
+    stale_texts.add("a fresh line from the parent process")
+    if len(TextHistory(os.path.join(tmp, "multi_text.jsonl"))) != total + 1 or len(stale_texts) != total + 1:
+        failures.append("appending after a refresh indexed a line twice or lost one")
+
+if failures:
+    for f in failures:
+        print("FAIL:", f)
+    sys.exit(2)
+print("PASS")
+sys.exit(0)
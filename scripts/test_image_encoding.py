@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+"""Test the JPEG quality search (byte budget and SSIM floor) on a synthetic image."""
+from pathlib import Path
+import io
+import sys
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+import numpy as np
+from PIL import Image
+import image_encoding as enc
+
+# Smooth gradient + noise so quality actually changes the size
+rng = np.random.default_rng(7)
+yy, xx = np.mgrid[0:540, 0:540]
+base = np.stack([xx * 255 / 540, yy * 255 / 540, (xx + yy) * 127 / 540], axis=-1)
+noise = rng.normal(0, 12, base.shape)
+img = Image.fromarray(np.clip(base + noise, 0, 255).astype(np.uint8))
+
+failures = []
+
+same = enc.ssim(img, img)
+if abs(same - 1.0) > 1e-9:
+    failures.append(f"SSIM of identical images should be 1.0, got {same}")
+
+full, full_info = enc.encode_jpeg(img)
+budget = len(full) // 3
+data, info = enc.encode_jpeg(img, target_bytes=budget)
+print("target:", budget, info)
+if info["size"] > budget or len(data) != info["size"]:
+    failures.append(f"byte budget not met: {info['size']} > {budget}")
+if info["quality"] >= full_info["quality"]:
+    failures.append("byte budget should lower the quality")
+if not info["met"]:
+    failures.append("a reachable budget should be reported as met")
+
+data, info = enc.encode_jpeg(img, target_bytes=500)
+if info["met"] or info["quality"] != 60 or info["size"] <= 500:
+    failures.append(f"an unreachable budget should be reported as missed: {info}")
+
+data, info = enc.encode_jpeg(img, min_ssim=0.95)
+print("ssim:", info)
+if info["ssim"] < 0.95:
+    failures.append(f"SSIM floor not met: {info['ssim']}")
+if info["size"] >= full_info["size"]:
+    failures.append("SSIM floor should shrink the output")
+
+data, info = enc.encode_jpeg(img, min_ssim=0.95, progressive=True, subsampling="4:4:4")
+if Image.open(io.BytesIO(data)).info.get("progressive") != 1:
+    failures.append("progressive flag not applied")
+
+try:
+    enc.encode_jpeg(img, subsampling="4:1:1")
+    failures.append("unknown subsampling should raise")
+except ValueError:
+    pass
+
+if failures:
+    for f in failures:
+        print("FAIL:", f)
+    sys.exit(2)
+print("PASS")
+sys.exit(0)
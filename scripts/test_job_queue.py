@@ -0,0 +1,257 @@
+#!/usr/bin/env python3
+"""Test the SQLite job queue: WAL mode, dependencies, leasing by type, retries with
+backoff, expired leases and heartbeats, failure cascades, the artifact store,
+several worker processes never running the same job twice, deliver jobs that
+spool a post once however often they are retried, and pruning finished runs."""
+from pathlib import Path
+import os
+import sys
+import time
+import tempfile
+import threading
+import multiprocessing
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+state = tempfile.TemporaryDirectory()
+os.environ["ASTROBOLI_STATE_DIR"] = state.name
+# Deliver jobs below: SMTP unreachable, no in-run retries, quick job retries
+os.environ.update(SMTP_HOST="127.0.0.1", SMTP_PORT="1", SMTP_STARTTLS="0", OUTBOX_RETRIES="0",
+                  JOB_BACKOFF_SECONDS="0.1", YOUR_EMAIL="bot@example.com", EMAIL_PASSWORD="x")
+
+import job_queue
+from job_queue import JobQueue, ArtifactStore
+
+failures = []
+
+
+def record(payload, inputs, store):
+    """Task for the worker processes: log which process ran the job."""
+    with open(payload["log"], "a", encoding="utf-8") as f:
+        f.write(f"{payload['n']} {os.getpid()}\n")
+    time.sleep(0.01)
+    return {"n": payload["n"], "got": [i["n"] for i in inputs]}
+
+
+def slow(payload, inputs, store):
+    time.sleep(payload["seconds"])
+    return {"artifact": store.put(b"slow result")}
+
+
+db = os.path.join(state.name, "jobs.sqlite")
+queue = JobQueue(db, lease_seconds=0.3, backoff_seconds=0.2)
+if queue._db().execute("PRAGMA journal_mode").fetchone()[0] != "wal":
+    failures.append("queue database should be in WAL mode")
+
+# Dependencies and leasing by type
+a = queue.submit("image", "__main__:record", {"n": 1}, "run-a")
+b = queue.submit("slide", "__main__:record", {"n": 2}, "run-a", after=[a])
+if queue.lease(["slide"], "w1") is not None:
+    failures.append("a job should not be leased before its dependency is done")
+job = queue.lease(["video"], "w1")
+if job is not None:
+    failures.append("workers should only get the job types they asked for")
+job = queue.lease(["image", "slide"], "w1")
+if job is None or job["id"] != a or not queue.complete(a, "w1", {"n": 1}):
+    failures.append("the ready image job should be leased and completed")
+job = queue.lease(["slide"], "w1")
+if job is None or job["id"] != b or job["inputs"] != [{"n": 1}]:
+    failures.append(f"the slide job should get its dependency's result: {job}")
+queue.complete(b, "w1", {"n": 2})
+
+# Retry with backoff, then give up and fail everything downstream
+c = queue.submit("content", "__main__:record", {}, "run-b", max_attempts=2)
+d = queue.submit("deliver", "__main__:record", {}, "run-b", after=[c])
+queue.lease(["content"], "w1")
+if queue.fail(c, "w1", "Gemini 503") != "queued" or queue.lease(["content"], "w1") is not None:
+    failures.append("a failed job should wait out its backoff before it is leased again")
+time.sleep(0.25)
+job = queue.lease(["content"], "w2")
+if job is None or job["attempts"] != 2:
+    failures.append(f"the job should be retried after the backoff: {job}")
+if queue.fail(c, "w2", "Gemini 503") != "failed" or queue.get(d)["state"] != "failed":
+    failures.append("after the last attempt the job and its dependents should fail")
+if not queue.finished("run-b") or queue.counts("run-b") != {"failed": 2}:
+    failures.append(f"run-b should be finished with 2 failed jobs: {queue.counts('run-b')}")
+
+# An expired lease is taken over; the old owner's result is refused
+e = queue.submit("video", "__main__:record", {}, "run-c")
+queue.lease(["video"], "crashed")
+time.sleep(0.35)
+job = queue.lease(["video"], "w3")
+if job is None or job["id"] != e or queue.complete(e, "crashed", {}):
+    failures.append("an expired lease should go to another worker and the old one can't complete")
+queue.complete(e, "w3", {})
+
+# Heartbeats keep a long job's lease; results land in the artifact store
+f = queue.submit("video", "__main__:slow", {"seconds": 0.8}, "run-d")
+job = queue.lease(["video"], "w4")
+stealer = {}
+thief = threading.Thread(target=lambda: (time.sleep(0.5), stealer.update(job=JobQueue(db, 0.3).lease(["video"], "w5"))))
+thief.start()
+job_queue.run_job(queue, job, ArtifactStore.for_queue(db), "w4")
+thief.join()
+result = queue.get(f)
+if stealer.get("job") is not None or result["state"] != "done":
+    failures.append("the heartbeat should keep the lease of a job that runs longer than the lease")
+elif ArtifactStore.for_queue(db).get(result["result"]["artifact"]) != b"slow result":
+    failures.append("the job's artifact should be readable from the store")
+store = ArtifactStore(os.path.join(state.name, "store"))
+if store.put(b"x" * 10) != store.put(b"x" * 10) or len(os.listdir(store.root)) != 1:
+    failures.append("identical artifacts should be stored once")
+
+# Several worker processes share one queue without running a job twice
+log = os.path.join(state.name, "ran.log")
+many = JobQueue(os.path.join(state.name, "many.sqlite"))
+for n in range(60):
+    many.submit("image", "__main__:record", {"n": n, "log": log}, "run-e")
+context = multiprocessing.get_context("fork")
+workers = [context.Process(target=job_queue.work, args=(["image"], many.path),
+                           kwargs={"exit_when_idle": True, "poll_seconds": 0.05}) for _ in range(4)]
+for w in workers:
+    w.start()
+for w in workers:
+    w.join(60)
+with open(log, encoding="utf-8") as fh:
+    runs = [line.split() for line in fh]
+ran = sorted(int(n) for n, _ in runs)
+if ran != list(range(60)) or many.counts("run-e") != {"done": 60}:
+    failures.append(f"every job should run exactly once: {len(ran)} runs, {many.counts('run-e')}")
+print(f"60 jobs over {len({pid for _, pid in runs})} worker process(es)")
+
+# Deliver jobs: a retried job spools its email once, and spooled (SMTP down) counts as done
+from io import BytesIO
+from PIL import Image
+import outbox
+import bot_core
+import carousel_bot
+
+
+def local_image(prompt, dedup=True, record=True):
+    buf = BytesIO()
+    Image.new("RGB", (1024, 1024), (60, 30, 90)).save(buf, "PNG")
+    return buf.getvalue()
+
+
+drain = outbox.Outbox.drain
+drain_errors = []
+
+
+def flaky_drain(self, send, **kwargs):
+    if drain_errors:  # The worker dies between spooling and sending
+        raise drain_errors.pop()
+    return drain(self, send, **kwargs)
+
+
+carousel_bot.generate_image = local_image
+outbox.Outbox.drain = flaky_drain
+posts_db = os.path.join(state.name, "posts.sqlite")
+run_id = carousel_bot.submit_jobs([None], [carousel_bot.current_run().brand], carousel_bot.parse_args(["--mock"]),
+                                  queue=JobQueue(posts_db), dated=False)
+drain_errors.append(ConnectionError("worker lost its network"))
+job_queue.work_inline(run_id, posts_db)
+spooled = bot_core.get_outbox().entries()
+deliver_job = [j for j in JobQueue(posts_db).jobs(run_id) if j["type"] == "deliver"][0]
+if len(spooled) != 1 or spooled[0]["key"] != deliver_job["payload"]["spool_key"]:
+    failures.append(f"a retried deliver job should spool its email once: {[e['id'] for e in spooled]}")
+if deliver_job["state"] != "done" or deliver_job["attempts"] != 2:
+    failures.append(f"deliver job should be done on its retry: {deliver_job['state']}, "
+                    f"attempts {deliver_job['attempts']}, {deliver_job['error']}")
+
+# Its texts go into the history once, when the post is handed over, not on every attempt
+store = ArtifactStore.for_queue(posts_db)
+jobs = {j["id"]: j for j in JobQueue(posts_db).jobs(run_id)}
+deps = JobQueue(posts_db)._db().execute("SELECT dep_id FROM deps WHERE job_id = ? ORDER BY position",
+                                        (deliver_job["id"],)).fetchall()
+inputs = [jobs[row["dep_id"]]["result"] for row in deps]
+payload = dict(deliver_job["payload"], mock=False, spool_key="real-post")
+history = bot_core._get_text_history()
+before = len(history)
+drain_errors.append(ConnectionError("worker lost its network"))
+try:
+    carousel_bot.job_deliver(payload, inputs, store)
+    failures.append("the first attempt should fail")
+except ConnectionError:
+    pass
+if len(history) != before:
+    failures.append("a failed deliver attempt should not add to the text history")
+carousel_bot.job_deliver(payload, inputs, store)
+if len(history) - before != 6 or len(bot_core.get_outbox().entries()) != 2:
+    failures.append(f"history grew by {len(history) - before}, outbox has "
+                    f"{len(bot_core.get_outbox().entries())} entries")
+outbox.Outbox.drain = drain
+
+# Retention: a finished run takes its job rows and the artifacts no other job uses with it
+import subprocess
+
+pruning = JobQueue(os.path.join(state.name, "prune", "jobs.sqlite"))
+store = ArtifactStore.for_queue(pruning.path)
+
+
+def finished_job(run, result, job_type="image"):
+    job_id = pruning.submit(job_type, "__main__:record", {}, run)
+    pruning.lease([job_type], "w1", run)
+    pruning.complete(job_id, "w1", result)
+
+
+def stored():
+    return {name for _, _, names in os.walk(store.root) for name in names if not name.endswith(".tmp")}
+
+
+only_old, shared = store.put(b"only in the old run"), store.put(b"in both runs")
+finished_job("old", {"raw": only_old, "slides": [shared]})
+finished_job("new", {"raw": shared})
+time.sleep(0.05)
+later = store.put(b"stored again after the old run ended")
+finished_job("old", {"raw": later}, job_type="slide")
+time.sleep(0.05)
+store.put(b"stored again after the old run ended")  # A newer run reuses the same content before recording its result
+if job_queue.prune_run(pruning, store, "old") != (2, 1) or stored() != {shared, later}:
+    failures.append(f"prune_run should delete the run's jobs and unshared artifacts: {stored()}")
+if pruning.jobs("old") or not pruning.jobs("new"):
+    failures.append("prune_run should delete only that run's jobs")
+
+busy = store.put(b"made while another run is busy")
+finished_job("done", {"raw": busy})
+pruning.submit("video", "__main__:record", {}, "busy")
+if job_queue.prune_run(pruning, store, "done") != (1, 0) or busy not in stored():
+    failures.append("artifacts should wait for the sweep while other jobs are open")
+if job_queue.prune_run(pruning, store, "busy") != (0, 0) or not pruning.jobs("busy"):
+    failures.append("a run with open jobs should not be pruned")
+
+if job_queue.prune(pruning, store, 3600)["runs"]:
+    failures.append("prune should keep runs newer than --older-than")
+with open(os.path.join(store.root, ".stale.tmp"), "wb") as f:
+    f.write(b"half an artifact")
+time.sleep(0.05)
+deleted = job_queue.prune(pruning, store, 0)  # Run "new"; then the sweep takes every unreferenced file
+if deleted != {"runs": 1, "jobs": 1, "artifacts": 4} or pruning.counts() != {"queued": 1} or stored():
+    failures.append(f"prune --older-than 0 should leave only the open run: {deleted} {pruning.counts()} {stored()}")
+if os.path.exists(os.path.join(store.root, ".stale.tmp")):
+    failures.append("prune should sweep stale temp files")
+if [job_queue.parse_age(t) for t in ("90", "30m", "12h", "7d")] != [90, 1800, 43200, 604800]:
+    failures.append("parse_age wrong")
+cli = subprocess.run([sys.executable, str(Path(__file__).resolve().parents[1] / "job_queue.py"), "--db", pruning.path,
+                      "prune", "--older-than", "1h"], capture_output=True, text=True)
+if cli.returncode != 0 or "Nothing to prune" not in cli.stdout:
+    failures.append(f"prune CLI: {cli.returncode} {cli.stdout} {cli.stderr[-300:]}")
+
+# The bots' default path: a run worked off inline is gone (rows and artifacts) once it succeeds
+inline_db = os.path.join(state.name, "inline", "jobs.sqlite")
+run_id = carousel_bot.submit_jobs([None], [carousel_bot.current_run().brand],
+                                  carousel_bot.parse_args(["--mock", "--delivery", "dir", "--delivery-path",
+                                                           os.path.join(state.name, "posts")]),
+                                  queue=JobQueue(inline_db), dated=False)
+code = job_queue.finish_run(run_id, path=inline_db)
+left = [name for _, _, names in os.walk(ArtifactStore.for_queue(inline_db).root) for name in names]
+if code != 0 or JobQueue(inline_db).counts() or left:
+    failures.append(f"finished run should be pruned: code {code}, {JobQueue(inline_db).counts()}, {len(left)} artifacts")
+if len(os.listdir(os.path.join(state.name, "posts"))) != 1:
+    failures.append("the delivered carousel must survive pruning its artifacts")
+
+state.cleanup()
+if failures:
+    for f in failures:
+        print("FAIL:", f)
+    sys.exit(2)
+print("PASS")
+sys.exit(0)
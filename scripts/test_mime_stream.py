@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""Test the streaming MIME writer: valid MIME out, dot-stuffing, flat peak memory,
+and a streamed send through the SMTP session to the stand-in server."""
+from pathlib import Path
+import os
+import sys
+import email
+import tempfile
+import tracemalloc
+from email import policy
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+import mime_stream
+from mime_stream import MessageSpec, iter_message, dot_stuffed, iter_base64
+from smtp_delivery import SMTPSession
+from smtp_standin import StandInSMTPServer
+
+failures = []
+
+with tempfile.TemporaryDirectory() as tmp:
+    video = os.path.join(tmp, "reel.mp4")
+    with open(video, "wb") as f:
+        f.write(os.urandom(3 * 1024 * 1024 + 7))  # Not a multiple of the chunk size
+    with open(video, "rb") as f:
+        video_bytes = f.read()
+    image = os.urandom(150_001)
+
+    spec = MessageSpec("bot@example.com", "me@example.com", "Astroboli Carousel Ready — Post ✨",
+                       html="<p>Caption ✨</p>\n.\n<p>.dot line</p>")
+    spec.attach(image, "astroboli_post.jpg", "image/jpeg")
+    spec.attach(video, "astroboli_reel.mp4", "video/mp4")
+    spec.attach(b"", "empty.bin")
+
+    raw = b"".join(iter_message(spec))
+    if any(len(line) > 998 for line in raw.split(b"\r\n")) or b"\n" in raw.replace(b"\r\n", b""):
+        failures.append("message must use CRLF lines under the 998-byte limit")
+    parsed = email.message_from_bytes(raw, policy=policy.default)
+    if parsed["Subject"] != spec.subject:
+        failures.append(f"subject not round-tripped: {parsed['Subject']!r}")
+    parts = list(parsed.iter_attachments())
+    if [p.get_filename() for p in parts] != ["astroboli_post.jpg", "astroboli_reel.mp4", "empty.bin"]:
+        failures.append(f"attachments wrong: {[p.get_filename() for p in parts]}")
+    elif parts[0].get_content() != image or parts[1].get_content() != video_bytes or parts[2].get_content():
+        failures.append("attachment content did not survive the base64 round trip")
+    if parsed.get_body(("html",)).get_content() != spec.html:
+        failures.append("html body wrong")
+
+    # Base64 is identical however the raw data is chunked
+    expected = b"".join(iter_base64([video_bytes]))
+    odd_chunks = (video_bytes[i:i + 1000] for i in range(0, len(video_bytes), 1000))
+    if b"".join(iter_base64(odd_chunks)) != expected:
+        failures.append("base64 output depends on chunking")
+
+    # Dot-stuffing: lines starting with "." get doubled, nothing else changes
+    stuffed = b"".join(dot_stuffed([b"a\r\n.\r\n..x\r\n", b".y\r\nb.c\r\n"]))
+    if stuffed != b"a\r\n..\r\n...x\r\n..y\r\nb.c\r\n":
+        failures.append(f"dot-stuffing wrong: {stuffed!r}")
+
+    # Peak memory stays flat: stream a 32 MB file vs. a 4 MB one
+    def peak_for(size):
+        path = os.path.join(tmp, f"big_{size}.bin")
+        with open(path, "wb") as f:
+            f.truncate(size)
+        big = MessageSpec("a@example.com", "b@example.com", "big").attach(path, "big.bin")
+        tracemalloc.start()
+        total = sum(len(piece) for piece in dot_stuffed(iter_message(big)))
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        return total, peak
+
+    small_total, small_peak = peak_for(4 * 1024 * 1024)
+    big_total, big_peak = peak_for(32 * 1024 * 1024)
+    print(f"peak memory: {small_peak // 1024}KB for 4MB, {big_peak // 1024}KB for 32MB "
+          f"({big_total // (1024 * 1024)}MB streamed)")
+    if big_peak > 1024 * 1024 or big_peak > small_peak * 2:
+        failures.append(f"peak memory grows with the attachment ({small_peak} -> {big_peak} bytes)")
+
+    # write_message (used for files on disk) writes exactly what iter_message yields
+    out = os.path.join(tmp, "out.eml")
+    with open(out, "wb") as f:
+        written = mime_stream.write_message(spec, f)
+    if written != os.path.getsize(out) or abs(written - len(raw)) > 64:  # Date / Message-ID vary
+        failures.append("write_message size mismatch")
+
+    # Streamed over SMTP: the stand-in receives the same message, dot lines intact
+    with StandInSMTPServer() as server, SMTPSession(host="127.0.0.1", port=server.port, starttls=False) as s:
+        s.send(spec)
+        received = email.message_from_bytes(server.messages[0][2], policy=policy.default)
+        got = {p.get_filename(): p.get_content() for p in received.iter_attachments()}
+        if got.get("astroboli_reel.mp4") != video_bytes or received.get_body(("html",)).get_content() != spec.html:
+            failures.append("message received over SMTP does not match")
+        if server.messages[0][1] != ["me@example.com"]:
+            failures.append(f"wrong envelope recipients: {server.messages[0][1]}")
+
+if failures:
+    for f in failures:
+        print("FAIL:", f)
+    sys.exit(2)
+print("PASS")
+sys.exit(0)
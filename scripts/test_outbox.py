@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""Test the durable outbox: spooled entries survive failed sends, are retried with
+backoff, end up in failed/ after max_attempts, and drain over SMTP to the stand-in."""
+from pathlib import Path
+import os
+import sys
+import email
+import tempfile
+from email import policy
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from outbox import Outbox, backoff_delay
+from mime_stream import MessageSpec
+from smtp_delivery import SMTPSession
+from smtp_standin import StandInSMTPServer
+
+failures = []
+
+
+def spec_with(video_path, n=0):
+    spec = MessageSpec("bot@example.com", "me@example.com", f"Astroboli Post {n} ✨", html="<p>Caption ✨</p>")
+    spec.attach(b"\xff\xd8jpeg-bytes", "astroboli_post.jpg", "image/jpeg")
+    spec.attach(video_path, "astroboli_reel.mp4", "video/mp4")
+    return spec
+
+
+with tempfile.TemporaryDirectory() as tmp:
+    video = os.path.join(tmp, "reel.mp4")
+    with open(video, "wb") as f:
+        f.write(os.urandom(200_000))
+    with open(video, "rb") as f:
+        video_bytes = f.read()
+    box = Outbox(os.path.join(tmp, "outbox"), max_attempts=3, backoff_seconds=60)
+
+    # put -> load round trip; the spooled copy outlives the original file
+    entry_id = box.put(spec_with(video), kind="post")
+    os.remove(video)
+    loaded = box.load(entry_id)
+    if (loaded.subject != "Astroboli Post 0 ✨" or loaded.to_addrs != ["me@example.com"]
+            or [a.filename for a in loaded.attachments] != ["astroboli_post.jpg", "astroboli_reel.mp4"]):
+        failures.append(f"loaded spec wrong: {loaded.subject!r} {[a.filename for a in loaded.attachments]}")
+    elif b"".join(loaded.attachments[1].iter_raw(65536)) != video_bytes:
+        failures.append("spooled video does not match the original")
+
+    # Half-written (hidden staging) directories and stray files are not entries
+    os.makedirs(os.path.join(box.root, ".20260101-000000-post-abc"))
+    os.makedirs(os.path.join(box.root, "junk"))
+    if [e["id"] for e in box.entries()] != [entry_id]:
+        failures.append(f"entries should list only the real entry: {box.entries()}")
+
+    # Flaky sender: fails twice, then works; the in-run retries back off 2 s, 4 s
+    calls, sleeps = [], []
+
+    def flaky(spec):
+        calls.append(spec.subject)
+        if len(calls) < 3:
+            raise ConnectionError("network down")
+
+    result = box.drain(flaky, retries=2, sleep=sleeps.append)
+    if result["sent"] != [entry_id] or sleeps != [2.0, 4.0] or box.entries():
+        failures.append(f"flaky send should succeed on the third try: {result}, sleeps {sleeps}")
+
+    # A send that keeps failing is rescheduled (not due until the backoff passes)
+    with open(video, "wb") as f:
+        f.write(video_bytes)
+    entry_id = box.put(spec_with(video, 1))
+
+    def down(spec):
+        raise ConnectionError("smtp unreachable")
+
+    result = box.drain(down, retries=1, sleep=lambda s: None)
+    state = box.entry(entry_id)
+    if result["failed"] != [entry_id] or state["attempts"] != 1 or "unreachable" not in state["last_error"]:
+        failures.append(f"failed drain should count one attempt: {result} {state}")
+    if box.due(state["next_attempt"] - 1) or not box.due(state["next_attempt"]):
+        failures.append("entry should only be due after its backoff")
+    if box.drain(down, retries=0)["failed"]:
+        failures.append("a normal drain must skip entries that are not due yet")
+    if [backoff_delay(n, 60) for n in (1, 2, 3)] != [60, 120, 240] or backoff_delay(30, 60) != 6 * 3600:
+        failures.append("backoff should double per attempt up to the cap")
+
+    # force (--flush-outbox) ignores the schedule; at max_attempts the entry moves to failed/
+    box.drain(down, retries=0, force=True)
+    box.drain(down, retries=0, force=True)
+    if box.entries() or not os.path.isfile(os.path.join(box.root, "failed", entry_id, "entry.json")):
+        failures.append("entry should move to failed/ after max_attempts")
+
+    # A second drain while one holds the lock does nothing
+    box.put(spec_with(video, 2))
+    held = box._lock()
+    if not box.drain(down)["locked"]:
+        failures.append("drain should report locked while another holds the outbox")
+    held.close()
+
+    # Real delivery: drain over an SMTP session to the stand-in server
+    with StandInSMTPServer() as server, SMTPSession(host="127.0.0.1", port=server.port, starttls=False,
+                                                    min_interval=0) as s:
+        result = box.drain(s.send, force=True)
+        if len(result["sent"]) != 1 or len(server.messages) != 1 or box.entries():
+            failures.append(f"drain over SMTP failed: {result}")
+        else:
+            received = email.message_from_bytes(server.messages[0][2], policy=policy.default)
+            got = {p.get_filename(): p.get_content() for p in received.iter_attachments()}
+            if got.get("astroboli_reel.mp4") != video_bytes or received["Subject"] != "Astroboli Post 2 ✨":
+                failures.append("message delivered from the outbox does not match")
+        print(f"outbox: delivered {result['sent']}, server {server.stats}")
+
+if failures:
+    for f in failures:
+        print("FAIL:", f)
+    sys.exit(2)
+print("PASS")
+sys.exit(0)
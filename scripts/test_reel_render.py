@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+"""Test the ffmpeg reel renderer: loop a short clip, pad to 1080x1920 and mux audio."""
+from pathlib import Path
+import sys
+import os
+import re
+import subprocess
+import tempfile
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+import reel_render as rr
+
+failures = []
+ff = rr.ffmpeg_exe()
+
+with tempfile.TemporaryDirectory() as tmp:
+    clip = os.path.join(tmp, "clip.mp4")
+    audio = os.path.join(tmp, "voice.mp3")
+    out = os.path.join(tmp, "reel.mp4")
+    # 2 s square test clip (has to be looped and padded) + 3 s tone
+    subprocess.run([ff, "-loglevel", "error", "-y", "-f", "lavfi", "-i", "testsrc=size=480x480:rate=24:duration=2",
+                    "-c:v", "libx264", "-preset", "ultrafast", clip], check=True)
+    subprocess.run([ff, "-loglevel", "error", "-y", "-f", "lavfi", "-i", "sine=frequency=440:duration=3",
+                    audio], check=True)
+
+    if abs(rr.media_duration(audio) - 3.0) > 0.1:
+        failures.append(f"media_duration wrong: {rr.media_duration(audio)}")
+
+    elapsed = rr.render_reel_ffmpeg(clip, audio, out, 4.0)
+    print(f"rendered in {elapsed:.2f}s, {os.path.getsize(out)} bytes")
+
+    banner = subprocess.run([ff, "-hide_banner", "-i", out], capture_output=True, text=True).stderr
+    if "1080x1920" not in banner:
+        failures.append("output is not 1080x1920")
+    if "Audio: aac" not in banner:
+        failures.append("audio track missing")
+    duration = rr.media_duration(out)
+    if abs(duration - 4.0) > 0.15:
+        failures.append(f"output duration {duration:.2f}s, expected 4.0s (loop + trim)")
+
+    # Silent render path
+    rr.render_reel_ffmpeg(clip, None, out, 3.0)
+    banner = subprocess.run([ff, "-hide_banner", "-i", out], capture_output=True, text=True).stderr
+    if "Audio:" in banner:
+        failures.append("silent render should have no audio track")
+
+    # In-memory path: clip and output as MemFiles, audio bytes piped on stdin
+    with open(clip, "rb") as f:
+        clip_bytes = f.read()
+    with open(audio, "rb") as f:
+        audio_bytes = f.read()
+    with rr.MemFile(clip_bytes) as video_file, rr.MemFile() as output:
+        rr.render_reel_ffmpeg(video_file, audio_bytes, output, 4.0, profile="draft")
+        data = output.read()
+        mem_path = output.path
+    if data[4:8] != b"ftyp" or b"moov" not in data[:4096]:
+        failures.append("in-memory render is not a faststart mp4")
+    if mem_path.startswith(tempfile.gettempdir()) and os.path.exists(mem_path):
+        failures.append("MemFile temp file not removed")
+
+    # Multi-format export from one decode pass
+    exported = rr.export_renditions(clip, audio, 3.0, ["reel", "square"], tmp, profile="draft")
+    for name, size in (("reel", "1080x1920"), ("square", "1080x1080")):
+        info = exported.get(name)
+        if not info or info["size"] <= 0:
+            failures.append(f"{name} rendition missing")
+            continue
+        banner = subprocess.run([ff, "-hide_banner", "-i", info["path"]], capture_output=True, text=True).stderr
+        if size not in banner:
+            failures.append(f"{name} rendition is not {size}")
+        if abs(rr.media_duration(info["path"]) - 3.0) > 0.15:
+            failures.append(f"{name} rendition duration wrong")
+    try:
+        rr.export_renditions(clip, audio, 3.0, ["imax"], tmp)
+        failures.append("unknown rendition should raise")
+    except ValueError:
+        pass
+
+    # Voice variants: one silent track, audio muxed with stream copy (trim and loop)
+    track = os.path.join(tmp, "track.mp4")
+    long_audio = os.path.join(tmp, "long.mp3")
+    subprocess.run([ff, "-loglevel", "error", "-y", "-f", "lavfi", "-i", "sine=frequency=330:duration=5",
+                    long_audio], check=True)
+    rr.render_reel_ffmpeg(clip, None, track, 4.0, profile="draft")
+    muxed = rr.mux_variants(track, {"short": (audio_bytes, 3.0), "long": (long_audio, 5.0)},
+                            tmp, track_duration=4.0, profile="draft")
+    for name, expected in (("short", 3.0), ("long", 5.0)):
+        info = muxed.get(name)
+        if not info:
+            failures.append(f"{name} variant missing")
+            continue
+        banner = subprocess.run([ff, "-hide_banner", "-i", info["path"]], capture_output=True, text=True).stderr
+        if "1080x1920" not in banner or "Audio: aac" not in banner:
+            failures.append(f"{name} variant should keep the 1080x1920 track and add aac audio")
+        if abs(rr.media_duration(info["path"]) - expected) > 0.2:
+            failures.append(f"{name} variant duration {rr.media_duration(info['path']):.2f}s, expected {expected}s")
+    cmd = rr.build_mux_command(track, audio, out, 5.0, track_duration=4.0)
+    if "copy" not in cmd or "-stream_loop" not in cmd:
+        failures.append("mux should stream-copy video and loop a short track")
+    if "-stream_loop" in rr.build_mux_command(track, audio, out, 3.0, track_duration=4.0):
+        failures.append("mux should only loop when the voiceover outlasts the track")
+
+    # Size budget: a noisy (high-motion) clip at CRF 18 overshoots; the VBV cap and the
+    # two-pass fit both bring it under the budget
+    noisy = os.path.join(tmp, "noisy.mp4")
+    subprocess.run([ff, "-loglevel", "error", "-y", "-f", "lavfi", "-i",
+                    "testsrc2=size=360x640:rate=24:duration=3,noise=alls=60:allf=t",
+                    "-c:v", "libx264", "-preset", "ultrafast", "-qp", "0", noisy], check=True)
+    sharp = dict(rr.get_profile("draft"), crf=18)
+    big = os.path.join(tmp, "big.mp4")
+    rr.render_reel_ffmpeg(noisy, audio, big, 3.0, width=360, height=640, profile=sharp, clip_duration=3.0)
+    budget = 200 * 1024
+    if os.path.getsize(big) <= budget:
+        failures.append(f"noisy test clip should overshoot the budget ({os.path.getsize(big)} bytes)")
+
+    capped = os.path.join(tmp, "capped.mp4")
+    rr.render_reel_ffmpeg(noisy, audio, capped, 3.0, width=360, height=640,
+                          profile=rr.capped_profile(sharp, budget, 3.0), clip_duration=3.0)
+    print(f"size budget {budget} bytes: uncapped {os.path.getsize(big)}, VBV-capped {os.path.getsize(capped)}")
+    if os.path.getsize(capped) > budget * 1.1:
+        failures.append(f"VBV-capped render {os.path.getsize(capped)} bytes, budget {budget}")
+
+    fitted = os.path.join(tmp, "fitted.mp4")
+    info = rr.fit_to_size(big, fitted, budget, 3.0, audio_bitrate=sharp["audio_bitrate"])
+    print(f"two-pass fit: {info['size']} bytes at {info['kbps']:.0f} kbps in {info['seconds']:.2f}s")
+    if info["size"] > budget or os.path.getsize(fitted) != info["size"]:
+        failures.append(f"fit_to_size left {info['size']} bytes over the {budget} budget")
+    banner = subprocess.run([ff, "-hide_banner", "-i", fitted], capture_output=True, text=True).stderr
+    if "Audio: aac" not in banner or abs(rr.media_duration(fitted) - 3.0) > 0.15:
+        failures.append("fitted reel should keep the audio and the duration")
+
+    try:
+        rr.render_reel_ffmpeg(os.path.join(tmp, "missing.mp4"), None, out + ".x.mp4", 1.0)
+        failures.append("missing input should raise")
+    except Exception:
+        pass
+
+# Encoding profiles
+args = rr.video_encoder_args("draft")
+if "ultrafast" not in args or "-crf" not in args:
+    failures.append(f"draft profile args wrong: {args}")
+args = rr.video_encoder_args(dict(rr.get_profile("standard"), bitrate="2M"))
+if "-b:v" not in args or "-crf" in args:
+    failures.append(f"bitrate profile should replace CRF: {args}")
+args = rr.video_encoder_args(rr.capped_profile("standard", 10 * 1000 * 1000, 20.0))
+if "-crf" not in args or args[args.index("-maxrate") + 1] != "3573k":
+    failures.append(f"capped profile should keep CRF and add a VBV cap: {args}")
+
+# Email budget math: base64 with MIME line breaks, as the email package encodes it
+import base64
+from email.mime.base import MIMEBase
+from email import encoders
+for n in (0, 1, 57, 1000, 123457):
+    part = MIMEBase("video", "mp4")
+    part.set_payload(os.urandom(n))
+    encoders.encode_base64(part)
+    if rr.base64_size(n) != len(part.get_payload().replace("\n", "\r\n")):
+        failures.append(f"base64_size({n}) = {rr.base64_size(n)}, email encodes {len(part.get_payload())}")
+if abs(len(base64.b64encode(b"x" * 3000)) - 4000) or rr.base64_size(3000) != 4000 + 2 * 53:
+    failures.append("base64_size should add a CRLF per 76 characters")
+limit, other = 25 * 1000 * 1000, 300 * 1000
+for videos in (1, 3):
+    per_video = rr.attachment_budget(limit, other, videos)
+    if other + videos * rr.base64_size(per_video) > limit:
+        failures.append(f"attachment_budget({videos}) overshoots the limit")
+    if other + videos * rr.base64_size(per_video) < limit * 0.98:
+        failures.append(f"attachment_budget({videos}) wastes more than 2% of the limit")
+
+try:
+    rr.get_profile("cinema")
+    failures.append("unknown profile should raise")
+except ValueError:
+    pass
+
+if failures:
+    for f in failures:
+        print("FAIL:", f)
+    sys.exit(2)
+print("PASS")
+sys.exit(0)
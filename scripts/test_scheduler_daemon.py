@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+"""Test the scheduler daemon: cron matching, one catch-up run after a missed slot,
+runs serialized on one warm worker thread, and the Unix control socket."""
+from pathlib import Path
+import os
+import sys
+import time
+import tempfile
+import datetime
+import threading
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+state = tempfile.TemporaryDirectory()
+os.environ["ASTROBOLI_STATE_DIR"] = state.name
+
+import scheduler_daemon as sd
+from scheduler_daemon import CronSchedule
+
+failures = []
+at = datetime.datetime
+
+# Cron: next_after
+cases = [
+    ("0 10 * * *", at(2026, 10, 19, 9, 59, 30), at(2026, 10, 19, 10, 0)),
+    ("0 10 * * *", at(2026, 10, 19, 10, 0), at(2026, 10, 20, 10, 0)),
+    ("0 11 * * 0", at(2026, 10, 19, 12, 0), at(2026, 10, 25, 11, 0)),    # Monday -> Sunday
+    ("0 11 * * 7", at(2026, 10, 19, 12, 0), at(2026, 10, 25, 11, 0)),    # 7 is Sunday too
+    ("*/15 * * * *", at(2026, 10, 19, 9, 46), at(2026, 10, 19, 10, 0)),
+    ("30 8-9 * * 1-5", at(2026, 10, 23, 9, 30), at(2026, 10, 26, 8, 30)),  # Friday -> Monday
+    ("0 0 29 2 *", at(2026, 3, 1), at(2028, 2, 29, 0, 0)),
+    ("0 12 1,15 * 3", at(2026, 10, 19), at(2026, 10, 21, 12, 0)),        # day OR weekday
+]
+for expression, after, expected in cases:
+    got = CronSchedule(expression).next_after(after)
+    if got != expected:
+        failures.append(f"'{expression}' after {after}: expected {expected}, got {got}")
+for bad in ("0 10 * *", "61 * * * *", "* * * * */0"):
+    try:
+        CronSchedule(bad)
+        failures.append(f"'{bad}' should be rejected")
+    except ValueError:
+        pass
+
+# Worker: a missed slot fires once, runs never overlap, all on one thread
+lock = threading.Lock()
+log = []
+active = [0]
+
+
+def fake_job(argv):
+    with lock:
+        active[0] += 1
+        log.append((threading.current_thread().name, active[0], list(argv)))
+    time.sleep(0.05)
+    with lock:
+        active[0] -= 1
+    return 3 if "--fail" in argv else 0
+
+
+sd.JOBS["fake"] = fake_job
+sd.warm_up = lambda browser=False: 0.0
+scheduler = sd.Scheduler({"fake": (CronSchedule("0 10 * * *"), ["--cron"])}, warm_browser=False).start()
+scheduler.next_runs["fake"] = datetime.datetime.now() - datetime.timedelta(days=3)  # Slept through 3 slots
+scheduler._wake.set()
+time.sleep(0.2)  # Let the clock thread notice
+manual = [scheduler.submit("fake", ["--n", str(i)]) for i in range(3)]
+failed = scheduler.submit("fake", ["--fail"])
+if scheduler.wait(failed["id"], timeout=5)["code"] != 3:
+    failures.append("exit code of a run should be recorded")
+cron_runs = [entry for entry in log if entry[2] == ["--cron"]]
+if len(cron_runs) != 1:
+    failures.append(f"missed slots should collapse into one run, got {len(cron_runs)}")
+if {name for name, _, _ in log} != {"daemon-worker"} or max(depth for _, depth, _ in log) != 1:
+    failures.append(f"runs should be serialized on the worker thread: {log}")
+if [entry[2] for entry in log if entry[2][:1] == ["--n"]] != [["--n", "0"], ["--n", "1"], ["--n", "2"]]:
+    failures.append("manual runs should run in submission order")
+if scheduler.next_runs["fake"] <= datetime.datetime.now():
+    failures.append("next run should be in the future after catching up")
+
+# Control socket: status / run / wait / errors, owner-only
+socket_path = os.path.join(state.name, "daemon.sock")
+server = sd.ControlServer(socket_path, scheduler)
+threading.Thread(target=server.serve_forever, kwargs={"poll_interval": 0.1}, daemon=True).start()
+try:
+    if os.stat(socket_path).st_mode & 0o077:
+        failures.append(f"socket should be owner-only: {oct(os.stat(socket_path).st_mode)}")
+    queued = sd.send_command(socket_path, "run fake --n 'two words'")
+    result = sd.send_command(socket_path, f"wait {queued.get('queued')}", timeout=5)
+    if result.get("code") != 0 or result.get("args") != ["--n", "two words"] or result.get("seconds") is None:
+        failures.append(f"run over the socket wrong: {queued} {result}")
+    status = sd.send_command(socket_path, "status", timeout=5)
+    if status["schedules"]["fake"]["cron"] != "0 10 * * *" or len(status["finished"]) != 6:
+        failures.append(f"status wrong: {status}")
+    if "error" not in sd.send_command(socket_path, "run nosuchjob") or \
+            "error" not in sd.send_command(socket_path, "dance"):
+        failures.append("bad commands should get an error reply")
+    try:
+        sd.ControlServer(socket_path, scheduler)
+        failures.append("a second daemon on a live socket should be refused")
+    except Exception as e:
+        if "already listening" not in str(e):
+            failures.append(f"unexpected error for a live socket: {e}")
+    sd.send_command(socket_path, "stop")
+finally:
+    server.server_close()
+    scheduler.stop(timeout=5)
+
+# A failing warm-up is recorded and the worker keeps running runs (cold)
+def broken_warm_up(browser=False):
+    raise OSError("image_hashes.npy: permission denied")
+
+
+sd.warm_up = broken_warm_up
+scheduler = sd.Scheduler({}, warm_browser=False).start()
+try:
+    run = scheduler.submit("fake", ["--after-failed-warm-up"])
+    done = scheduler.wait(run["id"], timeout=5)
+    status = scheduler.status()
+    if done["code"] != 0 or "permission denied" not in (status["warm_error"] or ""):
+        failures.append(f"worker should survive a failed warm-up: code {done['code']}, status {status['warm_error']}")
+finally:
+    scheduler.stop(timeout=5)
+try:
+    scheduler.submit("fake", [])
+    failures.append("a stopped daemon should refuse new runs instead of queueing them forever")
+except RuntimeError:
+    pass
+sd.warm_up = lambda browser=False: 0.0
+
+# A multi-day run from the daemon makes its reels on the daemon's worker thread (Playwright's thread)
+from io import BytesIO
+from PIL import Image
+import daily_bot
+
+reel_threads = []
+
+
+def local_image(prompt, dedup=True, record=True):
+    buf = BytesIO()
+    Image.new("RGB", (1024, 1024), (60, 30, 90)).save(buf, "PNG")
+    return buf.getvalue()
+
+
+def no_reel(*args, **kwargs):
+    reel_threads.append(threading.current_thread().name)
+    return None, None
+
+
+daily_bot.generate_image = local_image
+daily_bot.make_post_videos = no_reel
+out = os.path.join(state.name, "week")
+scheduler = sd.Scheduler({}, warm_browser=False).start()
+try:
+    run = scheduler.submit("post", ["--mock", "--days", "2", "--start", "2026-11-01", "--out", out])
+    code = scheduler.wait(run["id"], timeout=120)["code"]
+    if code != 0 or reel_threads != ["daemon-worker", "daemon-worker"]:
+        failures.append(f"backfill reels should run on the daemon worker: code {code}, threads {reel_threads}")
+finally:
+    scheduler.stop(timeout=5)
+
+state.cleanup()
+if failures:
+    for f in failures:
+        print("FAIL:", f)
+    sys.exit(2)
+print("PASS")
+sys.exit(0)
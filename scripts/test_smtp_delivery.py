@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""Test the reusable SMTP session against the stand-in server: one login per batch,
+NOOP liveness checks, transparent reconnects and rate-limited queue sends."""
+from pathlib import Path
+import sys
+import time
+import smtplib
+from email.mime.text import MIMEText
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from smtp_delivery import SMTPSession, DeliveryQueue
+from smtp_standin import StandInSMTPServer
+
+failures = []
+
+
+def message(n):
+    msg = MIMEText(f"Body {n}\n.\n..leading dots survive\n")
+    msg["From"] = "bot@example.com"
+    msg["To"] = "me@example.com"
+    msg["Subject"] = f"Post {n}"
+    return msg
+
+
+with StandInSMTPServer(users={"bot@example.com": "app-password"}) as server:
+    def session(**kw):
+        return SMTPSession("bot@example.com", kw.pop("password", "app-password"), host="127.0.0.1",
+                           port=server.port, starttls=False, **kw)
+
+    # A batch over one connection: one TCP connect, one AUTH, rate limited
+    with session(min_interval=0.1) as s:
+        queue = DeliveryQueue(s)
+        for n in range(5):
+            queue.put(message(n))
+        start = time.perf_counter()
+        results = queue.flush()
+        elapsed = time.perf_counter() - start
+        if [error for _, error in results if error]:
+            failures.append(f"batch send failed: {results}")
+        if server.stats["connections"] != 1 or server.stats["logins"] != 1:
+            failures.append(f"batch should reuse one login, server saw {server.stats}")
+        if elapsed < 0.4:
+            failures.append(f"5 sends at 0.1 s spacing took only {elapsed:.2f}s")
+        if len(server.messages) != 5 or b"..leading dots" not in server.messages[0][2]:
+            failures.append("messages missing or dot-stuffing broken")
+        print(f"batch: 5 messages in {elapsed:.2f}s, server {server.stats}")
+
+        # Idle connection checked with NOOP before the next send
+        s.noop_after = 0.0
+        s.send(message(5))
+        if s.stats["noops"] < 1 or server.stats["noops"] < 1:
+            failures.append("idle connection should be checked with NOOP")
+
+        # Server drops the connection: the NOOP notices and the session reconnects
+        server.drop_connections()
+        time.sleep(0.1)
+        s.send(message(6))
+        if s.stats["reconnects"] != 1 or server.stats["connections"] != 2:
+            failures.append(f"dropped connection should reconnect once: {s.stats}")
+
+        # Dropped without the NOOP check: the failed send is retried on a new connection
+        s.noop_after = 3600
+        server.drop_connections()
+        time.sleep(0.1)
+        s.send(message(7))
+        if s.stats["reconnects"] != 2 or len(server.messages) != 8:
+            failures.append(f"send on a dead connection should reconnect and resend: {s.stats}")
+        print(f"reconnects: {s.stats}")
+
+    # Bad credentials are an error, not a reconnect loop
+    try:
+        session(password="wrong").send(message(8))
+        failures.append("wrong password should raise")
+    except smtplib.SMTPAuthenticationError:
+        pass
+
+    # One refused message does not stop the queue
+    with session(min_interval=0) as s:
+        queue = DeliveryQueue(s)
+        queue.put(message(9), label="first")
+        bad = message(10)
+        del bad["To"]
+        queue.put(bad, label="no recipient")
+        queue.put(message(11), label="last")
+        results = queue.flush()
+        if [label for label, error in results if error] != ["no recipient"]:
+            failures.append(f"queue should report only the bad message: {results}")
+
+if failures:
+    for f in failures:
+        print("FAIL:", f)
+    sys.exit(2)
+print("PASS")
+sys.exit(0)
@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""Startup benchmark: cold-start imports of both bots for `--dry-run --mock`.
+
+Runs each entry point under `python -X importtime` and fails when
+  - a heavy dependency (Gemini SDK, NumPy, Pillow, requests, smtplib/email MIME,
+    edge-tts, moviepy, Playwright, python-dotenv without a .env) is imported, or
+  - the total import time goes over STARTUP_IMPORT_BUDGET_MS (best of a few runs).
+"""
+from pathlib import Path
+import os
+import sys
+import subprocess
+import tempfile
+
+ROOT = Path(__file__).resolve().parents[1]
+BUDGET_MS = float(os.environ.get("STARTUP_IMPORT_BUDGET_MS", "250"))
+RUNS = 3
+
+HEAVY_MODULES = (
+    "google.generativeai", "numpy", "PIL", "requests", "smtplib", "email.mime",
+    "edge_tts", "moviepy", "playwright", "image_dedup", "text_history", "image_encoding",
+    "video_jobs", "tts_engine",
+)
+if not (ROOT / ".env").is_file():
+    HEAVY_MODULES += ("dotenv",)
+
+ENTRY_POINTS = [
+    ("daily_bot.py", ["--dry-run", "--mock"]),
+    ("carousel_bot.py", ["--dry-run", "--mock"]),
+]
+
+
+def import_profile(script, args):
+    """Run one cold start; returns (exit code, {top-level module: cumulative us}, all module names)."""
+    with tempfile.TemporaryDirectory() as cwd:  # No stray .env in the working directory
+        proc = subprocess.run(
+            [sys.executable, "-X", "importtime", str(ROOT / script)] + args,
+            capture_output=True, text=True, cwd=cwd,
+        )
+    top_level, names = {}, []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|", 2)
+        if not cumulative.strip().isdigit():
+            continue  # Header line
+        names.append(name.strip())
+        if not name[1:].startswith(" "):  # Imported directly by the script, not nested
+            top_level[name.strip()] = int(cumulative)
+    return proc.returncode, top_level, names
+
+
+failures = []
+for script, args in ENTRY_POINTS:
+    best = None
+    for _ in range(RUNS):
+        code, top_level, names = import_profile(script, args)
+        if code != 0:
+            failures.append(f"{script} {' '.join(args)} exited with {code}")
+            break
+        heavy = sorted({n for n in names for h in HEAVY_MODULES if n == h or n.startswith(h + ".")})
+        if heavy:
+            failures.append(f"{script} imports heavy modules at startup: {', '.join(heavy[:8])}")
+            break
+        total_ms = sum(top_level.values()) / 1000
+        best = total_ms if best is None else min(best, total_ms)
+    if best is None:
+        continue
+    slowest = sorted(top_level.items(), key=lambda kv: -kv[1])[:3]
+    print(f"{script}: {best:.0f} ms of imports (budget {BUDGET_MS:.0f} ms); slowest: "
+          + ", ".join(f"{name} {us / 1000:.0f} ms" for name, us in slowest))
+    if best > BUDGET_MS:
+        failures.append(f"{script} import time {best:.0f} ms is over the {BUDGET_MS:.0f} ms budget")
+
+if failures:
+    for f in failures:
+        print("FAIL:", f)
+    sys.exit(2)
+print("PASS")
+sys.exit(0)
@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""Test the MinHash/LSH posted-text history (near-duplicate lookup + persistence)."""
+from pathlib import Path
+import sys
+import os
+import time
+import tempfile
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+import text_history as th
+
+failures = []
+
+hook = th.caption_hook(
+    "The cosmos crowns you with infinite potential today. Trust it. ✨ Visit astroboli.com for your reading 🌙\n\n"
+    "#AstroboliAI #Astrology"
+)
+if hook != "The cosmos crowns you with infinite potential today.":
+    failures.append(f"caption_hook returned {hook!r}")
+
+with tempfile.TemporaryDirectory() as tmp:
+    path = os.path.join(tmp, "history.jsonl")
+    history = th.TextHistory(path, threshold=0.6)
+    history.add_many([
+        "Trust the timing of your life.",
+        "What you seek is seeking you.",
+    ], kind="slide")
+    # Filler so the lookup has something to search through
+    history.add_many([f"Line number {i} about moon phase {i * 7} and house {i % 12}" for i in range(3000)], kind="slide")
+
+    reloaded = th.TextHistory(path, threshold=0.6)
+    if len(reloaded) != 3002:
+        failures.append(f"history not persisted: {len(reloaded)} entries")
+
+    if not reloaded.find("Trust the timing of your life!"):
+        failures.append("punctuation variant not detected")
+    if not reloaded.find("trust the timing of your  life"):
+        failures.append("case/spacing variant not detected")
+    if reloaded.find("The stars don't decide your path. You do."):
+        failures.append("unrelated line flagged")
+
+    lines = ["What you seek is seeking you", "Your intuition is the universe whispering."]
+    if reloaded.collisions(lines) != ["What you seek is seeking you"]:
+        failures.append(f"collisions() wrong: {reloaded.collisions(lines)}")
+
+    if reloaded.recent(1, kind="slide") != ["Line number 2999 about moon phase 20993 and house 11"]:
+        failures.append(f"recent() wrong: {reloaded.recent(1)}")
+
+    start = time.perf_counter()
+    for _ in range(200):
+        reloaded.find("Trust the timing of your life.")
+    per_lookup_ms = (time.perf_counter() - start) / 200 * 1000
+    print(f"lookup: {per_lookup_ms:.3f} ms with {len(reloaded)} entries")
+    if per_lookup_ms > 5:
+        failures.append(f"lookup too slow: {per_lookup_ms:.2f} ms")
+
+prompt = th.avoid_prompt(["Trust the timing of your life.", "Trust the timing of your life."])
+if prompt.count("Trust the timing") != 1:
+    failures.append("avoid_prompt should list each line once")
+
+if failures:
+    for f in failures:
+        print("FAIL:", f)
+    sys.exit(2)
+print("PASS")
+sys.exit(0)
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""Test the segmented TTS engine: sentence cache, concurrent synthesis and crossfaded join."""
+from pathlib import Path
+import sys
+import os
+import asyncio
+import subprocess
+import tempfile
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+import tts_engine
+from reel_render import ffmpeg_exe
+
+calls = []
+active = {"now": 0, "peak": 0}
+
+
+async def fake_stream_tts(text, voice=None, rate=None, pitch=None):
+    """Stand-in for edge-tts: a tone whose length depends on the sentence."""
+    calls.append(text)
+    active["now"] += 1
+    active["peak"] = max(active["peak"], active["now"])
+    await asyncio.sleep(0.05)
+    duration = 0.5 + len(text) / 100
+    proc = subprocess.run(
+        [ffmpeg_exe(), "-loglevel", "error", "-f", "lavfi", "-i", f"sine=frequency=300:duration={duration}",
+         "-ar", "24000", "-ac", "1", "-f", "mp3", "pipe:1"],
+        capture_output=True, check=True,
+    )
+    active["now"] -= 1
+    return proc.stdout, duration
+
+
+tts_engine.stream_tts = fake_stream_tts
+failures = []
+
+split = tts_engine.split_sentences("Welcome to Astro Boli. The stars align today.. Visit astroboli dot com for your complete reading.")
+if split != ["Welcome to Astro Boli.", "The stars align today.", "Visit astroboli dot com for your complete reading."]:
+    failures.append(f"split_sentences wrong: {split}")
+
+with tempfile.TemporaryDirectory() as cache:
+    engine = tts_engine.TTSEngine(cache, voice="en-US-AvaMultilingualNeural")
+
+    day1 = "Welcome to Astro Boli. The stars align today. Visit astroboli dot com for your complete reading."
+    audio, duration, stats = asyncio.run(engine.synthesize(day1))
+    print("day 1:", stats, f"{duration:.2f}s")
+    if stats["synthesized"] != 3 or active["peak"] < 2:
+        failures.append(f"uncached sentences should be synthesized concurrently (peak {active['peak']})")
+    if audio[:4] != b"RIFF":
+        failures.append("joined audio should be WAV")
+    expected = sum(0.5 + len(s) / 100 for s in split)
+    if not (expected - 0.5 < duration <= expected + 0.05):
+        failures.append(f"joined duration {duration:.2f}s, expected about {expected:.2f}s")
+
+    calls.clear()
+    day2 = "Welcome to Astro Boli. Your intuition is the universe whispering. Visit astroboli dot com for your complete reading."
+    audio, duration, stats = asyncio.run(engine.synthesize(day2))
+    print("day 2:", stats, calls)
+    if calls != ["Your intuition is the universe whispering."]:
+        failures.append(f"only the middle sentence should hit the network, got {calls}")
+
+    # A different voice must not reuse the cache
+    calls.clear()
+    other = tts_engine.TTSEngine(cache, voice="en-US-EmmaMultilingualNeural")
+    asyncio.run(other.synthesize("Welcome to Astro Boli."))
+    if calls != ["Welcome to Astro Boli."]:
+        failures.append("cache key must include the voice")
+
+    engine.prune(max_segments=2)
+    remaining = [f for f in os.listdir(cache) if f.endswith(".mp3")]
+    if len(remaining) != 2:
+        failures.append(f"prune left {len(remaining)} segments")
+
+if failures:
+    for f in failures:
+        print("FAIL:", f)
+    sys.exit(2)
+print("PASS")
+sys.exit(0)
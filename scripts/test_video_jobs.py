@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""Test the async video job manager with in-process stand-in providers (no network)."""
+from pathlib import Path
+import sys
+import time
+import threading
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+import video_jobs
+
+video_jobs.MIN_POLL_SECONDS = 0.01
+failures = []
+VIDEO = b"\x00\x00\x00\x18ftypmp42" + b"\x00" * 2000
+
+
+class StandIn(video_jobs.VideoProvider):
+    """Finishes after `polls` polls (never if None) and records every call."""
+
+    def __init__(self, name, polls=None, video=VIDEO, interval=0.02, retry_after=None, errors=()):
+        super().__init__(api_key="test")
+        self.name, self.polls, self.video = name, polls, video
+        self.poll_interval, self.retry_after = interval, retry_after
+        self.errors = list(errors)  # Raised by the first polls, like a dropped connection
+        self.submitted, self.cancelled, self.poll_times = [], [], []
+        self.lock = threading.Lock()
+
+    def submit(self, prompt, duration, webhook=None):
+        self.submitted.append(prompt)
+        return {"id": f"{self.name}-1"}
+
+    def poll(self, handle):
+        with self.lock:
+            self.poll_times.append(time.monotonic())
+            count = len(self.poll_times)
+            if self.errors:
+                raise self.errors.pop(0)
+        if self.polls is not None and count >= self.polls:
+            return {"state": "done", "url": f"https://example.invalid/{self.name}.mp4"}
+        return {"state": "pending", "retry_after": self.retry_after}
+
+    def cancel(self, handle):
+        self.cancelled.append(handle["id"])
+
+    def download(self, url):
+        return self.video
+
+
+def is_video(data):
+    return data[4:8] == b"ftyp"
+
+
+# First valid video wins, the still-running job is cancelled
+fast, slow = StandIn("fast", polls=3), StandIn("slow")
+start = time.monotonic()
+winner = video_jobs.download_first_video([slow, fast], "stars", 5, validate=is_video, timeout=5)
+if not winner or winner[0] != "fast":
+    failures.append(f"fast provider should win, got {winner and winner[0]}")
+if slow.cancelled != ["slow-1"]:
+    failures.append("losing job should be cancelled through the provider API")
+if fast.cancelled:
+    failures.append("winning job must not be cancelled")
+if time.monotonic() - start > 2:
+    failures.append("race should return as soon as one job finishes")
+
+# An invalid result does not win; the next valid video does
+bad, good = StandIn("bad", polls=1, video=b"\xff\xd8" + b"\x00" * 2000), StandIn("good", polls=4)
+winner = video_jobs.download_first_video([bad, good], "stars", 5, validate=is_video, timeout=5)
+if not winner or winner[0] != "good":
+    failures.append("invalid video should be skipped")
+
+# Retry-After is honoured between polls
+patient = StandIn("patient", polls=3, retry_after=0.25)
+video_jobs.download_first_video([patient], "stars", 5, timeout=5)
+gaps = [b - a for a, b in zip(patient.poll_times, patient.poll_times[1:])]
+if not gaps or min(gaps) < 0.24:
+    failures.append(f"Retry-After not honoured: gaps {gaps}")
+
+# top-k only submits to the first k providers
+first, second = StandIn("first", polls=1), StandIn("second", polls=1)
+video_jobs.download_first_video([first, second], "stars", 5, top_k=1, timeout=5)
+if not first.submitted or second.submitted:
+    failures.append("top_k=1 should only submit to the first provider")
+
+# Nothing finishes in time -> None, and every job is cancelled
+stuck_a, stuck_b = StandIn("a"), StandIn("b")
+if video_jobs.download_first_video([stuck_a, stuck_b], "stars", 5, timeout=0.3) is not None:
+    failures.append("timeout should return None")
+if stuck_a.cancelled != ["a-1"] or stuck_b.cancelled != ["b-1"]:
+    failures.append("timed-out jobs should be cancelled")
+
+# A poll that fails once (connection reset) is retried; the healthy job is not cancelled
+flaky = StandIn("flaky", polls=3, errors=[ConnectionResetError("connection reset by peer")])
+winner = video_jobs.download_first_video([flaky], "stars", 5, validate=is_video, timeout=5)
+if not winner or winner[0] != "flaky" or flaky.cancelled:
+    failures.append(f"a transient poll error should be retried: {winner and winner[0]}, cancelled {flaky.cancelled}")
+
+# A poll that keeps failing gives up at the deadline and cancels the remote job
+broken = StandIn("broken", polls=3, errors=[OSError("name resolution failed")] * 100)
+if video_jobs.download_first_video([broken], "stars", 5, timeout=0.3) is not None or broken.cancelled != ["broken-1"]:
+    failures.append(f"a job that cannot be polled should be cancelled when giving up: {broken.cancelled}")
+
+# Retry-After header parsing
+if video_jobs.parse_retry_after("12") != 12.0:
+    failures.append("delta-seconds Retry-After")
+if abs(video_jobs.parse_retry_after("Thu, 01 Jan 2026 00:00:30 GMT", now=1767225600) - 30) > 0.01:
+    failures.append("HTTP-date Retry-After")
+if video_jobs.parse_retry_after("soon") is not None or video_jobs.parse_retry_after(None) is not None:
+    failures.append("bad Retry-After should be None")
+
+if failures:
+    for f in failures:
+        print("FAIL:", f)
+    sys.exit(2)
+print("PASS")
+sys.exit(0)
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""Test the MP4/WebM container probe against test_reel.mp4 and ffmpeg-generated clips."""
+from pathlib import Path
+import sys
+import os
+import subprocess
+import tempfile
+import warnings
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+import video_probe
+from reel_render import ffmpeg_exe, loop_count
+
+failures = []
+ff = ffmpeg_exe()
+
+
+def check(name, info, **expected):
+    for key, value in expected.items():
+        got = info.get(key)
+        ok = abs(got - value) < 0.05 if isinstance(value, float) and got is not None else got == value
+        if not ok:
+            failures.append(f"{name}: {key} = {got!r}, expected {value!r}")
+
+
+# Reference reel: faststart MP4, H.264 + AAC
+info = video_probe.probe_file(str(ROOT / "test_reel.mp4"))
+check("test_reel.mp4", info, container="mp4", duration=10.29, width=1080, height=1920,
+      codec="avc1", fps=24.0, has_video=True)
+if [t["type"] for t in info["tracks"]] != ["video", "audio"]:
+    failures.append(f"test_reel.mp4 tracks: {info['tracks']}")
+
+with tempfile.TemporaryDirectory() as tmp:
+    def make(name, *args):
+        path = os.path.join(tmp, name)
+        subprocess.run([ff, "-loglevel", "error", "-y", *args, path], check=True)
+        with open(path, "rb") as f:
+            return f.read()
+
+    src = ["-f", "lavfi", "-i", "testsrc=size=320x240:rate=25:duration=2"]
+    tone = ["-f", "lavfi", "-i", "sine=duration=2"]
+
+    webm = make("clip.webm", *src, *tone, "-c:v", "libvpx", "-c:a", "libvorbis", "-shortest")
+    check("webm", video_probe.probe(webm), container="webm", duration=2.0, width=320, height=240,
+          codec="V_VP8", fps=25.0, has_video=True)
+
+    # moov after mdat (no faststart) and fragmented MP4 (samples in moof boxes)
+    tail = make("tail.mp4", *src, "-c:v", "libx264", "-preset", "ultrafast")
+    check("moov at end", video_probe.probe(tail), duration=2.0, width=320, height=240, fps=25.0)
+    frag = make("frag.mp4", *src, "-c:v", "libx264", "-preset", "ultrafast", "-g", "10",
+                "-movflags", "frag_keyframe+empty_moov")
+    check("fragmented", video_probe.probe(frag), duration=2.0, width=320, height=240, fps=25.0)
+
+    # QuickTime: minf has a data handler (dhlr/url) after the media handler (mhlr/vide)
+    mov = make("clip.mov", *src, *tone, "-c:v", "libx264", "-preset", "ultrafast", "-c:a", "aac", "-shortest")
+    mov_info = video_probe.probe(mov)
+    check("mov", mov_info, container="mp4", duration=2.0, width=320, height=240, fps=25.0, has_video=True)
+    if [t["type"] for t in mov_info["tracks"]] != ["video", "audio"]:
+        failures.append(f"mov tracks: {mov_info['tracks']}")
+
+    audio_only = make("voice.m4a", *tone, "-c:a", "aac")
+    check("audio only", video_probe.probe(audio_only), has_video=False)
+
+    zero = make("blip.mp4", "-f", "lavfi", "-i", "testsrc=size=320x240:rate=25:duration=0.2",
+                "-c:v", "libx264", "-preset", "ultrafast")
+
+    # Downstream: rejection happens before any render work
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        from daily_bot import _is_valid_video
+    with open(ROOT / "test_reel.mp4", "rb") as f:
+        if not _is_valid_video(f.read()):
+            failures.append("test_reel.mp4 should be a valid provider clip")
+    if not _is_valid_video(webm):
+        failures.append("webm clip should be valid")
+    if not _is_valid_video(mov):
+        failures.append("QuickTime .mov clip should be valid")
+    if _is_valid_video(audio_only):
+        failures.append("audio-only clip should be rejected")
+    if _is_valid_video(zero):
+        failures.append("0.2 s clip should be rejected")
+
+for bad in (b"\x00\x00\x00\x18ftypisom" + b"\x00" * 100, b"\x89PNG\r\n\x1a\n" + b"\x00" * 100):
+    if video_probe.try_probe(bad) is not None:
+        failures.append("truncated MP4 / PNG should not probe")
+
+# Loop count from the probed clip length
+if loop_count(10.0, 5.0) != 2 or loop_count(4.0, 10.29) != 0 or loop_count(8.0, None) != -1:
+    failures.append("loop_count wrong")
+
+if failures:
+    for f in failures:
+        print("FAIL:", f)
+    sys.exit(2)
+print("PASS")
+sys.exit(0)
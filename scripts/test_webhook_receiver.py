@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""Test webhook-driven video jobs: a local stand-in provider POSTs the completion payload."""
+from pathlib import Path
+import sys
+import json
+import time
+import base64
+import threading
+import requests
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+import video_jobs
+from webhook_receiver import WebhookReceiver, sign_standard_webhook, standard_webhook_verifier
+
+failures = []
+SECRET = "whsec_" + base64.b64encode(b"astroboli-test-secret-0123456789").decode()
+VIDEO = b"\x00\x00\x00\x18ftypmp42" + b"\x00" * 2000
+
+
+def post_signed(url, payload, secret=SECRET, msg_id="msg_1", timestamp=None):
+    body = json.dumps(payload).encode()
+    timestamp = str(int(timestamp if timestamp is not None else time.time()))
+    headers = {
+        "content-type": "application/json",
+        "webhook-id": msg_id,
+        "webhook-timestamp": timestamp,
+        "webhook-signature": sign_standard_webhook(secret, msg_id, timestamp, body),
+    }
+    return requests.post(url, data=body, headers=headers, timeout=5)
+
+
+class StandInReplicate(video_jobs.ReplicateProvider):
+    """Replicate stand-in: no network, completes by POSTing a signed webhook after `delay`."""
+
+    poll_interval = 60.0  # Polling alone could never finish within the test
+
+    def __init__(self, delay=0.2, sign_with=SECRET):
+        super().__init__("test", webhook_secret=SECRET)
+        self.delay, self.sign_with = delay, sign_with
+        self.polls, self.webhook, self.responses = 0, None, []
+
+    def submit(self, prompt, duration, webhook=None):
+        self.webhook = webhook
+
+        def deliver():
+            time.sleep(self.delay)
+            prediction = {"id": "p1", "status": "succeeded", "output": ["https://example.invalid/v.mp4"]}
+            self.responses.append(post_signed(webhook, prediction, secret=self.sign_with).status_code)
+
+        if webhook:
+            threading.Thread(target=deliver, daemon=True).start()
+        return {"id": "p1", "get_url": "", "cancel_url": ""}
+
+    def poll(self, handle):
+        self.polls += 1
+        return {"state": "pending", "retry_after": None}
+
+    def cancel(self, handle):
+        pass
+
+    def download(self, url):
+        return VIDEO
+
+
+with WebhookReceiver("http://127.0.0.1:0", bind="127.0.0.1:0") as receiver:
+    receiver.public_url = f"http://127.0.0.1:{receiver.port}"
+
+    # Signed webhook wakes the job immediately, without a single poll
+    provider = StandInReplicate()
+    start = time.monotonic()
+    winner = video_jobs.download_first_video([provider], "stars", 5, timeout=10, receiver=receiver)
+    elapsed = time.monotonic() - start
+    print(f"webhook job finished in {elapsed:.2f}s, polls={provider.polls}, responses={provider.responses}")
+    if not winner or winner[1] != VIDEO:
+        failures.append("webhook job should return the video")
+    if elapsed > 3 or provider.polls:
+        failures.append("completion should come from the webhook, not polling")
+    if not provider.webhook or "/hooks/" not in provider.webhook:
+        failures.append("submit should receive a per-job callback URL")
+
+    # A forged signature is rejected and does not finish the job
+    forged = StandInReplicate(sign_with="whsec_" + base64.b64encode(b"wrong-secret").decode())
+    video_jobs.WEBHOOK_POLL_SECONDS = 0.3
+    winner = video_jobs.download_first_video([forged], "stars", 5, timeout=1.0, receiver=receiver)
+    if winner is not None or forged.responses != [401]:
+        failures.append(f"forged webhook should be rejected with 401, got {forged.responses}")
+    if not forged.polls:
+        failures.append("polling should keep running as a safety net while waiting for the webhook")
+
+    # Finished jobs are unregistered; unknown tokens are 404
+    if post_signed(provider.webhook, {"status": "succeeded"}).status_code != 404:
+        failures.append("callback URL should be gone after the job finished")
+    if requests.post(f"{receiver.public_url}/hooks/nope", data=b"{}", timeout=5).status_code != 404:
+        failures.append("unknown token should be 404")
+
+# Signature checks: replayed (old) timestamps and rotated signature lists
+verify = standard_webhook_verifier(SECRET)
+body = b'{"id": "p1"}'
+old = str(int(time.time()) - 3600)
+if verify({"webhook-id": "m", "webhook-timestamp": old,
+           "webhook-signature": sign_standard_webhook(SECRET, "m", old, body)}, body):
+    failures.append("old timestamp should be rejected")
+now = str(int(time.time()))
+rotated = "v1,bm90LXRoZS1zaWduYXR1cmU= " + sign_standard_webhook(SECRET, "m", now, body)
+if not verify({"webhook-id": "m", "webhook-timestamp": now, "webhook-signature": rotated}, body):
+    failures.append("any matching signature in the header should be accepted")
+
+# fal webhook payloads map to job states
+fal = video_jobs.FalProvider("test")
+if fal.parse_webhook({"status": "OK", "payload": {"video": {"url": "u"}}}) != {"state": "done", "url": "u"}:
+    failures.append("fal OK webhook should be done")
+if fal.parse_webhook({"status": "ERROR", "error": "boom"})["state"] != "failed":
+    failures.append("fal ERROR webhook should fail")
+
+if failures:
+    for f in failures:
+        print("FAIL:", f)
+    sys.exit(2)
+print("PASS")
+sys.exit(0)
@@ -0,0 +1,223 @@
+"""
+Reusable SMTP delivery session.
+
+Every send used to open smtplib.SMTP, run STARTTLS, log in, send one message and
+quit. Batch runs (several days, brands or variants) repeated that TCP + TLS + AUTH
+handshake per message and ran into Gmail's login rate limits. SMTPSession keeps
+one authenticated connection for the whole process:
+
+  - before a send on a connection that has been idle, a NOOP checks it is still up
+  - a dropped connection (idle timeout, server restart) is reopened transparently
+    and the message is sent again once
+  - sends are spaced at least SMTP_MIN_INTERVAL apart (rate limiting)
+
+DeliveryQueue collects messages and sends them in order over one session, so a
+failed message does not stop the rest. get_session() is the process-wide session
+that send_email / send_carousel_email use; it is closed at exit. Messages can be
+email.message objects or mime_stream.MessageSpec, which is streamed onto the socket.
+
+Any SMTP server works (SMTP_HOST / SMTP_PORT / SMTP_STARTTLS). For local tests
+there is a stand-in server in scripts/smtp_standin.py.
+"""
+
+import os
+import ssl
+import time
+import atexit
+import smtplib
+
+from mime_stream import MessageSpec, iter_message, dot_stuffed
+
+SMTP_HOST = os.environ.get("SMTP_HOST", "smtp.gmail.com")
+SMTP_PORT = int(os.environ.get("SMTP_PORT", "587"))
+SMTP_STARTTLS = os.environ.get("SMTP_STARTTLS", "1") not in ("0", "false", "False")
+SMTP_TIMEOUT = 60
+SMTP_MIN_INTERVAL = float(os.environ.get("SMTP_MIN_INTERVAL", "1.0"))  # Seconds between two sends
+NOOP_AFTER_IDLE = 10.0  # Check the connection with NOOP when it has been idle this long
+
+# Errors that mean the connection is gone (as opposed to the message being refused)
+CONNECTION_ERRORS = (smtplib.SMTPServerDisconnected, ConnectionError, TimeoutError)
+
+
+class SMTPSession:
+    """One authenticated SMTP connection, kept open and reused across sends."""
+
+    def __init__(self, user=None, password=None, host=None, port=None, starttls=None,
+                 timeout=SMTP_TIMEOUT, min_interval=None, noop_after=NOOP_AFTER_IDLE):
+        self.user = user
+        self.password = password
+        self.host = host or SMTP_HOST
+        self.port = port or SMTP_PORT
+        self.starttls = SMTP_STARTTLS if starttls is None else starttls
+        self.timeout = timeout
+        self.min_interval = SMTP_MIN_INTERVAL if min_interval is None else min_interval
+        self.noop_after = noop_after
+        self.stats = {"connects": 0, "logins": 0, "noops": 0, "reconnects": 0, "sent": 0}
+        self._smtp = None
+        self._last_used = 0.0
+        self._last_send = None
+
+    def connect(self):
+        """Open, secure and authenticate the connection (closing any old one)."""
+        self.close()
+        smtp = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+        try:
+            smtp.ehlo()
+            if self.starttls:
+                smtp.starttls(context=ssl.create_default_context())
+                smtp.ehlo()
+            if self.user:
+                smtp.login(self.user, self.password)
+                self.stats["logins"] += 1
+        except Exception:
+            smtp.close()
+            raise
+        self._smtp = smtp
+        self._last_used = time.monotonic()
+        self.stats["connects"] += 1
+        return self
+
+    @property
+    def connected(self) -> bool:
+        return self._smtp is not None
+
+    def is_alive(self) -> bool:
+        """Whether the connection is usable; sends a NOOP if it has been idle."""
+        if self._smtp is None:
+            return False
+        if time.monotonic() - self._last_used < self.noop_after:
+            return True
+        try:
+            self.stats["noops"] += 1
+            code, _ = self._smtp.noop()
+        except (smtplib.SMTPException, OSError):
+            return False
+        self._last_used = time.monotonic()
+        return code == 250
+
+    def ensure_connected(self):
+        if not self.is_alive():
+            if self._smtp is not None:
+                self.stats["reconnects"] += 1
+                print("    🔌 SMTP connection dropped, reconnecting...")
+            self.connect()
+        return self
+
+    def _wait_turn(self):
+        if self._last_send is not None and self.min_interval > 0:
+            wait = self._last_send + self.min_interval - time.monotonic()
+            if wait > 0:
+                time.sleep(wait)
+
+    def send(self, msg, from_addr=None, to_addrs=None):
+        """
+        Send an email.message.Message or a mime_stream.MessageSpec (streamed, see
+        _send_spec) over the shared connection. If the connection turns out to be
+        dead mid-send it is reopened and the message is sent once more.
+        Refused messages (bad recipient, too large) raise smtplib errors as usual.
+        """
+        send = self._send_spec if isinstance(msg, MessageSpec) else self._smtp_send_message
+        self._wait_turn()
+        self.ensure_connected()
+        try:
+            refused = send(msg, from_addr, to_addrs)
+        except CONNECTION_ERRORS:
+            self.stats["reconnects"] += 1
+            print("    🔌 SMTP connection lost while sending, reconnecting once...")
+            self.connect()
+            refused = send(msg, from_addr, to_addrs)
+        self._last_used = self._last_send = time.monotonic()
+        self.stats["sent"] += 1
+        return refused
+
+    def _smtp_send_message(self, msg, from_addr, to_addrs):
+        return self._smtp.send_message(msg, from_addr, to_addrs)
+
+    def _send_spec(self, spec, from_addr=None, to_addrs=None):
+        """
+        MAIL / RCPT / DATA by hand so the body can be streamed: the pieces of
+        mime_stream.iter_message go onto the socket as they are encoded.
+        """
+        smtp = self._smtp
+        from_addr = from_addr or spec.from_addr
+        to_addrs = to_addrs or spec.to_addrs
+        code, resp = smtp.mail(from_addr)
+        if code != 250:
+            smtp.rset()
+            raise smtplib.SMTPSenderRefused(code, resp, from_addr)
+        refused = {}
+        for rcpt in to_addrs:
+            code, resp = smtp.rcpt(rcpt)
+            if code not in (250, 251):
+                refused[rcpt] = (code, resp)
+        if len(refused) == len(to_addrs):
+            smtp.rset()
+            raise smtplib.SMTPRecipientsRefused(refused)
+        code, resp = smtp.docmd("DATA")
+        if code != 354:
+            smtp.rset()
+            raise smtplib.SMTPDataError(code, resp)
+        for piece in dot_stuffed(iter_message(spec)):
+            smtp.send(piece)
+        smtp.send(b".\r\n")
+        code, resp = smtp.getreply()
+        if code != 250:
+            smtp.rset()
+            raise smtplib.SMTPDataError(code, resp)
+        return refused
+
+    def close(self):
+        if self._smtp is not None:
+            try:
+                self._smtp.quit()
+            except (smtplib.SMTPException, OSError):
+                self._smtp.close()
+            self._smtp = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class DeliveryQueue:
+    """Messages sent in order over one SMTPSession; one failure does not stop the batch."""
+
+    def __init__(self, session: SMTPSession):
+        self.session = session
+        self._pending = []
+
+    def __len__(self):
+        return len(self._pending)
+
+    def put(self, msg, label=None, from_addr=None, to_addrs=None):
+        self._pending.append((label or msg.get("Subject", "message"), msg, from_addr, to_addrs))
+
+    def flush(self) -> list:
+        """Send everything queued. Returns [(label, error or None)] in queue order."""
+        results = []
+        pending, self._pending = self._pending, []
+        for label, msg, from_addr, to_addrs in pending:
+            try:
+                self.session.send(msg, from_addr, to_addrs)
+                results.append((label, None))
+            except Exception as e:
+                print(f"    ❌ Could not send {label}: {str(e)[:120]}")
+                results.append((label, e))
+        return results
+
+
+_session = None
+
+
+def get_session(user, password) -> SMTPSession:
+    """The process-wide session for these credentials (opened on first send, closed at exit)."""
+    global _session
+    if _session is None or (_session.user, _session.password) != (user, password):
+        if _session is not None:
+            _session.close()
+        else:
+            atexit.register(lambda: _session and _session.close())
+        _session = SMTPSession(user, password)
+    return _session
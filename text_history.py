@@ -0,0 +1,195 @@
+"""
+History of posted captions and slide lines with a MinHash/LSH index.
+
+Gemini likes to bring back lines we have already posted ("Trust the timing of
+your life."). Every posted caption hook and carousel slide line is appended to a
+JSON Lines history; on load each line gets a MinHash signature (character
+4-gram shingles, NumPy) bucketed into LSH bands, so a near-duplicate lookup is a
+handful of dict hits plus one signature comparison - well under a millisecond
+even after thousands of posts.
+"""
+
+import os
+import re
+import json
+import zlib
+import time
+import threading
+
+import numpy as np
+
+from file_lock import file_lock
+
+NUM_PERM = 64
+BANDS = 16
+ROWS = NUM_PERM // BANDS
+SHINGLE = 4
+
+# Universal hashing (a*x + b) mod p with p prime > 2^32; a < 2^31 keeps a*x inside uint64
+_PRIME = np.uint64(4294967311)
+_rng = np.random.default_rng(20240601)  # Fixed so signatures are stable between runs
+_A = _rng.integers(1, 2**31, size=NUM_PERM, dtype=np.uint64)
+_B = _rng.integers(0, 2**32, size=NUM_PERM, dtype=np.uint64)
+
+
+def normalize(text: str) -> str:
+    """Lowercase, drop punctuation/emojis, collapse whitespace."""
+    text = re.sub(r"[^\w\s]", " ", text.lower())
+    return re.sub(r"\s+", " ", text).strip()
+
+
+def shingles(text: str) -> set:
+    norm = normalize(text)
+    if len(norm) <= SHINGLE:
+        return {norm} if norm else set()
+    return {norm[i:i + SHINGLE] for i in range(len(norm) - SHINGLE + 1)}
+
+
+def minhash(shingle_set: set) -> np.ndarray:
+    """MinHash signature (NUM_PERM uint64 values) of a shingle set."""
+    if not shingle_set:
+        return np.full(NUM_PERM, np.iinfo(np.uint64).max, dtype=np.uint64)
+    x = np.fromiter((zlib.crc32(s.encode("utf-8")) for s in shingle_set), dtype=np.uint64)
+    hashed = (x[:, None] * _A[None, :] + _B[None, :]) % _PRIME
+    return hashed.min(axis=0)
+
+
+def caption_hook(caption: str) -> str:
+    """The part of a caption worth de-duplicating: its first sentence, without hashtags or CTA."""
+    body = caption.split("\n\n")[0]
+    body = re.sub(r"#\w+", "", body)
+    body = re.split(r"(?i)(?:—\s*)?visit\s+(?:https?://)?astroboli", body)[0]
+    first = re.split(r"(?<=[.!?])\s+", body.strip())[0]
+    return first.strip()
+
+
+def avoid_prompt(lines: list) -> str:
+    """Prompt addendum asking the model not to reuse these lines."""
+    unique = list(dict.fromkeys(l.strip() for l in lines if l and l.strip()))
+    if not unique:
+        return ""
+    listed = "\n".join(f"- {l}" for l in unique)
+    return (
+        "\n\nIMPORTANT: these lines were already posted recently. Do NOT reuse, reword or "
+        f"closely paraphrase any of them - write completely fresh lines:\n{listed}\n"
+    )
+
+
+class TextHistory:
+    """
+    Persistent posted-text history with MinHash/LSH near-duplicate lookup.
+    Several worker processes append to one file: lookups first index the lines
+    other workers appended since (tracked by byte offset), and appends hold a
+    file lock so lines from different processes never interleave.
+    """
+
+    def __init__(self, path: str, threshold: float = 0.6):
+        self.path = path
+        self.threshold = threshold
+        self._lock = threading.Lock()  # Queue / backfill workers add from several threads
+        self._reset()
+        self.refresh()
+
+    def _reset(self):
+        self.entries = []
+        self._shingles = []
+        self._signatures = []
+        self._buckets = {}
+        self._offset = 0  # Bytes of the file already indexed
+
+    def refresh(self):
+        """Index lines other processes appended since the last read."""
+        if not self.path:
+            return
+        with self._lock:
+            self._read_new()
+
+    def _read_new(self):
+        try:
+            size = os.path.getsize(self.path)
+        except OSError:
+            return
+        if size < self._offset:  # Truncated or replaced: start over
+            self._reset()
+        if size == self._offset:
+            return
+        with open(self.path, "rb") as f:
+            f.seek(self._offset)
+            data = f.read()
+        # A line still being written has no newline yet; leave it for the next read
+        complete = data[:data.rfind(b"\n") + 1]
+        self._offset += len(complete)
+        for line in complete.decode("utf-8", errors="replace").splitlines():
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                self._index(json.loads(line))
+            except (ValueError, KeyError, TypeError):
+                continue
+
+    def _index(self, entry: dict):
+        idx = len(self.entries)
+        sh = shingles(entry["text"])
+        sig = minhash(sh)
+        self.entries.append(entry)
+        self._shingles.append(sh)
+        self._signatures.append(sig)
+        for band in range(BANDS):
+            key = (band, sig[band * ROWS:(band + 1) * ROWS].tobytes())
+            self._buckets.setdefault(key, []).append(idx)
+
+    def __len__(self):
+        return len(self.entries)
+
+    def find(self, text: str) -> list:
+        """Return [(entry, similarity)] of past lines at or above the threshold, best first."""
+        sh = shingles(text)
+        if not sh:
+            return []
+        self.refresh()
+        sig = minhash(sh)
+        candidates = set()
+        for band in range(BANDS):
+            candidates.update(self._buckets.get((band, sig[band * ROWS:(band + 1) * ROWS].tobytes()), ()))
+        matches = []
+        for idx in candidates:
+            # Exact Jaccard on the (tiny) shingle sets confirms the LSH estimate
+            past = self._shingles[idx]
+            similarity = len(sh & past) / len(sh | past)
+            if similarity >= self.threshold:
+                matches.append((self.entries[idx], similarity))
+        matches.sort(key=lambda m: m[1], reverse=True)
+        return matches
+
+    def collisions(self, lines: list) -> list:
+        """Return the lines that are near-duplicates of something already posted."""
+        return [line for line in lines if line and self.find(line)]
+
+    def recent(self, n: int = 20, kind: str = None) -> list:
+        """Most recent n posted lines (optionally of one kind), newest first."""
+        self.refresh()
+        picked = [e["text"] for e in reversed(self.entries) if kind is None or e.get("kind") == kind]
+        return picked[:n]
+
+    def add(self, text: str, kind: str = "line"):
+        self.add_many([text], kind)
+
+    def add_many(self, lines: list, kind: str = "line"):
+        new = [{"text": l.strip(), "kind": kind, "ts": int(time.time())} for l in lines if l and l.strip()]
+        if not new:
+            return
+        with self._lock:
+            if not self.path:
+                for entry in new:
+                    self._index(entry)
+                return
+            with file_lock(self.path):
+                # Catch up first, so the offset lands right after our own lines
+                self._read_new()
+                os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+                with open(self.path, "ab") as f:
+                    f.write("".join(json.dumps(e, ensure_ascii=False) + "\n" for e in new).encode("utf-8"))
+                    self._offset = f.tell()
+                for entry in new:
+                    self._index(entry)
@@ -0,0 +1,382 @@
+"""
+Async job manager for the queue-based AI video providers (fal.ai, Luma, Replicate).
+
+Each provider is submit -> poll -> download. Instead of polling them one after
+another with blocking sleeps, every configured provider (or the top-k by
+priority) is submitted at once and all jobs are polled from one event loop.
+Each job waits as long as the provider asks (Retry-After header, queue
+position) before polling again. The first valid video wins; the other jobs are
+cancelled through the provider's cancel API so they stop burning credits.
+
+The HTTP calls use requests (blocking) and run in worker threads via
+asyncio.to_thread, so the providers stay plain, easily testable classes.
+
+With a WebhookReceiver (webhook_receiver.py), providers that support completion
+webhooks (fal, Replicate) are given a per-job callback URL and the job wakes as
+soon as the webhook arrives; polling then only runs as a slow safety net.
+"""
+
+import time
+import asyncio
+from email.utils import parsedate_to_datetime
+
+import requests
+
+MIN_POLL_SECONDS = 1.0
+MAX_POLL_SECONDS = 30.0
+DEFAULT_TIMEOUT = 300  # Overall budget for the whole race (seconds)
+WEBHOOK_POLL_SECONDS = 30.0  # Safety-net poll interval while waiting for a webhook
+
+
+def parse_retry_after(value, now=None):
+    """Seconds to wait from a Retry-After header (delta-seconds or HTTP date), or None."""
+    if value is None:
+        return None
+    value = str(value).strip()
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        when = parsedate_to_datetime(value).timestamp()
+    except (TypeError, ValueError, IndexError):
+        return None
+    return max(0.0, when - (now if now is not None else time.time()))
+
+
+def _clamp_delay(seconds):
+    return max(MIN_POLL_SECONDS, min(MAX_POLL_SECONDS, seconds))
+
+
+class VideoProvider:
+    """
+    One queue-based video API. Subclasses implement submit/poll/cancel with plain
+    blocking calls. poll() and parse_webhook() return a dict:
+        {"state": "pending" | "done" | "failed", "url": ..., "error": ..., "retry_after": seconds or None}
+    """
+
+    name = "provider"
+    poll_interval = 5.0
+    supports_webhook = False
+
+    def __init__(self, api_key, session=None):
+        self.api_key = api_key
+        self.session = session or requests.Session()
+
+    def submit(self, prompt, duration, webhook=None) -> dict:
+        raise NotImplementedError
+
+    def poll(self, handle: dict) -> dict:
+        raise NotImplementedError
+
+    def cancel(self, handle: dict):
+        raise NotImplementedError
+
+    def parse_webhook(self, payload: dict) -> dict:
+        raise NotImplementedError
+
+    def webhook_verifier(self):
+        """verify(headers, body) for this provider's webhook signatures, or None (URL token only)."""
+        return None
+
+    def download(self, url) -> bytes:
+        response = self.session.get(url, timeout=120)
+        if response.status_code != 200:
+            raise Exception(f"{self.name} download returned {response.status_code}")
+        return response.content
+
+    def _status(self, response, state, **extra) -> dict:
+        status = {"state": state, "retry_after": parse_retry_after(response.headers.get("Retry-After"))}
+        status.update(extra)
+        return status
+
+
+class FalProvider(VideoProvider):
+    """fal.ai queue API (Kling text-to-video)."""
+
+    name = "fal"
+    poll_interval = 3.0
+    supports_webhook = True
+    model = "fal-ai/kling-video/v1.5/standard/text-to-video"
+    base_url = "https://queue.fal.run"
+
+    def _headers(self):
+        return {"Authorization": f"Key {self.api_key}", "Content-Type": "application/json"}
+
+    def submit(self, prompt, duration, webhook=None) -> dict:
+        response = self.session.post(
+            f"{self.base_url}/{self.model}", headers=self._headers(), timeout=30,
+            params={"fal_webhook": webhook} if webhook else None,
+            json={"prompt": prompt, "duration": "5", "aspect_ratio": "9:16"},  # 5 s is looped to the reel length
+        )
+        if response.status_code != 200:
+            raise Exception(f"fal submit returned {response.status_code}")
+        data = response.json()
+        request_id = data["request_id"]
+        base = f"{self.base_url}/{self.model}/requests/{request_id}"
+        return {
+            "id": request_id,
+            "status_url": data.get("status_url") or f"{base}/status",
+            "response_url": data.get("response_url") or base,
+            "cancel_url": data.get("cancel_url") or f"{base}/cancel",
+        }
+
+    def poll(self, handle: dict) -> dict:
+        response = self.session.get(handle["status_url"], headers=self._headers(), timeout=30)
+        if response.status_code not in (200, 202):
+            return self._status(response, "pending")
+        data = response.json()
+        status = data.get("status")
+        if status == "COMPLETED":
+            result = self.session.get(handle["response_url"], headers=self._headers(), timeout=30)
+            if result.status_code != 200:
+                return {"state": "failed", "error": f"result returned {result.status_code}"}
+            url = (result.json().get("video") or {}).get("url")
+            return {"state": "done", "url": url} if url else {"state": "failed", "error": "no video url"}
+        if status in ("FAILED", "ERROR"):
+            return {"state": "failed", "error": data.get("error")}
+        # Further back in the queue -> poll less often
+        queued = data.get("queue_position") or 0
+        hint = self.poll_interval + 2 * queued if status == "IN_QUEUE" else None
+        status = self._status(response, "pending")
+        if status["retry_after"] is None and hint:
+            status["retry_after"] = hint
+        return status
+
+    def cancel(self, handle: dict):
+        self.session.put(handle["cancel_url"], headers=self._headers(), timeout=15)
+
+    def parse_webhook(self, payload: dict) -> dict:
+        # {"request_id": ..., "status": "OK" | "ERROR", "payload": <model output>, "error": ...}
+        if payload.get("status") != "OK":
+            return {"state": "failed", "error": payload.get("error") or payload.get("payload_error")}
+        url = ((payload.get("payload") or {}).get("video") or {}).get("url")
+        return {"state": "done", "url": url} if url else {"state": "failed", "error": "no video url"}
+
+
+class LumaProvider(VideoProvider):
+    """Luma Dream Machine API."""
+
+    name = "luma"
+    poll_interval = 5.0
+    base_url = "https://api.lumalabs.ai/dream-machine/v1/generations"
+
+    def _headers(self):
+        return {"Authorization": f"Bearer {self.api_key}", "Content-Type": "application/json"}
+
+    def submit(self, prompt, duration, webhook=None) -> dict:
+        response = self.session.post(
+            self.base_url, headers=self._headers(), timeout=30,
+            json={"prompt": prompt, "aspect_ratio": "9:16", "loop": False},
+        )
+        if response.status_code not in (200, 201):
+            raise Exception(f"Luma submit returned {response.status_code}")
+        return {"id": response.json()["id"]}
+
+    def poll(self, handle: dict) -> dict:
+        response = self.session.get(f"{self.base_url}/{handle['id']}", headers=self._headers(), timeout=30)
+        if response.status_code != 200:
+            return self._status(response, "pending")
+        data = response.json()
+        state = data.get("state")
+        if state == "completed":
+            url = (data.get("assets") or {}).get("video")
+            return {"state": "done", "url": url} if url else {"state": "failed", "error": "no video url"}
+        if state == "failed":
+            return {"state": "failed", "error": data.get("failure_reason")}
+        return self._status(response, "pending")
+
+    def cancel(self, handle: dict):
+        # Luma has no separate cancel call; deleting a generation stops it
+        self.session.delete(f"{self.base_url}/{handle['id']}", headers=self._headers(), timeout=15)
+
+
+class ReplicateProvider(VideoProvider):
+    """Replicate predictions API (CogVideoX)."""
+
+    name = "replicate"
+    poll_interval = 4.0
+    supports_webhook = True
+    base_url = "https://api.replicate.com/v1/predictions"
+    secret_url = "https://api.replicate.com/v1/webhooks/default/secret"
+    version = "2b89ece6d64f7deccae55c54a3a2ca8d2bea04e3c0d3b5c6f7a1e8e5e5c5e5e5"
+
+    def __init__(self, api_key, session=None, webhook_secret=None):
+        super().__init__(api_key, session)
+        self.webhook_secret = webhook_secret
+
+    def _headers(self):
+        return {"Authorization": f"Token {self.api_key}", "Content-Type": "application/json"}
+
+    def submit(self, prompt, duration, webhook=None) -> dict:
+        payload = {"version": self.version, "input": {"prompt": prompt, "num_frames": 49, "fps": 8}}
+        if webhook:
+            payload.update(webhook=webhook, webhook_events_filter=["completed"])
+        response = self.session.post(self.base_url, headers=self._headers(), json=payload, timeout=30)
+        if response.status_code != 201:
+            raise Exception(f"Replicate submit returned {response.status_code}")
+        data = response.json()
+        urls = data.get("urls") or {}
+        return {
+            "id": data["id"],
+            "get_url": urls.get("get") or f"{self.base_url}/{data['id']}",
+            "cancel_url": urls.get("cancel") or f"{self.base_url}/{data['id']}/cancel",
+        }
+
+    def poll(self, handle: dict) -> dict:
+        response = self.session.get(handle["get_url"], headers=self._headers(), timeout=30)
+        if response.status_code != 200:
+            return self._status(response, "pending")
+        return self.parse_prediction(response.json(), response)
+
+    def parse_prediction(self, data: dict, response=None) -> dict:
+        status = data.get("status")
+        if status == "succeeded":
+            output = data.get("output")
+            url = output[0] if isinstance(output, list) and output else output
+            return {"state": "done", "url": url} if url else {"state": "failed", "error": "no video url"}
+        if status in ("failed", "canceled"):
+            return {"state": "failed", "error": data.get("error") or status}
+        if response is not None:
+            return self._status(response, "pending")
+        return {"state": "pending", "retry_after": None}
+
+    def cancel(self, handle: dict):
+        self.session.post(handle["cancel_url"], headers=self._headers(), timeout=15)
+
+    def parse_webhook(self, payload: dict) -> dict:
+        # The webhook body is the prediction object itself
+        return self.parse_prediction(payload)
+
+    def webhook_verifier(self):
+        from webhook_receiver import standard_webhook_verifier
+
+        if not self.webhook_secret:
+            # The signing secret belongs to the account; fetch it once with the API token
+            try:
+                response = self.session.get(self.secret_url, headers=self._headers(), timeout=15)
+                if response.status_code == 200:
+                    self.webhook_secret = response.json().get("key")
+            except Exception as e:
+                print(f"    ⚠️ replicate: could not fetch the webhook secret: {str(e)[:80]}")
+        if not self.webhook_secret:
+            print("    ⚠️ replicate: webhook signatures not verified (no secret)")
+            return None
+        return standard_webhook_verifier(self.webhook_secret)
+
+
+async def _cancel_job(provider, handle):
+    try:
+        await asyncio.to_thread(provider.cancel, handle)
+        print(f"    🛑 {provider.name}: job {handle.get('id')} cancelled")
+    except Exception as e:
+        print(f"    ⚠️ {provider.name}: cancel failed: {str(e)[:80]}")
+
+
+async def run_job(provider, prompt, duration, validate=None, deadline=None, receiver=None):
+    """
+    Submit one job and wait until it finishes: by webhook if a receiver is given and
+    the provider supports it, else by polling. Returns the video bytes; raises on failure.
+    """
+    deadline = deadline or time.monotonic() + DEFAULT_TIMEOUT
+    token = webhook_url = queue = None
+    if receiver is not None and provider.supports_webhook:
+        verify = await asyncio.to_thread(provider.webhook_verifier)
+        token, webhook_url, queue = receiver.register(verify)
+
+    try:
+        submit = asyncio.ensure_future(asyncio.to_thread(provider.submit, prompt, duration, webhook_url))
+        try:
+            handle = await asyncio.shield(submit)
+        except asyncio.CancelledError:
+            # The request may already be on its way; wait for the id so the job can be cancelled
+            try:
+                handle = await submit
+            except Exception:
+                raise asyncio.CancelledError()
+            await _cancel_job(provider, handle)
+            raise
+        print(f"    📤 {provider.name}: job {handle.get('id')} submitted" + (" (webhook)" if queue else ""))
+
+        try:
+            delay = WEBHOOK_POLL_SECONDS if queue else provider.poll_interval
+            poll_error = None
+            while True:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise TimeoutError(f"{provider.name} did not finish in time"
+                                       + (f" (last poll error: {str(poll_error)[:80]})" if poll_error else ""))
+                status = None
+                if queue is not None:
+                    try:
+                        status = provider.parse_webhook(await asyncio.wait_for(queue.get(), min(delay, remaining)))
+                    except asyncio.TimeoutError:
+                        pass
+                else:
+                    await asyncio.sleep(min(delay, remaining))
+                if status is None:
+                    try:
+                        status = await asyncio.to_thread(provider.poll, handle)
+                    except Exception as e:
+                        # Connection reset, DNS, read timeout: the job is still running remotely, ask again later
+                        poll_error = e
+                        delay = _clamp_delay(delay * 2)
+                        print(f"    ⚠️ {provider.name}: poll failed ({str(e)[:80]}), retrying in {delay:.0f}s")
+                        continue
+                poll_error = None
+                if status["state"] in ("done", "failed"):
+                    break
+                retry_after = status.get("retry_after")
+                if queue is None:
+                    delay = _clamp_delay(retry_after if retry_after is not None else provider.poll_interval)
+        except (asyncio.CancelledError, Exception):
+            # Given up (timeout, cancelled by a winner, unexpected error): stop the paid job too
+            await _cancel_job(provider, handle)
+            raise
+    finally:
+        if token:
+            receiver.unregister(token)
+
+    if status["state"] == "failed":
+        raise Exception(f"{provider.name} job failed: {status.get('error')}")
+    data = await asyncio.to_thread(provider.download, status["url"])
+    if validate and not validate(data):
+        raise Exception(f"{provider.name} returned an invalid video")
+    return data
+
+
+async def first_video(providers, prompt, duration, validate=None, top_k=None, timeout=DEFAULT_TIMEOUT,
+                      receiver=None):
+    """
+    Race the providers (the first top_k in priority order, or all of them).
+    Returns (provider_name, video_bytes) for the first valid video, or None.
+    Jobs still running when a winner is found are cancelled.
+    """
+    chosen = list(providers)[:top_k] if top_k else list(providers)
+    if not chosen:
+        return None
+    deadline = time.monotonic() + timeout
+    tasks = {asyncio.create_task(run_job(p, prompt, duration, validate, deadline, receiver)): p for p in chosen}
+    pending = set(tasks)
+    winner = None
+    try:
+        while pending and winner is None:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                provider = tasks[task]
+                if task.exception() is not None:
+                    print(f"    ❌ {provider.name}: {str(task.exception())[:120]}")
+                elif winner is None:
+                    winner = (provider.name, task.result())
+    finally:
+        for task in pending:
+            task.cancel()
+        # Let the cancel API calls finish before returning
+        await asyncio.gather(*pending, return_exceptions=True)
+    return winner
+
+
+def download_first_video(providers, prompt, duration, validate=None, top_k=None, timeout=DEFAULT_TIMEOUT,
+                         receiver=None):
+    """Blocking wrapper around first_video for synchronous callers."""
+    return asyncio.run(first_video(providers, prompt, duration, validate, top_k, timeout, receiver))
@@ -0,0 +1,368 @@
+"""
+Pure-Python container probe for provider videos (MP4/MOV and WebM/Matroska).
+
+Reads only the metadata: MP4 box headers are walked and mdat is skipped by its
+size, so the moov box is found whether it sits at the front (faststart) or at
+the end. WebM is read up to the first Cluster. Nothing is decoded. Returns a plain dict:
+
+    {"container": "mp4", "duration": 5.04, "width": 720, "height": 1280,
+     "codec": "avc1", "fps": 24.0, "has_video": True,
+     "tracks": [{"type": "video", "codec": "avc1", "width": 720, "height": 1280,
+                 "duration": 5.04, "fps": 24.0}, {"type": "audio", ...}]}
+
+Top-level width/height/codec/fps come from the first video track.
+"""
+
+import mmap
+import struct
+
+# ===== MP4 / ISO BMFF =====
+
+_MP4_CONTAINERS = {b"moov", b"trak", b"mdia", b"minf", b"stbl", b"edts", b"mvex", b"dinf"}
+_HANDLERS = {b"vide": "video", b"soun": "audio", b"text": "text", b"sbtl": "subtitle", b"subt": "subtitle"}
+
+
+def _boxes(buf, start, end):
+    """Yield (type, payload_start, box_end) for the boxes in buf[start:end]."""
+    pos = start
+    while pos + 8 <= end:
+        size, kind = struct.unpack_from(">I4s", buf, pos)
+        header = 8
+        if size == 1:
+            if pos + 16 > end:
+                return
+            size = struct.unpack_from(">Q", buf, pos + 8)[0]
+            header = 16
+        elif size == 0:
+            size = end - pos
+        if size < header:
+            return
+        yield kind, pos + header, min(pos + size, end)
+        pos += size
+
+
+def _full_box(buf, pos):
+    """(version, payload start after version/flags) of a FullBox."""
+    return buf[pos], pos + 4
+
+
+def _parse_tkhd(buf, pos, end):
+    """(track_id, width, height); width/height are the box's last two 16.16 fixed-point fields."""
+    version, p = _full_box(buf, pos)
+    track_id = struct.unpack_from(">I", buf, p + (16 if version == 1 else 8))[0]
+    width, height = struct.unpack_from(">II", buf, end - 8)
+    return track_id, width >> 16, height >> 16
+
+
+def _parse_timing(buf, pos):
+    """(timescale, duration) of an mvhd or mdhd box (same layout up to duration)."""
+    version, p = _full_box(buf, pos)
+    if version == 1:
+        timescale, duration = struct.unpack_from(">IQ", buf, p + 16)
+    else:
+        timescale, duration = struct.unpack_from(">II", buf, p + 8)
+    return timescale, duration
+
+
+def _parse_stsd(buf, pos, end, kind):
+    _, p = _full_box(buf, pos)
+    if p + 4 > end or struct.unpack_from(">I", buf, p)[0] == 0:
+        return {}
+    entry = p + 4
+    _, codec = struct.unpack_from(">I4s", buf, entry)
+    info = {"codec": codec.decode("latin-1").strip()}
+    if kind == "video" and entry + 36 <= end:
+        # VisualSampleEntry: 8 header + 6 reserved + 2 data ref + 16 pre-defined/reserved, then width, height
+        info["width"], info["height"] = struct.unpack_from(">HH", buf, entry + 32)
+    return info
+
+
+def _parse_stts(buf, pos, end):
+    """(sample count, total duration in media timescale units) from the time-to-sample table."""
+    _, p = _full_box(buf, pos)
+    count = struct.unpack_from(">I", buf, p)[0]
+    samples = total = 0
+    for i in range(min(count, (end - p - 4) // 8)):
+        n, delta = struct.unpack_from(">II", buf, p + 4 + 8 * i)
+        samples += n
+        total += n * delta
+    return samples, total
+
+
+def _parse_trak(buf, start, end):
+    track = {"type": "other"}
+    timescale = duration = None
+    stts = None
+
+    def walk(s, e, parent):
+        nonlocal timescale, duration, stts
+        for kind, p, box_end in _boxes(buf, s, e):
+            if kind == b"tkhd":
+                track["id"], track["width"], track["height"] = _parse_tkhd(buf, p, box_end)
+            elif kind == b"mdhd":
+                timescale, duration = _parse_timing(buf, p)
+            elif kind == b"hdlr":
+                # Only the media handler; QuickTime also has a data handler (dhlr) inside minf
+                if parent == b"mdia":
+                    track["type"] = _HANDLERS.get(bytes(buf[p + 8:p + 12]), "other")
+            elif kind == b"stsd":
+                track.update(_parse_stsd(buf, p, box_end, track["type"]))
+            elif kind == b"stts":
+                stts = _parse_stts(buf, p, box_end)
+            elif kind in _MP4_CONTAINERS:
+                walk(p, box_end, kind)
+
+    walk(start, end, b"trak")
+    if timescale:
+        track["timescale"] = timescale
+        track["duration"] = duration / timescale
+    if track["type"] == "video" and stts and stts[1] and timescale:
+        track["fps"] = round(stts[0] * timescale / stts[1], 3)
+    if track["type"] != "video":
+        track.pop("width", None)
+        track.pop("height", None)
+    return track
+
+
+def _fragment_end(buf, moof_start, moof_end, trex_durations):
+    """{track_id: (end time, samples, sample time)} in media units from one moof (tfdt + trun durations)."""
+    ends = {}
+    for kind, p, box_end in _boxes(buf, moof_start, moof_end):
+        if kind != b"traf":
+            continue
+        track_id, default_duration, base, total, samples = None, None, 0, 0, 0
+        for sub, sp, sub_end in _boxes(buf, p, box_end):
+            if sub == b"tfhd":
+                flags = _uint(buf, sp + 1, sp + 4)
+                track_id = struct.unpack_from(">I", buf, sp + 4)[0]
+                q = sp + 8 + (8 if flags & 0x01 else 0) + (4 if flags & 0x02 else 0)
+                if flags & 0x08:
+                    default_duration = struct.unpack_from(">I", buf, q)[0]
+            elif sub == b"tfdt":
+                base = struct.unpack_from(">Q" if buf[sp] == 1 else ">I", buf, sp + 4)[0]
+            elif sub == b"trun":
+                flags = _uint(buf, sp + 1, sp + 4)
+                count = struct.unpack_from(">I", buf, sp + 4)[0]
+                samples += count
+                q = sp + 8 + (4 if flags & 0x01 else 0) + (4 if flags & 0x04 else 0)
+                if flags & 0x100:
+                    stride = 4 * bin(flags & 0xF00).count("1")
+                    total += sum(struct.unpack_from(">I", buf, q + i * stride)[0] for i in range(count))
+                else:
+                    per_sample = default_duration if default_duration is not None else trex_durations.get(track_id, 0)
+                    total += count * per_sample
+        if track_id is not None:
+            ends[track_id] = (base + total, samples, total)
+    return ends
+
+
+def probe_mp4(buf) -> dict:
+    """Probe an MP4/MOV held in a bytes-like object (bytes, memoryview, mmap)."""
+    end = len(buf)
+    if end < 12 or bytes(buf[4:8]) != b"ftyp":
+        raise ValueError("not an MP4 (no ftyp box)")
+    info = {"container": "mp4", "duration": None, "tracks": []}
+    movie_timescale = fragment_duration = None
+    found_moov = False
+    trex_durations = {}
+    last_moof = None
+    for kind, p, box_end in _boxes(buf, 0, end):
+        if kind == b"moof":
+            last_moof = (p, box_end)
+        if kind != b"moov":
+            continue
+        found_moov = True
+        for sub, sp, sub_end in _boxes(buf, p, box_end):
+            if sub == b"mvhd":
+                movie_timescale, duration = _parse_timing(buf, sp)
+                info["duration"] = duration / movie_timescale if movie_timescale else None
+            elif sub == b"trak":
+                info["tracks"].append(_parse_trak(buf, sp, sub_end))
+            elif sub == b"mvex":
+                # Fragmented MP4: the movie header duration is 0, mehd has the real one
+                info["fragmented"] = True
+                for ext, ep, _ in _boxes(buf, sp, sub_end):
+                    if ext == b"mehd":
+                        version, q = _full_box(buf, ep)
+                        fragment_duration = struct.unpack_from(">Q" if version == 1 else ">I", buf, q)[0]
+                    elif ext == b"trex":
+                        track_id, _, default_duration = struct.unpack_from(">III", buf, ep + 4)
+                        trex_durations[track_id] = default_duration
+        if fragment_duration and not info["duration"] and movie_timescale:
+            info["duration"] = fragment_duration / movie_timescale
+    if not found_moov:
+        raise ValueError("MP4 has no moov box (truncated download?)")
+
+    if info.get("fragmented") and last_moof:
+        # Samples live in the fragments: the last moof says where each track ends
+        for track_id, (media_end, samples, sample_time) in _fragment_end(buf, *last_moof, trex_durations).items():
+            track = next((t for t in info["tracks"] if t.get("id") == track_id), None)
+            if track and track.get("timescale"):
+                track["duration"] = media_end / track["timescale"]
+                if track["type"] == "video":
+                    track["fps"] = round(samples * track["timescale"] / sample_time, 3) if sample_time else None
+        # The movie header only covers samples in the moov itself
+        durations = [t["duration"] for t in info["tracks"] if t.get("duration")]
+        info["duration"] = max(durations + [info["duration"] or 0])
+    if not info["duration"]:
+        durations = [t["duration"] for t in info["tracks"] if t.get("duration")]
+        info["duration"] = max(durations) if durations else info["duration"]
+    for track in info["tracks"]:
+        track.pop("timescale", None)
+    return _summarize(info)
+
+
+# ===== WebM / Matroska (EBML) =====
+
+_EBML = 0x1A45DFA3
+_DOCTYPE = 0x4282
+_SEGMENT = 0x18538067
+_INFO = 0x1549A966
+_TIMECODE_SCALE = 0x2AD7B1
+_DURATION = 0x4489
+_TRACKS = 0x1654AE6B
+_TRACK_ENTRY = 0xAE
+_TRACK_TYPE = 0x83
+_CODEC_ID = 0x86
+_DEFAULT_DURATION = 0x23E383
+_VIDEO = 0xE0
+_PIXEL_WIDTH = 0xB0
+_PIXEL_HEIGHT = 0xBA
+_CLUSTER = 0x1F43B675
+_TRACK_TYPES = {1: "video", 2: "audio", 17: "subtitle"}
+
+
+def _vint(buf, pos, keep_marker):
+    """Read an EBML variable-length integer. Returns (value, length, all_ones)."""
+    first = buf[pos]
+    length = 1
+    mask = 0x80
+    while length <= 8 and not first & mask:
+        mask >>= 1
+        length += 1
+    if length > 8:
+        raise ValueError("invalid EBML variable-length integer")
+    value = first if keep_marker else first & (mask - 1)
+    for i in range(1, length):
+        value = (value << 8) | buf[pos + i]
+    all_ones = not keep_marker and value == (1 << (7 * length)) - 1
+    return value, length, all_ones
+
+
+def _elements(buf, start, end):
+    """Yield (id, data_start, data_end) for the EBML elements in buf[start:end]."""
+    pos = start
+    while pos < end:
+        element_id, id_len, _ = _vint(buf, pos, keep_marker=True)
+        size, size_len, unknown = _vint(buf, pos + id_len, keep_marker=False)
+        data = pos + id_len + size_len
+        data_end = end if unknown else min(data + size, end)  # Unknown size: runs to the parent's end
+        yield element_id, data, data_end
+        if unknown:
+            return
+        pos = data + size
+
+
+def _uint(buf, s, e):
+    return int.from_bytes(bytes(buf[s:e]), "big")
+
+
+def _float(buf, s, e):
+    n = e - s
+    if n == 4:
+        return struct.unpack(">f", bytes(buf[s:e]))[0]
+    if n == 8:
+        return struct.unpack(">d", bytes(buf[s:e]))[0]
+    return None
+
+
+def _parse_track_entry(buf, s, e):
+    track = {"type": "other"}
+    for element_id, ds, de in _elements(buf, s, e):
+        if element_id == _TRACK_TYPE:
+            track["type"] = _TRACK_TYPES.get(_uint(buf, ds, de), "other")
+        elif element_id == _CODEC_ID:
+            track["codec"] = bytes(buf[ds:de]).decode("ascii", "replace").rstrip("\x00")
+        elif element_id == _DEFAULT_DURATION:
+            frame_ns = _uint(buf, ds, de)
+            if frame_ns:
+                track["fps"] = round(1e9 / frame_ns, 3)
+        elif element_id == _VIDEO:
+            for vid, vs, ve in _elements(buf, ds, de):
+                if vid == _PIXEL_WIDTH:
+                    track["width"] = _uint(buf, vs, ve)
+                elif vid == _PIXEL_HEIGHT:
+                    track["height"] = _uint(buf, vs, ve)
+    if track["type"] != "video":
+        track.pop("fps", None)
+    return track
+
+
+def probe_webm(buf) -> dict:
+    """Probe a WebM/Matroska file held in a bytes-like object."""
+    end = len(buf)
+    if end < 4 or _uint(buf, 0, 4) != _EBML:
+        raise ValueError("not an EBML file")
+    info = {"container": "webm", "duration": None, "tracks": []}
+    timecode_scale = 1_000_000  # Matroska default: timestamps in milliseconds
+    raw_duration = None
+    for element_id, s, e in _elements(buf, 0, end):
+        if element_id == _EBML:
+            for hid, hs, he in _elements(buf, s, e):
+                if hid == _DOCTYPE:
+                    info["container"] = bytes(buf[hs:he]).decode("ascii", "replace").rstrip("\x00")
+        elif element_id == _SEGMENT:
+            for sid, ss, se in _elements(buf, s, e):
+                if sid == _INFO:
+                    for iid, i_s, i_e in _elements(buf, ss, se):
+                        if iid == _TIMECODE_SCALE:
+                            timecode_scale = _uint(buf, i_s, i_e)
+                        elif iid == _DURATION:
+                            raw_duration = _float(buf, i_s, i_e)
+                elif sid == _TRACKS:
+                    info["tracks"] = [_parse_track_entry(buf, ts, te)
+                                      for tid, ts, te in _elements(buf, ss, se) if tid == _TRACK_ENTRY]
+                elif sid == _CLUSTER:
+                    break  # Media data starts; all the metadata we need comes before it
+            break
+    if raw_duration is not None:
+        info["duration"] = raw_duration * timecode_scale / 1e9
+    return _summarize(info)
+
+
+# ===== Common =====
+
+def _summarize(info: dict) -> dict:
+    video = next((t for t in info["tracks"] if t["type"] == "video"), None)
+    info["has_video"] = video is not None
+    for key in ("width", "height", "codec", "fps"):
+        info[key] = video.get(key) if video else None
+    return info
+
+
+def probe(data) -> dict:
+    """Probe MP4 or WebM bytes. Raises ValueError for anything else or unparseable metadata."""
+    header = bytes(data[:12])
+    try:
+        if header[4:8] == b"ftyp":
+            return probe_mp4(data)
+        if header[:4] == b"\x1a\x45\xdf\xa3":
+            return probe_webm(data)
+    except (struct.error, IndexError) as e:
+        raise ValueError(f"truncated or corrupt container: {e}")
+    raise ValueError("unsupported container (expected MP4 or WebM)")
+
+
+def probe_file(path: str) -> dict:
+    """Probe a file on disk; memory-mapped, so only the pages holding metadata are read."""
+    with open(path, "rb") as f:
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            return probe(mapped)
+
+
+def try_probe(data):
+    """probe() that returns None instead of raising."""
+    try:
+        return probe(data)
+    except ValueError:
+        return None
@@ -0,0 +1,148 @@
+"""
+Embedded webhook receiver for video job completion.
+
+Replicate and the fal queue can call a URL when a job finishes instead of being
+polled. WebhookReceiver is a small standard-library HTTP server (ThreadingHTTPServer
+in a daemon thread). Every job registers its own unguessable callback URL
+(/hooks/<token>), and a delivery wakes the waiting asyncio job at once. Replicate
+signs its webhooks with the Standard Webhooks scheme (HMAC-SHA256 over
+"id.timestamp.body"), which is verified before anything is delivered. fal
+deliveries are authenticated by the per-job token in the URL.
+
+The receiver is only useful when the providers can reach it, so it is started only
+when WEBHOOK_PUBLIC_URL is configured (a tunnel or reverse proxy to WEBHOOK_BIND);
+otherwise the job manager just polls.
+"""
+
+import hmac
+import json
+import time
+import base64
+import asyncio
+import hashlib
+import secrets
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+MAX_BODY_BYTES = 1 << 20
+SIGNATURE_TOLERANCE = 300  # Seconds a signed timestamp may be off (replay protection)
+
+
+def sign_standard_webhook(secret: str, msg_id: str, timestamp, body: bytes) -> str:
+    """Standard Webhooks v1 signature (base64 HMAC-SHA256 of "id.timestamp.body")."""
+    key = base64.b64decode(secret.split("_", 1)[1] if secret.startswith("whsec_") else secret)
+    content = f"{msg_id}.{timestamp}.".encode("utf-8") + body
+    return "v1," + base64.b64encode(hmac.new(key, content, hashlib.sha256).digest()).decode("ascii")
+
+
+def standard_webhook_verifier(secret: str, tolerance: int = SIGNATURE_TOLERANCE):
+    """Return a verify(headers, body) function for Standard Webhooks (used by Replicate)."""
+
+    def verify(headers, body: bytes) -> bool:
+        msg_id = headers.get("webhook-id")
+        timestamp = headers.get("webhook-timestamp")
+        signatures = headers.get("webhook-signature")
+        if not (msg_id and timestamp and signatures):
+            return False
+        try:
+            if abs(time.time() - int(timestamp)) > tolerance:
+                return False
+        except ValueError:
+            return False
+        expected = sign_standard_webhook(secret, msg_id, timestamp, body)
+        # The header may list several space-separated signatures (secret rotation)
+        return any(hmac.compare_digest(expected, sig) for sig in signatures.split())
+
+    return verify
+
+
+class _Registration:
+    def __init__(self, loop, queue, verify):
+        self.loop = loop
+        self.queue = queue
+        self.verify = verify
+
+
+class _HookHandler(BaseHTTPRequestHandler):
+    server_version = "AstroboliHooks/1.0"
+
+    def do_POST(self):
+        receiver = self.server.receiver
+        token = self.path.split("?", 1)[0].rstrip("/").rsplit("/", 1)[-1]
+        registration = receiver._registrations.get(token) if self.path.startswith("/hooks/") else None
+        if registration is None:
+            return self._reply(404)
+
+        length = int(self.headers.get("Content-Length") or 0)
+        if length <= 0 or length > MAX_BODY_BYTES:
+            return self._reply(413 if length > MAX_BODY_BYTES else 400)
+        body = self.rfile.read(length)
+
+        if registration.verify and not registration.verify(self.headers, body):
+            print(f"    ⚠️ Webhook with a bad signature rejected ({token[:6]}...)")
+            return self._reply(401)
+        try:
+            payload = json.loads(body)
+        except ValueError:
+            return self._reply(400)
+
+        registration.loop.call_soon_threadsafe(registration.queue.put_nowait, payload)
+        self._reply(200)
+
+    def _reply(self, code):
+        self.send_response(code)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def log_message(self, format, *args):
+        pass  # Keep the bot's console output readable
+
+
+class WebhookReceiver:
+    """Per-job webhook endpoints served from a background thread."""
+
+    def __init__(self, public_url: str, bind: str = "0.0.0.0:8787"):
+        host, _, port = bind.rpartition(":")
+        self._server = ThreadingHTTPServer((host or "0.0.0.0", int(port)), _HookHandler)
+        self._server.daemon_threads = True
+        self._server.receiver = self
+        self._registrations = {}
+        self._thread = None
+        self.public_url = public_url.rstrip("/")
+
+    @property
+    def port(self) -> int:
+        return self._server.server_address[1]
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._server.serve_forever, name="webhooks", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        if self._thread is not None:
+            self._server.shutdown()
+            self._thread.join()
+            self._thread = None
+        self._server.server_close()
+
+    def register(self, verify=None):
+        """
+        Create a callback endpoint for one job. Must be called from the event loop
+        that will wait on it. Returns (token, url, queue); every verified delivery
+        is put on the asyncio queue.
+        """
+        token = secrets.token_urlsafe(24)
+        queue = asyncio.Queue()
+        self._registrations[token] = _Registration(asyncio.get_running_loop(), queue, verify)
+        return token, f"{self.public_url}/hooks/{token}", queue
+
+    def unregister(self, token: str):
+        self._registrations.pop(token, None)
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()